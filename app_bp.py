@@ -6,8 +6,13 @@ from folium.plugins import Fullscreen
 from streamlit_folium import st_folium
 import plotly.express as px
 import os
+import sys
 from branca.element import Template, MacroElement
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from mda_app.core.colunas_derivadas import anexar_colunas, aplicar_correcoes
+
 def reais(x):
     val = f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
     return val
@@ -37,25 +42,12 @@ with col2:
 # Carregar dados
 @st.cache_data
 def carregar_dados():
-    asd = gpd.read_file("dados/precificacao_al_ii.geojson")
-    # Criar indicadores adicionais
-    asd["valor_medio"] = (asd["valor_mun_perim"] + asd["valor_mun_area"]) / 2
-    return asd
+    return gpd.read_file("dados/precificacao_al_ii.geojson")
 
 gdf = carregar_dados()
-gdf = gdf.to_crs(epsg=4326)
-gdf['nota_insalub_2'] = gdf['nota_insalub_2'].apply(lambda x: 1 if x < 1 else x)
-gdf['valor_medio_car'] = np.where(
-    gdf['area_car_total'] != 0,
-    ((gdf['area_car_total'] / gdf['area_georef']) * gdf['valor_mun_area'])/gdf['num_imoveis'],
-    0
-)
-
-gdf['val_med_car_perim'] = np.where(
-    gdf['num_imoveis'] != 0,
-    gdf['valor_mun_perim'] / gdf['num_imoveis'],
-    0
-)
+gdf = aplicar_correcoes(gdf.to_crs(epsg=4326))
+# Indicadores adicionais: as mesmas fórmulas do app (mda_app.core.colunas_derivadas)
+gdf = anexar_colunas(gdf, ["valor_medio", "valor_medio_car", "val_med_car_perim"])
 
 # Filtros (sidebar)
 st.markdown("""
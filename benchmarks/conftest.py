@@ -0,0 +1,123 @@
+"""Infraestrutura da suíte de benchmarks.
+
+Execução:
+
+    python -m pytest benchmarks            # compara com baselines.json
+    MDA_BENCH_ATUALIZAR=1 python -m pytest benchmarks   # regrava as baselines
+
+Cada benchmark mede o menor tempo entre algumas repetições (ou a mediana,
+para medições ruidosas, depois de execuções de aquecimento) e falha quando
+ultrapassa `baseline * MDA_BENCH_TOLERANCIA` (padrão: 2,0) mais uma folga
+absoluta de 5 ms, que absorve o ruído de medições muito curtas. Benchmarks de
+vazão (ex.: relatórios por segundo) aparecem também no resumo final da execução.
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+import warnings
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mda_app.core.dados_sinteticos import TAMANHOS_PADRAO, gerar_base_sintetica
+
+CAMINHO_BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+TOLERANCIA = float(os.environ.get("MDA_BENCH_TOLERANCIA", "2.0"))
+FOLGA_S = 0.005
+ATUALIZAR = os.environ.get("MDA_BENCH_ATUALIZAR", "0") == "1"
+
+# Vértices extras por aresta: aproxima a densidade das malhas do IBGE simplificadas
+VERTICES_POR_ARESTA = 8
+
+
+def _ler_baselines():
+    if not os.path.exists(CAMINHO_BASELINES):
+        return {}
+    with open(CAMINHO_BASELINES, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class Benchmark:
+    """Executa medições e compara com as baselines gravadas."""
+
+    def __init__(self):
+        self.baselines = _ler_baselines()
+        self.novos = {}
+        self.vazoes = {}
+
+    def medir(self, nome, func, repeticoes=3, aquecimento=0, mediana=False):
+        """Medir `func` e verificar regressão contra a baseline `nome`.
+
+        Args:
+            aquecimento: Execuções descartadas antes das medidas (caches,
+                imports tardios, templates)
+            mediana: Usar a mediana das repetições em vez do menor tempo
+
+        Returns:
+            O valor de retorno da última execução.
+        """
+        tempos = []
+        resultado = None
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for _ in range(aquecimento):
+                func()
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                resultado = func()
+                tempos.append(time.perf_counter() - inicio)
+        medido = statistics.median(tempos) if mediana else min(tempos)
+        self.novos[nome] = round(medido, 6)
+
+        baseline = self.baselines.get(nome)
+        if not ATUALIZAR and baseline is not None:
+            limite = baseline * TOLERANCIA + FOLGA_S
+            assert medido <= limite, (
+                f"Regressão em {nome}: {medido:.4f}s > limite {limite:.4f}s "
+                f"(baseline {baseline:.4f}s)"
+            )
+        return resultado
+
+    def medir_vazao(self, nome, func, itens, unidade, repeticoes=3):
+        """Medir `func`, que processa `itens` itens, e registrar itens por segundo."""
+        resultado = self.medir(nome, func, repeticoes)
+        self.vazoes[nome] = (itens / max(self.novos[nome], 1e-9), unidade)
+        return resultado
+
+
+_sessao = Benchmark()
+
+
+@pytest.fixture(scope="session")
+def benchmark():
+    bench = _sessao
+    yield bench
+    if ATUALIZAR and bench.novos:
+        baselines = {**bench.baselines, **bench.novos}
+        with open(CAMINHO_BASELINES, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+
+@pytest.fixture(scope="session")
+def bases_sinteticas(tmp_path_factory):
+    """Bases sintéticas (GeoDataFrame e GeoJSON em disco) por tamanho."""
+    diretorio = tmp_path_factory.mktemp("bases")
+    bases = {}
+    for n in TAMANHOS_PADRAO:
+        gdf = gerar_base_sintetica(n, vertices_por_aresta=VERTICES_POR_ARESTA)
+        caminho = diretorio / f"sintetica_{n}.geojson"
+        gdf.to_file(caminho, driver="GeoJSON")
+        bases[n] = (gdf, str(caminho))
+    return bases
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _sessao.vazoes:
+        terminalreporter.section("vazão")
+        for nome, (valor, unidade) in sorted(_sessao.vazoes.items()):
+            terminalreporter.write_line(f"{nome}: {valor:,.1f} {unidade}/s")
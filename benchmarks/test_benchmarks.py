@@ -0,0 +1,242 @@
+"""Benchmarks das etapas do dashboard em bases sintéticas de 100 a 5.570 municípios."""
+
+import http.client
+import threading
+
+import pytest
+
+from mda_app.app import aplicar_filtros, calcular_media_notas_por_uf
+from mda_app.components.visualizations import criar_mapa
+from mda_app.core.autocorrelacao import COLUNAS_AUTOCORRELACAO, lisa
+from mda_app.core.camadas_regionais import camadas_regionais
+from mda_app.core.base_colunar import BaseColunar, salvar_base_colunar
+from mda_app.core.data_loader import carregar_dados, processar_dados_geograficos
+from mda_app.core.dados_sinteticos import TAMANHOS_PADRAO
+from mda_app.core.precificacao import COLUNAS_TRIMESTRES, calcular_totais_trimestrais
+from mda_app.core.relatorios import gerar_relatorios
+from mda_app.core.sensibilidade import COLUNAS_VALORES, simular
+from mda_app.core.servico_api import ServicoAPI, criar_servidor
+from mda_app.core.vizinhanca import construir_adjacencia
+
+COLUNAS_NOTAS = ["nota_veg", "nota_area", "nota_relevo", "nota_insalub_2",
+                 "nota_total_q1", "nota_total_q2", "nota_total_q3", "nota_total_q4"]
+
+
+@pytest.fixture(scope="module")
+def preparadas(bases_sinteticas):
+    """Bases já preparadas (EPSG:4326 e colunas derivadas)."""
+    return {n: processar_dados_geograficos(gdf) for n, (gdf, _) in bases_sinteticas.items()}
+
+
+def _filtros_padrao(gdf):
+    ufs = list(gdf["SIGLA_UF"].unique())
+    municipios = list(gdf["NM_MUN"].unique())
+    faixa = (float(gdf["nota_media"].min()), float(gdf["nota_media"].max()))
+    return ufs, municipios, "nota_media", faixa
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_carregamento(benchmark, bases_sinteticas, n):
+    _, caminho = bases_sinteticas[n]
+
+    def carregar():
+        carregar_dados.clear()
+        return carregar_dados(caminho)
+
+    gdf = benchmark.medir(f"carregamento[{n}]", carregar, repeticoes=2)
+    assert len(gdf) == n
+
+
+@pytest.fixture(scope="module")
+def bases_colunares(bases_sinteticas, tmp_path_factory):
+    """Mesmas bases sintéticas gravadas no formato colunar."""
+    diretorio = tmp_path_factory.mktemp("colunar")
+    caminhos = {}
+    for n, (gdf, _) in bases_sinteticas.items():
+        caminhos[n] = str(diretorio / f"sintetica_{n}")
+        salvar_base_colunar(gdf, caminhos[n])
+    return caminhos
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_carregamento_colunar(benchmark, bases_colunares, n):
+    gdf = benchmark.medir(
+        f"carregamento_colunar[{n}]",
+        lambda: BaseColunar(bases_colunares[n]).para_geodataframe(),
+    )
+    assert len(gdf) == n
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_atributos_colunar(benchmark, bases_colunares, n):
+    # Caminho só de atributos: nenhuma geometria é decodificada
+    df = benchmark.medir(
+        f"atributos_colunar[{n}]",
+        lambda: BaseColunar(bases_colunares[n]).atributos(["SIGLA_UF", "nota_media", "area_georef"]),
+        repeticoes=5,
+    )
+    assert len(df) == n
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_preparacao(benchmark, bases_sinteticas, n):
+    gdf, _ = bases_sinteticas[n]
+    resultado = benchmark.medir(f"preparacao[{n}]", lambda: processar_dados_geograficos(gdf.copy()))
+    assert resultado.crs.to_epsg() == 4326
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_filtragem(benchmark, preparadas, n):
+    gdf = preparadas[n]
+    ufs, municipios, criterio, faixa = _filtros_padrao(gdf)
+    filtrado = benchmark.medir(
+        f"filtragem[{n}]",
+        lambda: aplicar_filtros(gdf, ufs[:3], municipios, criterio, faixa),
+        repeticoes=5,
+    )
+    assert 0 < len(filtrado) <= n
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_precificacao(benchmark, preparadas, n):
+    gdf = preparadas[n]
+    totais = benchmark.medir(f"precificacao[{n}]", lambda: calcular_totais_trimestrais(gdf), repeticoes=5)
+    assert all(t > 0 for t in totais)
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_mapa(benchmark, preparadas, n):
+    gdf = preparadas[n]
+
+    def construir_e_renderizar():
+        # A renderização do HTML é o que o st_folium envia ao navegador
+        return criar_mapa(gdf, "nota_media").get_root().render()
+
+    html = benchmark.medir(f"mapa[{n}]", construir_e_renderizar, repeticoes=3, aquecimento=1, mediana=True)
+    assert len(html) > 0
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_mapa_agregado(benchmark, preparadas, n):
+    # Vista nacional pela camada de UFs; as geometrias dissolvidas já estão prontas
+    gdf = preparadas[n].copy()
+    gdf.attrs["versao"] = f"benchmark-{n}"
+    camadas_regionais(gdf)
+    html = benchmark.medir(
+        f"mapa_agregado[{n}]",
+        lambda: criar_mapa(gdf, "nota_media", base=gdf).get_root().render(),
+        repeticoes=2,
+    )
+    assert "municípios" in html
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_agregacao(benchmark, preparadas, n):
+    gdf = preparadas[n]
+    df_uf = benchmark.medir(
+        f"agregacao[{n}]",
+        lambda: calcular_media_notas_por_uf(gdf, COLUNAS_NOTAS),
+        repeticoes=5,
+    )
+    assert len(df_uf) == gdf["SIGLA_UF"].nunique()
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_relatorios(benchmark, preparadas, tmp_path, n):
+    # Um relatório HTML por município, com o pool de processos padrão
+    gdf = preparadas[n]
+    gerados = benchmark.medir_vazao(
+        f"relatorios[{n}]",
+        lambda: gerar_relatorios(gdf, tmp_path),
+        itens=n,
+        unidade="relatórios",
+        repeticoes=2,
+    )
+    assert len(gerados) == n
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_adjacencia(benchmark, preparadas, n):
+    # Grafo de vizinhança completo, sem reaproveitar o STRtree da base
+    geometrias = preparadas[n].geometry.to_numpy()
+    grafo = benchmark.medir(f"adjacencia[{n}]", lambda: construir_adjacencia(geometrias), repeticoes=3)
+    assert len(grafo) == n and grafo.graus().max() == 6
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_lisa(benchmark, preparadas, n):
+    # LISA das seis notas com 999 permutações, com o pool de processos padrão
+    gdf = preparadas[n]
+    grafo = construir_adjacencia(gdf.geometry.to_numpy())
+    valores = gdf[COLUNAS_AUTOCORRELACAO].to_numpy(dtype=float)
+    _, _, classes = benchmark.medir(f"lisa[{n}]", lambda: lisa(grafo, valores), repeticoes=1)
+    assert classes.shape == valores.shape
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_sensibilidade(benchmark, preparadas, n):
+    # 2000 sorteios com os desvios padrão, com o pool de processos padrão
+    gdf = preparadas[n]
+    contagem, totais = benchmark.medir(
+        f"sensibilidade[{n}]",
+        lambda: simular(gdf[COLUNAS_TRIMESTRES], gdf["nota_media"], gdf["area_georef"]),
+        repeticoes=1,
+    )
+    assert contagem.shape == (n, 6) and totais.shape == (2000, len(COLUNAS_VALORES))
+
+
+CLIENTES_API = 4
+REQUISICOES_POR_CLIENTE = 250
+
+
+@pytest.mark.parametrize("n", TAMANHOS_PADRAO)
+def test_bench_api(benchmark, preparadas, n):
+    # Clientes locais com conexões persistentes: agregados por UF (memorizados
+    # após a primeira consulta), municípios e revalidações por ETag
+    gdf = preparadas[n].copy()
+    gdf.attrs["versao"] = f"bench-{n}"
+    ufs = sorted(gdf["SIGLA_UF"].unique())
+    codigos = gdf["CD_MUN"].tolist()
+    servidor = criar_servidor(ServicoAPI(gdf), porta=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    porta = servidor.server_address[1]
+
+    def cliente(semente, falhas):
+        conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=30)
+        etags = {}
+        for i in range(REQUISICOES_POR_CLIENTE):
+            if i % 3 == 0:
+                caminho = f"/agregados?uf={ufs[(semente + i) % len(ufs)]}"
+            elif i % 3 == 1:
+                caminho = f"/municipios/{codigos[(semente * 7919 + i) % len(codigos)]}"
+            else:
+                caminho = "/precos"
+            cabecalhos = {"Accept-Encoding": "gzip"}
+            if caminho in etags:
+                cabecalhos["If-None-Match"] = etags[caminho]
+            conexao.request("GET", caminho, headers=cabecalhos)
+            resposta = conexao.getresponse()
+            resposta.read()
+            if resposta.status not in (200, 304):
+                falhas.append((caminho, resposta.status))
+            etags[caminho] = resposta.getheader("ETag")
+        conexao.close()
+
+    def rodada():
+        falhas = []
+        threads = [threading.Thread(target=cliente, args=(s, falhas)) for s in range(CLIENTES_API)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return falhas
+
+    try:
+        falhas = benchmark.medir_vazao(
+            f"api[{n}]", rodada, itens=CLIENTES_API * REQUISICOES_POR_CLIENTE, unidade="requisições",
+            repeticoes=2,
+        )
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+    assert falhas == []
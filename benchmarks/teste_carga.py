@@ -0,0 +1,335 @@
+"""Teste de carga headless: sessões concorrentes do dashboard.
+
+Simula N analistas usando o mesmo servidor: cada sessão é um `AppTest` do
+Streamlit executando `main.py` numa thread própria, com sequências aleatórias
+(mas reprodutíveis pela semente) de filtros de UF e município, cliques no mapa
+e mudanças na faixa do critério. Mede a latência de cada rerun, o pico de RSS
+do processo e a taxa de acerto dos caches, e grava um relatório JSON.
+
+Roda totalmente offline: a base é sintética (`mda_app.core.dados_sinteticos`)
+e o logo é substituído por uma imagem gerada num diretório de trabalho
+temporário.
+
+Uso:
+
+    python benchmarks/teste_carga.py --sessoes 8 --interacoes 20 --municipios 1000
+    python benchmarks/teste_carga.py --comparar relatorio_anterior.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(RAIZ, 'src'))
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil é opcional
+    psutil = None
+
+CHAVE_CLIQUE = "_teste_carga_clique"
+ACOES = ("filtro_uf", "filtro_municipio", "clique", "criterio", "limpar")
+
+_CONTEXTOS_ATIVOS = []
+
+
+class MonitorMemoria:
+    """Amostra o RSS do processo em segundo plano e guarda o pico."""
+
+    def __init__(self, intervalo=0.05):
+        self.intervalo = intervalo
+        self.pico_bytes = 0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+
+    def _rss_atual(self):
+        if psutil is not None:
+            return psutil.Process().memory_info().rss
+        import resource
+        # ru_maxrss está em KB no Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _amostrar(self):
+        while not self._parar.is_set():
+            self.pico_bytes = max(self.pico_bytes, self._rss_atual())
+            self._parar.wait(self.intervalo)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+        self.pico_bytes = max(self.pico_bytes, self._rss_atual())
+        return False
+
+
+def preparar_ambiente(n_municipios, semente):
+    """Gerar base sintética e diretório de trabalho com os assets mínimos."""
+    from PIL import Image
+
+    from mda_app.core.dados_sinteticos import gerar_base_sintetica
+
+    diretorio = tempfile.mkdtemp(prefix="mda_carga_")
+    os.makedirs(os.path.join(diretorio, "assets", "images"))
+    Image.new("RGB", (8, 8), "white").save(
+        os.path.join(diretorio, "assets", "images", "img_1.png")
+    )
+
+    gdf = gerar_base_sintetica(n_municipios, vertices_por_aresta=4, semente=semente)
+    caminho = os.path.join(diretorio, "base_sintetica.geojson")
+    gdf.to_file(caminho, driver="GeoJSON")
+    return diretorio, caminho, gdf.to_crs(epsg=4326)
+
+
+def instalar_cliques_simulados():
+    """Permitir que o harness injete cliques no mapa.
+
+    O componente do folium só devolve cliques vindos do navegador. O wrapper
+    mantém a renderização real (e seu custo) e, quando a sessão tem um clique
+    agendado em `session_state`, devolve-o como se viesse do navegador.
+    """
+    import streamlit as st
+    import streamlit_folium
+
+    st_folium_original = streamlit_folium.st_folium
+
+    def st_folium_com_clique(*args, **kwargs):
+        retorno = st_folium_original(*args, **kwargs)
+        clique = st.session_state.pop(CHAVE_CLIQUE, None)
+        if clique is not None:
+            retorno = dict(retorno or {})
+            retorno["last_clicked"] = clique
+        return retorno
+
+    streamlit_folium.st_folium = st_folium_com_clique
+
+
+def habilitar_apptest_concorrente():
+    """Permitir vários `AppTest` rodando ao mesmo tempo no processo.
+
+    Cada `AppTest.run()` instala um runtime falso em `Runtime._instance` e o
+    remove ao terminar, e ativa a opção `global.appTest` só durante a execução.
+    Com sessões em threads, o fim de uma execução derrubaria o runtime das
+    demais. Aqui o primeiro runtime instalado passa a ser compartilhado por
+    todas as sessões (como num servidor real) e a opção fica ativa durante todo
+    o teste de carga.
+    """
+    import contextlib
+
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.util import patch_config_options
+
+    class _MetaRuntimeCompartilhado(type(Runtime)):
+        def __setattr__(cls, nome, valor):
+            if nome == "_instance":
+                if valor is not None and Runtime._instance is None:
+                    Runtime._instance = valor
+                return
+            super().__setattr__(nome, valor)
+
+    class _RuntimeCompartilhado(Runtime, metaclass=_MetaRuntimeCompartilhado):
+        pass
+
+    app_test.Runtime = _RuntimeCompartilhado
+    # Manter a referência: se o context manager for coletado, o patch é desfeito
+    _CONTEXTOS_ATIVOS.append(patch_config_options({"global.appTest": True}))
+    _CONTEXTOS_ATIVOS[-1].__enter__()
+    app_test.patch_config_options = lambda *args, **kwargs: contextlib.nullcontext()
+
+
+def _sortear_acao(rng, at, gdf):
+    """Aplicar uma interação aleatória na sessão e devolver seu nome."""
+    acao = rng.choice(ACOES)
+    ufs = sorted(gdf["SIGLA_UF"].unique())
+
+    if acao == "filtro_uf":
+        at.sidebar.multiselect[0].set_value(rng.sample(ufs, rng.randint(1, min(4, len(ufs)))))
+    elif acao == "filtro_municipio":
+        widget = at.sidebar.multiselect[1] if len(at.sidebar.multiselect) > 1 else None
+        if widget is None or not widget.options:
+            return _sortear_acao(rng, at, gdf)
+        widget.set_value(rng.sample(list(widget.options), rng.randint(1, min(3, len(widget.options)))))
+    elif acao == "clique":
+        ufs_ativas = at.sidebar.multiselect[0].value or ufs
+        candidatos = gdf[gdf["SIGLA_UF"].isin(ufs_ativas)]
+        ponto = candidatos.geometry.iloc[rng.randrange(len(candidatos))].representative_point()
+        at.session_state[CHAVE_CLIQUE] = {"lat": ponto.y, "lng": ponto.x}
+    elif acao == "criterio":
+        slider = at.sidebar.slider[0]
+        minimo, maximo = slider.min, slider.max
+        a, b = sorted(rng.uniform(minimo, maximo) for _ in range(2))
+        slider.set_range(a, max(b, a + (maximo - minimo) * 0.2))
+    else:
+        at.sidebar.multiselect[0].set_value(ufs)
+        if len(at.sidebar.multiselect) > 1:
+            at.sidebar.multiselect[1].set_value([])
+        at.session_state["municipios_selecionados"] = []
+    return acao
+
+
+def executar_sessao(indice, args, gdf, resultados):
+    """Executar uma sessão completa e registrar a latência de cada rerun."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(args.semente * 1000 + indice)
+    at = AppTest.from_file(os.path.join(RAIZ, "main.py"), default_timeout=args.timeout)
+    registros = []
+
+    def rodar(acao):
+        inicio = time.perf_counter()
+        at.run()
+        latencia = time.perf_counter() - inicio
+        registros.append({
+            "sessao": indice,
+            "acao": acao,
+            "latencia_s": latencia,
+            "erro": str(at.exception[0].message) if at.exception else None,
+        })
+
+    rodar("inicial")
+    for _ in range(args.interacoes):
+        try:
+            acao = _sortear_acao(rng, at, gdf)
+        except (IndexError, ValueError):
+            # App parado (ex.: filtro sem resultados): voltar ao estado padrão
+            at = AppTest.from_file(os.path.join(RAIZ, "main.py"), default_timeout=args.timeout)
+            acao = "reinicio"
+        rodar(acao)
+    resultados[indice] = registros
+
+
+def percentis(valores):
+    """Resumo de latência em milissegundos."""
+    arr = np.asarray(valores) * 1000
+    return {
+        "n": int(arr.size),
+        "media_ms": round(float(arr.mean()), 2),
+        "p50_ms": round(float(np.percentile(arr, 50)), 2),
+        "p95_ms": round(float(np.percentile(arr, 95)), 2),
+        "p99_ms": round(float(np.percentile(arr, 99)), 2),
+        "max_ms": round(float(arr.max()), 2),
+    }
+
+
+def montar_relatorio(args, registros, pico_rss, duracao, stats_cache):
+    """Montar o relatório comparável da execução."""
+    import pandas as pd
+    import streamlit
+
+    df = pd.DataFrame(registros)
+    por_acao = {
+        acao: percentis(grupo["latencia_s"]) for acao, grupo in df.groupby("acao")
+    }
+    return {
+        "configuracao": {
+            "sessoes": args.sessoes,
+            "interacoes": args.interacoes,
+            "municipios": args.municipios,
+            "semente": args.semente,
+        },
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "streamlit": streamlit.__version__,
+            "cpus": os.cpu_count(),
+        },
+        "duracao_s": round(duracao, 3),
+        "reruns": len(df),
+        "reruns_por_s": round(len(df) / duracao, 3) if duracao else None,
+        "erros": int(df["erro"].notna().sum()),
+        "mensagens_erro": sorted(df["erro"].dropna().unique().tolist()),
+        "latencia": percentis(df["latencia_s"]),
+        "latencia_por_acao": por_acao,
+        "pico_rss_mb": round(pico_rss / 2**20, 1),
+        "cache": stats_cache,
+    }
+
+
+def comparar(atual, anterior):
+    """Imprimir a variação das métricas principais entre dois relatórios."""
+    print("\nComparação com relatório anterior:")
+    pares = [
+        ("p50 (ms)", atual["latencia"]["p50_ms"], anterior["latencia"]["p50_ms"]),
+        ("p95 (ms)", atual["latencia"]["p95_ms"], anterior["latencia"]["p95_ms"]),
+        ("p99 (ms)", atual["latencia"]["p99_ms"], anterior["latencia"]["p99_ms"]),
+        ("pico RSS (MB)", atual["pico_rss_mb"], anterior["pico_rss_mb"]),
+    ]
+    for nome, novo, velho in pares:
+        variacao = (novo - velho) / velho * 100 if velho else float("nan")
+        print(f"  {nome:<14} {velho:>10.1f} -> {novo:>10.1f}  ({variacao:+.1f}%)")
+    if atual["configuracao"] != anterior["configuracao"]:
+        print("  Atenção: configurações diferentes, comparação apenas indicativa.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessoes", type=int, default=4, help="Sessões concorrentes")
+    parser.add_argument("--interacoes", type=int, default=10, help="Interações por sessão")
+    parser.add_argument("--municipios", type=int, default=1000, help="Tamanho da base sintética")
+    parser.add_argument("--semente", type=int, default=0, help="Semente das sequências aleatórias")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout de cada rerun (s)")
+    parser.add_argument("--saida", default="relatorio_carga.json", help="Arquivo do relatório")
+    parser.add_argument("--comparar", help="Relatório anterior para comparação")
+    args = parser.parse_args(argv)
+
+    diretorio, caminho, gdf = preparar_ambiente(args.municipios, args.semente)
+    saida = os.path.abspath(args.saida)
+    os.environ["MDA_DATASET"] = caminho
+    os.chdir(diretorio)
+
+    from mda_app.utils.instrumentacao import estatisticas_cache, zerar_estatisticas_cache
+
+    instalar_cliques_simulados()
+    habilitar_apptest_concorrente()
+    zerar_estatisticas_cache()
+
+    resultados = {}
+    threads = [
+        threading.Thread(target=executar_sessao, args=(i, args, gdf, resultados))
+        for i in range(args.sessoes)
+    ]
+    with MonitorMemoria() as monitor:
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duracao = time.perf_counter() - inicio
+
+    registros = [r for i in sorted(resultados) for r in resultados[i]]
+    relatorio = montar_relatorio(args, registros, monitor.pico_bytes, duracao, estatisticas_cache())
+
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+
+    lat = relatorio["latencia"]
+    print(f"{relatorio['reruns']} reruns em {relatorio['duracao_s']} s "
+          f"({args.sessoes} sessões, {relatorio['erros']} erros)")
+    print(f"Latência p50/p95/p99: {lat['p50_ms']} / {lat['p95_ms']} / {lat['p99_ms']} ms")
+    print(f"Pico de RSS: {relatorio['pico_rss_mb']} MB")
+    for nome, stats in relatorio["cache"].items():
+        taxa = stats["taxa_acerto"]
+        print(f"Cache {nome}: {stats['chamadas']} chamadas, "
+              f"taxa de acerto {taxa:.1%}" if taxa is not None else f"Cache {nome}: sem chamadas")
+    print(f"Relatório gravado em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(relatorio, json.load(f))
+    return relatorio
+
+
+if __name__ == "__main__":
+    main()
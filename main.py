@@ -1,10 +1,21 @@
-"""Ponto de entrada da aplicação MDA Precificação de Áreas."""
+"""Ponto de entrada da aplicação MDA Precificação de Áreas.
+
+`streamlit run main.py` executa o dashboard normalmente. `python main.py
+[opções do streamlit]` sobe o mesmo servidor e aquece os caches (base
+preparada, índice espacial e mapa padrão) em segundo plano.
+"""
 
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+from streamlit import runtime
+
 from mda_app.app import main
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if runtime.exists():
+        main()
+    else:
+        from mda_app.core.aquecimento import iniciar_servidor
+        iniciar_servidor(os.path.abspath(__file__), sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,15 @@
+"""Precificação em lote pela linha de comando, sem o dashboard.
+
+    python precificar.py data/raw/precificacao_al_ii.geojson data/processed/precificacao --processos 4
+
+Ver `mda_app.core.precificacao_lote` para as opções e o formato das saídas.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from mda_app.core.precificacao_lote import main
+
+if __name__ == "__main__":
+    main()
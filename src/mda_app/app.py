@@ -1,28 +1,56 @@
 """Aplicação principal MDA Precificação de Áreas."""
 
+import copy
+import os
+
 import streamlit as st
-import numpy as np
-from mda_app.config.settings import APP_CONFIG
-from mda_app.core.data_loader import carregar_dados, processar_dados_geograficos
-from mda_app.components.ui_components import render_header, render_metrics
-from mda_app.components.visualizations import criar_mapa, criar_histograma, criar_scatter_plot
-from mda_app.utils.formatters import reais
-
-
-def calcular_valor_por_nota(pontuacao, area):
-    """Calcula valor baseado na pontuação e área."""
-    if pontuacao <= 15:
-        return area * 49.83
-    elif pontuacao <= 25:
-        return area * 59.80
-    elif pontuacao <= 35:
-        return area * 104.78
-    elif pontuacao <= 45:
-        return area * 134.88
-    elif pontuacao <= 55:
-        return area * 164.95
-    else:
-        return area * 202.87
+from mda_app.config.settings import APP_CONFIG, PATHS
+from mda_app.core.autocorrelacao import CLASSES_LISA, COLUNAS_AUTOCORRELACAO, anexar_classes_lisa, moran_da_base
+from mda_app.core.base_colunar import localizar_ponto
+from mda_app.core.camadas_regionais import nivel_agregacao
+from mda_app.core.colunas_derivadas import anexar_colunas
+from mda_app.core.data_loader import carregar_auditoria, carregar_comparacao, carregar_dados_filtrados, carregar_dados_preparados
+from mda_app.core.exportacao import FORMATOS_EXPORTACAO, caminho_exportacao, exportar, nome_arquivo
+from mda_app.core.indicadores import (
+    COLUNAS_COMPOSICAO_UF,
+    calcular_media_notas_por_uf,
+    cartoes_selecao,
+    cartoes_trimestrais,
+    resumir_selecao,
+)
+from mda_app.core.precificacao import COLUNAS_CRITERIOS, COLUNAS_TRIMESTRES, calcular_totais_trimestrais
+from mda_app.core.sensibilidade import (
+    COLUNAS_CLIMA,
+    SORTEIOS,
+    analisar_sensibilidade,
+    chave_selecao,
+    municipios_em_risco,
+)
+from mda_app.core.vizinhanca import comparar_com_vizinhos
+from mda_app.components.ui_components import (
+    render_auditoria,
+    render_comparacao_vizinhos,
+    render_header,
+    render_o_que_mudou,
+    render_painel_performance,
+    render_sensibilidade,
+)
+from mda_app.components.visualizations import (
+    criar_mapa,
+    criar_histograma,
+    criar_scatter_plot,
+    criar_grafico_trimestral,
+    criar_gauge_area_georef,
+    criar_grafico_composicao_uf,
+)
+from mda_app.utils.formatters import numero_br
+from mda_app.utils.importacao import modulo_tardio
+from mda_app.utils.instrumentacao import etapa, medir_etapa, iniciar_rerun, finalizar_rerun
+
+streamlit_folium = modulo_tardio("streamlit_folium")
+
+# Indicadores derivados exibidos na tabela de municípios
+COLUNAS_TABELA = ["valor_medio", "valor_medio_car", "val_med_car_perim"]
 
 
 def configurar_pagina():
@@ -59,7 +87,12 @@ def criar_filtros_sidebar(gdf):
     """Criar filtros na sidebar."""
     # Filtro de UF
     ufs = gdf["SIGLA_UF"].unique()
-    uf_sel = st.sidebar.multiselect("Seleção de Estado (UF)", options=ufs, default=list(ufs))
+    if 'ufs_selecionadas' not in st.session_state:
+        st.session_state.ufs_selecionadas = list(ufs)
+    # Clique em uma UF do mapa agregado: detalhar só essa UF
+    if 'uf_detalhar' in st.session_state:
+        st.session_state.ufs_selecionadas = [st.session_state.pop('uf_detalhar')]
+    uf_sel = st.sidebar.multiselect("Seleção de Estado (UF)", options=ufs, key="ufs_selecionadas")
     
     # Filtro de Municípios (baseado nas UFs selecionadas)
     if uf_sel:
@@ -75,6 +108,12 @@ def criar_filtros_sidebar(gdf):
         if 'municipios_selecionados' not in st.session_state:
             st.session_state.municipios_selecionados = []
         
+        # Descartar municípios que saíram das opções (ex.: UF desmarcada)
+        opcoes_validas = set(municipios)
+        st.session_state.municipios_selecionados = [
+            m for m in st.session_state.municipios_selecionados if m in opcoes_validas
+        ]
+        
         # Multiselect com placeholder "Todos"
         municipios_sel = st.sidebar.multiselect(
             "Filtro de Municípios",
@@ -110,11 +149,44 @@ def criar_filtros_sidebar(gdf):
     return uf_sel, municipios_sel, criterio_sel, crit_sel
 
 
+def criar_seletor_mapa(gdf):
+    """Coloração do mapa: grau de dificuldade ou agrupamentos espaciais (LISA) de uma nota."""
+    opcoes = {"nota_media": "Grau de Dificuldade Médio"}
+    opcoes.update({
+        f"lisa_{coluna}": f"Agrupamentos (LISA) - {coluna}"
+        for coluna in COLUNAS_AUTOCORRELACAO if coluna in gdf.columns
+    })
+    return st.sidebar.selectbox(
+        "Coloração do Mapa",
+        options=list(opcoes),
+        format_func=opcoes.get,
+        help="Agrupamentos LISA: municípios cuja nota e a média dos vizinhos são ambas altas (Alto-Alto), "
+             "ambas baixas (Baixo-Baixo) ou destoam (Alto-Baixo, Baixo-Alto), com significância de 5%.",
+        key="criterio_mapa",
+    )
+
+
+@medir_etapa()
 def aplicar_filtros(gdf, uf_sel, municipios_sel, criterio_sel, crit_sel):
     """Aplicar filtros aos dados."""
     # Determinar qual coluna de nome usar
     coluna_nome = 'mun_nome' if 'mun_nome' in gdf.columns else 'NM_MUN'
-    
+
+    fonte = gdf.attrs.get("fonte_filtravel")
+    if fonte is not None:
+        # Base em banco SQL: os filtros viram parâmetros da consulta
+        ufs = tuple(sorted(uf_sel))
+        municipios = tuple(sorted(set(municipios_sel)))
+        todos = gdf.loc[gdf["SIGLA_UF"].isin(ufs), coluna_nome].nunique()
+        return carregar_dados_filtrados(
+            fonte,
+            ufs,
+            None if len(municipios) >= todos else municipios,
+            coluna_nome,
+            ((criterio_sel, tuple(float(v) for v in crit_sel)),),
+            gdf.attrs.get("versao"),
+        )
+
     filtros = (
         gdf["SIGLA_UF"].isin(uf_sel) &
         gdf[coluna_nome].isin(municipios_sel) &
@@ -123,8 +195,180 @@ def aplicar_filtros(gdf, uf_sel, municipios_sel, criterio_sel, crit_sel):
     return gdf[filtros]
 
 
+def _criar_mapa(gdf_mapa, criterio_sel, base):
+    """Mapa de `gdf_mapa`; critérios LISA são calculados sobre a `base` inteira."""
+    if criterio_sel.startswith("lisa_"):
+        gdf_mapa = anexar_classes_lisa(gdf_mapa, criterio_sel[len("lisa_"):], base=base)
+        return criar_mapa(gdf_mapa, criterio_sel, mostrar_controle_camadas=True, classes=CLASSES_LISA)
+    return criar_mapa(gdf_mapa, criterio_sel, mostrar_controle_camadas=True, base=base)
+
+
+@st.cache_resource(show_spinner=False)
+def _mapa_padrao(caminho, criterio_sel, versao=None):
+    """Mapa da base completa, construído uma vez por processo e versão da base."""
+    gdf = carregar_dados_preparados(caminho)
+    return _criar_mapa(gdf, criterio_sel, gdf)
+
+
+def obter_mapa(gdf, gdf_filtrado, criterio_sel, caminho=None):
+    """Mapa do rerun, reaproveitando o mapa padrão quando nada foi filtrado.
+
+    O st_folium altera o mapa ao renderizá-lo, então cada sessão recebe uma
+    cópia do mapa cacheado (bem mais barata que reconstruí-lo).
+    """
+    if len(gdf_filtrado) == len(gdf):
+        mapa = _mapa_padrao(caminho, criterio_sel, gdf.attrs.get("versao"))
+        return copy.deepcopy(mapa)
+    return _criar_mapa(gdf_filtrado, criterio_sel, gdf)
+
+
+def renderizar_moran(gdf, criterio_mapa):
+    """Legenda do I de Moran global da nota exibida em agrupamentos LISA."""
+    if not criterio_mapa.startswith("lisa_"):
+        return
+    coluna = criterio_mapa[len("lisa_"):]
+    moran = moran_da_base(gdf, coluna)
+    st.caption(
+        f"I de Moran global ({coluna}, base inteira): {numero_br(moran['I'], 3)} "
+        f"(esperado sem autocorrelação: {numero_br(moran['esperado'], 4)}; p = {numero_br(moran['p_valor'], 3)})"
+    )
+
+
+def localizar_municipio(gdf, gdf_filtrado, lat, lng):
+    """Índice do município filtrado que contém o ponto, ou None."""
+    indices = localizar_ponto(gdf, lng, lat)
+    indices = indices[indices.isin(gdf_filtrado.index)]
+    return indices[0] if len(indices) else None
+
+
+def municipio_referencia(gdf, gdf_filtrado):
+    """Município da comparação com os vizinhos: o último clicado ou o único filtrado."""
+    idx = st.session_state.get("municipio_vizinhanca")
+    if idx in gdf.index and idx in gdf_filtrado.index:
+        return idx
+    if len(gdf_filtrado) == 1 and gdf_filtrado.index[0] in gdf.index:
+        return gdf_filtrado.index[0]
+    return None
+
+
+def renderizar_vizinhos(gdf, gdf_filtrado):
+    """Comparar o município de referência com os municípios que fazem divisa com ele."""
+    idx = municipio_referencia(gdf, gdf_filtrado)
+    if idx is None:
+        return
+    coluna_nome = 'mun_nome' if 'mun_nome' in gdf.columns else 'NM_MUN'
+    with st.expander(f"🧭 Comparar com vizinhos - {gdf.at[idx, coluna_nome]}", expanded=False):
+        render_comparacao_vizinhos(comparar_com_vizinhos(gdf, idx))
+
+
+def renderizar_exportacao(gdf, gdf_filtrado, uf_sel):
+    """Download da seleção filtrada em GeoPackage, GeoParquet ou CSV.
+
+    O arquivo só é gerado quando pedido e fica no cache de exportações; a
+    mesma seleção, em qualquer sessão, reaproveita o arquivo já gravado.
+    """
+    selecao = anexar_colunas(gdf_filtrado.drop(columns=["fid"], errors="ignore"), COLUNAS_TABELA, base=gdf)
+    col_formato, col_botao = st.columns([3, 1], vertical_alignment="bottom")
+    formato = col_formato.selectbox(
+        "Exportar seleção",
+        options=list(FORMATOS_EXPORTACAO),
+        format_func=lambda f: FORMATOS_EXPORTACAO[f][2],
+        key="formato_exportacao",
+    )
+    _, mime, rotulo = FORMATOS_EXPORTACAO[formato]
+    caminho = caminho_exportacao(selecao, formato)
+    if not os.path.exists(caminho):
+        if not col_botao.button("Preparar arquivo", key="preparar_exportacao", use_container_width=True):
+            return
+        with st.spinner(f"Gerando {rotulo}..."):
+            caminho = exportar(selecao, formato)
+    with open(caminho, "rb") as arquivo:
+        col_botao.download_button(
+            f"⬇️ Baixar {rotulo}",
+            data=arquivo,
+            file_name=nome_arquivo(formato, uf_sel),
+            mime=mime,
+            key="baixar_exportacao",
+            use_container_width=True,
+        )
+
+
+def renderizar_sensibilidade(gdf_filtrado):
+    """Simulação Monte Carlo dos preços da seleção com ruído nas notas.
+
+    Só roda quando pedida, para a seleção em que foi pedida: mudar os
+    filtros descarta os parâmetros e a simulação precisa ser pedida de novo.
+    Os resultados ficam memorizados por seleção e parâmetros, então os
+    reruns seguintes reaproveitam a simulação.
+    """
+    with st.expander("🎲 Sensibilidade dos preços às notas", expanded=False):
+        if not all(c in gdf_filtrado.columns for c in [*COLUNAS_TRIMESTRES, "area_georef"]):
+            st.info("A base não tem as notas totais trimestrais e a área georreferenciável.")
+            return
+        selecao = chave_selecao(gdf_filtrado)
+        pedido = st.session_state.get("parametros_sensibilidade")
+        if pedido is not None and pedido[0] != selecao:
+            del st.session_state.parametros_sensibilidade
+        with st.form("form_sensibilidade"):
+            col1, col2, col3 = st.columns(3)
+            desvio_criterios = col1.slider("Desvio das notas de critério", 0.0, 2.0, 0.5, 0.1)
+            desvio_clima = col2.slider("Desvio das notas de clima", 0.0, 4.0, 1.0, 0.1)
+            sorteios = col3.select_slider("Sorteios", options=[500, 1000, 2000, 5000], value=SORTEIOS)
+            if st.form_submit_button("Simular"):
+                st.session_state.parametros_sensibilidade = (selecao, (desvio_criterios, desvio_clima, sorteios))
+        pedido = st.session_state.get("parametros_sensibilidade")
+        if pedido is None:
+            st.caption("Sorteia ruído nas notas e reprecifica os municípios da seleção em cada sorteio.")
+            return
+        desvio_criterios, desvio_clima, sorteios = pedido[1]
+        desvios = {**{c: desvio_criterios for c in COLUNAS_CRITERIOS}, **{c: desvio_clima for c in COLUNAS_CLIMA}}
+        with st.spinner("Simulando..."):
+            resumo, totais = analisar_sensibilidade(gdf_filtrado, desvios, sorteios)
+        render_sensibilidade(resumo, totais, municipios_em_risco(resumo))
+
+
+def renderizar_o_que_mudou(uf_sel):
+    """Aba de comparação entre a versão anterior e a atual da base."""
+    st.title("• O que mudou")
+    caminho_anterior = PATHS["dataset_anterior"]
+    if not os.path.exists(caminho_anterior):
+        st.info(f"Versão anterior da base não encontrada ({caminho_anterior}).")
+        return
+    st.caption(f"Comparação entre {caminho_anterior} e {PATHS['dataset']}.")
+    try:
+        with etapa("comparacao_versoes"):
+            comparacao = carregar_comparacao()
+    except Exception as erro:
+        # Uma versão anterior ilegível não deve derrubar o restante do dashboard
+        st.warning(f"Não foi possível comparar as versões da base: {erro}")
+        return
+    render_o_que_mudou(comparacao, uf_sel)
+
+
+def renderizar_qualidade_dados(uf_sel):
+    """Aba de auditoria das áreas e perímetros declarados contra as geometrias."""
+    st.title("• Qualidade dos dados")
+    st.caption(
+        "Áreas e perímetros recalculados a partir das geometrias (EPSG:5880) e comparados "
+        "com area_cidade, area_georef, percent_area_georef, area_car_total e perimetro_total_car."
+    )
+    with etapa("auditoria_geometrica"):
+        relatorio = carregar_auditoria()
+    render_auditoria(relatorio, uf_sel)
+
+
 def main():
     """Função principal da aplicação."""
+    iniciar_rerun()
+    try:
+        renderizar_dashboard()
+    finally:
+        registros = finalizar_rerun()
+    render_painel_performance(registros)
+
+
+def renderizar_dashboard():
+    """Renderizar o dashboard completo (um rerun)."""
     configurar_pagina()
     configurar_sidebar_styles()
     
@@ -132,11 +376,12 @@ def main():
     render_header()
     
     # Carregar e processar dados
-    gdf = carregar_dados()
-    gdf = processar_dados_geograficos(gdf)
+    with etapa("carregar_dados"):
+        gdf = carregar_dados_preparados()
     
     # Criar filtros
     uf_sel, municipios_sel, criterio_sel, crit_sel = criar_filtros_sidebar(gdf)
+    criterio_mapa = criar_seletor_mapa(gdf)
     
     # Aplicar filtros
     gdf_filtrado = aplicar_filtros(gdf, uf_sel, municipios_sel, criterio_sel, crit_sel)
@@ -146,10 +391,16 @@ def main():
         st.warning("⚠️ Nenhum município encontrado com os filtros selecionados. Por favor, ajuste os filtros.")
         st.stop()
     
-    gdf_filtrado2 = gdf_filtrado.to_crs(epsg=5880)
-    
     # Criar abas
-    abas = st.tabs(["Mapa", "Introdução"])
+    abas = st.tabs(["Mapa", "Introdução", "O que mudou", "Qualidade dos dados"])
+    
+    # Aba Qualidade dos dados (índice 3)
+    with abas[3]:
+        renderizar_qualidade_dados(uf_sel)
+    
+    # Aba O que mudou (índice 2)
+    with abas[2]:
+        renderizar_o_que_mudou(uf_sel)
     
     # Aba Introdução (índice 1)
     with abas[1]:
@@ -236,22 +487,22 @@ predominante no município (aberta, intermediária e fechada) e nota específica
     # Aba Mapa (índice 0)
     with abas[0]:
         # Criar mapa
-        m = criar_mapa(gdf_filtrado, criterio_sel, mostrar_controle_camadas=True)
-        
-        from streamlit_folium import st_folium
-        from shapely.geometry import Point
+        m = obter_mapa(gdf, gdf_filtrado, criterio_mapa)
         
         # Inicializar controle de último clique
         if 'ultimo_clique' not in st.session_state:
             st.session_state.ultimo_clique = None
         
         # Renderizar mapa e capturar eventos
-        map_data = st_folium(
-            m, 
-            width=None, 
-            height=500,
-            key="mapa_principal"
-        )
+        with etapa("st_folium") as registro:
+            map_data = streamlit_folium.st_folium(
+                m, 
+                width=None, 
+                height=500,
+                key="mapa_principal"
+            )
+            # Tamanho do HTML que o st_folium acabou de gerar (sem renderizar de novo)
+            registro.payload(m)
         
         # Tentar diferentes formas de capturar clique
         clicked_coords = None
@@ -278,19 +529,28 @@ predominante no município (aberta, intermediária e fechada) e nota específica
             if st.session_state.ultimo_clique != clicked_coords:
                 st.session_state.ultimo_clique = clicked_coords
                 
-                # Encontrar município clicado
-                ponto_clicado = Point(lng, lat)
+                # Encontrar município clicado pelo índice espacial
                 coluna_nome = 'mun_nome' if 'mun_nome' in gdf_filtrado.columns else 'NM_MUN'
+                idx = localizar_municipio(gdf, gdf_filtrado, lat, lng)
+                
+                if idx is not None and nivel_agregacao(gdf_filtrado) and not criterio_mapa.startswith("lisa_"):
+                    # Mapa agregado: o clique detalha a UF em municípios
+                    st.session_state.uf_detalhar = gdf.at[idx, "SIGLA_UF"]
+                    st.rerun()
                 
-                for idx, row in gdf_filtrado.iterrows():
-                    if row['geometry'].contains(ponto_clicado):
-                        municipio_clicado = row[coluna_nome]
-                        
-                        # Adicionar ao filtro se não estiver
-                        if municipio_clicado not in st.session_state.municipios_selecionados:
-                            st.session_state.municipios_selecionados.append(municipio_clicado)
-                            st.rerun()
-                        break
+                if idx is not None:
+                    municipio_clicado = gdf_filtrado.at[idx, coluna_nome]
+                    st.session_state.municipio_vizinhanca = idx
+                    
+                    # Adicionar ao filtro se não estiver
+                    if municipio_clicado not in st.session_state.municipios_selecionados:
+                        st.session_state.municipios_selecionados.append(municipio_clicado)
+                        st.rerun()
+        
+        renderizar_moran(gdf, criterio_mapa)
+        
+        with etapa("vizinhos"):
+            renderizar_vizinhos(gdf, gdf_filtrado)
         
         st.markdown("---")
         
@@ -304,60 +564,11 @@ predominante no município (aberta, intermediária e fechada) e nota específica
             # Múltiplos municípios - mostrar dados agregados
             st.markdown("<h3 style='text-align: center;'>Informações Adicionais</h3>", unsafe_allow_html=True)
         
-        if len(gdf_filtrado) == 1:
-            # Um município: mostra 4 cards
-            col1, col2, col3, col4 = st.columns(4)
-            municipio_especifico = gdf_filtrado.iloc[0]
-            
-            if 'area_georef' in gdf_filtrado.columns:
-                area_fmt = f"{municipio_especifico['area_georef']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                col1.metric("Área total do Município (ha)", area_fmt)
-            
-            if 'area_car_total' in gdf_filtrado.columns:
-                area_car_fmt = f"{municipio_especifico['area_car_total']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                col2.metric("Área CAR Total (ha)", area_car_fmt)
-            
-            if 'area_car_media' in gdf_filtrado.columns:
-                tamanho_fmt = f"{municipio_especifico['area_car_media']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                col3.metric("Tamanho Médio Imóvel CAR (ha)", tamanho_fmt)
-            
-            # Valor médio por hectare
-            if 'valor_mun_area' in gdf_filtrado.columns and 'area_georef' in gdf_filtrado.columns:
-                if municipio_especifico['area_georef'] > 0:
-                    valor_ha = municipio_especifico['valor_mun_area'] / municipio_especifico['area_georef']
-                    valor_fmt = f"R$ {valor_ha:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                    col4.metric("Valor Médio/ha", valor_fmt)
-        else:
-            # Múltiplos municípios: 5 colunas
-            col1, col2, col3, col4, col5 = st.columns(5)
-            
-            if 'area_georef' in gdf_filtrado.columns:
-                area_total = gdf_filtrado['area_georef'].sum()
-                area_fmt = f"{area_total:,.0f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                col1.metric("Área Total (ha)", area_fmt)
-            
-            if 'area_car_media' in gdf_filtrado.columns:
-                tamanho_medio = gdf_filtrado['area_car_media'].mean()
-                tamanho_fmt = f"{tamanho_medio:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                col2.metric("Tamanho Médio Imóvel CAR (ha)", tamanho_fmt)
-            
-            # Valor médio por hectare
-            if 'valor_mun_area' in gdf_filtrado.columns and 'area_georef' in gdf_filtrado.columns:
-                gdf_temp = gdf_filtrado[gdf_filtrado['area_georef'] > 0].copy()
-                if len(gdf_temp) > 0:
-                    gdf_temp['valor_por_ha'] = gdf_temp['valor_mun_area'] / gdf_temp['area_georef']
-                    
-                    valor_medio_ha = gdf_temp['valor_por_ha'].mean()
-                    valor_medio_fmt = f"R$ {valor_medio_ha:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                    col3.metric("Valor Médio/ha", valor_medio_fmt)
-                    
-                    valor_min = gdf_temp['valor_por_ha'].min()
-                    valor_min_fmt = f"R$ {valor_min:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                    col4.metric("Valor Mínimo/ha", valor_min_fmt)
-                    
-                    valor_max = gdf_temp['valor_por_ha'].max()
-                    valor_max_fmt = f"R$ {valor_max:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                    col5.metric("Valor Máximo/ha", valor_max_fmt)
+        # Um município: 4 cards com os seus atributos; vários: 5 cards agregados
+        # (mesmos textos da API e do instantâneo estático, ver mda_app.core.indicadores)
+        colunas_cards = st.columns(4 if len(gdf_filtrado) == 1 else 5)
+        for coluna, (rotulo, valor) in zip(colunas_cards, cartoes_selecao(resumir_selecao(gdf_filtrado))):
+            coluna.metric(rotulo, valor)
         
         st.markdown("---")
         
@@ -366,87 +577,18 @@ predominante no município (aberta, intermediária e fechada) e nota específica
         
         with col_grafico1:
             st.markdown("<h4 style='text-align: center;'>Grau de Dificuldade por Trimestre</h4>", unsafe_allow_html=True)
+            colunas_trimestres = ['nota_total_q1', 'nota_total_q2', 'nota_total_q3', 'nota_total_q4']
             # Se houver município único, mostrar dados dele; senão, médias gerais
             if len(gdf_filtrado) == 1:
-                import plotly.graph_objects as go
                 municipio_especifico = gdf_filtrado.iloc[0]
-                
-                trimestres = ['Trimestre 1', 'Trimestre 2', 'Trimestre 3', 'Trimestre 4']
-                valores = [
-                    municipio_especifico.get('nota_total_q1', 0),
-                    municipio_especifico.get('nota_total_q2', 0),
-                    municipio_especifico.get('nota_total_q3', 0),
-                    municipio_especifico.get('nota_total_q4', 0)
-                ]
-                
-                fig_barras = go.Figure(data=[
-                    go.Bar(
-                        x=trimestres, 
-                        y=valores,
-                        marker_color=['#6C9BCF', '#8BB8E8', '#A9CCE3', '#C5DEDD'],
-                        text=[f'{v:.2f}' for v in valores],
-                        textposition='outside',
-                    )
-                ])
-                
-                fig_barras.update_layout(
-                    yaxis=dict(
-                        title='',
-                        showticklabels=False,
-                        showgrid=False,
-                        zeroline=False,
-                        range=[0, max(valores) * 1.15]
-                    ),
-                    xaxis=dict(
-                        title='',
-                        showgrid=False
-                    ),
-                    height=350,
-                    showlegend=False,
-                    margin=dict(l=40, r=40, t=50, b=40)
-                )
-                
-                st.plotly_chart(fig_barras, use_container_width=True)
+                valores = [municipio_especifico.get(coluna, 0) for coluna in colunas_trimestres]
             else:
-                # Mostrar médias gerais
-                import plotly.graph_objects as go
-                
-                trimestres = ['Trimestre 1', 'Trimestre 2', 'Trimestre 3', 'Trimestre 4']
                 valores = [
-                    gdf_filtrado['nota_total_q1'].mean() if 'nota_total_q1' in gdf_filtrado.columns else 0,
-                    gdf_filtrado['nota_total_q2'].mean() if 'nota_total_q2' in gdf_filtrado.columns else 0,
-                    gdf_filtrado['nota_total_q3'].mean() if 'nota_total_q3' in gdf_filtrado.columns else 0,
-                    gdf_filtrado['nota_total_q4'].mean() if 'nota_total_q4' in gdf_filtrado.columns else 0
+                    gdf_filtrado[coluna].mean() if coluna in gdf_filtrado.columns else 0
+                    for coluna in colunas_trimestres
                 ]
-                
-                fig_barras = go.Figure(data=[
-                    go.Bar(
-                        x=trimestres, 
-                        y=valores,
-                        marker_color=['#6C9BCF', '#8BB8E8', '#A9CCE3', '#C5DEDD'],
-                        text=[f'{v:.2f}' for v in valores],
-                        textposition='outside',
-                    )
-                ])
-                
-                fig_barras.update_layout(
-                    yaxis=dict(
-                        title='',
-                        showticklabels=False,
-                        showgrid=False,
-                        zeroline=False,
-                        range=[0, max(valores) * 1.15]
-                    ),
-                    xaxis=dict(
-                        title='',
-                        showgrid=False
-                    ),
-                    height=350,
-                    showlegend=False,
-                    margin=dict(l=40, r=40, t=50, b=40)
-                )
-                
-                st.plotly_chart(fig_barras, use_container_width=True)
+
+            st.plotly_chart(criar_grafico_trimestral(valores), use_container_width=True)
         
         with col_grafico2:
             st.markdown("<h4 style='text-align: center;'>Percentual de Área Georreferenciável</h4>", unsafe_allow_html=True)
@@ -466,82 +608,7 @@ predominante no município (aberta, intermediária e fechada) e nota específica
                 else:
                     percentual = 0.0
             
-            import plotly.graph_objects as go
-            
-            fig_gauge = go.Figure(go.Indicator(
-                mode="gauge+number",
-                value=percentual,
-                domain={'x': [0, 1], 'y': [0, 1]},
-                number={'suffix': "%", 'font': {'size': 40}},
-                gauge={
-                    'axis': {
-                        'range': [0, 100], 
-                        'tickwidth': 1, 
-                        'tickcolor': "darkblue",
-                        'tickmode': 'array',
-                        'tickvals': [0, 25, 50, 75, 90, 100],
-                        'ticktext': ['0', '25', '50', '75', '90', '100']
-                    },
-                    'bar': {'color': "rgba(0,0,0,0)"},  # Barra invisível
-                    'bgcolor': "white",
-                    'borderwidth': 2,
-                    'bordercolor': "gray",
-                    'steps': [
-                        {'range': [0, 2.5], 'color': '#27ae60'},
-                        {'range': [2.5, 5], 'color': '#29b15e'},
-                        {'range': [5, 7.5], 'color': '#2cb55d'},
-                        {'range': [7.5, 10], 'color': '#2eb85b'},
-                        {'range': [10, 12.5], 'color': '#31bc5a'},
-                        {'range': [12.5, 15], 'color': '#36bf5c'},
-                        {'range': [15, 17.5], 'color': '#3dc261'},
-                        {'range': [17.5, 20], 'color': '#44c565'},
-                        {'range': [20, 22.5], 'color': '#4ec96a'},
-                        {'range': [22.5, 25], 'color': '#56cc6e'},
-                        {'range': [25, 27.5], 'color': '#5fcf73'},
-                        {'range': [27.5, 30], 'color': '#67d277'},
-                        {'range': [30, 32.5], 'color': '#70d57c'},
-                        {'range': [32.5, 35], 'color': '#78d880'},
-                        {'range': [35, 37.5], 'color': '#81db85'},
-                        {'range': [37.5, 40], 'color': '#89de89'},
-                        {'range': [40, 42.5], 'color': '#92e08e'},
-                        {'range': [42.5, 45], 'color': '#9ae292'},
-                        {'range': [45, 47.5], 'color': '#a3e597'},
-                        {'range': [47.5, 50], 'color': '#abe79b'},
-                        {'range': [50, 52.5], 'color': '#b4e9a0'},
-                        {'range': [52.5, 55], 'color': '#bceba4'},
-                        {'range': [55, 57.5], 'color': '#c5eda9'},
-                        {'range': [57.5, 60], 'color': '#cdefad'},
-                        {'range': [60, 62.5], 'color': '#d6f0b2'},
-                        {'range': [62.5, 65], 'color': '#def2b6'},
-                        {'range': [65, 67.5], 'color': '#e7f3bb'},
-                        {'range': [67.5, 70], 'color': '#eff4bf'},
-                        {'range': [70, 72.5], 'color': '#f8f5c4'},
-                        {'range': [72.5, 75], 'color': '#f9f2b8'},
-                        {'range': [75, 77.5], 'color': '#fae9a0'},
-                        {'range': [77.5, 80], 'color': '#f9e18e'},
-                        {'range': [80, 82.5], 'color': '#f7d87c'},
-                        {'range': [82.5, 85], 'color': '#f6d06a'},
-                        {'range': [85, 87.5], 'color': '#f4c258'},
-                        {'range': [87.5, 90], 'color': '#f2b446'},
-                        {'range': [90, 92.5], 'color': '#f0a634'},
-                        {'range': [92.5, 95], 'color': '#ec8e2c'},
-                        {'range': [95, 97.5], 'color': '#e96a30'},
-                        {'range': [97.5, 100], 'color': '#e74c3c'}
-                    ],
-                    'threshold': {
-                        'line': {'color': "darkblue", 'width': 4},
-                        'thickness': 0.75,
-                        'value': percentual
-                    }
-                }
-            ))
-            
-            fig_gauge.update_layout(
-                height=300,
-                margin=dict(l=20, r=20, t=40, b=20)
-            )
-            
-            st.plotly_chart(fig_gauge, use_container_width=True)
+            st.plotly_chart(criar_gauge_area_georef(percentual), use_container_width=True)
         
         st.markdown("---")
 
@@ -589,37 +656,12 @@ predominante no município (aberta, intermediária e fechada) e nota específica
                     """, unsafe_allow_html=True)
         
         # Calcular valores totais por trimestre
-        total_q1 = sum(calcular_valor_por_nota(row['nota_total_q1'], row['area_georef']) 
-                       for _, row in gdf_filtrado.iterrows())
-        total_q2 = sum(calcular_valor_por_nota(row['nota_total_q2'], row['area_georef'])
-                       for _, row in gdf_filtrado.iterrows())
-        total_q3 = sum(calcular_valor_por_nota(row['nota_total_q3'], row['area_georef'])
-                       for _, row in gdf_filtrado.iterrows())
-        total_q4 = sum(calcular_valor_por_nota(row['nota_total_q4'], row['area_georef'])
-                       for _, row in gdf_filtrado.iterrows())
+        with etapa("valores_trimestrais"):
+            valores_trimestrais = calcular_totais_trimestrais(gdf_filtrado)
         
         # Exibir cards
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            total_q1_mi = total_q1 / 1_000_000
-            total_q1_fmt = f"R$ {total_q1_mi:,.3f} Mi".replace(",", "X").replace(".", ",").replace("X", ".")
-            st.metric("1º Trimestre", total_q1_fmt)
-        
-        with col2:
-            total_q2_mi = total_q2 / 1_000_000
-            total_q2_fmt = f"R$ {total_q2_mi:,.3f} Mi".replace(",", "X").replace(".", ",").replace("X", ".")
-            st.metric("2º Trimestre", total_q2_fmt)
-        
-        with col3:
-            total_q3_mi = total_q3 / 1_000_000
-            total_q3_fmt = f"R$ {total_q3_mi:,.3f} Mi".replace(",", "X").replace(".", ",").replace("X", ".")
-            st.metric("3º Trimestre", total_q3_fmt)
-        
-        with col4:
-            total_q4_mi = total_q4 / 1_000_000
-            total_q4_fmt = f"R$ {total_q4_mi:,.3f} Mi".replace(",", "X").replace(".", ",").replace("X", ".")
-            st.metric("4º Trimestre", total_q4_fmt)
+        for coluna, (rotulo, valor) in zip(st.columns(4), cartoes_trimestrais(valores_trimestrais)):
+            coluna.metric(rotulo, valor)
         
         st.markdown("---")
         
@@ -627,110 +669,12 @@ predominante no município (aberta, intermediária e fechada) e nota específica
         st.markdown("<h3 style='text-align: center;'>Composição Média dos Graus de Dificuldade por UF</h3>", unsafe_allow_html=True)
 
         # Selecionar colunas principais de notas
-        colunas_notas = ["nota_veg", "nota_area", "nota_relevo", "nota_insalub_2",
-                        "nota_total_q1", "nota_total_q2", "nota_total_q3", "nota_total_q4"]
-        colunas_presentes = [c for c in colunas_notas if c in gdf_filtrado.columns]
+        colunas_presentes = [c for c in COLUNAS_COMPOSICAO_UF if c in gdf_filtrado.columns]
 
         if len(colunas_presentes) >= 3:
-            # Calcular média das notas por UF
-            df_uf = (
-                gdf_filtrado.groupby("SIGLA_UF")[colunas_presentes]
-                .mean()
-                .reset_index()
-            )
-            
-            # Calcular total para ordenar por complexidade/custo
-            df_uf['total_notas'] = df_uf[colunas_presentes].sum(axis=1)
-            df_uf = df_uf.sort_values("total_notas", ascending=False)
-
-            # Dicionário de legendas amigáveis (ordem invertida para legenda)
-            legendas = {
-                "nota_total_q1": "Clima T1",
-                "nota_total_q2": "Clima T2",
-                "nota_total_q3": "Clima T3",
-                "nota_total_q4": "Clima T4",
-                "nota_insalub_2": "Insalubridade",
-                "nota_relevo": "Relevo",
-                "nota_area": "Área CAR",
-                "nota_veg": "Vegetação",
-            }
-
-            # Paleta suave consistente com o restante do app
-            cores = {
-                "nota_total_q1": "#6C9BCF",
-                "nota_total_q2": "#8BB8E8", 
-                "nota_total_q3": "#A9CCE3",
-                "nota_total_q4": "#C5DEDD",
-                "nota_insalub_2": "#9AD0EC",
-                "nota_relevo": "#C9E4F3",
-                "nota_area": "#A3C4BC",
-                "nota_veg": "#F2E8CF"
-            }
-
-            # Criar figura de barras empilhadas
-            fig_empilhado = go.Figure()
-
-            # Adicionar traços na ordem da legenda (invertida)
-            ordem_legenda = ["nota_total_q1", "nota_total_q2", "nota_total_q3", "nota_total_q4",
-                            "nota_insalub_2", "nota_relevo", "nota_area", "nota_veg"]
-            
-            # Filtrar apenas colunas presentes
-            ordem_legenda = [col for col in ordem_legenda if col in colunas_presentes]
-            
-            for coluna in ordem_legenda:
-                valores = df_uf[coluna].values
-                
-                fig_empilhado.add_trace(go.Bar(
-                    x=df_uf["SIGLA_UF"],
-                    y=valores,
-                    name=legendas.get(coluna, coluna),
-                    marker_color=cores.get(coluna, "#CCCCCC"),
-                    text="",  # Sem texto nas barras
-                    hovertemplate=legendas.get(coluna, coluna) + ": %{y:.2f}<extra></extra>"
-                ))
-
-            fig_empilhado.update_layout(
-                barmode="stack",
-                xaxis=dict(
-                    title="", 
-                    showgrid=False,
-                    tickfont=dict(size=12)
-                ),
-                yaxis=dict(
-                    title="", 
-                    showticklabels=False,  # Remove valores do eixo Y
-                    showgrid=False,
-                    zeroline=False
-                ),
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="center",
-                    x=0.5,
-                    font=dict(size=11),
-                    traceorder="normal"
-                ),
-                margin=dict(l=20, r=20, t=60, b=40),
-                height=600,
-                showlegend=True,
-                plot_bgcolor="white",
-                paper_bgcolor="white",
-                hovermode="x unified"
-            )
-            
-            # Customizar o hover
-            fig_empilhado.update_layout(
-                hoverlabel=dict(
-                    bgcolor="white",
-                    font_size=12,
-                    font_family="Arial"
-                )
-            )
-            
-            # Remover linha tracejada vertical do hover
-            fig_empilhado.update_xaxes(showspikes=False)
-            fig_empilhado.update_yaxes(showspikes=False)
+            df_uf = calcular_media_notas_por_uf(gdf_filtrado, colunas_presentes)
+
+            fig_empilhado = criar_grafico_composicao_uf(df_uf, colunas_presentes)
 
             st.plotly_chart(fig_empilhado, use_container_width=True)
             
@@ -746,7 +690,17 @@ predominante no município (aberta, intermediária e fechada) e nota específica
         colunas_excluir = ["geometry"]
         if "fid" in gdf_filtrado.columns:
             colunas_excluir.append("fid")
-        st.dataframe(gdf_filtrado.drop(columns=colunas_excluir), use_container_width=True)
+        with etapa("tabela") as registro:
+            tabela = anexar_colunas(gdf_filtrado.drop(columns=colunas_excluir, errors="ignore"), COLUNAS_TABELA,
+                                    base=gdf)
+            tabela = registro.payload(tabela)
+            st.dataframe(tabela, use_container_width=True)
+
+        with etapa("exportacao"):
+            renderizar_exportacao(gdf, gdf_filtrado, uf_sel)
+
+        with etapa("sensibilidade"):
+            renderizar_sensibilidade(gdf_filtrado)
 
 
 if __name__ == "__main__":
@@ -2,6 +2,20 @@
 
 import streamlit as st
 from mda_app.config.settings import COLORS
+from mda_app.core.auditoria_geometrica import VERIFICACOES, resumir_auditoria
+from mda_app.core.comparacao_versoes import (
+    SITUACAO_ALTERADO,
+    SITUACAO_INALTERADO,
+    SITUACAO_INCLUIDO,
+    SITUACAO_REMOVIDO,
+    impacto_por_uf,
+    resumir_comparacao,
+)
+from mda_app.utils.formatters import numero_br, reais
+from mda_app.utils.importacao import modulo_tardio
+from mda_app.utils.instrumentacao import instrumentacao_ativa
+
+pd = modulo_tardio("pandas")
 
 
 def render_header():
@@ -27,125 +41,139 @@ def render_header():
         )
 
 
-def render_metrics(gdf_filtrado):
-    """Renderizar métricas principais."""
-    
-    # Seção: Informações Gerais
-    st.markdown("### 📍 Informações Gerais")
-    col1, col2, col3 = st.columns(3)
-    
-    col1.metric("Número de Municípios", len(gdf_filtrado))
-    col2.metric("Nota Média", f"{gdf_filtrado['nota_media'].mean():.2f}")
-    
-    # Área Georreferenciável Total
-    if 'area_georef' in gdf_filtrado.columns:
-        area_total = gdf_filtrado['area_georef'].sum()
-        area_total_fmt = f"{area_total:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        col3.metric("Área Georreferenciável (ha)", area_total_fmt)
-    
-    st.markdown("---")
-    
-    # Seção: Perímetro
-    st.markdown("### 📏 Perímetro")
-    col1, col2, col3 = st.columns(3)
-    
-    # Perímetro Georreferenciável Total (km)
-    if 'perimetro_total_car' in gdf_filtrado.columns:
-        perimetro_total = gdf_filtrado['perimetro_total_car'].sum()
-        perimetro_total_fmt = f"{perimetro_total:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        col1.metric("Perímetro Georreferenciável (km)", perimetro_total_fmt)
-    
-    # Tamanho médio do imóvel (ha)
-    if 'area_car_media' in gdf_filtrado.columns:
-        tamanho_medio = gdf_filtrado['area_car_media'].mean()
-        tamanho_medio_fmt = f"{tamanho_medio:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        col2.metric("Tamanho Médio do Imóvel (ha)", tamanho_medio_fmt)
-    
-    # Perímetro médio do imóvel (km)
-    if 'perimetro_medio_car' in gdf_filtrado.columns:
-        perimetro_medio = gdf_filtrado['perimetro_medio_car'].mean()
-        perimetro_medio_fmt = f"{perimetro_medio:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        col3.metric("Perímetro Médio do Imóvel (km)", perimetro_medio_fmt)
-    
-    st.markdown("---")
-    
-    # Seção: Valores Totais
-    st.markdown("### 💰 Valores Totais")
-    col1, col2 = st.columns(2)
-    
-    # Valor total por área (R$)
-    if 'valor_mun_area' in gdf_filtrado.columns:
-        valor_area_total = gdf_filtrado['valor_mun_area'].sum()
-        valor_area_total_fmt = f"R$ {valor_area_total:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        col1.metric("Valor Total por Área", valor_area_total_fmt)
-    
-    # Valor total por Perímetro (R$)
-    if 'valor_mun_perim' in gdf_filtrado.columns:
-        valor_perim_total = gdf_filtrado['valor_mun_perim'].sum()
-        valor_perim_total_fmt = f"R$ {valor_perim_total:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        col2.metric("Valor Total por Perímetro", valor_perim_total_fmt)
-    
-    st.markdown("---")
-    
-    # Seção: Valores Médios
-    st.markdown("### 📊 Valores Médios")
-    col1, col2 = st.columns(2)
-    
-    # Valor médio por hectare (agregado)
-    if 'valor_mun_area' in gdf_filtrado.columns and 'area_georef' in gdf_filtrado.columns:
-        area_total = gdf_filtrado['area_georef'].sum()
-        if area_total > 0:
-            valor_medio_ha = gdf_filtrado['valor_mun_area'].sum() / area_total
-            valor_medio_ha_fmt = f"R$ {valor_medio_ha:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            col1.metric("Valor Médio por Hectare", valor_medio_ha_fmt)
-    
-    # Valor médio por quilômetro (agregado)
-    if 'valor_mun_perim' in gdf_filtrado.columns and 'perimetro_total_car' in gdf_filtrado.columns:
-        perimetro_total = gdf_filtrado['perimetro_total_car'].sum()
-        if perimetro_total > 0:
-            valor_medio_km = gdf_filtrado['valor_mun_perim'].sum() / perimetro_total
-            valor_medio_km_fmt = f"R$ {valor_medio_km:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            col2.metric("Valor Médio por Quilômetro", valor_medio_km_fmt)
-    
-    st.markdown("---")
-    
-    # Seção: Valores Mínimos e Máximos
-    st.markdown("### 📈 Valores Mínimos e Máximos (por município)")
-    
-    # Calcular valor por hectare para cada município
-    if 'valor_mun_area' in gdf_filtrado.columns and 'area_georef' in gdf_filtrado.columns:
-        gdf_temp_ha = gdf_filtrado[gdf_filtrado['area_georef'] > 0].copy()
-        if len(gdf_temp_ha) > 0:
-            gdf_temp_ha['valor_por_ha'] = gdf_temp_ha['valor_mun_area'] / gdf_temp_ha['area_georef']
-            
-            col1, col2 = st.columns(2)
-            
-            # Valor mínimo por hectare
-            valor_min_ha = gdf_temp_ha['valor_por_ha'].min()
-            valor_min_ha_fmt = f"R$ {valor_min_ha:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            col1.metric("Valor Mínimo por Hectare", valor_min_ha_fmt)
-            
-            # Valor máximo por hectare
-            valor_max_ha = gdf_temp_ha['valor_por_ha'].max()
-            valor_max_ha_fmt = f"R$ {valor_max_ha:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            col2.metric("Valor Máximo por Hectare", valor_max_ha_fmt)
-    
-    # Calcular valor por quilômetro para cada município
-    if 'valor_mun_perim' in gdf_filtrado.columns and 'perimetro_total_car' in gdf_filtrado.columns:
-        gdf_temp_km = gdf_filtrado[gdf_filtrado['perimetro_total_car'] > 0].copy()
-        if len(gdf_temp_km) > 0:
-            gdf_temp_km['valor_por_km'] = gdf_temp_km['valor_mun_perim'] / gdf_temp_km['perimetro_total_car']
-            
-            col1, col2 = st.columns(2)
-            
-            # Valor mínimo por km
-            valor_min_km = gdf_temp_km['valor_por_km'].min()
-            valor_min_km_fmt = f"R$ {valor_min_km:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            col1.metric("Valor Mínimo por km", valor_min_km_fmt)
-            
-            # Valor máximo por km
-            valor_max_km = gdf_temp_km['valor_por_km'].max()
-            valor_max_km_fmt = f"R$ {valor_max_km:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            col2.metric("Valor Máximo por km", valor_max_km_fmt)
-    
-    st.markdown("---")
\ No newline at end of file
+def render_comparacao_vizinhos(tabela):
+    """Renderizar a tabela do município de referência e seus vizinhos."""
+    if len(tabela) <= 1:
+        st.info("Nenhum município vizinho na base.")
+        return
+
+    def destacar(linha):
+        estilo = "font-weight: bold; background-color: #E5F0F7" if linha["referencia"] else ""
+        return [estilo] * len(linha)
+
+    colunas_dif = [c for c in tabela.columns if c.endswith("_dif")]
+    st.caption(f"{len(tabela) - 1} municípios vizinhos; colunas `_dif` mostram a diferença em relação à referência.")
+    st.dataframe(
+        tabela.style.apply(destacar, axis=1).format("{:+,.2f}", subset=colunas_dif),
+        hide_index=True,
+        column_config={"referencia": None},
+        use_container_width=True
+    )
+
+
+def render_sensibilidade(resumo, totais, em_risco):
+    """Renderizar a distribuição simulada do valor e os municípios perto de mudar de faixa."""
+    valores = totais["valor_mun_area"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Valor sem ruído", reais(resumo["valor_base"].sum()))
+    col2.metric("Percentil 5", reais(valores.quantile(0.05)))
+    col3.metric("Mediana", reais(valores.quantile(0.5)))
+    col4.metric("Percentil 95", reais(valores.quantile(0.95)))
+
+    proporcao = (resumo["prob_mudar_faixa"] >= 0.05).mean() if len(resumo) else 0.0
+    st.caption(
+        f"{len(totais)} sorteios; {numero_br(100 * proporcao, 1)}% dos municípios com 5% ou mais "
+        "de chance de mudar de faixa de preço."
+    )
+    if len(em_risco) == 0:
+        st.success("Nenhum município com chance relevante de mudar de faixa.")
+        return
+    st.dataframe(
+        em_risco.drop(columns=["prob_subir", "prob_descer"]),
+        hide_index=True,
+        column_config={
+            "prob_mudar_faixa": st.column_config.ProgressColumn("Chance de mudar de faixa", min_value=0, max_value=1),
+            "distancia_limite": st.column_config.NumberColumn("Distância ao limite", format="%.2f"),
+            "valor_em_risco": st.column_config.NumberColumn("Valor em risco (R$)", format="%.2f"),
+        },
+        use_container_width=True
+    )
+
+
+def render_auditoria(relatorio, ufs=None):
+    """Renderizar o relatório de qualidade das áreas e perímetros."""
+    if ufs is not None and "SIGLA_UF" in relatorio.columns:
+        relatorio = relatorio[relatorio["SIGLA_UF"].isin(ufs)]
+    resumo = resumir_auditoria(relatorio)
+    if not resumo:
+        st.info("A base não tem colunas de área ou perímetro para auditar.")
+        return
+
+    colunas = st.columns(len(resumo))
+    for coluna, (verificacao, total) in zip(colunas, resumo.items()):
+        coluna.metric(VERIFICACOES[verificacao], total)
+
+    sinalizados = relatorio[relatorio["problemas"] > 0].sort_values("problemas", ascending=False)
+    if len(sinalizados) == 0:
+        st.success(f"Nenhuma inconsistência entre os {len(relatorio)} municípios auditados.")
+        return
+    st.markdown(f"**{len(sinalizados)} de {len(relatorio)} municípios com inconsistências**")
+    st.dataframe(
+        sinalizados.rename(columns={c: rotulo for c, rotulo in VERIFICACOES.items()}),
+        hide_index=True,
+        use_container_width=True
+    )
+
+
+def render_painel_performance(registros):
+    """Renderizar painel de desempenho do rerun na sidebar (modo debug)."""
+    if not instrumentacao_ativa() or not registros:
+        return
+
+    df = pd.DataFrame(registros)
+    tempo_total = df["tempo_ms"].sum()
+    payload_total = df["payload_bytes"].fillna(0).sum()
+
+    with st.sidebar.expander("⏱️ Desempenho do rerun", expanded=False):
+        col1, col2 = st.columns(2)
+        col1.metric("Tempo (ms)", f"{tempo_total:,.1f}".replace(",", "X").replace(".", ",").replace("X", "."))
+        col2.metric("Payload (KB)", f"{payload_total / 1024:,.1f}".replace(",", "X").replace(".", ",").replace("X", "."))
+        st.dataframe(
+            df.rename(columns={
+                "etapa": "Etapa",
+                "tempo_ms": "Tempo (ms)",
+                "alocado_kb": "Alocação (KB)",
+                "payload_bytes": "Payload (bytes)",
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+
+
+def render_o_que_mudou(comparacao, ufs=None):
+    """Renderizar o que mudou entre a versão anterior e a atual da base."""
+    if ufs is not None:
+        comparacao = comparacao[comparacao["SIGLA_UF"].isin(ufs)]
+    resumo = resumir_comparacao(comparacao)
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Municípios alterados", resumo[SITUACAO_ALTERADO])
+    col2.metric("Incluídos", resumo[SITUACAO_INCLUIDO])
+    col3.metric("Removidos", resumo[SITUACAO_REMOVIDO])
+    col4.metric("Geometrias alteradas", resumo["geometrias_alteradas"])
+    if "impacto_valor" in resumo:
+        variacao = resumo["impacto_valor"] / resumo["valor_antes"] * 100 if resumo["valor_antes"] else 0.0
+        col5.metric(
+            "Impacto no valor (área)",
+            reais(resumo["impacto_valor"]),
+            f"{variacao:+.2f}%".replace(".", ","),
+        )
+
+    mudancas = comparacao[comparacao["situacao"] != SITUACAO_INALTERADO]
+    if mudancas.empty:
+        st.info("Nenhuma diferença entre as versões para as UFs selecionadas.")
+        return
+
+    if "impacto_valor" in mudancas.columns:
+        st.markdown("<h4 style='text-align: center;'>Impacto por UF</h4>", unsafe_allow_html=True)
+        st.dataframe(impacto_por_uf(comparacao), hide_index=True, use_container_width=True)
+        mudancas = mudancas.sort_values("impacto_valor", key=lambda s: s.abs(), ascending=False)
+
+    # Só as colunas de delta que de fato mudaram em algum município
+    deltas = [
+        coluna for coluna in mudancas.columns
+        if coluna.endswith("_delta") and mudancas[coluna].fillna(0).ne(0).any()
+    ]
+    fixas = [coluna for coluna in mudancas.columns if not coluna.endswith("_delta")]
+    st.markdown("<h4 style='text-align: center;'>Municípios com mudanças</h4>", unsafe_allow_html=True)
+    st.dataframe(mudancas[fixas + deltas], hide_index=True, use_container_width=True)
@@ -1,10 +1,20 @@
 """Componentes de visualização - mapas e gráficos."""
 
-import folium
-from folium.plugins import Fullscreen
-from streamlit_folium import st_folium
-import plotly.express as px
-from branca.element import Template, MacroElement
+import copy
+from functools import lru_cache
+
+import numpy as np
+from mda_app.config.settings import CHART_CONFIG
+from mda_app.core.base_colunar import com_geometrias
+from mda_app.core.camadas_regionais import camada_agregada, nivel_agregacao
+from mda_app.utils.importacao import modulo_tardio
+from mda_app.utils.instrumentacao import medir_etapa
+
+# Dependências pesadas: importadas no primeiro mapa/gráfico, não na inicialização
+folium = modulo_tardio("folium")
+folium_plugins = modulo_tardio("folium.plugins")
+px = modulo_tardio("plotly.express")
+go = modulo_tardio("plotly.graph_objects")
 
 
 def get_color(value, min_val, max_val, global_min=0, global_max=60):
@@ -39,8 +49,55 @@ def get_color(value, min_val, max_val, global_min=0, global_max=60):
     return f'#{r:02x}{g:02x}{b:02x}'
 
 
-def criar_mapa(gdf_filtrado, criterio_sel, mostrar_controle_camadas=True, padding_zoom=30):
-    """Criar mapa folium com dados filtrados."""
+def _legenda_classes(classes, titulo="Agrupamentos (LISA)"):
+    """Legenda do mapa com uma linha por classe."""
+    itens = "".join(
+        f'''<div style="display: flex; align-items: center; margin: 3px 0; font-size: 11px;">
+            <span style="display: inline-block; width: 14px; height: 14px; background: {cor};
+                         border: 1px solid #333; margin-right: 6px;"></span>{rotulo}
+        </div>'''
+        for rotulo, cor in classes.values()
+    )
+    return f'''
+    <div style="position: fixed; 
+                bottom: 50px; 
+                left: 50px; 
+                width: 200px; 
+                background-color: white; 
+                border: 2px solid grey; 
+                border-radius: 5px;
+                z-index: 9999; 
+                font-size: 14px;
+                padding: 10px;
+                box-shadow: 0 2px 6px rgba(0,0,0,0.3);">
+        <p style="margin: 0 0 10px 0; font-weight: bold; text-align: center; font-size: 12px;">{titulo}</p>
+        {itens}
+    </div>
+    '''
+
+
+@medir_etapa()
+def criar_mapa(gdf_filtrado, criterio_sel, mostrar_controle_camadas=True, padding_zoom=30, classes=None,
+               base=None):
+    """Criar mapa folium com dados filtrados.
+
+    Com `classes` (`{valor: (rótulo, cor)}`), o critério é tratado como
+    categórico: cada município recebe a cor da sua classe e a legenda lista as
+    classes em vez do gradiente.
+
+    Com `base` (a base completa), seleções com muitas UFs são desenhadas pela
+    camada agregada por UF (ver `mda_app.core.camadas_regionais`) em vez dos
+    polígonos municipais.
+
+    Uma seleção só de atributos (base colunar) tem as geometrias montadas
+    aqui, apenas para os municípios desenhados.
+    """
+    if base is not None and classes is None:
+        nivel = nivel_agregacao(gdf_filtrado)
+        if nivel is not None:
+            gdf_filtrado = camada_agregada(gdf_filtrado, base, nivel)
+    gdf_filtrado = com_geometrias(gdf_filtrado)
+
     # Calcular o centro dos dados
     centro_lat = gdf_filtrado.centroid.y.mean()
     centro_lon = gdf_filtrado.centroid.x.mean()
@@ -82,10 +139,13 @@ def criar_mapa(gdf_filtrado, criterio_sel, mostrar_controle_camadas=True, paddin
     
     # Adicionar polígonos ao mapa
     for idx, row in gdf_filtrado.iterrows():
-        color = get_color(row[criterio_sel], min_val, max_val, global_min, global_max)
+        if classes is not None:
+            color = classes.get(row[criterio_sel], classes[min(classes)])[1]
+        else:
+            color = get_color(row[criterio_sel], min_val, max_val, global_min, global_max)
         
-        # Usar mun_nome se disponível, senão NM_MUN
-        nome_municipio = row.get('mun_nome', row['NM_MUN'])
+        # Camada agregada: rótulo da UF/região; senão mun_nome, ou NM_MUN
+        nome_municipio = row['rotulo'] if 'rotulo' in row else row.get('mun_nome', row['NM_MUN'])
         
         # Criar tooltip simples com o nome do município
         tooltip = folium.Tooltip(
@@ -178,6 +238,8 @@ def criar_mapa(gdf_filtrado, criterio_sel, mostrar_controle_camadas=True, paddin
         </div>
     </div>
     '''
+    if classes is not None:
+        legend_html = _legenda_classes(classes)
     m.get_root().html.add_child(folium.Element(legend_html))
     
     # Adicionar controle de camadas (opcional)
@@ -185,25 +247,378 @@ def criar_mapa(gdf_filtrado, criterio_sel, mostrar_controle_camadas=True, paddin
         folium.LayerControl().add_to(m)
     
     # Adicionar plugin de tela cheia
-    Fullscreen().add_to(m)
+    folium_plugins.Fullscreen().add_to(m)
     
     return m
 
 
-def criar_histograma(gdf_filtrado, coluna, titulo):
-    """Criar histograma com plotly."""
-    fig = px.histogram(gdf_filtrado, x=coluna, nbins=15, title=titulo)
+def calcular_bins_histograma(valores, nbins=None):
+    """Calcular contagens e bordas dos bins no servidor com NumPy.
+
+    Args:
+        valores: Série ou array com os valores da coluna
+        nbins: Número de bins (padrão: CHART_CONFIG["histograma_bins"])
+
+    Returns:
+        Tupla (contagens, bordas) de arrays NumPy, ignorando valores nulos.
+    """
+    if nbins is None:
+        nbins = CHART_CONFIG["histograma_bins"]
+    valores = np.asarray(valores, dtype=float)
+    valores = valores[np.isfinite(valores)]
+    return np.histogram(valores, bins=nbins)
+
+
+def amostrar_preservando_densidade(x, y, max_pontos, tamanho_grade=None, semente=None):
+    """Selecionar índices de uma amostra que preserva a densidade dos pontos.
+
+    Os pontos são agrupados em uma grade regular e cada célula mantém a mesma
+    fração de pontos (arredondada para cima), de modo que regiões esparsas e
+    pontos isolados continuam visíveis após a redução.
+
+    Args:
+        x: Array com as coordenadas x
+        y: Array com as coordenadas y
+        max_pontos: Número máximo aproximado de pontos mantidos
+        tamanho_grade: Número de células por eixo (padrão: CHART_CONFIG)
+        semente: Semente do gerador aleatório (padrão: CHART_CONFIG)
+
+    Returns:
+        Array ordenado com os índices dos pontos mantidos.
+    """
+    if tamanho_grade is None:
+        tamanho_grade = CHART_CONFIG["scatter_grade_amostragem"]
+    if semente is None:
+        semente = CHART_CONFIG["scatter_semente"]
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= max_pontos:
+        return np.arange(n)
+
+    # Limitar a grade para que o número de células não ultrapasse o orçamento
+    tamanho_grade = max(1, min(tamanho_grade, int(np.sqrt(max_pontos))))
+
+    def _celula(v):
+        vmin, vmax = v.min(), v.max()
+        if vmax - vmin == 0:
+            return np.zeros(len(v), dtype=np.int64)
+        pos = ((v - vmin) / (vmax - vmin) * tamanho_grade).astype(np.int64)
+        return np.minimum(pos, tamanho_grade - 1)
+
+    celulas = _celula(x) * tamanho_grade + _celula(y)
+
+    # Ordenar por célula e, dentro de cada célula, em ordem aleatória
+    rng = np.random.default_rng(semente)
+    ordem = np.lexsort((rng.random(n), celulas))
+    celulas_ordenadas = celulas[ordem]
+
+    inicio_celula = np.r_[0, np.flatnonzero(np.diff(celulas_ordenadas)) + 1]
+    contagens = np.diff(np.r_[inicio_celula, n])
+    posicao = np.arange(n) - np.repeat(inicio_celula, contagens)
+
+    fracao = max_pontos / n
+    cotas = np.ceil(contagens * fracao).astype(np.int64)
+    manter = posicao < np.repeat(cotas, contagens)
+    return np.sort(ordem[manter])
+
+
+@medir_etapa(payload=True)
+def criar_histograma(gdf_filtrado, coluna, titulo, nbins=None):
+    """Criar histograma com bins pré-calculados (apenas contagens vão ao Plotly)."""
+    contagens, bordas = calcular_bins_histograma(gdf_filtrado[coluna], nbins)
+    centros = (bordas[:-1] + bordas[1:]) / 2
+    larguras = np.diff(bordas)
+
+    fig = go.Figure(go.Bar(
+        x=centros,
+        y=contagens,
+        width=larguras,
+        customdata=np.column_stack([bordas[:-1], bordas[1:]]),
+        hovertemplate="%{customdata[0]:.2f} – %{customdata[1]:.2f}<br>"
+                      "Municípios: %{y}<extra></extra>",
+    ))
+    fig.update_layout(
+        title=titulo,
+        bargap=0,
+        xaxis_title=coluna,
+        yaxis_title="count"
+    )
     return fig
 
 
-def criar_scatter_plot(gdf_filtrado, x_col, y_col, titulo):
-    """Criar gráfico de dispersão."""
-    fig = px.scatter(gdf_filtrado, x=x_col, y=y_col, title=titulo, 
-                     hover_data=['NM_MUN'])
+@medir_etapa(payload=True)
+def criar_scatter_plot(gdf_filtrado, x_col, y_col, titulo, max_pontos=None):
+    """Criar gráfico de dispersão em WebGL, com redução opcional de pontos.
+
+    Args:
+        gdf_filtrado: Dados filtrados
+        x_col: Coluna do eixo x
+        y_col: Coluna do eixo y
+        titulo: Título do gráfico
+        max_pontos: Limite de pontos antes da amostragem por densidade
+            (padrão: CHART_CONFIG["scatter_max_pontos"]; 0 desativa)
+    """
+    if max_pontos is None:
+        max_pontos = CHART_CONFIG["scatter_max_pontos"]
+
+    # Enviar apenas as colunas necessárias, nunca a geometria
+    dados = gdf_filtrado[[x_col, y_col, "NM_MUN"]].dropna(subset=[x_col, y_col])
+    x = dados[x_col].to_numpy()
+    y = dados[y_col].to_numpy()
+    nomes = dados["NM_MUN"].to_numpy()
+
+    if max_pontos and len(dados) > max_pontos:
+        indices = amostrar_preservando_densidade(x, y, max_pontos)
+        x, y, nomes = x[indices], y[indices], nomes[indices]
+
+    fig = go.Figure(go.Scattergl(
+        x=x,
+        y=y,
+        mode="markers",
+        text=nomes,
+        hovertemplate="%{text}<br>" + x_col + "=%{x}<br>" + y_col + "=%{y}<extra></extra>",
+    ))
+    fig.update_layout(title=titulo, xaxis_title=x_col, yaxis_title=y_col)
     return fig
 
 
 def criar_bar_chart(gdf_filtrado, x_col, y_col, titulo):
     """Criar gráfico de barras."""
-    fig = px.bar(gdf_filtrado, x=x_col, y=y_col, title=titulo)
-    return fig
\ No newline at end of file
+    fig = px.bar(gdf_filtrado[[x_col, y_col]], x=x_col, y=y_col, title=titulo)
+    return fig
+
+
+# --- Templates de figuras estáticas ---
+# A parte fixa de cada figura (layout, faixas de cor, eixos) é construída e
+# validada pelo Plotly uma única vez por processo. A cada rerun apenas os
+# arrays de dados são inseridos numa cópia da especificação, e a figura é
+# montada sem nova validação.
+
+TRIMESTRES = ['Trimestre 1', 'Trimestre 2', 'Trimestre 3', 'Trimestre 4']
+CORES_TRIMESTRES = ['#6C9BCF', '#8BB8E8', '#A9CCE3', '#C5DEDD']
+
+# Dicionário de legendas amigáveis do gráfico de composição por UF
+LEGENDAS_NOTAS_UF = {
+    "nota_total_q1": "Clima T1",
+    "nota_total_q2": "Clima T2",
+    "nota_total_q3": "Clima T3",
+    "nota_total_q4": "Clima T4",
+    "nota_insalub_2": "Insalubridade",
+    "nota_relevo": "Relevo",
+    "nota_area": "Área CAR",
+    "nota_veg": "Vegetação",
+}
+
+# Paleta suave consistente com o restante do app
+CORES_NOTAS_UF = {
+    "nota_total_q1": "#6C9BCF",
+    "nota_total_q2": "#8BB8E8",
+    "nota_total_q3": "#A9CCE3",
+    "nota_total_q4": "#C5DEDD",
+    "nota_insalub_2": "#9AD0EC",
+    "nota_relevo": "#C9E4F3",
+    "nota_area": "#A3C4BC",
+    "nota_veg": "#F2E8CF"
+}
+
+# Ordem dos traços (e da legenda) no gráfico empilhado
+ORDEM_NOTAS_UF = ["nota_total_q1", "nota_total_q2", "nota_total_q3", "nota_total_q4",
+                  "nota_insalub_2", "nota_relevo", "nota_area", "nota_veg"]
+
+# Faixas de cor do medidor de área georreferenciável (0 a 100%, passo 2,5)
+CORES_GAUGE = [
+    '#27ae60', '#29b15e', '#2cb55d', '#2eb85b', '#31bc5a', '#36bf5c', '#3dc261', '#44c565',
+    '#4ec96a', '#56cc6e', '#5fcf73', '#67d277', '#70d57c', '#78d880', '#81db85', '#89de89',
+    '#92e08e', '#9ae292', '#a3e597', '#abe79b', '#b4e9a0', '#bceba4', '#c5eda9', '#cdefad',
+    '#d6f0b2', '#def2b6', '#e7f3bb', '#eff4bf', '#f8f5c4', '#f9f2b8', '#fae9a0', '#f9e18e',
+    '#f7d87c', '#f6d06a', '#f4c258', '#f2b446', '#f0a634', '#ec8e2c', '#e96a30', '#e74c3c'
+]
+
+
+def _template_barras_trimestrais():
+    """Template do gráfico de barras do grau de dificuldade por trimestre."""
+    fig = go.Figure(data=[
+        go.Bar(
+            x=TRIMESTRES,
+            y=[0, 0, 0, 0],
+            marker_color=CORES_TRIMESTRES,
+            textposition='outside',
+        )
+    ])
+    fig.update_layout(
+        yaxis=dict(
+            title='',
+            showticklabels=False,
+            showgrid=False,
+            zeroline=False,
+            range=[0, 1]
+        ),
+        xaxis=dict(
+            title='',
+            showgrid=False
+        ),
+        height=350,
+        showlegend=False,
+        margin=dict(l=40, r=40, t=50, b=40)
+    )
+    return fig
+
+
+def _template_gauge_area_georef():
+    """Template do medidor de percentual de área georreferenciável."""
+    passo = 100 / len(CORES_GAUGE)
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=0,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        number={'suffix': "%", 'font': {'size': 40}},
+        gauge={
+            'axis': {
+                'range': [0, 100],
+                'tickwidth': 1,
+                'tickcolor': "darkblue",
+                'tickmode': 'array',
+                'tickvals': [0, 25, 50, 75, 90, 100],
+                'ticktext': ['0', '25', '50', '75', '90', '100']
+            },
+            'bar': {'color': "rgba(0,0,0,0)"},  # Barra invisível
+            'bgcolor': "white",
+            'borderwidth': 2,
+            'bordercolor': "gray",
+            'steps': [
+                {'range': [i * passo, (i + 1) * passo], 'color': cor}
+                for i, cor in enumerate(CORES_GAUGE)
+            ],
+            'threshold': {
+                'line': {'color': "darkblue", 'width': 4},
+                'thickness': 0.75,
+                'value': 0
+            }
+        }
+    ))
+    fig.update_layout(
+        height=300,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    return fig
+
+
+def _template_composicao_uf():
+    """Template (apenas layout) do gráfico empilhado de notas por UF."""
+    fig = go.Figure()
+    fig.update_layout(
+        barmode="stack",
+        xaxis=dict(
+            title="",
+            showgrid=False,
+            tickfont=dict(size=12)
+        ),
+        yaxis=dict(
+            title="",
+            showticklabels=False,  # Remove valores do eixo Y
+            showgrid=False,
+            zeroline=False
+        ),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="center",
+            x=0.5,
+            font=dict(size=11),
+            traceorder="normal"
+        ),
+        margin=dict(l=20, r=20, t=60, b=40),
+        height=600,
+        showlegend=True,
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        hovermode="x unified",
+        hoverlabel=dict(
+            bgcolor="white",
+            font_size=12,
+            font_family="Arial"
+        )
+    )
+    # Remover linha tracejada vertical do hover
+    fig.update_xaxes(showspikes=False)
+    fig.update_yaxes(showspikes=False)
+    return fig
+
+
+_TEMPLATES = {
+    "barras_trimestrais": _template_barras_trimestrais,
+    "gauge_area_georef": _template_gauge_area_georef,
+    "composicao_uf": _template_composicao_uf,
+}
+
+
+@lru_cache(maxsize=None)
+def _especificacao_template(nome):
+    """Construir e validar um template uma única vez por processo."""
+    return _TEMPLATES[nome]().to_dict()
+
+
+def _clonar_template(nome):
+    """Devolver uma cópia independente da especificação de um template."""
+    return copy.deepcopy(_especificacao_template(nome))
+
+
+def _montar_figura(especificacao):
+    """Montar a figura a partir de uma especificação já validada."""
+    return go.Figure(especificacao, _validate=False)
+
+
+@medir_etapa(payload=True)
+def criar_grafico_trimestral(valores):
+    """Criar gráfico de barras do grau de dificuldade por trimestre.
+
+    Args:
+        valores: Sequência com as quatro notas (trimestres 1 a 4)
+    """
+    valores = [float(v) for v in valores]
+    espec = _clonar_template("barras_trimestrais")
+    barra = espec["data"][0]
+    barra["y"] = valores
+    barra["text"] = [f'{v:.2f}' for v in valores]
+    espec["layout"]["yaxis"]["range"] = [0, (max(valores) * 1.15) or 1]
+    return _montar_figura(espec)
+
+
+@medir_etapa(payload=True)
+def criar_gauge_area_georef(percentual):
+    """Criar medidor do percentual de área georreferenciável."""
+    percentual = float(percentual)
+    espec = _clonar_template("gauge_area_georef")
+    indicador = espec["data"][0]
+    indicador["value"] = percentual
+    indicador["gauge"]["threshold"]["value"] = percentual
+    return _montar_figura(espec)
+
+
+@medir_etapa(payload=True)
+def criar_grafico_composicao_uf(df_uf, colunas_presentes):
+    """Criar gráfico de barras empilhadas com a média das notas por UF.
+
+    Args:
+        df_uf: DataFrame com a coluna SIGLA_UF e a média de cada nota
+        colunas_presentes: Colunas de notas disponíveis em df_uf
+    """
+    espec = _clonar_template("composicao_uf")
+    ufs = df_uf["SIGLA_UF"].tolist()
+    espec["data"] = [
+        {
+            "type": "bar",
+            "x": ufs,
+            "y": df_uf[coluna].tolist(),
+            "name": LEGENDAS_NOTAS_UF.get(coluna, coluna),
+            "marker": {"color": CORES_NOTAS_UF.get(coluna, "#CCCCCC")},
+            "text": "",  # Sem texto nas barras
+            "hovertemplate": LEGENDAS_NOTAS_UF.get(coluna, coluna) + ": %{y:.2f}<extra></extra>",
+        }
+        for coluna in ORDEM_NOTAS_UF
+        if coluna in colunas_presentes
+    ]
+    return _montar_figura(espec)
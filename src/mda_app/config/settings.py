@@ -1,5 +1,7 @@
 """Configurações da aplicação."""
 
+import os
+
 APP_CONFIG = {
     "page_title": "Precificação de Áreas - MDA",
     "page_icon": "🏷️",
@@ -17,5 +19,35 @@ PATHS = {
     "data_raw": "data/raw/",
     "data_processed": "data/processed/",
     "assets": "assets/",
-    "images": "assets/images/"
+    "images": "assets/images/",
+    # Base carregada pelo app (sobrescrever com MDA_DATASET)
+    "dataset": os.environ.get("MDA_DATASET", "data/raw/precificacao_al_ii.geojson"),
+    # Versão anterior, usada na aba "O que mudou" (sobrescrever com MDA_DATASET_ANTERIOR)
+    "dataset_anterior": os.environ.get("MDA_DATASET_ANTERIOR", "data/raw/precificacao_al.geojson"),
+    # Acervo de safras (ver mda_app.core.acervo_safras; sobrescrever com MDA_ACERVO)
+    "acervo": os.environ.get("MDA_ACERVO", "data/acervo/"),
+    # Cache das exportações da seleção filtrada (sobrescrever com MDA_EXPORTACOES)
+    "exportacoes": os.environ.get("MDA_EXPORTACOES", "data/processed/exportacoes/")
+}
+
+CHART_CONFIG = {
+    "histograma_bins": 15,
+    "scatter_max_pontos": 5000,
+    "scatter_grade_amostragem": 50,
+    "scatter_semente": 42
+}
+
+MAP_CONFIG = {
+    # A partir de quantas UFs selecionadas o mapa desenha a camada agregada
+    "ufs_para_agregar": 6,
+    # Camada agregada: "uf" ou "regiao" (ver mda_app.core.camadas_regionais)
+    "nivel_agregado": "uf"
+}
+
+PERF_CONFIG = {
+    # Ativar com a variável de ambiente MDA_PERF=1
+    "ativo": os.environ.get("MDA_PERF", "0") == "1",
+    # tracemalloc é do processo: com várias sessões simultâneas, as alocações se misturam
+    "medir_memoria": True,
+    "logger": "mda_app.performance"
 }
\ No newline at end of file
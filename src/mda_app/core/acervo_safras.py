@@ -0,0 +1,247 @@
+"""Acervo local, somente de inclusão, das safras (entregas) da base.
+
+Cada nova entrega é ingerida como uma safra, sem sobrescrever as anteriores,
+preservando o histórico de notas e preços. Layout em disco:
+
+    <raiz>/catalogo.json
+    <raiz>/atributos/safra=<safra>/SIGLA_UF=<UF>/parte-0.parquet
+    <raiz>/geometrias/SIGLA_UF=<UF>/safra=<safra>.parquet
+
+Os atributos de cada município guardam o hash do WKB da sua geometria
+(`geom_hash`). As geometrias ficam em arquivos por UF contendo apenas os hashes
+vistos pela primeira vez naquela safra: um polígono que não mudou entre
+entregas é gravado uma única vez.
+
+Abrir uma safra (ou comparar uma coluna entre safras) lê apenas os arquivos das
+safras e UFs pedidas, e apenas as colunas pedidas.
+
+Ingestão pela linha de comando:
+
+    python -m mda_app.core.acervo_safras data/acervo data/raw/precificacao_al_ii.geojson 2025-02
+"""
+
+import argparse
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+
+from mda_app.core.comparacao_versoes import hash_geometrias
+from mda_app.utils.importacao import modulo_tardio
+
+gpd = modulo_tardio("geopandas")
+pa = modulo_tardio("pyarrow")
+pc = modulo_tardio("pyarrow.compute")
+pq = modulo_tardio("pyarrow.parquet")
+pd = modulo_tardio("pandas")
+shapely = modulo_tardio("shapely")
+
+ARQUIVO_CATALOGO = "catalogo.json"
+COLUNA_HASH = "geom_hash"
+_NOME_VALIDO = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class AcervoSafras:
+    """Acervo de safras particionado por safra e UF.
+
+    Args:
+        raiz: Diretório do acervo (criado na primeira ingestão)
+    """
+
+    def __init__(self, raiz):
+        self.raiz = str(raiz)
+
+    # Catálogo
+
+    def _caminho_catalogo(self):
+        return os.path.join(self.raiz, ARQUIVO_CATALOGO)
+
+    def catalogo(self):
+        """Metadados das safras ingeridas, na ordem de ingestão."""
+        caminho = self._caminho_catalogo()
+        if not os.path.exists(caminho):
+            return {"safras": []}
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+
+    @property
+    def safras(self):
+        return [registro["safra"] for registro in self.catalogo()["safras"]]
+
+    def _registro(self, safra):
+        for registro in self.catalogo()["safras"]:
+            if registro["safra"] == safra:
+                return registro
+        raise KeyError(f"Safra {safra!r} não encontrada no acervo {self.raiz}.")
+
+    # Caminhos das partições
+
+    def _arquivo_atributos(self, safra, uf):
+        return os.path.join(self.raiz, "atributos", f"safra={safra}", f"SIGLA_UF={uf}", "parte-0.parquet")
+
+    def _diretorio_geometrias(self, uf):
+        return os.path.join(self.raiz, "geometrias", f"SIGLA_UF={uf}")
+
+    def _hashes_existentes(self, uf):
+        diretorio = self._diretorio_geometrias(uf)
+        if not os.path.isdir(diretorio):
+            return np.zeros(0, dtype=np.uint64)
+        partes = [
+            pq.read_table(os.path.join(diretorio, nome), columns=[COLUNA_HASH]).column(0).to_numpy()
+            for nome in sorted(os.listdir(diretorio))
+            if nome.endswith(".parquet")
+        ]
+        return np.concatenate(partes) if partes else np.zeros(0, dtype=np.uint64)
+
+    # Escrita
+
+    def ingerir(self, gdf, safra, origem=None):
+        """Incluir uma nova safra no acervo.
+
+        Safras são imutáveis: ingerir um nome já existente é um erro.
+
+        Returns:
+            Resumo da ingestão (linhas, UFs, geometrias novas e reaproveitadas).
+        """
+        if not _NOME_VALIDO.match(safra):
+            raise ValueError(f"Nome de safra inválido: {safra!r} (use letras, números, '.', '_' ou '-').")
+        if safra in self.safras:
+            raise ValueError(f"A safra {safra!r} já existe no acervo; safras não são sobrescritas.")
+        if "SIGLA_UF" not in gdf.columns:
+            raise ValueError("A base precisa da coluna SIGLA_UF para ser particionada.")
+
+        coluna_geometria = gdf.geometry.name
+        hashes = hash_geometrias(gdf.geometry.to_numpy())
+        atributos = pd.DataFrame(gdf.drop(columns=coluna_geometria)).assign(**{COLUNA_HASH: hashes})
+
+        geometrias_novas = 0
+        for uf, posicoes in atributos.groupby("SIGLA_UF", sort=True).indices.items():
+            arquivo = self._arquivo_atributos(safra, uf)
+            os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+            tabela = pa.Table.from_pandas(
+                atributos.iloc[posicoes].drop(columns="SIGLA_UF"), preserve_index=False
+            )
+            pq.write_table(tabela, arquivo)
+
+            # Geometrias: só os hashes ainda não vistos nesta UF
+            hashes_uf, primeiras = np.unique(hashes[posicoes], return_index=True)
+            novos = ~np.isin(hashes_uf, self._hashes_existentes(uf))
+            if novos.any():
+                selecionadas = posicoes[primeiras[novos]]
+                wkb = shapely.to_wkb(gdf.geometry.to_numpy()[selecionadas])
+                os.makedirs(self._diretorio_geometrias(uf), exist_ok=True)
+                pq.write_table(
+                    pa.table({COLUNA_HASH: hashes_uf[novos], "wkb": pa.array(list(wkb), type=pa.binary())}),
+                    os.path.join(self._diretorio_geometrias(uf), f"safra={safra}.parquet"),
+                )
+                geometrias_novas += int(novos.sum())
+
+        resumo = {
+            "safra": safra,
+            "origem": origem,
+            "ingerida_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "crs": gdf.crs.to_string() if gdf.crs is not None else None,
+            "coluna_geometria": coluna_geometria,
+            "linhas": len(gdf),
+            "ufs": sorted(atributos["SIGLA_UF"].unique().tolist()),
+            "geometrias_novas": geometrias_novas,
+            "geometrias_reaproveitadas": int(len(np.unique(hashes))) - geometrias_novas,
+        }
+        catalogo = self.catalogo()
+        catalogo["safras"].append(resumo)
+        os.makedirs(self.raiz, exist_ok=True)
+        temporario = self._caminho_catalogo() + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(catalogo, arquivo, indent=2, ensure_ascii=False)
+        os.replace(temporario, self._caminho_catalogo())
+        return resumo
+
+    # Leitura
+
+    def _ler_atributos(self, safra, ufs, colunas):
+        registro = self._registro(safra)
+        ufs = registro["ufs"] if ufs is None else [uf for uf in ufs if uf in registro["ufs"]]
+        partes = []
+        for uf in ufs:
+            colunas_arquivo = None if colunas is None else [c for c in colunas if c != "SIGLA_UF"]
+            tabela = pq.read_table(self._arquivo_atributos(safra, uf), columns=colunas_arquivo)
+            partes.append(tabela.to_pandas().assign(SIGLA_UF=uf))
+        if not partes:
+            return pd.DataFrame(columns=list(colunas or []) + ["SIGLA_UF"]), registro
+        return pd.concat(partes, ignore_index=True), registro
+
+    def contar_por_uf(self, safra=None):
+        """Municípios por UF na safra, lidos dos metadados dos arquivos Parquet."""
+        safra = safra or self.safras[-1]
+        return {
+            uf: pq.ParquetFile(self._arquivo_atributos(safra, uf)).metadata.num_rows
+            for uf in sorted(self._registro(safra)["ufs"])
+        }
+
+    def abrir(self, safra=None, ufs=None, colunas=None, geometria=True):
+        """Abrir uma safra, lendo só as partições das UFs pedidas.
+
+        Args:
+            safra: Nome da safra (padrão: a mais recente)
+            ufs: UFs desejadas (padrão: todas)
+            colunas: Colunas de atributos desejadas (padrão: todas)
+            geometria: Se False, devolve só os atributos (DataFrame)
+        """
+        safra = safra or self.safras[-1]
+        if colunas is not None and geometria and COLUNA_HASH not in colunas:
+            colunas = [*colunas, COLUNA_HASH]
+        atributos, registro = self._ler_atributos(safra, ufs, colunas)
+        if not geometria:
+            return atributos.drop(columns=COLUNA_HASH, errors="ignore")
+        if COLUNA_HASH not in atributos.columns:
+            # Nenhuma das UFs pedidas está na safra: GeoDataFrame vazio
+            atributos[COLUNA_HASH] = pd.Series(dtype="uint64")
+
+        wkb_por_hash = {}
+        for uf in atributos["SIGLA_UF"].unique():
+            diretorio = self._diretorio_geometrias(uf)
+            necessarios = pa.array(
+                atributos.loc[atributos["SIGLA_UF"] == uf, COLUNA_HASH].unique(), type=pa.uint64()
+            )
+            for nome in sorted(os.listdir(diretorio)):
+                tabela = pq.read_table(
+                    os.path.join(diretorio, nome), filters=pc.field(COLUNA_HASH).isin(necessarios)
+                )
+                wkb_por_hash.update(zip(tabela.column(COLUNA_HASH).to_pylist(), tabela.column("wkb").to_pylist()))
+
+        geometrias = shapely.from_wkb([wkb_por_hash[h] for h in atributos[COLUNA_HASH]])
+        gdf = gpd.GeoDataFrame(
+            atributos.drop(columns=COLUNA_HASH), geometry=geometrias, crs=registro["crs"]
+        )
+        if registro["coluna_geometria"] != gdf.geometry.name:
+            gdf = gdf.rename_geometry(registro["coluna_geometria"])
+        gdf.attrs["versao"] = f"{os.path.abspath(self.raiz)}:{safra}"
+        return gdf
+
+    def comparar_coluna(self, coluna, safras=None, ufs=None, chave="CD_MUN"):
+        """Valores de `coluna` em cada safra, lado a lado (uma coluna por safra).
+
+        Lê apenas `chave` e `coluna` das partições das safras e UFs pedidas.
+        """
+        safras = safras or self.safras
+        series = {}
+        for safra in safras:
+            atributos, _ = self._ler_atributos(safra, ufs, [chave, coluna])
+            series[safra] = atributos.set_index(chave)[coluna]
+        return pd.DataFrame(series).rename_axis(chave)
+
+
+def ingerir_arquivo(raiz, origem, safra):
+    """Ler um arquivo vetorial e ingeri-lo como a safra `safra`."""
+    return AcervoSafras(raiz).ingerir(gpd.read_file(origem), safra, origem=str(origem))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingerir uma nova safra da base no acervo.")
+    parser.add_argument("raiz", help="Diretório do acervo")
+    parser.add_argument("origem", help="Arquivo da entrega (GeoJSON, GeoPackage...)")
+    parser.add_argument("safra", help="Nome da safra (ex.: 2025-02)")
+    args = parser.parse_args()
+    print(json.dumps(ingerir_arquivo(args.raiz, args.origem, args.safra), indent=2, ensure_ascii=False))
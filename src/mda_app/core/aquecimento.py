@@ -0,0 +1,83 @@
+"""Aquecimento dos caches na inicialização do servidor.
+
+Quando o app é iniciado com `python main.py`, o servidor Streamlit roda no
+mesmo processo que dispara o aquecimento; assim a base preparada, o índice
+espacial e o mapa padrão já estão em `st.cache_resource` quando a primeira
+sessão chega, em vez de serem construídos durante o primeiro rerun.
+"""
+
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger("mda_app.aquecimento")
+
+_trava = threading.Lock()
+_thread = None
+
+
+def aquecer_caches(caminho=None, criterio_sel="nota_media"):
+    """Construir base preparada, índice espacial e mapa padrão.
+
+    Returns:
+        Dicionário com o tempo (s) de cada etapa.
+    """
+    # Import tardio: o módulo do app só é carregado na thread de aquecimento
+    from mda_app.app import _mapa_padrao
+    from mda_app.core.data_loader import carregar_dados_preparados
+
+    tempos = {}
+    inicio = time.perf_counter()
+    gdf = carregar_dados_preparados(caminho)
+    tempos["dados_preparados"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    _mapa_padrao(caminho, criterio_sel, gdf.attrs.get("versao"))
+    tempos["mapa_padrao"] = time.perf_counter() - inicio
+    return tempos
+
+
+def _executar(caminho, criterio_sel):
+    try:
+        tempos = aquecer_caches(caminho, criterio_sel)
+    except Exception:
+        logger.exception("Falha no aquecimento dos caches")
+    else:
+        logger.info(
+            "Caches aquecidos: %s",
+            ", ".join(f"{nome}={t:.2f}s" for nome, t in tempos.items()),
+        )
+
+
+def iniciar_aquecimento(caminho=None, criterio_sel="nota_media"):
+    """Disparar o aquecimento em uma thread de segundo plano (uma vez por processo).
+
+    Returns:
+        A thread de aquecimento (a mesma em chamadas repetidas).
+    """
+    global _thread
+    with _trava:
+        if _thread is None:
+            _thread = threading.Thread(
+                target=_executar,
+                args=(caminho, criterio_sel),
+                name="mda-aquecimento",
+                daemon=True,
+            )
+            _thread.start()
+        return _thread
+
+
+def iniciar_servidor(script, argumentos=()):
+    """Aquecer os caches e subir o servidor Streamlit neste mesmo processo.
+
+    Args:
+        script: Caminho do script Streamlit (normalmente `main.py`)
+        argumentos: Opções repassadas ao `streamlit run` (ex.: `--server.port 8502`)
+    """
+    from streamlit.web import cli
+
+    iniciar_aquecimento()
+    sys.argv = ["streamlit", "run", script, *argumentos]
+    sys.exit(cli.main())
@@ -0,0 +1,147 @@
+"""Auditoria das áreas e perímetros declarados contra a geometria dos municípios.
+
+A área e o perímetro de cada município são recalculados em EPSG:5880 (SIRGAS
+2000 / Brazil Polyconic), de uma vez para todas as geometrias, e comparados com
+as colunas da base. Cada verificação vira uma coluna booleana no relatório:
+
+- `area_divergente`: `area_cidade` difere da área calculada em mais de
+  `TOLERANCIA_AREA`;
+- `area_georef_excede`: `area_georef` (ou `area_car_total`, em
+  `area_car_excede`) maior que a área do município;
+- `percentual_divergente`: `percent_area_georef` difere de
+  `100 * area_georef / área calculada` em mais de `TOLERANCIA_PERCENTUAL`
+  pontos percentuais;
+- `perimetro_atipico`: a razão entre `perimetro_total_car` e o perímetro do
+  município foge da distribuição da base (escore robusto, pela mediana e pelo
+  desvio absoluto mediano do logaritmo, acima de `LIMITE_ESCORE`).
+
+Colunas ausentes na base simplesmente não geram a verificação correspondente.
+
+Uso:
+
+    python -m mda_app.core.auditoria_geometrica data/raw/precificacao_al_ii.geojson auditoria.csv
+"""
+
+import argparse
+
+import numpy as np
+
+from mda_app.config.settings import PATHS
+from mda_app.core.fontes_dados import obter_fonte
+from mda_app.utils.formatters import csv_br
+from mda_app.utils.importacao import modulo_tardio
+
+pd = modulo_tardio("pandas")
+shapely = modulo_tardio("shapely")
+
+EPSG_AREA = 5880
+
+# Diferença relativa aceita entre `area_cidade` e a área calculada
+TOLERANCIA_AREA = 0.05
+# Folga para áreas declaradas maiores que o município (arredondamentos)
+FOLGA_EXCEDENTE = 0.01
+# Pontos percentuais aceitos em `percent_area_georef`
+TOLERANCIA_PERCENTUAL = 2.0
+# Escore robusto a partir do qual a razão de perímetros é atípica
+LIMITE_ESCORE = 3.5
+
+VERIFICACOES = {
+    "area_divergente": "Área do município diverge da geometria",
+    "area_georef_excede": "Área georreferenciável maior que o município",
+    "area_car_excede": "Área CAR maior que o município",
+    "percentual_divergente": "Percentual georreferenciável inconsistente",
+    "perimetro_atipico": "Perímetro CAR atípico para o município",
+}
+
+
+def medidas_geometricas(gdf):
+    """Área (ha) e perímetro (km) de cada município, calculados em EPSG:5880."""
+    geometrias = gdf.geometry.to_crs(epsg=EPSG_AREA).to_numpy()
+    return pd.DataFrame(
+        {
+            "area_calculada_ha": shapely.area(geometrias) / 10_000,
+            "perimetro_calculado_km": shapely.length(geometrias) / 1000,
+        },
+        index=gdf.index,
+    )
+
+
+def escore_robusto(valores):
+    """Distância à mediana em desvios absolutos medianos (escalados como desvio-padrão)."""
+    valores = np.asarray(valores, dtype=float)
+    mediana = np.nanmedian(valores)
+    desvio = 1.4826 * np.nanmedian(np.abs(valores - mediana))
+    if not desvio:
+        return np.zeros_like(valores)
+    return (valores - mediana) / desvio
+
+
+def _coluna(gdf, nome):
+    return gdf[nome].to_numpy(dtype=float) if nome in gdf.columns else None
+
+
+def auditar(gdf):
+    """Relatório de qualidade das áreas e perímetros de `gdf`.
+
+    Returns:
+        DataFrame com o índice de `gdf`: identificação do município, medidas
+        calculadas, as diferenças usadas em cada verificação, uma coluna
+        booleana por verificação (`VERIFICACOES`) e `problemas` (quantas
+        verificações falharam).
+    """
+    identificacao = [c for c in ("CD_MUN", "NM_MUN", "SIGLA_UF") if c in gdf.columns]
+    relatorio = pd.DataFrame(gdf[identificacao]).join(medidas_geometricas(gdf))
+    area = relatorio["area_calculada_ha"].to_numpy()
+    perimetro = relatorio["perimetro_calculado_km"].to_numpy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        area_cidade = _coluna(gdf, "area_cidade")
+        if area_cidade is not None:
+            relatorio["dif_area_rel"] = area_cidade / area - 1
+            relatorio["area_divergente"] = np.abs(relatorio["dif_area_rel"]) > TOLERANCIA_AREA
+
+        area_georef = _coluna(gdf, "area_georef")
+        if area_georef is not None:
+            relatorio["area_georef_excede"] = area_georef > area * (1 + FOLGA_EXCEDENTE)
+            percentual = _coluna(gdf, "percent_area_georef")
+            if percentual is not None:
+                relatorio["percentual_calculado"] = 100 * area_georef / area
+                relatorio["dif_percentual"] = percentual - relatorio["percentual_calculado"]
+                relatorio["percentual_divergente"] = np.abs(relatorio["dif_percentual"]) > TOLERANCIA_PERCENTUAL
+
+        area_car = _coluna(gdf, "area_car_total")
+        if area_car is not None:
+            relatorio["area_car_excede"] = area_car > area * (1 + FOLGA_EXCEDENTE)
+
+        perimetro_car = _coluna(gdf, "perimetro_total_car")
+        if perimetro_car is not None:
+            razao = np.where(perimetro_car > 0, perimetro_car / perimetro, np.nan)
+            relatorio["razao_perimetro"] = razao
+            relatorio["escore_perimetro"] = escore_robusto(np.log(razao))
+            relatorio["perimetro_atipico"] = np.abs(relatorio["escore_perimetro"]) > LIMITE_ESCORE
+
+    verificacoes = [c for c in VERIFICACOES if c in relatorio.columns]
+    relatorio["problemas"] = relatorio[verificacoes].sum(axis=1).astype(int)
+    return relatorio
+
+
+def resumir_auditoria(relatorio):
+    """Municípios sinalizados por verificação (`{verificação: quantidade}`)."""
+    return {c: int(relatorio[c].sum()) for c in VERIFICACOES if c in relatorio.columns}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Auditar áreas e perímetros da base em EPSG:5880.")
+    parser.add_argument("origem", nargs="?", default=PATHS["dataset"], help="Base a auditar")
+    parser.add_argument("saida", nargs="?", default="auditoria_geometrica.csv", help="CSV do relatório")
+    parser.add_argument("--todos", action="store_true", help="Incluir municípios sem problemas")
+    args = parser.parse_args()
+
+    relatorio = auditar(obter_fonte(args.origem).carregar())
+    for verificacao, total in resumir_auditoria(relatorio).items():
+        print(f"{VERIFICACOES[verificacao]}: {total}")
+    if not args.todos:
+        relatorio = relatorio[relatorio["problemas"] > 0]
+    with open(args.saida, "w", encoding="utf-8-sig", newline="") as arquivo:
+        arquivo.write(csv_br(relatorio))
+    print(f"{len(relatorio)} municípios gravados em {args.saida}")
@@ -0,0 +1,279 @@
+"""Autocorrelação espacial das notas: I de Moran global e LISA (Moran local).
+
+Os pesos são os de contiguidade do grafo de vizinhança
+(`mda_app.core.vizinhanca`), padronizados por linha: cada vizinho do município
+`i` pesa `1 / grau(i)`. A defasagem espacial (média dos vizinhos) é calculada
+direto sobre os arrays CSR, para várias colunas ou permutações de uma vez.
+
+A significância vem de testes de permutação:
+
+- global: a cada permutação as notas são embaralhadas entre os municípios; as
+  permutações são processadas em lotes, como colunas de uma matriz;
+- local (aleatorização condicional): para o município `i`, os `grau(i)`
+  vizinhos são sorteados entre os demais municípios. Um único sorteio de
+  índices é compartilhado por todos os municípios e colunas, e municípios com
+  o mesmo grau são avaliados juntos em lotes vetorizados. Os lotes são
+  distribuídos por um pool de processos quando a base é grande.
+
+Classes LISA (`CLASSES_LISA`): 1 Alto-Alto, 2 Baixo-Alto, 3 Baixo-Baixo,
+4 Alto-Baixo e 0 quando o p-valor não é significativo.
+"""
+
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mda_app.core.precificacao import COLUNAS_TRIMESTRES
+from mda_app.core.vizinhanca import adjacencia
+from mda_app.utils.importacao import modulo_tardio
+
+pd = modulo_tardio("pandas")
+
+# Notas analisadas (as ausentes na base são ignoradas)
+COLUNAS_AUTOCORRELACAO = ["nota_media", "nota_insalub_2", *COLUNAS_TRIMESTRES]
+
+# classe: (rótulo, cor no mapa)
+CLASSES_LISA = {
+    0: ("Não significativo", "#d9d9d9"),
+    1: ("Alto-Alto", "#d7191c"),
+    2: ("Baixo-Alto", "#abd9e9"),
+    3: ("Baixo-Baixo", "#2c7bb6"),
+    4: ("Alto-Baixo", "#fdae61"),
+}
+
+PERMUTACOES = 999
+SIGNIFICANCIA = 0.05
+SEMENTE = 12345
+
+# Valores reunidos de uma vez (municípios x permutações x vizinhos x colunas)
+# em cada lote do teste local; limita a memória de cada processo
+ELEMENTOS_POR_LOTE = 4_000_000
+# Municípios mínimos por processo: abaixo disso, iniciar processos custa mais
+# do que o teste (a base nacional é dividida em três partes)
+MUNICIPIOS_POR_PROCESSO = 2000
+VERSOES_MEMORIZADAS = 4
+
+_memo = OrderedDict()
+_trava = threading.Lock()
+
+
+def defasagem_espacial(grafo, valores):
+    """Média dos vizinhos de cada município (pesos padronizados por linha).
+
+    `valores` tem um município por linha (1D ou 2D, ex.: uma coluna por nota);
+    municípios sem vizinhos recebem 0.
+    """
+    valores = np.asarray(valores, dtype=float)
+    acumulado = np.zeros((grafo.pares + 1,) + valores.shape[1:])
+    np.cumsum(valores[grafo.indices], axis=0, out=acumulado[1:])
+    somas = acumulado[grafo.indptr[1:]] - acumulado[grafo.indptr[:-1]]
+    graus = grafo.graus().reshape((-1,) + (1,) * (valores.ndim - 1))
+    return np.divide(somas, graus, out=np.zeros_like(somas), where=graus > 0)
+
+
+def _padronizar(valores):
+    valores = np.asarray(valores, dtype=float)
+    return valores - valores.mean(axis=0)
+
+
+def moran_global(grafo, valores, permutacoes=PERMUTACOES, semente=SEMENTE, lote=100):
+    """I de Moran global de uma nota, com p-valor por permutação.
+
+    Returns:
+        Dicionário com `I`, `esperado` (-1 / (n - 1)), `p_valor` (pseudo
+        p-valor unilateral na direção do valor observado) e `z` (em relação à
+        distribuição das permutações).
+    """
+    z = _padronizar(valores)
+    n = len(z)
+    conectados = int((grafo.graus() > 0).sum())
+    escala = n / max(conectados, 1) / (z @ z)
+    observado = float(escala * (z @ defasagem_espacial(grafo, z)))
+
+    gerador = np.random.default_rng(semente)
+    simulados = []
+    for inicio in range(0, permutacoes, lote):
+        tamanho = min(lote, permutacoes - inicio)
+        embaralhados = gerador.permuted(np.tile(z, (tamanho, 1)), axis=1).T
+        defasagens = defasagem_espacial(grafo, embaralhados)
+        simulados.append(escala * np.einsum("ij,ij->j", embaralhados, defasagens))
+    simulados = np.concatenate(simulados)
+
+    acima = int((simulados >= observado).sum())
+    extremos = min(acima, permutacoes - acima)
+    return {
+        "I": observado,
+        "esperado": -1 / (n - 1),
+        "p_valor": (extremos + 1) / (permutacoes + 1),
+        "z": float((observado - simulados.mean()) / simulados.std()),
+    }
+
+
+def _sorteio_vizinhos(n, maximo, permutacoes, semente):
+    """Índices sorteados sem reposição entre `n - 1` municípios (um sorteio por permutação)."""
+    gerador = np.random.default_rng(semente)
+    return np.stack([
+        gerador.choice(n - 1, size=maximo, replace=False) for _ in range(permutacoes)
+    ]).astype(np.int32)
+
+
+def _extremos_locais(z, posicoes, graus, observados, sorteio):
+    """Permutações tão ou mais extremas que o observado, por município e coluna.
+
+    Args:
+        z: Notas padronizadas (municípios x colunas)
+        posicoes: Municípios avaliados
+        graus: Número de vizinhos de cada município avaliado
+        observados: I local observado (municípios avaliados x colunas)
+        sorteio: Índices sorteados (permutações x grau máximo)
+    """
+    permutacoes = len(sorteio)
+    acima = np.zeros(observados.shape, dtype=np.int64)
+    for grau in np.unique(graus):
+        grupo = np.flatnonzero(graus == grau)
+        indices = sorteio[:, :grau]
+        lote = max(1, ELEMENTOS_POR_LOTE // (permutacoes * grau * z.shape[1]))
+        for inicio in range(0, len(grupo), lote):
+            linhas = grupo[inicio:inicio + lote]
+            proprios = posicoes[linhas][:, None, None]
+            # O sorteio é entre os n - 1 outros municípios: pula o próprio
+            sorteados = indices[None] + (indices[None] >= proprios)
+            medias = z[sorteados].mean(axis=2)
+            simulados = z[posicoes[linhas]][:, None, :] * medias
+            acima[linhas] = (simulados >= observados[linhas][:, None, :]).sum(axis=1)
+    return np.minimum(acima, permutacoes - acima)
+
+
+def _extremos_em_lote(z, posicoes, graus, observados, permutacoes, maximo, semente):
+    sorteio = _sorteio_vizinhos(len(z), maximo, permutacoes, semente)
+    return _extremos_locais(z, posicoes, graus, observados, sorteio)
+
+
+def lisa(grafo, valores, permutacoes=PERMUTACOES, significancia=SIGNIFICANCIA, semente=SEMENTE,
+         processos=None):
+    """Moran local (LISA) de uma ou mais notas.
+
+    Args:
+        grafo: Grafo de vizinhança (`Adjacencia`)
+        valores: Notas, um município por linha (1D ou 2D com uma nota por coluna)
+        permutacoes: Permutações do teste de significância
+        significancia: Limite do p-valor para a classe ser atribuída
+        semente: Semente do sorteio (mesmo resultado a cada execução)
+        processos: Processos do pool (padrão: número de CPUs); 1 roda tudo
+            no processo atual
+
+    Returns:
+        Tupla `(I, p_valor, classe)`, arrays com a forma de `valores`.
+    """
+    valores = np.asarray(valores, dtype=float)
+    unidimensional = valores.ndim == 1
+    z = _padronizar(valores.reshape(len(valores), -1))
+    n = len(z)
+    momento = (z ** 2).sum(axis=0) / n
+    defasagem = defasagem_espacial(grafo, z)
+    locais = z * defasagem / momento
+
+    graus = grafo.graus()
+    posicoes = np.flatnonzero(graus > 0)
+    p_valores = np.full(z.shape, np.nan)
+    if len(posicoes):
+        maximo = int(graus.max())
+        observados = z[posicoes] * defasagem[posicoes]
+        extremos = _distribuir(z, posicoes, graus[posicoes], observados, permutacoes, maximo, semente,
+                               processos)
+        p_valores[posicoes] = (extremos + 1) / (permutacoes + 1)
+
+    alto, vizinhos_alto = z > 0, defasagem > 0
+    classes = np.select(
+        [alto & vizinhos_alto, ~alto & vizinhos_alto, ~alto & ~vizinhos_alto, alto & ~vizinhos_alto],
+        [1, 2, 3, 4],
+    )
+    classes[~(p_valores <= significancia)] = 0
+    if unidimensional:
+        return locais[:, 0], p_valores[:, 0], classes[:, 0]
+    return locais, p_valores, classes
+
+
+def _distribuir(z, posicoes, graus, observados, permutacoes, maximo, semente, processos):
+    """Dividir os municípios entre processos; todos usam o mesmo sorteio (mesma semente)."""
+    processos = min(processos or os.cpu_count() or 1, -(-len(posicoes) // MUNICIPIOS_POR_PROCESSO))
+    if processos <= 1:
+        return _extremos_em_lote(z, posicoes, graus, observados, permutacoes, maximo, semente)
+    partes = np.array_split(np.arange(len(posicoes)), processos)
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as pool:
+        futuros = [
+            pool.submit(_extremos_em_lote, z, posicoes[parte], graus[parte], observados[parte],
+                        permutacoes, maximo, semente)
+            for parte in partes
+        ]
+        return np.concatenate([futuro.result() for futuro in futuros])
+
+
+def _memorizado(gdf, chave, calcular):
+    """Resultado de `calcular()` memorizado pela versão de `gdf` e `chave`."""
+    versao = gdf.attrs.get("versao")
+    if versao is None:
+        return calcular()
+    chave = (versao, len(gdf)) + chave
+    with _trava:
+        resultado = _memo.get(chave)
+        if resultado is not None:
+            _memo.move_to_end(chave)
+            return resultado
+    resultado = calcular()
+    with _trava:
+        _memo[chave] = resultado
+        while len(_memo) > VERSOES_MEMORIZADAS * len(COLUNAS_AUTOCORRELACAO):
+            _memo.popitem(last=False)
+    return resultado
+
+
+def classes_lisa(gdf, colunas=None, permutacoes=PERMUTACOES, significancia=SIGNIFICANCIA, processos=None):
+    """Classes e p-valores LISA das notas de `gdf`, memorizados pela versão da base.
+
+    Returns:
+        DataFrame com o índice de `gdf` e, por nota, `lisa_<nota>` (classe) e
+        `lisa_p_<nota>` (p-valor).
+    """
+    colunas = [c for c in (colunas or COLUNAS_AUTOCORRELACAO) if c in gdf.columns]
+
+    def calcular():
+        _, p_valores, classes = lisa(adjacencia(gdf), gdf[colunas].to_numpy(dtype=float), permutacoes,
+                                     significancia, processos=processos)
+        resultado = pd.DataFrame(index=gdf.index)
+        for posicao, coluna in enumerate(colunas):
+            resultado[f"lisa_{coluna}"] = classes[:, posicao]
+            resultado[f"lisa_p_{coluna}"] = p_valores[:, posicao]
+        return resultado
+
+    return _memorizado(gdf, ("lisa", tuple(colunas), permutacoes, significancia), calcular)
+
+
+def moran_da_base(gdf, coluna, permutacoes=PERMUTACOES):
+    """I de Moran global de `coluna` em `gdf`, memorizado pela versão da base."""
+    return _memorizado(
+        gdf, ("moran", coluna, permutacoes),
+        lambda: moran_global(adjacencia(gdf), gdf[coluna].to_numpy(dtype=float), permutacoes),
+    )
+
+
+def anexar_classes_lisa(gdf_filtrado, coluna, base=None):
+    """Cópia de `gdf_filtrado` com a coluna `lisa_<coluna>`.
+
+    As classes são calculadas sobre `base` (padrão: a própria seleção), de modo
+    que o mapa de uma seleção mostra os agrupamentos da base inteira.
+    """
+    base = gdf_filtrado if base is None else base
+    classes = classes_lisa(base)[f"lisa_{coluna}"]
+    return gdf_filtrado.assign(**{f"lisa_{coluna}": classes.reindex(gdf_filtrado.index).fillna(0).astype(int)})
+
+
+def limpar_memoria():
+    """Descartar os resultados memorizados."""
+    with _trava:
+        _memo.clear()
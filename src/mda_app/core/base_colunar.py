@@ -0,0 +1,309 @@
+"""Armazenamento colunar da base, com atributos e geometrias separados.
+
+Uma base colunar é um diretório com:
+
+- `atributos.arrow`: tabela Arrow (formato IPC, sem compressão) com todas as
+  colunas exceto a geometria;
+- `geometrias.wkb`: as geometrias em WKB, concatenadas;
+- `offsets.npy`: vetor int64 com `n + 1` posições; a geometria `i` ocupa os
+  bytes `offsets[i]:offsets[i + 1]` de `geometrias.wkb`;
+- `envelopes.npy`: matriz float64 `(n, 4)` com o envelope (minx, miny, maxx,
+  maxy) de cada geometria, para consultas espaciais sem decodificar WKB;
+- `meta.json`: CRS, número de linhas e versão (hash do conteúdo).
+
+Os arquivos de dados são abertos por memory-map: leituras só de
+atributos (filtros, agregações, precificação) nunca decodificam geometrias, e
+vários processos que abrem a mesma base compartilham as páginas pelo cache do
+sistema operacional em vez de cada um manter sua cópia.
+
+O app carrega só os atributos (`quadro_atributos`): um DataFrame indexado pela
+posição das linhas na base, que guarda em `attrs` o diretório de origem. As
+geometrias são montadas sob demanda a partir do memory-map (`geometrias_de`,
+`com_geometrias`), apenas para as linhas que vão para o mapa, para a
+exportação ou para o cálculo de vizinhanças.
+
+Conversão a partir de um GeoJSON/GeoPackage:
+
+    python -m mda_app.core.base_colunar data/raw/precificacao_al_ii.geojson data/colunar/al_ii
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from mda_app.utils.importacao import modulo_tardio
+
+gpd = modulo_tardio("geopandas")
+pa = modulo_tardio("pyarrow")
+shapely = modulo_tardio("shapely")
+
+ARQUIVO_ATRIBUTOS = "atributos.arrow"
+ARQUIVO_GEOMETRIAS = "geometrias.wkb"
+ARQUIVO_OFFSETS = "offsets.npy"
+ARQUIVO_ENVELOPES = "envelopes.npy"
+ARQUIVO_META = "meta.json"
+
+# Chaves em `DataFrame.attrs` de um quadro só de atributos
+ATRIBUTO_BASE = "base_colunar"
+ATRIBUTO_CRS = "crs_geometrias"
+
+_bases = {}
+_trava = threading.Lock()
+
+
+def eh_base_colunar(caminho):
+    """Indicar se `caminho` é um diretório de base colunar."""
+    return os.path.isfile(os.path.join(str(caminho), ARQUIVO_META))
+
+
+def salvar_base_colunar(gdf, diretorio):
+    """Gravar um GeoDataFrame como base colunar.
+
+    Returns:
+        A versão (hash do conteúdo) gravada em `meta.json`.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    coluna_geometria = gdf.geometry.name
+
+    tabela = pa.Table.from_pandas(
+        gdf.drop(columns=coluna_geometria).reset_index(drop=True), preserve_index=False
+    )
+    caminho_atributos = os.path.join(diretorio, ARQUIVO_ATRIBUTOS)
+    with pa.OSFile(caminho_atributos, "wb") as arquivo:
+        with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+
+    wkbs = shapely.to_wkb(gdf.geometry.to_numpy())
+    offsets = np.zeros(len(wkbs) + 1, dtype=np.int64)
+    np.cumsum([len(w) for w in wkbs], out=offsets[1:])
+    with open(os.path.join(diretorio, ARQUIVO_GEOMETRIAS), "wb") as arquivo:
+        for wkb in wkbs:
+            arquivo.write(wkb)
+    np.save(os.path.join(diretorio, ARQUIVO_OFFSETS), offsets)
+    envelopes = shapely.bounds(gdf.geometry.to_numpy()).astype(np.float64).reshape(-1, 4)
+    np.save(os.path.join(diretorio, ARQUIVO_ENVELOPES), envelopes)
+
+    resumo = hashlib.blake2b(digest_size=16)
+    for nome in (ARQUIVO_ATRIBUTOS, ARQUIVO_GEOMETRIAS):
+        with open(os.path.join(diretorio, nome), "rb") as arquivo:
+            for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+                resumo.update(bloco)
+    meta = {
+        "linhas": len(gdf),
+        "crs": gdf.crs.to_string() if gdf.crs is not None else None,
+        "coluna_geometria": coluna_geometria,
+        "versao": resumo.hexdigest(),
+    }
+    with open(os.path.join(diretorio, ARQUIVO_META), "w", encoding="utf-8") as arquivo:
+        json.dump(meta, arquivo, indent=2)
+    return meta["versao"]
+
+
+class BaseColunar:
+    """Base colunar aberta por memory-map.
+
+    Args:
+        diretorio: Diretório gravado por `salvar_base_colunar`
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = str(diretorio)
+        with open(os.path.join(self.diretorio, ARQUIVO_META), encoding="utf-8") as arquivo:
+            self.meta = json.load(arquivo)
+
+        fonte = pa.memory_map(os.path.join(self.diretorio, ARQUIVO_ATRIBUTOS), "r")
+        self.tabela = pa.ipc.open_file(fonte).read_all()
+        self.offsets = np.load(os.path.join(self.diretorio, ARQUIVO_OFFSETS), mmap_mode="r")
+        caminho_geometrias = os.path.join(self.diretorio, ARQUIVO_GEOMETRIAS)
+        if os.path.getsize(caminho_geometrias) > 0:
+            self._wkb = np.memmap(caminho_geometrias, dtype=np.uint8, mode="r")
+        else:
+            self._wkb = np.zeros(0, dtype=np.uint8)
+        caminho_envelopes = os.path.join(self.diretorio, ARQUIVO_ENVELOPES)
+        # Bases gravadas antes de `envelopes.npy` calculam os envelopes na 1ª consulta
+        self._envelopes = (np.load(caminho_envelopes, mmap_mode="r")
+                           if os.path.exists(caminho_envelopes) else None)
+
+    def __len__(self):
+        return self.tabela.num_rows
+
+    @property
+    def versao(self):
+        return self.meta["versao"]
+
+    @property
+    def crs(self):
+        return self.meta["crs"]
+
+    @property
+    def colunas(self):
+        return self.tabela.column_names
+
+    def coluna(self, nome):
+        """Valores de uma coluna de atributos como array NumPy."""
+        return self.tabela.column(nome).to_numpy()
+
+    def atributos(self, colunas=None, indices=None):
+        """Atributos como DataFrame, sem decodificar nenhuma geometria.
+
+        Args:
+            colunas: Colunas desejadas (padrão: todas)
+            indices: Posições das linhas desejadas (padrão: todas)
+        """
+        tabela = self.tabela if colunas is None else self.tabela.select(list(colunas))
+        if indices is not None:
+            tabela = tabela.take(pa.array(np.asarray(indices, dtype=np.int64)))
+        return tabela.to_pandas()
+
+    def wkb(self, indices=None):
+        """Geometrias em WKB (lista de bytes), lidas direto do memory-map."""
+        if indices is None:
+            indices = range(len(self))
+        offsets = self.offsets
+        return [self._wkb[offsets[i]:offsets[i + 1]].tobytes() for i in indices]
+
+    def geometrias(self, indices=None):
+        """Geometrias shapely das linhas pedidas (padrão: todas)."""
+        return shapely.from_wkb(self.wkb(indices))
+
+    def envelopes(self):
+        """Envelopes (minx, miny, maxx, maxy) de todas as linhas, no CRS da base.
+
+        Lidos por memory-map de `envelopes.npy`, gravado junto com a base;
+        nenhuma geometria é decodificada.
+        """
+        if self._envelopes is None:
+            self._envelopes = shapely.bounds(self.geometrias())
+        return self._envelopes
+
+    def quadro_atributos(self, colunas=None, indices=None):
+        """Atributos das linhas pedidas, prontos para ganhar geometrias depois.
+
+        O índice é a posição de cada linha na base e `attrs` guarda o
+        diretório e o CRS das geometrias: `geometrias_de` e `com_geometrias`
+        as montam a partir do memory-map quando (e se) forem necessárias.
+        """
+        if indices is not None:
+            indices = np.asarray(indices, dtype=np.int64)
+        df = self.atributos(colunas, indices)
+        if indices is not None:
+            df.index = indices
+        df.attrs[ATRIBUTO_BASE] = self.diretorio
+        df.attrs[ATRIBUTO_CRS] = self.crs
+        return df
+
+    def para_geodataframe(self, colunas=None, indices=None):
+        """Montar um GeoDataFrame com as colunas e linhas pedidas."""
+        if indices is not None:
+            indices = np.asarray(indices, dtype=np.int64)
+        gdf = gpd.GeoDataFrame(
+            self.atributos(colunas, indices),
+            geometry=self.geometrias(indices),
+            crs=self.crs,
+        )
+        if self.meta["coluna_geometria"] != gdf.geometry.name:
+            gdf = gdf.rename_geometry(self.meta["coluna_geometria"])
+        return gdf
+
+
+def abrir_base_colunar(diretorio):
+    """`BaseColunar` de `diretorio`, aberta uma vez por processo.
+
+    A base é reaberta quando `meta.json` muda (base regravada).
+    """
+    diretorio = str(diretorio)
+    marca = os.stat(os.path.join(diretorio, ARQUIVO_META)).st_mtime_ns
+    with _trava:
+        aberta = _bases.get(diretorio)
+        if aberta is not None and aberta[0] == marca:
+            return aberta[1]
+    base = BaseColunar(diretorio)
+    with _trava:
+        _bases[diretorio] = (marca, base)
+    return base
+
+
+def so_atributos(df):
+    """Indicar se `df` é um quadro de `quadro_atributos`, ainda sem geometrias."""
+    return ATRIBUTO_BASE in df.attrs and not isinstance(df, gpd.GeoDataFrame)
+
+
+def geometrias_de(df):
+    """Geometrias das linhas de `df` como GeoSeries alinhada ao seu índice.
+
+    Para um quadro de `quadro_atributos`, as geometrias são decodificadas do
+    memory-map (só as linhas de `df`) e reprojetadas para o CRS em `attrs`.
+    """
+    if not so_atributos(df):
+        return df.geometry
+    base = abrir_base_colunar(df.attrs[ATRIBUTO_BASE])
+    geometrias = gpd.GeoSeries(
+        base.geometrias(df.index.to_numpy()), index=df.index, crs=base.crs,
+        name=base.meta["coluna_geometria"],
+    )
+    crs = df.attrs.get(ATRIBUTO_CRS)
+    if crs is not None and geometrias.crs is not None and not geometrias.crs.equals(crs):
+        geometrias = geometrias.to_crs(crs)
+    return geometrias
+
+
+def com_geometrias(df):
+    """`df` como GeoDataFrame, montando as geometrias se ele só tem atributos."""
+    if not so_atributos(df):
+        return df
+    geometrias = geometrias_de(df)
+    gdf = gpd.GeoDataFrame(df.assign(**{geometrias.name: geometrias}), geometry=geometrias.name,
+                           crs=geometrias.crs)
+    gdf.attrs = dict(df.attrs)
+    return gdf
+
+
+def reprojetar(df, epsg):
+    """Reprojetar `df` para o código EPSG `epsg`.
+
+    Um quadro só de atributos apenas registra o CRS de destino; a
+    reprojeção acontece quando as geometrias são montadas.
+    """
+    if not so_atributos(df):
+        return df.to_crs(epsg=epsg)
+    df = df.copy()
+    df.attrs[ATRIBUTO_CRS] = f"EPSG:{epsg}"
+    return df
+
+
+def localizar_ponto(df, x, y):
+    """Rótulos das linhas de `df` cuja geometria contém o ponto (x, y), no CRS de `df`.
+
+    Um quadro só de atributos é consultado pelos envelopes da base e só os
+    candidatos têm a geometria decodificada.
+    """
+    ponto = shapely.Point(x, y)
+    if not so_atributos(df):
+        return df.index[df.sindex.query(ponto, predicate="within")]
+    base = abrir_base_colunar(df.attrs[ATRIBUTO_BASE])
+    crs = df.attrs.get(ATRIBUTO_CRS)
+    if crs is not None and base.crs is not None:
+        ponto = gpd.GeoSeries([ponto], crs=crs).to_crs(base.crs).iloc[0]
+    minx, miny, maxx, maxy = base.envelopes().T
+    candidatos = np.flatnonzero((minx <= ponto.x) & (ponto.x <= maxx) & (miny <= ponto.y) & (ponto.y <= maxy))
+    candidatos = candidatos[np.isin(candidatos, df.index.to_numpy())]
+    if len(candidatos):
+        candidatos = candidatos[shapely.contains(base.geometrias(candidatos), ponto)]
+    return df.index[df.index.isin(candidatos)]
+
+
+def converter_para_colunar(origem, diretorio):
+    """Ler um arquivo vetorial (GeoJSON, GeoPackage...) e gravá-lo como base colunar."""
+    return salvar_base_colunar(gpd.read_file(origem), diretorio)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converter uma base vetorial para o formato colunar.")
+    parser.add_argument("origem", help="Arquivo de origem (GeoJSON, GeoPackage...)")
+    parser.add_argument("destino", help="Diretório da base colunar")
+    args = parser.parse_args()
+    print(converter_para_colunar(args.origem, args.destino))
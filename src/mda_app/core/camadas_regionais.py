@@ -0,0 +1,165 @@
+"""Camadas agregadas por UF e por região para as vistas de muitas UFs.
+
+Com muitas UFs na seleção, desenhar milhares de polígonos municipais é lento e
+ilegível. As geometrias das UFs (e das grandes regiões do IBGE) são dissolvidas
+uma vez por versão da base e simplificadas como uma cobertura
+(`shapely.coverage_simplify`), de modo que as divisas continuam coincidindo
+entre vizinhas. Cada nível tem a sua tolerância.
+
+Os atributos de cada camada são agregados a partir dos municípios:
+
+- notas (`nota_*`): média ponderada pela área georreferenciável;
+- áreas e valores (`COLUNAS_SOMADAS`): soma.
+
+As geometrias vêm da base inteira; os atributos são recalculados para a
+seleção (uma agregação por grupo, barata), então uma UF com só parte dos
+municípios filtrados mostra os números desses municípios.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from mda_app.config.settings import MAP_CONFIG
+from mda_app.core.base_colunar import geometrias_de
+from mda_app.utils.importacao import modulo_tardio
+
+gpd = modulo_tardio("geopandas")
+pd = modulo_tardio("pandas")
+shapely = modulo_tardio("shapely")
+
+# Grandes regiões do IBGE
+REGIOES = {
+    "Norte": ["AC", "AM", "AP", "PA", "RO", "RR", "TO"],
+    "Nordeste": ["AL", "BA", "CE", "MA", "PB", "PE", "PI", "RN", "SE"],
+    "Sudeste": ["ES", "MG", "RJ", "SP"],
+    "Sul": ["PR", "RS", "SC"],
+    "Centro-Oeste": ["DF", "GO", "MS", "MT"],
+}
+REGIAO_DA_UF = {uf: regiao for regiao, ufs in REGIOES.items() for uf in ufs}
+
+# nível: tolerância da simplificação (graus, base em EPSG:4326)
+TOLERANCIAS = {"uf": 0.01, "regiao": 0.03}
+
+# Somadas na agregação (as demais colunas numéricas `nota_*` viram médias ponderadas)
+COLUNAS_SOMADAS = ["area_georef", "area_car_total", "valor_mun_area"]
+COLUNA_PESO = "area_georef"
+VERSOES_MEMORIZADAS = 4
+
+_memo = OrderedDict()
+_trava = threading.Lock()
+
+
+def _chaves(gdf, nivel):
+    """Chave do grupo de cada município (UF ou região)."""
+    if nivel == "uf":
+        return gdf["SIGLA_UF"].to_numpy()
+    if nivel == "regiao":
+        return gdf["SIGLA_UF"].map(REGIAO_DA_UF).fillna("Outra").to_numpy()
+    raise ValueError(f"Nível de agregação desconhecido: {nivel!r} (use 'uf' ou 'regiao').")
+
+
+def agregar_atributos(gdf, nivel="uf"):
+    """Notas ponderadas pela área georreferenciável e somas de áreas e valores por grupo."""
+    chaves = _chaves(gdf, nivel)
+    notas = [c for c in gdf.columns if c.startswith("nota_") and pd.api.types.is_numeric_dtype(gdf[c])]
+    somadas = [c for c in COLUNAS_SOMADAS if c in gdf.columns]
+    pesos = gdf[COLUNA_PESO].to_numpy(dtype=float) if COLUNA_PESO in gdf.columns else np.ones(len(gdf))
+    pesos = np.where(np.isfinite(pesos) & (pesos > 0), pesos, 0.0)
+
+    ponderadas = pd.DataFrame(gdf[notas].to_numpy(dtype=float) * pesos[:, None], columns=notas)
+    ponderadas["_peso"] = pesos
+    grupos = ponderadas.groupby(chaves)
+    soma = grupos.sum()
+    # Grupo sem área informada: média simples das notas
+    simples = pd.DataFrame(gdf[notas].to_numpy(dtype=float), columns=notas).groupby(chaves).mean()
+    agregados = soma[notas].div(soma["_peso"], axis=0).where(soma["_peso"] > 0, simples)
+
+    for coluna in somadas:
+        agregados[coluna] = pd.Series(gdf[coluna].to_numpy(dtype=float)).groupby(chaves).sum()
+    agregados["municipios"] = grupos.size()
+    agregados.index.name = nivel
+    return agregados
+
+
+def _dissolver(gdf, geometrias, nivel):
+    chaves = _chaves(gdf, nivel)
+    grupos = pd.Series(np.arange(len(gdf))).groupby(chaves).indices
+    nomes = sorted(grupos)
+    return nomes, np.array([shapely.union_all(geometrias[grupos[nome]]) for nome in nomes], dtype=object)
+
+
+def _simplificar(geometrias, tolerancia):
+    try:
+        return shapely.coverage_simplify(geometrias, tolerancia)
+    except Exception:
+        # Geometrias que não formam uma cobertura válida: simplificação individual
+        return shapely.simplify(geometrias, tolerancia, preserve_topology=True)
+
+
+def construir_camadas(gdf, niveis=tuple(TOLERANCIAS)):
+    """Dissolver e simplificar as camadas de `gdf`, com os atributos da base inteira.
+
+    Returns:
+        Dicionário `{nível: GeoDataFrame}` indexado pela UF ou pela região.
+    """
+    camadas = {}
+    originais = geometrias_de(gdf)
+    for nivel in niveis:
+        nomes, geometrias = _dissolver(gdf, originais.to_numpy(), nivel)
+        camada = gpd.GeoDataFrame(
+            agregar_atributos(gdf, nivel).loc[nomes],
+            geometry=_simplificar(geometrias, TOLERANCIAS[nivel]),
+            crs=originais.crs,
+        )
+        camada.attrs = {}
+        camadas[nivel] = camada
+    return camadas
+
+
+def camadas_regionais(gdf):
+    """Camadas de `gdf` por UF e por região, memorizadas pela versão da base."""
+    versao = gdf.attrs.get("versao")
+    if versao is None:
+        return construir_camadas(gdf)
+    chave = (versao, len(gdf))
+    with _trava:
+        camadas = _memo.get(chave)
+        if camadas is not None:
+            _memo.move_to_end(chave)
+            return camadas
+    camadas = construir_camadas(gdf)
+    with _trava:
+        _memo[chave] = camadas
+        while len(_memo) > VERSOES_MEMORIZADAS:
+            _memo.popitem(last=False)
+    return camadas
+
+
+def nivel_agregacao(gdf_filtrado):
+    """Nível da camada agregada para a seleção, ou None para desenhar municípios."""
+    if "SIGLA_UF" not in gdf_filtrado.columns:
+        return None
+    if gdf_filtrado["SIGLA_UF"].nunique() < MAP_CONFIG["ufs_para_agregar"]:
+        return None
+    return MAP_CONFIG["nivel_agregado"]
+
+
+def camada_agregada(gdf_filtrado, base, nivel="uf"):
+    """Camada `nivel` com as geometrias de `base` e os atributos da seleção.
+
+    Acrescenta a coluna `rotulo` (ex.: "AL - 102 municípios") usada na dica do mapa.
+    """
+    agregados = agregar_atributos(gdf_filtrado, nivel)
+    geometrias = camadas_regionais(base)[nivel].geometry
+    camada = gpd.GeoDataFrame(agregados, geometry=geometrias.reindex(agregados.index).to_numpy(),
+                              crs=geometrias.crs)
+    camada["rotulo"] = [f"{nome} - {total} municípios" for nome, total in zip(camada.index, camada["municipios"])]
+    return camada
+
+
+def limpar_memoria():
+    """Descartar as camadas memorizadas."""
+    with _trava:
+        _memo.clear()
@@ -0,0 +1,178 @@
+"""Registro declarativo de colunas derivadas.
+
+Cada coluna derivada declara suas colunas de entrada e uma fórmula vetorizada
+(recebe o DataFrame, devolve um array/Series com uma posição por linha). As
+colunas são calculadas sob demanda, apenas quando alguma visão as pede, sobre a
+base completa, e memorizadas por versão da base (`gdf.attrs["versao"]`); um
+filtro ou rerun seguinte só reindexa o resultado já pronto.
+
+Novos indicadores entram com `@coluna_derivada(...)`, sem custo nos reruns
+das visões que não os usam.
+
+Correções de colunas da própria base (como o piso de `nota_insalub_2`) ficam em
+um registro à parte e são aplicadas uma vez na preparação dos dados, já que
+mudam o significado da coluna de origem para todas as visões.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from mda_app.utils.importacao import modulo_tardio
+
+pd = modulo_tardio("pandas")
+
+# Quantas versões da base mantêm colunas memorizadas
+VERSOES_MEMORIZADAS = 4
+
+
+class ColunaDerivada:
+    """Definição de uma coluna derivada.
+
+    Args:
+        nome: Nome da coluna gerada
+        entradas: Colunas usadas pela fórmula (da base ou outras derivadas)
+        formula: Função vetorizada `formula(df) -> array`
+        descricao: Texto curto para documentação/tabela
+    """
+
+    def __init__(self, nome, entradas, formula, descricao=""):
+        self.nome = nome
+        self.entradas = tuple(entradas)
+        self.formula = formula
+        self.descricao = descricao
+
+    def __repr__(self):
+        return f"ColunaDerivada({self.nome!r}, entradas={self.entradas!r})"
+
+
+COLUNAS_DERIVADAS = {}
+CORRECOES = {}
+
+_memo = OrderedDict()
+_trava = threading.Lock()
+
+
+def divisao_segura(numerador, denominador, padrao=0.0):
+    """Dividir elemento a elemento, usando `padrao` onde o denominador é 0 ou inválido."""
+    numerador = np.asarray(numerador, dtype=float)
+    denominador = np.asarray(denominador, dtype=float)
+    validos = (denominador != 0) & np.isfinite(denominador)
+    resultado = np.full(np.broadcast(numerador, denominador).shape, padrao, dtype=float)
+    np.divide(numerador, denominador, out=resultado, where=validos)
+    return resultado
+
+
+def coluna_derivada(nome, entradas, descricao=""):
+    """Registrar a fórmula decorada como coluna derivada `nome`."""
+    def decorador(formula):
+        COLUNAS_DERIVADAS[nome] = ColunaDerivada(nome, entradas, formula, descricao)
+        return formula
+    return decorador
+
+
+def correcao(nome, entradas, descricao=""):
+    """Registrar a fórmula decorada como correção da coluna `nome` da base."""
+    def decorador(formula):
+        CORRECOES[nome] = ColunaDerivada(nome, entradas, formula, descricao)
+        return formula
+    return decorador
+
+
+def aplicar_correcoes(df):
+    """Aplicar as correções registradas às colunas presentes em `df` (in-place)."""
+    for definicao in CORRECOES.values():
+        if all(entrada in df.columns for entrada in definicao.entradas):
+            df[definicao.nome] = definicao.formula(df)
+    return df
+
+
+def _memorizadas(versao):
+    """Dicionário de colunas já calculadas para `versao` (None: sem memória)."""
+    if versao is None:
+        return {}
+    with _trava:
+        colunas = _memo.get(versao)
+        if colunas is None:
+            colunas = _memo[versao] = {}
+            while len(_memo) > VERSOES_MEMORIZADAS:
+                _memo.popitem(last=False)
+        else:
+            _memo.move_to_end(versao)
+        return colunas
+
+
+def calcular_coluna(base, nome):
+    """Série da coluna derivada `nome` sobre `base`, com o mesmo índice.
+
+    Entradas que também são derivadas são resolvidas recursivamente. O
+    resultado é memorizado pela versão de `base` (`base.attrs["versao"]`).
+    """
+    definicao = COLUNAS_DERIVADAS[nome]
+    memorizadas = _memorizadas(base.attrs.get("versao"))
+    serie = memorizadas.get(nome)
+    if serie is not None and serie.index.equals(base.index):
+        return serie
+
+    entradas = {}
+    for entrada in definicao.entradas:
+        if entrada in COLUNAS_DERIVADAS and entrada not in base.columns:
+            entradas[entrada] = calcular_coluna(base, entrada)
+        else:
+            entradas[entrada] = base[entrada]
+    serie = pd.Series(
+        np.asarray(definicao.formula(pd.DataFrame(entradas, index=base.index))),
+        index=base.index,
+        name=nome,
+    )
+    memorizadas[nome] = serie
+    return serie
+
+
+def anexar_colunas(df, nomes, base=None):
+    """Devolver `df` com as colunas derivadas `nomes` acrescentadas.
+
+    Args:
+        df: DataFrame (tipicamente já filtrado) que vai receber as colunas
+        nomes: Colunas derivadas pedidas pela visão
+        base: Base completa da qual `df` é um recorte. As colunas são
+            calculadas (e memorizadas) sobre ela e alinhadas pelo índice.
+    """
+    base = df if base is None else base
+    novas = {
+        nome: calcular_coluna(base, nome).reindex(df.index)
+        for nome in nomes
+        if nome not in df.columns
+    }
+    return df.assign(**novas) if novas else df
+
+
+def limpar_memoria():
+    """Descartar todas as colunas memorizadas."""
+    with _trava:
+        _memo.clear()
+
+
+@correcao("nota_insalub_2", ["nota_insalub_2"], "Insalubridade ajustada, com piso 1")
+def _piso_nota_insalub_2(df):
+    return df["nota_insalub_2"].clip(lower=1)
+
+
+@coluna_derivada("valor_medio", ["valor_mun_perim", "valor_mun_area"],
+                 "Média entre os valores por perímetro e por área")
+def _valor_medio(df):
+    return (df["valor_mun_perim"] + df["valor_mun_area"]) / 2
+
+
+@coluna_derivada("valor_medio_car", ["area_car_total", "area_georef", "valor_mun_area", "num_imoveis"],
+                 "Valor médio por imóvel CAR (área)")
+def _valor_medio_car(df):
+    proporcao_car = divisao_segura(df["area_car_total"], df["area_georef"])
+    return divisao_segura(proporcao_car * df["valor_mun_area"], df["num_imoveis"])
+
+
+@coluna_derivada("val_med_car_perim", ["valor_mun_perim", "num_imoveis"],
+                 "Valor médio por imóvel CAR (perímetro)")
+def _val_med_car_perim(df):
+    return divisao_segura(df["valor_mun_perim"], df["num_imoveis"])
@@ -0,0 +1,210 @@
+"""Comparação entre duas versões (safras) da base de precificação.
+
+As versões são alinhadas pela chave do município (`CD_MUN`, ou `ckey` quando
+não houver código) e todas as diferenças de atributos são calculadas de forma
+vetorizada sobre a união das chaves. Mudanças de geometria são detectadas pelo
+hash do WKB de cada polígono, sem nenhuma operação geométrica entre pares:
+o custo é linear no número de municípios. Versões em CRSs diferentes são
+levadas ao CRS da versão anterior antes da comparação.
+
+O impacto na precificação não usa o valor gravado em cada versão: as duas são
+reprecificadas pela tabela de preços vigente (`valor_por_nota`, a versão
+vetorizada de `calcular_valor_por_nota`), a partir de `nota_media` e
+`area_georef`.
+"""
+
+import numpy as np
+
+from mda_app.core.precificacao import faixa_por_nota, valor_por_nota
+from mda_app.utils.importacao import modulo_tardio
+
+pd = modulo_tardio("pandas")
+shapely = modulo_tardio("shapely")
+
+SITUACAO_INCLUIDO = "incluído"
+SITUACAO_REMOVIDO = "removido"
+SITUACAO_ALTERADO = "alterado"
+SITUACAO_INALTERADO = "inalterado"
+
+
+def hash_geometrias(geometrias):
+    """Hash (uint64) do WKB de cada geometria; geometrias nulas viram 0."""
+    wkb = shapely.to_wkb(np.asarray(geometrias, dtype=object))
+    nulas = pd.isna(wkb)
+    wkb[nulas] = b""
+    hashes = pd.util.hash_array(wkb.astype(object))
+    hashes[nulas] = 0
+    return hashes
+
+
+def _chave_padrao(antiga, nova):
+    for chave in ("CD_MUN", "ckey"):
+        if chave in antiga.columns and chave in nova.columns:
+            return chave
+    raise ValueError("As versões não têm uma chave de município em comum (CD_MUN ou ckey).")
+
+
+def _colunas_numericas(antiga, nova, chave):
+    return [
+        coluna for coluna in antiga.columns
+        if coluna in nova.columns
+        and coluna != chave
+        and pd.api.types.is_numeric_dtype(antiga[coluna])
+        and pd.api.types.is_numeric_dtype(nova[coluna])
+    ]
+
+
+def comparar_versoes(antiga, nova, chave=None, colunas=None, tolerancia=1e-9, tolerancia_geometria=1e-6):
+    """Comparar duas versões da base, município a município.
+
+    Args:
+        antiga: Versão anterior (GeoDataFrame ou DataFrame)
+        nova: Versão atual
+        chave: Coluna que identifica o município (padrão: CD_MUN ou ckey)
+        colunas: Colunas numéricas a comparar (padrão: todas as comuns)
+        tolerancia: Diferença absoluta abaixo da qual o valor é considerado igual
+        tolerancia_geometria: Distância entre vértices (unidades do CRS da
+            versão anterior) abaixo da qual uma geometria reprojetada é
+            considerada igual
+
+    Returns:
+        DataFrame com uma linha por município presente em alguma das versões:
+        chave, `NM_MUN`/`SIGLA_UF` (quando existirem), `situacao`,
+        `geometria_alterada`, `colunas_alteradas` (quantidade), `<coluna>_delta`
+        para cada coluna comparada e o impacto na precificação
+        (`valor_antes`, `valor_depois`, `impacto_valor`, `faixa_antes`,
+        `faixa_depois`). Sem `nota_media` e `area_georef` nas duas versões, o
+        impacto usa o `valor_mun_area` gravado.
+    """
+    chave = chave or _chave_padrao(antiga, nova)
+    if colunas is None:
+        colunas = _colunas_numericas(antiga, nova, chave)
+
+    a = antiga.set_index(chave)
+    b = nova.set_index(chave)
+    for nome, df in (("anterior", a), ("atual", b)):
+        if not df.index.is_unique:
+            raise ValueError(f"A chave {chave!r} tem valores repetidos na versão {nome}.")
+    chaves = a.index.union(b.index)
+    posicoes_a = a.index.get_indexer(chaves)
+    posicoes_b = b.index.get_indexer(chaves)
+    em_a = posicoes_a >= 0
+    em_b = posicoes_b >= 0
+    em_ambas = em_a & em_b
+
+    def _alinhar(df, posicoes, coluna):
+        valores = np.full(len(chaves), np.nan)
+        presentes = posicoes >= 0
+        valores[presentes] = df[coluna].to_numpy(dtype=float)[posicoes[presentes]]
+        return valores
+
+    def _reprecificar(df, posicoes):
+        notas = _alinhar(df, posicoes, "nota_media")
+        valores = valor_por_nota(notas, _alinhar(df, posicoes, "area_georef"))
+        valores[np.isnan(notas)] = np.nan
+        return np.nan_to_num(valores)
+
+    resultado = pd.DataFrame(index=chaves)
+    for coluna in ("NM_MUN", "SIGLA_UF"):
+        # Identificação vem da versão atual; removidos usam a anterior
+        partes = [df[coluna].reindex(chaves) for df in (b, a) if coluna in df.columns]
+        if partes:
+            resultado[coluna] = partes[0].fillna(partes[-1])
+
+    alteradas = np.zeros(len(chaves), dtype=np.int64)
+    for coluna in colunas:
+        antes = _alinhar(a, posicoes_a, coluna)
+        depois = _alinhar(b, posicoes_b, coluna)
+        delta = depois - antes
+        mudou = em_ambas & ~np.isclose(antes, depois, rtol=0, atol=tolerancia, equal_nan=True)
+        alteradas += mudou
+        resultado[f"{coluna}_delta"] = delta
+
+    geometria_alterada = np.zeros(len(chaves), dtype=bool)
+    if hasattr(a, "geometry") and hasattr(b, "geometry"):
+        geometrias_a = a.geometry
+        geometrias_b = b.geometry
+        reprojetar = (geometrias_a.crs is not None and geometrias_b.crs is not None
+                      and not geometrias_a.crs.equals(geometrias_b.crs))
+        if reprojetar:
+            geometrias_b = geometrias_b.to_crs(geometrias_a.crs)
+        geometrias_a = geometrias_a.to_numpy()
+        geometrias_b = geometrias_b.to_numpy()
+        hash_a = hash_geometrias(geometrias_a)
+        hash_b = hash_geometrias(geometrias_b)
+        geometria_alterada[em_ambas] = (
+            hash_a[posicoes_a[em_ambas]] != hash_b[posicoes_b[em_ambas]]
+        )
+        if reprojetar:
+            # A reprojeção altera os últimos dígitos das coordenadas: os hashes
+            # diferentes são confirmados com tolerância
+            suspeitas = np.flatnonzero(geometria_alterada)
+            geometria_alterada[suspeitas] = ~shapely.equals_exact(
+                geometrias_a[posicoes_a[suspeitas]], geometrias_b[posicoes_b[suspeitas]],
+                tolerance=tolerancia_geometria,
+            )
+
+    situacao = np.where(
+        ~em_a, SITUACAO_INCLUIDO,
+        np.where(~em_b, SITUACAO_REMOVIDO,
+                 np.where((alteradas > 0) | geometria_alterada, SITUACAO_ALTERADO, SITUACAO_INALTERADO)),
+    )
+    resultado["situacao"] = situacao
+    resultado["geometria_alterada"] = geometria_alterada
+    resultado["colunas_alteradas"] = alteradas
+
+    # Impacto na precificação: valor por área (as duas versões reprecificadas) e faixa
+    valor_antes = valor_depois = None
+    if all(coluna in df.columns for df in (a, b) for coluna in ("nota_media", "area_georef")):
+        valor_antes = _reprecificar(a, posicoes_a)
+        valor_depois = _reprecificar(b, posicoes_b)
+    elif "valor_mun_area" in a.columns and "valor_mun_area" in b.columns:
+        valor_antes = np.nan_to_num(_alinhar(a, posicoes_a, "valor_mun_area"))
+        valor_depois = np.nan_to_num(_alinhar(b, posicoes_b, "valor_mun_area"))
+    if valor_antes is not None:
+        resultado["valor_antes"] = valor_antes
+        resultado["valor_depois"] = valor_depois
+        resultado["impacto_valor"] = valor_depois - valor_antes
+    if "nota_media" in a.columns and "nota_media" in b.columns:
+        for sufixo, df, posicoes, presentes in (("antes", a, posicoes_a, em_a), ("depois", b, posicoes_b, em_b)):
+            faixas = np.full(len(chaves), -1, dtype=np.int64)
+            faixas[presentes] = faixa_por_nota(_alinhar(df, posicoes, "nota_media")[presentes])
+            resultado[f"faixa_{sufixo}"] = faixas
+
+    resultado.index.name = chave
+    return resultado.reset_index()
+
+
+def resumir_comparacao(comparacao):
+    """Totais da comparação: municípios por situação e impacto no valor."""
+    contagem = comparacao["situacao"].value_counts()
+    resumo = {
+        situacao: int(contagem.get(situacao, 0))
+        for situacao in (SITUACAO_INCLUIDO, SITUACAO_REMOVIDO, SITUACAO_ALTERADO, SITUACAO_INALTERADO)
+    }
+    resumo["geometrias_alteradas"] = int(comparacao["geometria_alterada"].sum())
+    if "impacto_valor" in comparacao.columns:
+        resumo["impacto_valor"] = float(comparacao["impacto_valor"].sum())
+        resumo["valor_antes"] = float(comparacao["valor_antes"].sum())
+        resumo["valor_depois"] = float(comparacao["valor_depois"].sum())
+    if "faixa_antes" in comparacao.columns:
+        ambas = (comparacao["faixa_antes"] >= 0) & (comparacao["faixa_depois"] >= 0)
+        resumo["mudancas_faixa"] = int((ambas & (comparacao["faixa_antes"] != comparacao["faixa_depois"])).sum())
+    return resumo
+
+
+def impacto_por_uf(comparacao):
+    """Impacto no valor e municípios alterados, agregados por UF."""
+    alterado = comparacao["situacao"] != SITUACAO_INALTERADO
+    agregado = (
+        comparacao.assign(municipios_alterados=alterado)
+        .groupby("SIGLA_UF")
+        .agg(
+            municipios_alterados=("municipios_alterados", "sum"),
+            valor_antes=("valor_antes", "sum"),
+            valor_depois=("valor_depois", "sum"),
+            impacto_valor=("impacto_valor", "sum"),
+        )
+        .reset_index()
+    )
+    return agregado.sort_values("impacto_valor", key=np.abs, ascending=False)
@@ -0,0 +1,172 @@
+"""Geração determinística de bases municipais sintéticas.
+
+Produz GeoDataFrames com o mesmo esquema de atributos da base de
+precificação (`nota_*`, `valor_mun_*`, `area_georef`, ...) sobre uma malha
+hexagonal que cobre a extensão do Brasil. Vizinhos compartilham exatamente os
+mesmos vértices, de modo que predicados topológicos (`touches`) funcionam como
+na malha municipal real. Usado em testes, benchmarks e testes de carga, já que
+os GeoJSON versionados são ponteiros Git LFS.
+"""
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from mda_app.core.precificacao import valor_por_nota
+
+# Extensão aproximada do Brasil (SIRGAS 2000, graus)
+EXTENSAO_BRASIL = (-74.0, -33.7, -34.8, 5.3)
+
+# Código IBGE de cada UF
+CODIGOS_UF = {
+    "RO": 11, "AC": 12, "AM": 13, "RR": 14, "PA": 15, "AP": 16, "TO": 17,
+    "MA": 21, "PI": 22, "CE": 23, "RN": 24, "PB": 25, "PE": 26, "AL": 27,
+    "SE": 28, "BA": 29, "MG": 31, "ES": 32, "RJ": 33, "SP": 35, "PR": 41,
+    "SC": 42, "RS": 43, "MS": 50, "MT": 51, "GO": 52, "DF": 53,
+}
+
+TAMANHOS_PADRAO = (100, 1000, 5570)
+
+
+def _densificar_aresta(a, b, pontos_por_aresta):
+    """Interpolar pontos numa aresta de forma independente do sentido.
+
+    A interpolação é feita sempre a partir do vértice lexicograficamente menor,
+    para que dois hexágonos vizinhos gerem coordenadas idênticas na aresta que
+    compartilham.
+    """
+    if pontos_por_aresta <= 0:
+        return [a]
+    inverter = tuple(a) > tuple(b)
+    origem, destino = (b, a) if inverter else (a, b)
+    t = np.arange(1, pontos_por_aresta + 1) / (pontos_por_aresta + 1)
+    intermediarios = origem + np.outer(t, destino - origem)
+    if inverter:
+        intermediarios = intermediarios[::-1]
+    return [a, *intermediarios]
+
+
+def gerar_malha_hexagonal(n, vertices_por_aresta=0, extensao=EXTENSAO_BRASIL):
+    """Gerar `n` hexágonos contíguos cobrindo a extensão informada.
+
+    Args:
+        n: Número de polígonos
+        vertices_por_aresta: Vértices extras interpolados em cada aresta
+            (controla a densidade de vértices e o peso das geometrias)
+        extensao: (minx, miny, maxx, maxy) da malha
+
+    Returns:
+        Lista de polígonos shapely, em ordem de linha.
+    """
+    minx, miny, maxx, maxy = extensao
+    largura, altura = maxx - minx, maxy - miny
+
+    # Hexágonos "pointy-top": largura w = sqrt(3) * r, passo vertical 1,5 * r
+    colunas = max(1, int(np.ceil(np.sqrt(n * largura / altura * 1.5 / np.sqrt(3)))))
+    w = largura / colunas
+    r = w / np.sqrt(3)
+
+    # Offsets dos 6 vértices em unidades inteiras de (w/2, r/2)
+    offsets = [(0, 2), (1, 1), (1, -1), (0, -2), (-1, -1), (-1, 1)]
+
+    poligonos = []
+    for i in range(n):
+        linha, coluna = divmod(i, colunas)
+        # Centro em unidades inteiras: x em múltiplos de w/2, y em múltiplos de r/2
+        cx = 2 * coluna + (linha % 2) + 1
+        cy = 3 * linha
+        vertices = [
+            np.array([minx + (cx + dx) * w / 2, miny + (cy + dy) * r / 2])
+            for dx, dy in offsets
+        ]
+        anel = []
+        for k in range(6):
+            anel.extend(_densificar_aresta(vertices[k], vertices[(k + 1) % 6], vertices_por_aresta))
+        poligonos.append(shapely.Polygon(anel))
+    return poligonos
+
+
+def _atribuir_ufs(centroides, rng):
+    """Agrupar os polígonos em 27 UFs contíguas pelo centro mais próximo."""
+    siglas = list(CODIGOS_UF)
+    n_ufs = min(len(siglas), len(centroides))
+    sementes = centroides[rng.choice(len(centroides), size=n_ufs, replace=False)]
+    distancias = ((centroides[:, None, :] - sementes[None, :, :]) ** 2).sum(axis=2)
+    return np.array(siglas)[distancias.argmin(axis=1)]
+
+
+def gerar_base_sintetica(n, vertices_por_aresta=0, semente=0, crs="EPSG:4674"):
+    """Gerar uma base municipal sintética com o esquema da base real.
+
+    Args:
+        n: Número de municípios
+        vertices_por_aresta: Vértices extras por aresta do hexágono
+        semente: Semente do gerador aleatório (mesma semente, mesma base)
+        crs: CRS da base gerada (padrão: SIRGAS 2000 geográfico)
+
+    Returns:
+        GeoDataFrame com uma linha por município.
+    """
+    rng = np.random.default_rng(semente)
+    geometrias = gerar_malha_hexagonal(n, vertices_por_aresta)
+    centroides = shapely.get_coordinates(shapely.centroid(geometrias))
+
+    siglas = _atribuir_ufs(centroides, rng)
+    codigos_uf = np.array([CODIGOS_UF[s] for s in siglas])
+    sequencial = pd.Series(siglas).groupby(siglas).cumcount().to_numpy() + 1
+    cd_mun = [f"{c:02d}{s:05d}" for c, s in zip(codigos_uf, sequencial)]
+    nomes = [f"Município {c}" for c in cd_mun]
+
+    gdf = gpd.GeoDataFrame(
+        {
+            "CD_MUN": cd_mun,
+            "NM_MUN": nomes,
+            "SIGLA_UF": siglas,
+            "ckey": [f"{nome} - {uf}" for nome, uf in zip(nomes, siglas)],
+            "populacao": rng.lognormal(9.5, 1.2, n).round().astype(np.int64),
+        },
+        geometry=geometrias,
+        crs="EPSG:4674",
+    )
+
+    # Área do município em hectares (projeção de área do IBGE)
+    area_cidade = gdf.to_crs(epsg=5880).area.to_numpy() / 10_000
+
+    gdf["nota_veg"] = rng.integers(1, 11, n).astype(float)
+    gdf["nota_area"] = rng.integers(1, 11, n).astype(float)
+    gdf["nota_relevo"] = rng.integers(1, 11, n).astype(float)
+    gdf["nota_acesso"] = 1.0
+    gdf["nota_insalub"] = rng.uniform(0, 10, n).round(2)
+    gdf["nota_insalub_2"] = rng.uniform(0, 10, n).round(2)
+
+    for q in range(1, 5):
+        gdf[f"nota_p_q{q}"] = rng.uniform(0, 20, n).round(2)
+
+    gdf["area_cidade"] = area_cidade
+    gdf["percent_area_georef"] = rng.uniform(20, 95, n).round(2)
+    gdf["area_georef"] = area_cidade * gdf["percent_area_georef"] / 100
+    gdf["num_imoveis"] = rng.integers(0, 5000, n)
+    gdf["area_car_media"] = rng.lognormal(3.0, 0.8, n).round(2)
+    gdf["area_car_total"] = np.minimum(
+        gdf["num_imoveis"] * gdf["area_car_media"], gdf["area_georef"]
+    )
+    gdf["perimetro_medio_car"] = (4 * np.sqrt(gdf["area_car_media"] * 10_000) / 1000).round(3)
+    gdf["perimetro_total_car"] = gdf["num_imoveis"] * gdf["perimetro_medio_car"]
+    gdf["area_max_perim"] = (gdf["perimetro_medio_car"] * 1000 / 4) ** 2 / 10_000
+
+    base = (
+        gdf["nota_veg"] + gdf["nota_area"] + gdf["nota_relevo"]
+        + gdf["nota_acesso"] + gdf["nota_insalub_2"]
+    )
+    for q in range(1, 5):
+        gdf[f"nota_total_q{q}"] = base + gdf[f"nota_p_q{q}"]
+    colunas_totais = [f"nota_total_q{q}" for q in range(1, 5)]
+    gdf["nota_media"] = gdf[colunas_totais].mean(axis=1)
+
+    gdf["valor_mun_area"] = valor_por_nota(gdf["nota_media"], gdf["area_georef"])
+    gdf["valor_mun_perim"] = gdf["perimetro_total_car"] * rng.uniform(80, 400, n).round(2)
+
+    if crs is not None and crs != gdf.crs:
+        gdf = gdf.to_crs(crs)
+    return gdf
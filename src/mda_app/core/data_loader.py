@@ -1,26 +1,151 @@
 """Carregamento e processamento de dados geoespaciais."""
 
-import geopandas as gpd
-import numpy as np
 import streamlit as st
+from mda_app.config.settings import PATHS
+from mda_app.core.acervo_safras import AcervoSafras
+from mda_app.core.auditoria_geometrica import auditar
+from mda_app.core.base_colunar import com_geometrias, eh_base_colunar, so_atributos
+from mda_app.core.camadas_regionais import camadas_regionais
+from mda_app.core.comparacao_versoes import comparar_versoes
+from mda_app.core.fontes_dados import obter_fonte
+from mda_app.core.preparacao import processar_dados_geograficos
+from mda_app.core.vizinhanca import adjacencia
+from mda_app.utils.instrumentacao import cache_com_estatisticas
 
+# Recortes filtrados na fonte mantidos em cache (cada combinação de filtros é
+# uma entrada; as mais antigas são descartadas)
+MAXIMO_RECORTES_CACHE = 32
+# Bases preparadas mantidas em cache: a atual e a anterior a uma atualização
+VERSOES_PREPARADAS = 2
 
-@st.cache_data
-def carregar_dados():
-    """Carregar e processar dados geoespaciais."""
-    asd = gpd.read_file("data/raw/precificacao_al_ii.geojson")
-    # Criar indicadores adicionais
-    asd["valor_medio"] = (asd["valor_mun_perim"] + asd["valor_mun_area"]) / 2
+
+def versao_dataset(caminho):
+    """Identificador da versão da base em `caminho` (ver `FonteDados.versao`)."""
+    return obter_fonte(caminho).versao()
+
+
+@cache_com_estatisticas(st.cache_data)
+def carregar_dados(caminho=None, ufs=None, bbox=None, municipios=None, coluna_municipio="NM_MUN",
+                   faixas=None, geometria=True, versao=None):
+    """Carregar e processar dados geoespaciais.
+
+    `caminho` é o endereço da base: arquivo vetorial (GeoJSON, GeoPackage...),
+    diretório de base colunar ou banco SQL (`postgresql://...`,
+    `sqlite:///...`); ver `mda_app.core.fontes_dados`. Indicadores derivados
+    (`valor_medio`, ...) não são criados aqui: ver
+    `mda_app.core.colunas_derivadas`.
+
+    Args:
+        caminho: Base a carregar (padrão: PATHS["dataset"])
+        ufs: Tupla de UFs para carregar só parte da base
+        bbox: (minx, miny, maxx, maxy) no CRS da base
+        municipios: Tupla de nomes de municípios (em `coluna_municipio`)
+        coluna_municipio: Coluna com o nome do município
+        faixas: Tupla de pares `(coluna, (mínimo, máximo))`
+        geometria: Se False, só os atributos; numa base colunar as
+            geometrias são montadas depois, do memory-map (ver
+            `mda_app.core.base_colunar.com_geometrias`)
+        versao: Versão da base (ver `versao_dataset`). Faz parte da chave do
+            cache, então uma versão nova invalida o recorte; os recortes
+            filtrados recebem a da base e não consultam a fonte de novo.
+            Sem ela, é lida da fonte
+    """
+    caminho = caminho or PATHS["dataset"]
+    fonte = obter_fonte(caminho)
+    asd = fonte.carregar(ufs=ufs, municipios=municipios, coluna_municipio=coluna_municipio,
+                         faixas=faixas, bbox=bbox, geometria=geometria)
+    # Versão usada para memorizar colunas derivadas e caches que dependem da base
+    asd.attrs["versao"] = versao or fonte.versao()
+    if any(filtro is not None for filtro in (ufs, bbox, municipios, faixas)):
+        asd.attrs["versao"] += f"|ufs={ufs}|bbox={bbox}|municipios={municipios}|faixas={faixas}"
+    if fonte.filtra_na_origem:
+        # Sinaliza ao app que os filtros da sidebar podem ir para a fonte
+        asd.attrs["fonte_filtravel"] = caminho
     return asd
 
 
-def processar_dados_geograficos(gdf):
-    """Processar dados geográficos."""
-    gdf = gdf.to_crs(epsg=4326)
-    gdf['nota_insalub_2'] = gdf['nota_insalub_2'].apply(lambda x: 1 if x < 1 else x)
-    gdf['valor_medio_car'] = np.where(
-        gdf['area_car_total'] != 0,
-        ((gdf['area_car_total'] / gdf['area_georef']) * gdf['valor_mun_area'])/gdf['num_imoveis'],
-        0
+def carregar_dados_preparados(caminho=None):
+    """Carregar a base já processada, com índice espacial construído.
+
+    Fica em `st.cache_resource`: um único GeoDataFrame por processo e versão
+    da base, compartilhado entre sessões sem cópia. Quem o recebe não deve
+    alterá-lo (os filtros do app sempre produzem cópias).
+
+    Uma base colunar fica só com os atributos: tabelas, cards e filtros não
+    precisam de geometrias, e mapa, vizinhanças e exportação as montam do
+    memory-map quando são usados.
+    """
+    return _carregar_preparados(caminho, versao_dataset(caminho or PATHS["dataset"]))
+
+
+@cache_com_estatisticas(st.cache_resource(max_entries=VERSOES_PREPARADAS))
+def _carregar_preparados(caminho, versao):
+    geometria = not eh_base_colunar(caminho or PATHS["dataset"])
+    if geometria:
+        gdf = carregar_dados(caminho, versao=versao)
+    else:
+        gdf = carregar_dados(caminho, geometria=False, versao=versao)
+    gdf = processar_dados_geograficos(gdf)
+    if so_atributos(gdf):
+        return gdf
+    # Construção do STRtree sob demanda; aqui ela é paga uma vez por processo
+    gdf.sindex
+    # Grafo de vizinhança (CSR) sobre o mesmo STRtree, memorizado pela versão
+    adjacencia(gdf)
+    # Camadas dissolvidas por UF e região para as vistas de muitas UFs
+    camadas_regionais(gdf)
+    return gdf
+
+
+@cache_com_estatisticas(st.cache_data)
+def carregar_comparacao(caminho_anterior=None, caminho=None):
+    """Comparar a versão anterior da base com a atual (uma vez por par de arquivos)."""
+    anterior = carregar_dados(caminho_anterior or PATHS["dataset_anterior"])
+    atual = carregar_dados(caminho)
+    return comparar_versoes(anterior, atual)
+
+
+@cache_com_estatisticas(st.cache_data)
+def carregar_auditoria(caminho=None):
+    """Auditoria das áreas e perímetros em EPSG:5880 (uma vez por base)."""
+    return auditar(com_geometrias(carregar_dados_preparados(caminho)))
+
+
+@cache_com_estatisticas(st.cache_data)
+def carregar_safra(safra=None, ufs=None, colunas=None, raiz=None):
+    """Carregar uma safra do acervo, lendo só as partições das UFs pedidas.
+
+    Args:
+        safra: Nome da safra (padrão: a mais recente)
+        ufs: Tupla de UFs (padrão: todas)
+        colunas: Tupla de colunas de atributos (padrão: todas)
+        raiz: Diretório do acervo (padrão: PATHS["acervo"])
+    """
+    return AcervoSafras(raiz or PATHS["acervo"]).abrir(
+        safra,
+        ufs=list(ufs) if ufs is not None else None,
+        colunas=list(colunas) if colunas is not None else None,
+    )
+
+
+@cache_com_estatisticas(st.cache_data)
+def carregar_historico(coluna, safras=None, ufs=None, raiz=None):
+    """Valores de `coluna` em cada safra do acervo (uma coluna por safra)."""
+    return AcervoSafras(raiz or PATHS["acervo"]).comparar_coluna(
+        coluna,
+        safras=list(safras) if safras is not None else None,
+        ufs=list(ufs) if ufs is not None else None,
+    )
+
+
+@cache_com_estatisticas(st.cache_data(max_entries=MAXIMO_RECORTES_CACHE))
+def carregar_dados_filtrados(caminho, ufs, municipios, coluna_municipio, faixas,
+                             versao):
+    """Recorte já processado, com os filtros resolvidos na fonte (bancos SQL).
+
+    `versao` é a da base completa (`attrs["versao"]` da base preparada).
+    """
+    return processar_dados_geograficos(
+        carregar_dados(caminho, ufs=ufs, municipios=municipios,
+                       coluna_municipio=coluna_municipio, faixas=faixas, versao=versao)
     )
-    return gdf
\ No newline at end of file
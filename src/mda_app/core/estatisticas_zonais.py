@@ -0,0 +1,247 @@
+"""Notas de relevo e vegetação por estatística zonal de rasters locais.
+
+Recalcula `nota_relevo` (declividade do SRTM nas classes de Lepsch) e
+`nota_veg` (cobertura do MapBiomas agrupada em aberta, intermediária e
+fechada) a partir de GeoTIFFs locais, sem carregar o raster inteiro:
+
+- cada município lê só a janela do seu retângulo envolvente, alargada até os
+  limites dos blocos internos do arquivo (leituras alinhadas aos blocos não
+  descomprimem o mesmo bloco duas vezes);
+- janelas grandes (municípios extensos em rasters de 10 m) são lidas em
+  pedaços de até `PIXELS_POR_LEITURA` pixels, acumulando a contagem de pixels
+  por classe;
+- os municípios são divididos entre os processos de um pool; cada processo
+  abre o raster por conta própria e devolve só as contagens.
+
+Das contagens saem a classe predominante e a classe média de cada município, e
+delas a nota: cada classe tem um intervalo de notas (`INTERVALOS_*`) e a classe
+média posiciona a nota dentro do intervalo da predominante. As notas entram na
+base por `substituir_notas`, que recalcula os totais, a média e o valor.
+
+A declividade deve vir pronta, em porcentagem (ex.: `gdaldem slope -p` sobre o
+SRTM). Requer `rasterio` (dependência opcional: `pip install .[raster]`).
+
+Uso:
+
+    python -m mda_app.core.estatisticas_zonais base.geojson saida.parquet --relevo declividade.tif --vegetacao mapbiomas.tif
+"""
+
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mda_app.config.settings import PATHS
+from mda_app.core.fontes_dados import gravar_base, obter_fonte
+from mda_app.core.precificacao import substituir_notas
+from mda_app.utils.importacao import modulo_tardio
+
+rasterio = modulo_tardio("rasterio")
+rasterio_features = modulo_tardio("rasterio.features")
+rasterio_windows = modulo_tardio("rasterio.windows")
+shapely = modulo_tardio("shapely")
+
+# Classes de relevo de Lepsch (1983) pela declividade (%): limites superiores
+LIMITES_LEPSCH = np.array([3, 8, 20, 45, 75], dtype=float)
+CLASSES_RELEVO = ["Plano", "Suave ondulado", "Ondulado", "Forte ondulado", "Montanhoso", "Escarpado"]
+
+# Códigos do MapBiomas (coleção 8) em 1 aberta, 2 intermediária, 3 fechada;
+# os ausentes (água, área urbana, sem dado) não entram na contagem
+VEGETACAO_MAPBIOMAS = {
+    3: 3, 5: 3, 6: 3, 9: 3, 49: 3,
+    4: 2, 21: 2,
+    11: 1, 12: 1, 13: 1, 15: 1, 18: 1, 19: 1, 20: 1, 29: 1, 32: 1, 35: 1, 36: 1,
+    39: 1, 40: 1, 41: 1, 46: 1, 47: 1, 48: 1, 50: 1, 62: 1,
+}
+CLASSES_VEGETACAO = ["Aberta", "Intermediária", "Fechada"]
+
+# Intervalo de notas (mínima, máxima) de cada classe predominante
+INTERVALOS_RELEVO = [(1, 2), (2, 3), (3, 5), (5, 7), (7, 9), (9, 10)]
+INTERVALOS_VEGETACAO = [(1, 3), (4, 7), (8, 10)]
+
+PIXELS_POR_LEITURA = 16 * 1024 * 1024
+# Municípios mínimos por processo: abaixo disso, iniciar processos custa mais do que ler
+MUNICIPIOS_POR_PROCESSO = 200
+
+
+def classificar_declividade(declividade):
+    """Classe de Lepsch (1 a 6) de cada pixel; 0 para pixels sem dado."""
+    declividade = np.asarray(declividade, dtype=float)
+    classes = np.searchsorted(LIMITES_LEPSCH, declividade, side="left") + 1
+    return np.where(np.isfinite(declividade) & (declividade >= 0), classes, 0)
+
+
+def classificar_vegetacao(codigos):
+    """Classe de vegetação (1 a 3) de cada pixel do MapBiomas; 0 para os demais."""
+    tabela = np.zeros(256, dtype=np.int64)
+    for codigo, classe in VEGETACAO_MAPBIOMAS.items():
+        tabela[codigo] = classe
+    codigos = np.asarray(codigos)
+    validos = (codigos >= 0) & (codigos < len(tabela))
+    return np.where(validos, tabela[np.clip(codigos, 0, len(tabela) - 1).astype(np.int64)], 0)
+
+
+CLASSIFICADORES = {
+    "relevo": (classificar_declividade, len(CLASSES_RELEVO), INTERVALOS_RELEVO, "nota_relevo"),
+    "vegetacao": (classificar_vegetacao, len(CLASSES_VEGETACAO), INTERVALOS_VEGETACAO, "nota_veg"),
+}
+
+
+def janela_alinhada(coluna, linha, largura, altura, bloco, limites):
+    """Alargar a janela `(coluna, linha, largura, altura)` até os limites dos blocos.
+
+    Args:
+        bloco: `(altura, largura)` do bloco interno do raster
+        limites: `(altura, largura)` do raster
+
+    Returns:
+        Janela `(coluna, linha, largura, altura)` alinhada e recortada ao raster.
+    """
+    bloco_altura, bloco_largura = bloco
+    coluna0 = max(0, (coluna // bloco_largura) * bloco_largura)
+    linha0 = max(0, (linha // bloco_altura) * bloco_altura)
+    coluna1 = min(limites[1], -(-(coluna + largura) // bloco_largura) * bloco_largura)
+    linha1 = min(limites[0], -(-(linha + altura) // bloco_altura) * bloco_altura)
+    return coluna0, linha0, max(0, coluna1 - coluna0), max(0, linha1 - linha0)
+
+
+def dividir_janela(janela, bloco, pixels_por_leitura=PIXELS_POR_LEITURA):
+    """Dividir uma janela alinhada em faixas de linhas (múltiplas do bloco) que cabem na leitura."""
+    coluna, linha, largura, altura = janela
+    linhas_por_faixa = max(bloco[0], (pixels_por_leitura // max(largura, 1)) // bloco[0] * bloco[0])
+    for inicio in range(linha, linha + altura, linhas_por_faixa):
+        yield coluna, inicio, largura, min(linhas_por_faixa, linha + altura - inicio)
+
+
+def contar_classes(caminho, geometrias, tipo, pixels_por_leitura=PIXELS_POR_LEITURA):
+    """Pixels de cada classe dentro de cada geometria (já no CRS do raster).
+
+    Returns:
+        Array (geometrias x classes) com as contagens; a coluna `c` é a classe `c + 1`.
+    """
+    classificar, classes, _, _ = CLASSIFICADORES[tipo]
+    contagens = np.zeros((len(geometrias), classes), dtype=np.int64)
+    with rasterio.open(caminho) as raster:
+        bloco = raster.block_shapes[0]
+        limites = (raster.height, raster.width)
+        for posicao, geometria in enumerate(geometrias):
+            if geometria is None or shapely.is_empty(geometria):
+                continue
+            envelope = rasterio_windows.from_bounds(*shapely.bounds(geometria), transform=raster.transform)
+            janela = janela_alinhada(
+                int(np.floor(envelope.col_off)), int(np.floor(envelope.row_off)),
+                int(np.ceil(envelope.width)) + 1, int(np.ceil(envelope.height)) + 1, bloco, limites,
+            )
+            for coluna, linha, largura, altura in dividir_janela(janela, bloco, pixels_por_leitura):
+                if not largura or not altura:
+                    continue
+                recorte = rasterio_windows.Window(coluna, linha, largura, altura)
+                valores = raster.read(1, window=recorte, masked=True)
+                dentro = rasterio_features.geometry_mask(
+                    [geometria], out_shape=valores.shape,
+                    transform=raster.window_transform(recorte), invert=True,
+                ) & ~np.ma.getmaskarray(valores)
+                classes_pixels = classificar(valores.data[dentro])
+                contagens[posicao] += np.bincount(classes_pixels, minlength=classes + 1)[1:]
+    return contagens
+
+
+def _contar_wkb(caminho, geometrias_wkb, tipo, pixels_por_leitura):
+    return contar_classes(caminho, shapely.from_wkb(geometrias_wkb), tipo, pixels_por_leitura)
+
+
+def contar_classes_em_pool(caminho, geometrias, tipo, processos=None, pixels_por_leitura=PIXELS_POR_LEITURA):
+    """`contar_classes` com os municípios divididos entre os processos de um pool."""
+    processos = min(processos or os.cpu_count() or 1, -(-len(geometrias) // MUNICIPIOS_POR_PROCESSO))
+    if processos <= 1:
+        return contar_classes(caminho, geometrias, tipo, pixels_por_leitura)
+    # Municípios vizinhos no mesmo processo leem blocos próximos do arquivo
+    partes = np.array_split(np.arange(len(geometrias)), processos * 4)
+    wkb = shapely.to_wkb(np.asarray(geometrias, dtype=object))
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as pool:
+        futuros = [pool.submit(_contar_wkb, caminho, wkb[parte], tipo, pixels_por_leitura) for parte in partes]
+        return np.concatenate([futuro.result() for futuro in futuros])
+
+
+def resumir_classes(contagens):
+    """Classe predominante (1..k) e classe média de cada linha; 0 e NaN sem pixels."""
+    contagens = np.asarray(contagens, dtype=float)
+    totais = contagens.sum(axis=1)
+    predominante = np.where(totais > 0, contagens.argmax(axis=1) + 1, 0)
+    classes = np.arange(1, contagens.shape[1] + 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = contagens @ classes / totais
+    return predominante, media
+
+
+def notas_por_classes(predominante, media, intervalos):
+    """Nota de cada município pelo intervalo da classe predominante.
+
+    Dentro do intervalo, a posição segue a classe média entre as classes
+    vizinhas da predominante: média puxada para classes mais altas, nota mais
+    alta. Municípios sem pixels recebem NaN.
+    """
+    predominante = np.asarray(predominante)
+    media = np.asarray(media, dtype=float)
+    k = len(intervalos)
+    minimas = np.array([intervalo[0] for intervalo in intervalos], dtype=float)
+    maximas = np.array([intervalo[1] for intervalo in intervalos], dtype=float)
+    indice = np.clip(predominante - 1, 0, k - 1)
+    inferior = np.maximum(1, predominante - 1)
+    superior = np.minimum(k, predominante + 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        posicao = np.clip((media - inferior) / (superior - inferior), 0, 1)
+    notas = np.rint(minimas[indice] + posicao * (maximas[indice] - minimas[indice]))
+    return np.where(predominante > 0, notas, np.nan)
+
+
+def recalcular_notas_rasters(gdf, rasters, processos=None, pixels_por_leitura=PIXELS_POR_LEITURA):
+    """Recalcular as notas de `gdf` a partir dos rasters `{tipo: caminho}`.
+
+    Args:
+        gdf: Base municipal
+        rasters: `{"relevo": declividade.tif, "vegetacao": mapbiomas.tif}` (um ou ambos)
+        processos: Processos do pool (padrão: número de CPUs)
+
+    Returns:
+        Tupla `(base atualizada, {tipo: contagens por classe})`. Municípios sem
+        pixels válidos mantêm a nota anterior.
+    """
+    notas, contagens = {}, {}
+    for tipo, caminho in rasters.items():
+        _, _, intervalos, coluna = CLASSIFICADORES[tipo]
+        with rasterio.open(caminho) as raster:
+            crs = raster.crs
+        geometrias = gdf.geometry.to_crs(crs).to_numpy()
+        contagens[tipo] = contar_classes_em_pool(caminho, geometrias, tipo, processos, pixels_por_leitura)
+        novas = notas_por_classes(*resumir_classes(contagens[tipo]), intervalos)
+        if coluna in gdf.columns:
+            novas = np.where(np.isnan(novas), gdf[coluna].to_numpy(dtype=float), novas)
+        notas[coluna] = novas
+    return substituir_notas(gdf, notas), contagens
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Recalcular nota_relevo e nota_veg a partir de rasters locais.")
+    parser.add_argument("origem", nargs="?", default=PATHS["dataset"], help="Base municipal")
+    parser.add_argument("saida", nargs="?", default=os.path.join(PATHS["data_processed"], "precificacao_rasters.parquet"),
+                        help="Base atualizada (.parquet, .gpkg, .geojson)")
+    parser.add_argument("--relevo", help="GeoTIFF de declividade (%%)")
+    parser.add_argument("--vegetacao", help="GeoTIFF de cobertura do MapBiomas")
+    parser.add_argument("--processos", type=int, help="Processos do pool (padrão: número de CPUs)")
+    args = parser.parse_args(argumentos)
+
+    rasters = {tipo: caminho for tipo, caminho in (("relevo", args.relevo), ("vegetacao", args.vegetacao)) if caminho}
+    if not rasters:
+        parser.error("Informe --relevo e/ou --vegetacao.")
+    atualizada, _ = recalcular_notas_rasters(obter_fonte(args.origem).carregar(), rasters, args.processos)
+    gravar_base(atualizada, args.saida)
+    print(f"{len(atualizada)} municípios gravados em {args.saida}")
+    return atualizada
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""Exportação da seleção filtrada (GeoPackage, GeoParquet e CSV).
+
+Cada formato é serializado em lotes de linhas por um gerador que devolve
+pedaços de bytes: o arquivo nunca é montado inteiro em memória. O GeoPackage é
+um banco SQLite e precisa existir em disco; ele é gravado lote a lote em um
+arquivo temporário (com índice espacial R-tree) e depois lido em blocos.
+
+`exportar` grava o resultado em um cache em disco, indexado pela versão da
+base, pelas linhas selecionadas, pelas colunas e pelo formato: pedir de novo o
+mesmo recorte só reabre o arquivo já gravado.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from mda_app.config.settings import PATHS
+from mda_app.core.base_colunar import com_geometrias, geometrias_de
+from mda_app.core.comparacao_versoes import hash_geometrias
+from mda_app.utils.formatters import csv_br
+from mda_app.utils.importacao import modulo_tardio
+
+pa = modulo_tardio("pyarrow")
+pq = modulo_tardio("pyarrow.parquet")
+pd = modulo_tardio("pandas")
+pyogrio = modulo_tardio("pyogrio")
+shapely = modulo_tardio("shapely")
+
+# formato: (extensão, tipo MIME, rótulo)
+FORMATOS_EXPORTACAO = {
+    "gpkg": (".gpkg", "application/geopackage+sqlite3", "GeoPackage"),
+    "parquet": (".parquet", "application/vnd.apache.parquet", "GeoParquet"),
+    "csv": (".csv", "text/csv", "CSV"),
+}
+
+LINHAS_POR_LOTE = 5_000
+TAMANHO_BLOCO = 1024 * 1024
+# Arquivos mantidos no cache de exportações (os mais antigos são removidos)
+MAXIMO_ARQUIVOS_CACHE = 16
+CAMADA_GPKG = "municipios"
+
+
+def _lotes(gdf, linhas_por_lote):
+    for inicio in range(0, len(gdf), linhas_por_lote):
+        yield gdf.iloc[inicio:inicio + linhas_por_lote]
+
+
+def gerar_csv(gdf, linhas_por_lote=LINHAS_POR_LOTE):
+    """CSV no padrão brasileiro (`;` e vírgula decimal), sem a geometria."""
+    atributos = gdf.drop(columns=gdf.geometry.name) if hasattr(gdf, "geometry") else gdf
+    if len(atributos) == 0:
+        yield csv_br(atributos).encode("utf-8-sig")
+        return
+    for numero, lote in enumerate(_lotes(atributos, linhas_por_lote)):
+        # BOM no primeiro lote para o Excel reconhecer o UTF-8
+        texto = csv_br(lote, cabecalho=numero == 0)
+        yield texto.encode("utf-8-sig" if numero == 0 else "utf-8")
+
+
+class _Vazao:
+    """Destino de escrita que acumula bytes até serem drenados pelo gerador."""
+
+    def __init__(self):
+        self._partes = []
+        self.posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self.posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self.posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drenar(self):
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def _metadados_geo(gdf):
+    """Metadados GeoParquet 1.0 da coluna de geometria."""
+    coluna = gdf.geometry.name
+    tipos = sorted(set(gdf.geometry.geom_type.dropna()))
+    return {
+        "version": "1.0.0",
+        "primary_column": coluna,
+        "columns": {
+            coluna: {
+                "encoding": "WKB",
+                "geometry_types": tipos,
+                "crs": gdf.crs.to_json_dict() if gdf.crs is not None else None,
+                "bbox": [float(v) for v in gdf.total_bounds] if len(gdf) else [],
+            }
+        },
+    }
+
+
+def _schema_arrow(gdf):
+    """Schema Arrow declarado a partir da seleção inteira, não do primeiro lote.
+
+    Colunas `object` recebem o tipo dos seus valores não nulos (texto se
+    todos forem nulos); as demais, o tipo do seu dtype. Assim um lote em que
+    a coluna é toda nula, ou só tem inteiros, grava no mesmo tipo dos outros.
+    """
+    coluna = gdf.geometry.name
+    atributos = pd.DataFrame(gdf.drop(columns=coluna))
+    vazio = pa.Schema.from_pandas(atributos.iloc[:0], preserve_index=False)
+    campos = []
+    for campo in vazio:
+        serie = atributos[campo.name]
+        if serie.dtype == object:
+            valores = serie.dropna()
+            campo = campo.with_type(pa.array(valores).type if len(valores) else pa.string())
+        campos.append(campo)
+    campos.append(pa.field(coluna, pa.binary()))
+    return pa.schema(campos, metadata=vazio.metadata)
+
+
+def _tabela_arrow(lote, schema=None):
+    coluna = lote.geometry.name
+    df = pd.DataFrame(lote.drop(columns=coluna))
+    df[coluna] = shapely.to_wkb(lote.geometry.to_numpy())
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def gerar_geoparquet(gdf, linhas_por_lote=LINHAS_POR_LOTE):
+    """GeoParquet (geometria em WKB), um grupo de linhas por lote."""
+    destino = _Vazao()
+    schema = _schema_arrow(gdf)
+    schema = schema.with_metadata({
+        **(schema.metadata or {}),
+        b"geo": json.dumps(_metadados_geo(gdf)).encode("utf-8"),
+    })
+    with pq.ParquetWriter(destino, schema) as escritor:
+        for lote in _lotes(gdf, linhas_por_lote):
+            escritor.write_table(_tabela_arrow(lote, schema))
+            yield destino.drenar()
+    yield destino.drenar()
+
+
+def gerar_gpkg(gdf, linhas_por_lote=LINHAS_POR_LOTE, camada=CAMADA_GPKG):
+    """GeoPackage com índice espacial, gravado em disco lote a lote."""
+    descritor, temporario = tempfile.mkstemp(suffix=".gpkg")
+    os.close(descritor)
+    os.remove(temporario)
+    try:
+        lotes = _lotes(gdf, linhas_por_lote) if len(gdf) else [gdf]
+        for numero, lote in enumerate(lotes):
+            pyogrio.write_dataframe(
+                lote, temporario, layer=camada, driver="GPKG", append=numero > 0,
+                layer_options={"SPATIAL_INDEX": "YES"},
+            )
+        with open(temporario, "rb") as arquivo:
+            while bloco := arquivo.read(TAMANHO_BLOCO):
+                yield bloco
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+GERADORES = {"gpkg": gerar_gpkg, "parquet": gerar_geoparquet, "csv": gerar_csv}
+
+
+def chave_exportacao(gdf, formato):
+    """Identificador do recorte exportado: versão, linhas, colunas e formato."""
+    resumo = hashlib.blake2b(digest_size=16)
+    resumo.update(formato.encode())
+    resumo.update("\0".join(map(str, gdf.columns)).encode())
+    versao = gdf.attrs.get("versao")
+    if versao is not None:
+        resumo.update(str(versao).encode())
+        resumo.update(pd.util.hash_pandas_object(gdf.index.to_series(), index=False).to_numpy().tobytes())
+    else:
+        # Sem versão conhecida, o conteúdo identifica o recorte
+        geometrias = geometrias_de(gdf)
+        atributos = pd.DataFrame(gdf.drop(columns=geometrias.name, errors="ignore"))
+        resumo.update(pd.util.hash_pandas_object(atributos, index=True).to_numpy().tobytes())
+        resumo.update(np.asarray(hash_geometrias(geometrias.to_numpy())).tobytes())
+    return resumo.hexdigest()
+
+
+def _limpar_cache(diretorio, manter):
+    arquivos = [
+        os.path.join(diretorio, nome) for nome in os.listdir(diretorio)
+        if nome.startswith("selecao-")
+    ]
+    arquivos.sort(key=os.path.getmtime, reverse=True)
+    for caminho in arquivos[manter:]:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+
+def caminho_exportacao(gdf, formato, diretorio=None):
+    """Caminho do arquivo de `gdf` no cache de exportações (existindo ou não)."""
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Formato de exportação não suportado: {formato!r}")
+    diretorio = diretorio or PATHS["exportacoes"]
+    extensao = FORMATOS_EXPORTACAO[formato][0]
+    return os.path.join(diretorio, f"selecao-{chave_exportacao(gdf, formato)}{extensao}")
+
+
+def exportar(gdf, formato, diretorio=None, linhas_por_lote=LINHAS_POR_LOTE):
+    """Exportar `gdf` para o cache de exportações e devolver o caminho do arquivo.
+
+    O arquivo é gravado pelos geradores acima, um pedaço de cada vez. Se o
+    mesmo recorte já foi exportado no formato pedido, o arquivo existente é
+    reaproveitado.
+    """
+    caminho = caminho_exportacao(gdf, formato, diretorio)
+    diretorio = os.path.dirname(caminho)
+    os.makedirs(diretorio, exist_ok=True)
+    if os.path.exists(caminho):
+        os.utime(caminho)
+        return caminho
+
+    # Seleção de uma base colunar: geometrias montadas só agora, para as linhas exportadas
+    gdf = com_geometrias(gdf)
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporario, "wb") as arquivo:
+            for pedaco in GERADORES[formato](gdf, linhas_por_lote):
+                arquivo.write(pedaco)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    _limpar_cache(diretorio, MAXIMO_ARQUIVOS_CACHE)
+    return caminho
+
+
+def nome_arquivo(formato, ufs=()):
+    """Nome sugerido para o download (ex.: `municipios_AL_SE.gpkg`)."""
+    sufixo = "_".join(sorted(ufs)) if 0 < len(ufs) <= 5 else "selecao"
+    return f"municipios_{sufixo}{FORMATOS_EXPORTACAO[formato][0]}"
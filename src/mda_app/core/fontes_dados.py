@@ -0,0 +1,423 @@
+"""Fontes de dados plugáveis por trás de `carregar_dados`.
+
+Uma fonte é escolhida pelo endereço da base (`PATHS["dataset"]`):
+
+- `postgresql://...`: tabela PostGIS, lida com psycopg;
+- `sqlite:///caminho.db`: a mesma tabela em SQLite, com a geometria em WKB
+  (substituto local do PostGIS para testes e uso offline; ver
+  `gravar_tabela_sqlite`);
+- qualquer outro caminho: arquivo vetorial, GeoPackage ou base colunar.
+
+Todas devolvem GeoDataFrames com o mesmo esquema. As fontes SQL filtram na
+origem: UF, municípios e faixas de critério viram parâmetros da consulta, a
+geometria vem do banco em WKB e só as linhas selecionadas são transferidas.
+O índice do GeoDataFrame é a chave da tabela, estável entre consultas, de modo
+que um recorte filtrado no banco continua alinhado à base completa.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import partial
+
+import numpy as np
+
+from mda_app.core.base_colunar import abrir_base_colunar, eh_base_colunar
+from mda_app.core.leitor_gpkg import contar_gpkg, ler_gpkg
+from mda_app.utils.importacao import modulo_tardio
+from mda_app.utils.pool_conexoes import PoolConexoes
+
+gpd = modulo_tardio("geopandas")
+pd = modulo_tardio("pandas")
+pyogrio = modulo_tardio("pyogrio")
+shapely = modulo_tardio("shapely")
+
+TABELA_PADRAO = "municipios"
+TABELA_METADADOS = "fonte_metadados"
+# Segundos em que a versão de uma fonte SQL é reaproveitada sem consultar o banco
+VALIDADE_VERSAO = 30
+
+_fontes = {}
+_trava_fontes = threading.Lock()
+
+
+class FonteDados(ABC):
+    """Interface comum das fontes de dados."""
+
+    # Se True, o app delega os filtros da sidebar à fonte em vez de filtrar em pandas
+    filtra_na_origem = False
+
+    @abstractmethod
+    def carregar(self, ufs=None, municipios=None, coluna_municipio="NM_MUN", faixas=None, bbox=None,
+                 geometria=True):
+        """Carregar os municípios que atendem aos filtros.
+
+        Args:
+            ufs: UFs desejadas
+            municipios: Nomes de municípios desejados (em `coluna_municipio`)
+            coluna_municipio: Coluna com o nome do município
+            faixas: Pares `(coluna, (mínimo, máximo))`, filtros inclusivos
+            bbox: (minx, miny, maxx, maxy) no CRS da base
+            geometria: Se False, devolve só os atributos (DataFrame), sem
+                ler a coluna de geometria; numa base colunar o quadro pode
+                ganhar as geometrias depois (ver
+                `base_colunar.quadro_atributos`)
+
+        Returns:
+            GeoDataFrame com os municípios selecionados.
+        """
+
+    @abstractmethod
+    def versao(self):
+        """Identificador da versão dos dados (muda quando os dados mudam)."""
+
+    @abstractmethod
+    def contar_por_uf(self):
+        """Número de municípios de cada UF, sem carregar as geometrias."""
+
+
+def _filtrar_em_pandas(gdf, ufs, municipios, coluna_municipio, faixas):
+    mascara = pd.Series(True, index=gdf.index)
+    if ufs is not None:
+        mascara &= gdf["SIGLA_UF"].isin(list(ufs))
+    if municipios is not None:
+        mascara &= gdf[coluna_municipio].isin(list(municipios))
+    for coluna, (minimo, maximo) in faixas or ():
+        mascara &= gdf[coluna].between(minimo, maximo)
+    return gdf if mascara.all() else gdf[mascara]
+
+
+def _onde_ufs(ufs):
+    """Cláusula OGR SQL do filtro de UFs (None quando não há filtro)."""
+    if not ufs:
+        return None
+    return '"SIGLA_UF" IN ({})'.format(", ".join("'" + str(uf).replace("'", "''") + "'" for uf in ufs))
+
+
+class FonteArquivo(FonteDados):
+    """Arquivo vetorial (GeoJSON...), GeoPackage ou base colunar."""
+
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+
+    def carregar(self, ufs=None, municipios=None, coluna_municipio="NM_MUN", faixas=None, bbox=None,
+                 geometria=True):
+        if self.caminho.lower().endswith(".gpkg"):
+            # GeoPackage: filtros resolvidos no SQLite, com o índice R-tree
+            onde, parametros = None, ()
+            if municipios is not None:
+                municipios = list(municipios)
+                onde = f'"{coluna_municipio}" IN ({", ".join("?" * len(municipios))})' if municipios else "0"
+                parametros = municipios
+            return ler_gpkg(self.caminho, bbox=bbox, ufs=ufs, faixas=dict(faixas or ()),
+                            onde=onde, parametros=parametros, geometria=geometria)
+
+        if eh_base_colunar(self.caminho):
+            base = abrir_base_colunar(self.caminho)
+            indices = None
+            if ufs is not None:
+                # Só as linhas das UFs pedidas têm a geometria decodificada
+                indices = np.flatnonzero(np.isin(base.coluna("SIGLA_UF"), list(ufs)))
+            if not geometria and bbox is None:
+                # Geometrias montadas depois, do memory-map, só onde forem usadas
+                gdf = base.quadro_atributos(indices=indices)
+            else:
+                gdf = base.para_geodataframe(indices=indices)
+            if bbox is not None:
+                gdf = gdf[gdf.intersects(shapely.box(*bbox))]
+        elif not geometria and bbox is None:
+            # Só atributos, com as UFs filtradas pelo OGR durante a leitura
+            gdf = pyogrio.read_dataframe(self.caminho, where=_onde_ufs(ufs), read_geometry=False)
+        else:
+            gdf = gpd.read_file(self.caminho, bbox=bbox)
+        gdf = _filtrar_em_pandas(gdf, ufs, municipios, coluna_municipio, faixas)
+        if not geometria and isinstance(gdf, gpd.GeoDataFrame):
+            gdf = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+        return gdf
+
+    def versao(self):
+        if eh_base_colunar(self.caminho):
+            return abrir_base_colunar(self.caminho).versao
+        info = os.stat(self.caminho)
+        return f"{os.path.abspath(self.caminho)}:{info.st_size}:{info.st_mtime_ns}"
+
+    def contar_por_uf(self):
+        if self.caminho.lower().endswith(".gpkg"):
+            return contar_gpkg(self.caminho, "SIGLA_UF")
+        if eh_base_colunar(self.caminho):
+            ufs = pd.Series(abrir_base_colunar(self.caminho).coluna("SIGLA_UF"))
+        else:
+            ufs = gpd.read_file(self.caminho, columns=["SIGLA_UF"], ignore_geometry=True)["SIGLA_UF"]
+        return {uf: int(total) for uf, total in ufs.value_counts().sort_index().items()}
+
+
+class FonteSQL(FonteDados):
+    """Tabela de municípios em banco SQL (PostGIS ou substituto SQLite).
+
+    Args:
+        conectar: Função sem argumentos que abre uma conexão DB-API
+        dialeto: "postgis" ou "sqlite"
+        tabela: Tabela (ou view) com um município por linha
+        coluna_geometria: Coluna de geometria (no SQLite: WKB em BLOB)
+        coluna_id: Chave inteira da tabela, usada como índice
+        identificador: Texto que identifica o banco na versão dos dados
+        tamanho_pool: Conexões mantidas abertas
+        caminho_arquivo: Arquivo do banco (SQLite); a versão passa a usar
+            tamanho e data de modificação dele
+        validade_versao: Segundos em que `versao` é reaproveitada
+    """
+
+    filtra_na_origem = True
+
+    def __init__(self, conectar, dialeto="postgis", tabela=TABELA_PADRAO, coluna_geometria="geom",
+                 coluna_id="id", identificador="", tamanho_pool=4, caminho_arquivo=None,
+                 validade_versao=VALIDADE_VERSAO):
+        if dialeto not in ("postgis", "sqlite"):
+            raise ValueError(f"Dialeto SQL não suportado: {dialeto!r}")
+        self.dialeto = dialeto
+        self.tabela = tabela
+        self.coluna_geometria = coluna_geometria
+        self.coluna_id = coluna_id
+        self.identificador = identificador
+        self.caminho_arquivo = caminho_arquivo
+        self.pool = PoolConexoes(conectar, tamanho_pool)
+        self.validade_versao = validade_versao
+        self._colunas = None
+        self._crs = None
+        self._versao = None
+
+    def _marcador(self):
+        return "%s" if self.dialeto == "postgis" else "?"
+
+    def _aspas(self, identificador):
+        return '"' + identificador.replace('"', '""') + '"'
+
+    def _executar(self, sql, parametros=()):
+        with self.pool.conexao() as conexao:
+            cursor = conexao.cursor()
+            try:
+                cursor.execute(sql, parametros)
+                colunas = [descricao[0] for descricao in cursor.description]
+                return colunas, cursor.fetchall()
+            finally:
+                cursor.close()
+
+    @property
+    def colunas(self):
+        """Colunas de atributos da tabela (sem a geometria)."""
+        if self._colunas is None:
+            colunas, _ = self._executar(f"SELECT * FROM {self._aspas(self.tabela)} WHERE 1 = 0")
+            self._colunas = [c for c in colunas if c != self.coluna_geometria]
+        return self._colunas
+
+    @property
+    def crs(self):
+        if self._crs is None:
+            if self.dialeto == "postgis":
+                _, linhas = self._executar(
+                    f"SELECT ST_SRID({self._aspas(self.coluna_geometria)}) "
+                    f"FROM {self._aspas(self.tabela)} LIMIT 1"
+                )
+                self._crs = f"EPSG:{linhas[0][0]}" if linhas and linhas[0][0] else None
+            else:
+                _, linhas = self._executar(
+                    f"SELECT valor FROM {TABELA_METADADOS} WHERE chave = 'crs'"
+                )
+                self._crs = linhas[0][0] if linhas else None
+        return self._crs
+
+    def _condicao_lista(self, coluna, valores, parametros):
+        valores = list(valores)
+        if not valores:
+            return "1 = 0"
+        if self.dialeto == "postgis":
+            parametros.append(valores)
+            return f"{self._aspas(coluna)} = ANY(%s)"
+        parametros.extend(valores)
+        return f"{self._aspas(coluna)} IN ({', '.join('?' * len(valores))})"
+
+    def carregar(self, ufs=None, municipios=None, coluna_municipio="NM_MUN", faixas=None, bbox=None,
+                 geometria=True):
+        existentes = set(self.colunas)
+        faixas = list(faixas or ())
+        desconhecidas = [c for c in [coluna_municipio, *(c for c, _ in faixas)] if c not in existentes]
+        if desconhecidas:
+            raise KeyError(f"Colunas inexistentes na tabela {self.tabela!r}: {desconhecidas}")
+
+        coluna_geometria = self._aspas(self.coluna_geometria)
+        expressao_wkb = f"ST_AsBinary({coluna_geometria})" if self.dialeto == "postgis" else coluna_geometria
+        selecao = ", ".join(self._aspas(c) for c in self.colunas)
+        # Sem geometria pedida, ela só é lida para o refinamento do bbox
+        ler_geometria = geometria or bbox is not None
+        if ler_geometria:
+            selecao += f", {expressao_wkb} AS wkb_geometria"
+        sql = [f"SELECT {selecao} FROM {self._aspas(self.tabela)}"]
+
+        condicoes, parametros = [], []
+        marcador = self._marcador()
+        if ufs is not None:
+            condicoes.append(self._condicao_lista("SIGLA_UF", ufs, parametros))
+        if municipios is not None:
+            condicoes.append(self._condicao_lista(coluna_municipio, municipios, parametros))
+        for coluna, (minimo, maximo) in faixas:
+            condicoes.append(f"{self._aspas(coluna)} BETWEEN {marcador} AND {marcador}")
+            parametros.extend([float(minimo), float(maximo)])
+        if bbox is not None and self.dialeto == "postgis":
+            condicoes.append(
+                f"{coluna_geometria} && ST_MakeEnvelope(%s, %s, %s, %s, ST_SRID({coluna_geometria}))"
+            )
+            parametros.extend(bbox)
+        if condicoes:
+            sql.append("WHERE " + " AND ".join(condicoes))
+        sql.append(f"ORDER BY {self._aspas(self.coluna_id)}")
+
+        colunas, linhas = self._executar(" ".join(sql), parametros)
+        df = pd.DataFrame.from_records(linhas, columns=colunas)
+        if not ler_geometria:
+            return df.set_index(self.coluna_id, drop=True).rename_axis(None)
+        wkb = [bytes(valor) if valor is not None else None for valor in df.pop("wkb_geometria")]
+        gdf = gpd.GeoDataFrame(
+            df.set_index(self.coluna_id, drop=True).rename_axis(None),
+            geometry=shapely.from_wkb(wkb),
+            crs=self.crs,
+        )
+        if bbox is not None:
+            # O && do PostGIS compara envelopes; o refinamento é exato (e é o
+            # único filtro espacial no substituto SQLite)
+            gdf = gdf[gdf.intersects(shapely.box(*bbox))]
+        return gdf if geometria else pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+
+    def versao(self):
+        """Versão que muda com INSERT, DELETE e UPDATE, sem ler a tabela.
+
+        É consultada no máximo uma vez a cada `validade_versao` segundos (os
+        recortes filtrados reaproveitam a versão da base; ver
+        `mda_app.core.data_loader.carregar_dados`).
+        """
+        agora = time.monotonic()
+        memorizada = self._versao
+        if memorizada is not None and agora - memorizada[0] < self.validade_versao:
+            return memorizada[1]
+        versao = f"{self.identificador}:{self.tabela}:{self._ler_versao()}"
+        self._versao = (agora, versao)
+        return versao
+
+    def _ler_versao(self):
+        """Ficha da versão: arquivo, contadores do PostGIS ou hash (SQLite)."""
+        if self.caminho_arquivo is not None:
+            info = os.stat(self.caminho_arquivo)
+            return f"{info.st_size}:{info.st_mtime_ns}"
+        tabela = self._aspas(self.tabela)
+        coluna_id = self._aspas(self.coluna_id)
+        if self.dialeto == "postgis":
+            # Contadores mantidos pelo próprio PostgreSQL: nenhuma linha é lida
+            _, linhas = self._executar(
+                "SELECT n_tup_ins, n_tup_upd, n_tup_del FROM pg_stat_user_tables "
+                "WHERE relid = to_regclass(%s)",
+                (tabela,),
+            )
+            if not linhas:
+                # View: sem estatísticas próprias, contagem e maior chave
+                _, linhas = self._executar(
+                    f"SELECT COUNT(*), MAX({coluna_id}) FROM {tabela}"
+                )
+            return ":".join(map(str, linhas[0]))
+        # Substituto SQLite sem arquivo conhecido (testes): a tabela é pequena
+        _, linhas = self._executar(f"SELECT * FROM {tabela} ORDER BY {coluna_id}")
+        resumo = hashlib.blake2b(digest_size=16)
+        for linha in linhas:
+            resumo.update(repr(linha).encode())
+        return resumo.hexdigest()
+
+    def contar_por_uf(self):
+        _, linhas = self._executar(
+            f'SELECT "SIGLA_UF", COUNT(*) FROM {self._aspas(self.tabela)} GROUP BY "SIGLA_UF"'
+        )
+        return {uf: int(total) for uf, total in sorted(linhas)}
+
+
+def _conectar_sqlite(caminho):
+    # Uma conexão é usada por uma thread de cada vez (garantido pelo pool)
+    return sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, check_same_thread=False)
+
+
+def _conectar_postgres(endereco):
+    try:
+        import psycopg
+    except ImportError:
+        import psycopg2 as psycopg
+    conexao = psycopg.connect(endereco)
+    conexao.autocommit = True
+    return conexao
+
+
+def criar_fonte(endereco):
+    """Criar a fonte de dados adequada ao endereço da base."""
+    endereco = str(endereco)
+    if endereco.startswith(("postgresql://", "postgres://")):
+        return FonteSQL(partial(_conectar_postgres, endereco), dialeto="postgis", identificador=endereco)
+    if endereco.startswith("sqlite:///"):
+        caminho = os.path.abspath(endereco[len("sqlite:///"):])
+        return FonteSQL(partial(_conectar_sqlite, caminho), dialeto="sqlite",
+                        identificador=caminho, caminho_arquivo=caminho)
+    return FonteArquivo(endereco)
+
+
+def obter_fonte(endereco):
+    """Fonte compartilhada para `endereco` (uma por processo, com seu pool)."""
+    with _trava_fontes:
+        fonte = _fontes.get(str(endereco))
+        if fonte is None:
+            fonte = _fontes[str(endereco)] = criar_fonte(endereco)
+        return fonte
+
+
+def gravar_base(gdf, saida):
+    """Gravar uma base (GeoParquet para `.parquet`, senão pelo driver da extensão)."""
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    if str(saida).endswith(".parquet"):
+        gdf.to_parquet(saida)
+    else:
+        gdf.to_file(saida, engine="pyogrio")
+
+
+def gravar_tabela_sqlite(gdf, caminho, tabela=TABELA_PADRAO):
+    """Gravar a base como tabela SQLite com geometria em WKB.
+
+    Mesmo esquema esperado da tabela PostGIS: chave `id`, atributos e `geom`.
+    Índices em `SIGLA_UF` e `NM_MUN` atendem aos filtros empurrados pelo app.
+    """
+    atributos = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+    tipos = {
+        coluna: "INTEGER" if atributos[coluna].dtype.kind in "biu"
+        else "REAL" if atributos[coluna].dtype.kind == "f"
+        else "TEXT"
+        for coluna in atributos.columns
+    }
+    definicao = ", ".join(f'"{coluna}" {tipo}' for coluna, tipo in tipos.items())
+    wkb = shapely.to_wkb(gdf.geometry.to_numpy())
+
+    conexao = sqlite3.connect(caminho)
+    try:
+        with conexao:
+            conexao.execute(f'DROP TABLE IF EXISTS "{tabela}"')
+            conexao.execute(f'CREATE TABLE "{tabela}" (id INTEGER PRIMARY KEY, {definicao}, geom BLOB)')
+            marcadores = ", ".join("?" * (len(tipos) + 2))
+            linhas = (
+                (i, *[None if pd.isna(v) else (v.item() if hasattr(v, "item") else v) for v in valores], w)
+                for i, (valores, w) in enumerate(zip(atributos.itertuples(index=False), wkb))
+            )
+            conexao.executemany(f'INSERT INTO "{tabela}" VALUES ({marcadores})', linhas)
+            for coluna in ("SIGLA_UF", "NM_MUN"):
+                if coluna in tipos:
+                    conexao.execute(f'CREATE INDEX "idx_{tabela}_{coluna}" ON "{tabela}" ("{coluna}")')
+            conexao.execute(f"CREATE TABLE IF NOT EXISTS {TABELA_METADADOS} (chave TEXT PRIMARY KEY, valor TEXT)")
+            conexao.execute(
+                f"INSERT OR REPLACE INTO {TABELA_METADADOS} VALUES ('crs', ?)",
+                (gdf.crs.to_string() if gdf.crs is not None else None,),
+            )
+    finally:
+        conexao.close()
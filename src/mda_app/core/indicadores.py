@@ -0,0 +1,120 @@
+"""Indicadores agregados de uma seleção de municípios.
+
+São os números dos cartões do dashboard (área, tamanho médio dos imóveis,
+valor por hectare e valores trimestrais), calculados em um só lugar para que
+o app, a API e os instantâneos estáticos mostrem exatamente os mesmos valores.
+Os textos dos cards (`cartoes_selecao`, `cartoes_trimestrais`) também ficam
+aqui, com a formatação do dashboard.
+"""
+
+import numpy as np
+
+from mda_app.core.precificacao import COLUNAS_TRIMESTRES, calcular_totais_trimestrais
+from mda_app.utils.formatters import numero_br, reais
+
+# Notas do gráfico de composição média por UF
+COLUNAS_COMPOSICAO_UF = ["nota_veg", "nota_area", "nota_relevo", "nota_insalub_2", *COLUNAS_TRIMESTRES]
+
+
+def _linhas(tabela):
+    if isinstance(tabela, dict):
+        return len(next(iter(tabela.values()), ()))
+    return len(tabela)
+
+
+def resumir_selecao(gdf):
+    """Indicadores da seleção `gdf`.
+
+    `gdf` é um DataFrame ou um dicionário `{coluna: valores}`: um município
+    isolado (ex.: nos relatórios) é resumido como `{coluna: [valor]}`, sem o
+    custo de montar um DataFrame de uma linha. Valores nulos são ignorados,
+    como nas médias e somas do pandas.
+
+    Returns:
+        Dicionário com `municipios` e, quando as colunas existem:
+        `nota_media`, `percent_area_georef` e `area_car_media` (médias),
+        `area_georef`, `area_car_total`, `valor_mun_area` e `valor_mun_perim`
+        (somas), `valor_medio_ha`, `valor_min_ha` e `valor_max_ha` (média,
+        mínimo e máximo do valor por hectare dos municípios com área),
+        `notas_trimestrais` (média de `nota_total_q1..q4`) e
+        `valores_trimestrais` (R$, q1 a q4).
+    """
+    colunas = gdf.keys()
+    resumo = {"municipios": _linhas(gdf)}
+
+    def valores(coluna):
+        return np.asarray(gdf[coluna], dtype=float)
+
+    def media(serie):
+        contagem = np.count_nonzero(~np.isnan(serie))
+        return float(np.nansum(serie) / contagem) if contagem else float("nan")
+
+    for coluna in ("nota_media", "percent_area_georef", "area_car_media"):
+        if coluna in colunas:
+            resumo[coluna] = media(valores(coluna))
+    for coluna in ("area_georef", "area_car_total", "valor_mun_area", "valor_mun_perim"):
+        if coluna in colunas:
+            resumo[coluna] = float(np.nansum(valores(coluna)))
+
+    if "valor_mun_area" in colunas and "area_georef" in colunas:
+        area = valores("area_georef")
+        com_area = area > 0
+        if com_area.any():
+            valor_por_ha = valores("valor_mun_area")[com_area] / area[com_area]
+            resumo["valor_medio_ha"] = media(valor_por_ha)
+            resumo["valor_min_ha"] = float(np.nanmin(valor_por_ha))
+            resumo["valor_max_ha"] = float(np.nanmax(valor_por_ha))
+
+    if all(c in colunas for c in COLUNAS_TRIMESTRES):
+        resumo["notas_trimestrais"] = [media(valores(c)) for c in COLUNAS_TRIMESTRES]
+        if "area_georef" in colunas:
+            resumo["valores_trimestrais"] = calcular_totais_trimestrais(gdf)
+    return resumo
+
+
+def cartoes_selecao(resumo):
+    """Cards "Informações Adicionais" do dashboard, como pares (rótulo, texto).
+
+    Um município mostra os seus próprios atributos; vários mostram os
+    agregados de `resumir_selecao`.
+    """
+    cartoes = []
+    if resumo["municipios"] == 1:
+        if "area_georef" in resumo:
+            cartoes.append(("Área total do Município (ha)", numero_br(resumo["area_georef"])))
+        if "area_car_total" in resumo:
+            cartoes.append(("Área CAR Total (ha)", numero_br(resumo["area_car_total"])))
+        if "area_car_media" in resumo:
+            cartoes.append(("Tamanho Médio Imóvel CAR (ha)", numero_br(resumo["area_car_media"])))
+        if "valor_medio_ha" in resumo:
+            cartoes.append(("Valor Médio/ha", reais(resumo["valor_medio_ha"])))
+        return cartoes
+
+    if "area_georef" in resumo:
+        cartoes.append(("Área Total (ha)", numero_br(resumo["area_georef"], 0)))
+    if "area_car_media" in resumo:
+        cartoes.append(("Tamanho Médio Imóvel CAR (ha)", numero_br(resumo["area_car_media"])))
+    if "valor_medio_ha" in resumo:
+        cartoes.append(("Valor Médio/ha", reais(resumo["valor_medio_ha"])))
+        cartoes.append(("Valor Mínimo/ha", reais(resumo["valor_min_ha"])))
+        cartoes.append(("Valor Máximo/ha", reais(resumo["valor_max_ha"])))
+    return cartoes
+
+
+def cartoes_trimestrais(valores):
+    """Cards "Valores Totais Trimestrais por Nota" (R$ em milhões)."""
+    return [(f"{trimestre}º Trimestre", f"R$ {numero_br(valor / 1_000_000, 3)} Mi")
+            for trimestre, valor in enumerate(valores, start=1)]
+
+
+def calcular_media_notas_por_uf(gdf, colunas_presentes):
+    """Calcular a média das notas por UF, ordenada pela soma das médias."""
+    df_uf = (
+        gdf.groupby("SIGLA_UF")[colunas_presentes]
+        .mean()
+        .reset_index()
+    )
+
+    # Calcular total para ordenar por complexidade/custo
+    df_uf['total_notas'] = df_uf[colunas_presentes].sum(axis=1)
+    return df_uf.sort_values("total_notas", ascending=False)
@@ -0,0 +1,304 @@
+"""Notas de insalubridade a partir das notificações do DataSUS, com ingestão incremental.
+
+`nota_insalub` (dengue) e `nota_insalub_2` (dengue e acidentes com animais
+peçonhentos) saem das notificações do SINAN, arquivos com milhões de linhas.
+A ingestão lê cada arquivo em lotes de `LINHAS_POR_LOTE` linhas e soma os
+casos por município e mês (groupby vetorizado, acumulado lote a lote); só os
+totais vão para o disco. Layout:
+
+    <raiz>/catalogo.json
+    <raiz>/totais/agravo=<agravo>/<parte>.parquet
+
+Cada arquivo ingerido vira uma parte (municipio, mes, casos) registrada no
+catálogo com o tamanho e a data de modificação do arquivo. Ingerir de novo
+uma pasta com um mês a mais lê só o arquivo novo; um arquivo republicado
+(tamanho ou data diferentes) tem a sua parte substituída. As notas são
+calculadas dos totais, sem reler as notificações:
+
+- incidência por `POR_HABITANTES` habitantes (casos, se a base não tiver
+  `populacao`) no período pedido;
+- nota de 0 a `NOTA_MAXIMA` pelas mínimas e máximas gerais da base.
+
+Municípios são identificados pelos 6 primeiros dígitos do código do IBGE, como
+no DataSUS. Datas em `AAAA-MM-DD`, `AAAAMMDD` ou `DD/MM/AAAA`.
+
+Uso:
+
+    python -m mda_app.core.insalubridade ingerir data/datasus dengue DENGBR24.csv DENGBR25.parquet
+    python -m mda_app.core.insalubridade notas data/datasus base.geojson saida.parquet --inicio 202401 --fim 202512
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from mda_app.config.settings import PATHS
+from mda_app.core.fontes_dados import gravar_base, obter_fonte
+from mda_app.core.precificacao import substituir_notas
+from mda_app.utils.importacao import modulo_tardio
+
+pa = modulo_tardio("pyarrow")
+pd = modulo_tardio("pandas")
+pq = modulo_tardio("pyarrow.parquet")
+
+AGRAVOS = {
+    "dengue": "Dengue",
+    "peconhentos": "Acidentes com animais peçonhentos",
+}
+# nota: agravos somados na incidência
+NOTAS_AGRAVOS = {
+    "nota_insalub": ["dengue"],
+    "nota_insalub_2": ["dengue", "peconhentos"],
+}
+
+# Colunas do SINAN: município de residência e data da notificação
+COLUNA_MUNICIPIO = "ID_MN_RESI"
+COLUNA_DATA = "DT_NOTIFIC"
+LINHAS_POR_LOTE = 500_000
+POR_HABITANTES = 100_000
+NOTA_MAXIMA = 10.0
+ARQUIVO_CATALOGO = "catalogo.json"
+
+
+def codigos_municipio(valores):
+    """Código de 6 dígitos do IBGE (o do DataSUS) de cada valor; -1 quando inválido."""
+    codigos = pd.to_numeric(pd.Series(valores), errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    # Código completo (7 dígitos, com o verificador): descarta o último dígito
+    codigos = np.where(codigos >= 1_000_000, codigos // 10, codigos)
+    validos = np.isfinite(codigos) & (codigos >= 110_000) & (codigos < 1_000_000)
+    return np.where(validos, codigos, -1).astype(np.int64)
+
+
+def meses(valores):
+    """Mês `AAAAMM` de cada data; -1 quando inválida."""
+    serie = pd.Series(valores)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return (serie.dt.year * 100 + serie.dt.month).fillna(-1).to_numpy(dtype=np.int64)
+    texto = serie.astype("string").str.strip()
+    barras = texto.str.contains("/", regex=False).fillna(False)
+    # DD/MM/AAAA -> AAAAMM; AAAA-MM-DD e AAAAMMDD -> AAAAMM
+    mes = texto.str.replace("-", "", regex=False).str[:6]
+    if barras.any():
+        mes = mes.where(~barras, texto.str[6:10] + texto.str[3:5])
+    mes = pd.to_numeric(mes, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    validos = np.isfinite(mes) & (mes % 100 >= 1) & (mes % 100 <= 12) & (mes >= 190001)
+    return np.where(validos, mes, -1).astype(np.int64)
+
+
+def _separador(caminho, codificacao):
+    with open(caminho, encoding=codificacao) as arquivo:
+        cabecalho = arquivo.readline()
+    return ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+
+
+def _lotes(caminho, colunas, linhas_por_lote, tipos=None, codificacao="latin-1"):
+    if str(caminho).endswith(".parquet"):
+        arquivo = pq.ParquetFile(caminho)
+        for lote in arquivo.iter_batches(batch_size=linhas_por_lote, columns=colunas):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(
+            caminho, usecols=colunas, dtype=tipos, chunksize=linhas_por_lote,
+            sep=_separador(caminho, codificacao), encoding=codificacao,
+        )
+
+
+def contar_casos(caminho, coluna_municipio=COLUNA_MUNICIPIO, coluna_data=COLUNA_DATA,
+                 linhas_por_lote=LINHAS_POR_LOTE):
+    """Casos por município e mês de um arquivo de notificações, lido em lotes.
+
+    Returns:
+        Tupla `(DataFrame com municipio, mes e casos, linhas lidas, linhas descartadas)`.
+    """
+    totais = None
+    linhas = descartadas = 0
+    # Datas como texto (AAAAMMDD não vira número); o código é lido como número pelo leitor
+    for lote in _lotes(caminho, [coluna_municipio, coluna_data], linhas_por_lote, {coluna_data: str}):
+        codigos = codigos_municipio(lote[coluna_municipio])
+        mes = meses(lote[coluna_data])
+        validas = (codigos >= 0) & (mes >= 0)
+        linhas += len(lote)
+        descartadas += int((~validas).sum())
+        parcial = pd.Series(codigos[validas]).groupby([codigos[validas], mes[validas]]).size()
+        totais = parcial if totais is None else totais.add(parcial, fill_value=0)
+    if totais is None or totais.empty:
+        casos = pd.DataFrame({"municipio": [], "mes": [], "casos": []}, dtype=np.int64)
+    else:
+        totais.index.names = ["municipio", "mes"]
+        casos = totais.astype(np.int64).rename("casos").reset_index()
+    return casos, linhas, descartadas
+
+
+class AcumuladoInsalubridade:
+    """Totais de casos por agravo, município e mês, ingeridos arquivo a arquivo.
+
+    Args:
+        raiz: Diretório dos totais (criado na primeira ingestão)
+    """
+
+    def __init__(self, raiz):
+        self.raiz = str(raiz)
+
+    def _caminho_catalogo(self):
+        return os.path.join(self.raiz, ARQUIVO_CATALOGO)
+
+    def catalogo(self):
+        """Arquivos ingeridos, na ordem de ingestão."""
+        caminho = self._caminho_catalogo()
+        if not os.path.exists(caminho):
+            return {"arquivos": []}
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+
+    def _gravar_catalogo(self, catalogo):
+        os.makedirs(self.raiz, exist_ok=True)
+        temporario = self._caminho_catalogo() + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(catalogo, arquivo, indent=2, ensure_ascii=False)
+        os.replace(temporario, self._caminho_catalogo())
+
+    def _diretorio(self, agravo):
+        return os.path.join(self.raiz, "totais", f"agravo={agravo}")
+
+    def ingerir(self, caminho, agravo, coluna_municipio=COLUNA_MUNICIPIO, coluna_data=COLUNA_DATA,
+                linhas_por_lote=LINHAS_POR_LOTE):
+        """Ingerir um arquivo de notificações, se ainda não ingerido ou se mudou.
+
+        Returns:
+            Registro do arquivo no catálogo, com `situacao` "novo", "atualizado"
+            ou "inalterado" (arquivo já ingerido, não relido).
+        """
+        if agravo not in AGRAVOS:
+            raise ValueError(f"Agravo desconhecido: {agravo!r} (use {', '.join(AGRAVOS)}).")
+        origem = os.path.abspath(caminho)
+        estado = os.stat(origem)
+        assinatura = {"tamanho": estado.st_size, "modificado": estado.st_mtime_ns}
+        catalogo = self.catalogo()
+        anterior = next(
+            (r for r in catalogo["arquivos"] if r["arquivo"] == origem and r["agravo"] == agravo), None
+        )
+        if anterior is not None and anterior["assinatura"] == assinatura:
+            return {**anterior, "situacao": "inalterado"}
+
+        casos, linhas, descartadas = contar_casos(origem, coluna_municipio, coluna_data, linhas_por_lote)
+        parte = hashlib.sha1(origem.encode("utf-8")).hexdigest()[:16]
+        os.makedirs(self._diretorio(agravo), exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(casos, preserve_index=False),
+                       os.path.join(self._diretorio(agravo), f"{parte}.parquet"))
+
+        registro = {
+            "arquivo": origem,
+            "agravo": agravo,
+            "parte": parte,
+            "assinatura": assinatura,
+            "ingerido_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "linhas": linhas,
+            "descartadas": descartadas,
+            "casos": int(casos["casos"].sum()),
+            "meses": [int(casos["mes"].min()), int(casos["mes"].max())] if len(casos) else None,
+        }
+        catalogo["arquivos"] = [r for r in catalogo["arquivos"] if r is not anterior] + [registro]
+        self._gravar_catalogo(catalogo)
+        return {**registro, "situacao": "novo" if anterior is None else "atualizado"}
+
+    def totais(self, agravo, inicio=None, fim=None):
+        """Casos de `agravo` por município (código de 6 dígitos) entre os meses `inicio` e `fim` (AAAAMM)."""
+        partes = [
+            os.path.join(self._diretorio(agravo), f"{r['parte']}.parquet")
+            for r in self.catalogo()["arquivos"] if r["agravo"] == agravo
+        ]
+        if not partes:
+            return pd.Series(dtype=np.int64, name="casos").rename_axis("municipio")
+        casos = pd.concat([pq.read_table(parte).to_pandas() for parte in partes], ignore_index=True)
+        periodo = np.ones(len(casos), dtype=bool)
+        if inicio is not None:
+            periodo &= casos["mes"].to_numpy() >= int(inicio)
+        if fim is not None:
+            periodo &= casos["mes"].to_numpy() <= int(fim)
+        return casos[periodo].groupby("municipio")["casos"].sum()
+
+
+def normalizar_min_max(valores, maxima=NOTA_MAXIMA):
+    """Notas de 0 a `maxima` pelas mínimas e máximas gerais (NaN preservado)."""
+    valores = np.asarray(valores, dtype=float)
+    menor, maior = np.nanmin(valores), np.nanmax(valores)
+    if maior == menor:
+        return np.where(np.isnan(valores), np.nan, 0.0)
+    return maxima * (valores - menor) / (maior - menor)
+
+
+def incidencias(acumulado, gdf, inicio=None, fim=None):
+    """Incidência de cada agravo por município de `gdf` (colunas = agravos)."""
+    codigos = codigos_municipio(gdf["CD_MUN"].to_numpy())
+    habitantes = gdf["populacao"].to_numpy(dtype=float) if "populacao" in gdf.columns else None
+    resultado = pd.DataFrame(index=gdf.index)
+    for agravo in AGRAVOS:
+        casos = acumulado.totais(agravo, inicio, fim).reindex(codigos, fill_value=0).to_numpy(dtype=float)
+        if habitantes is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                casos = np.where(habitantes > 0, casos * POR_HABITANTES / habitantes, np.nan)
+        resultado[agravo] = casos
+    return resultado
+
+
+def recalcular_notas_insalubridade(acumulado, gdf, inicio=None, fim=None):
+    """Base com `nota_insalub` e `nota_insalub_2` recalculadas dos totais acumulados.
+
+    Municípios sem população mantêm as notas anteriores.
+
+    Returns:
+        Tupla `(base atualizada, incidências por agravo)`.
+    """
+    tabela = incidencias(acumulado, gdf, inicio, fim)
+    notas = {}
+    for coluna, agravos in NOTAS_AGRAVOS.items():
+        novas = normalizar_min_max(tabela[agravos].sum(axis=1, min_count=len(agravos)))
+        if coluna in gdf.columns:
+            novas = np.where(np.isnan(novas), gdf[coluna].to_numpy(dtype=float), novas)
+        notas[coluna] = novas
+    return substituir_notas(gdf, notas), tabela
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Ingerir notificações do DataSUS e recalcular as notas de insalubridade.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    ingerir = comandos.add_parser("ingerir", help="Ingerir arquivos de notificações (CSV ou Parquet)")
+    ingerir.add_argument("raiz", help="Diretório dos totais")
+    ingerir.add_argument("agravo", choices=list(AGRAVOS))
+    ingerir.add_argument("arquivos", nargs="+")
+    ingerir.add_argument("--coluna-municipio", default=COLUNA_MUNICIPIO)
+    ingerir.add_argument("--coluna-data", default=COLUNA_DATA)
+    ingerir.add_argument("--linhas-por-lote", type=int, default=LINHAS_POR_LOTE)
+
+    notas = comandos.add_parser("notas", help="Recalcular nota_insalub e nota_insalub_2 na base")
+    notas.add_argument("raiz", help="Diretório dos totais")
+    notas.add_argument("origem", nargs="?", default=PATHS["dataset"], help="Base municipal")
+    notas.add_argument("saida", nargs="?", default=os.path.join(PATHS["data_processed"], "precificacao_insalub.parquet"),
+                       help="Base atualizada (.parquet, .gpkg, .geojson)")
+    notas.add_argument("--inicio", type=int, help="Primeiro mês (AAAAMM)")
+    notas.add_argument("--fim", type=int, help="Último mês (AAAAMM)")
+    args = parser.parse_args(argumentos)
+
+    acumulado = AcumuladoInsalubridade(args.raiz)
+    if args.comando == "ingerir":
+        for arquivo in args.arquivos:
+            registro = acumulado.ingerir(arquivo, args.agravo, args.coluna_municipio, args.coluna_data,
+                                         args.linhas_por_lote)
+            print(f"{registro['situacao']}: {arquivo} ({registro['casos']} casos)")
+        return acumulado
+
+    atualizada, _ = recalcular_notas_insalubridade(
+        acumulado, obter_fonte(args.origem).carregar(), args.inicio, args.fim
+    )
+    gravar_base(atualizada, args.saida)
+    print(f"{len(atualizada)} municípios gravados em {args.saida}")
+    return atualizada
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Instantâneo estático da visão padrão do dashboard (HTML).
+
+A visão padrão (todas as UFs, sem filtro de município e com a faixa completa
+de `nota_media`) é a que a maior parte dos visitantes vê quando o dashboard é
+divulgado. Este módulo a renderiza uma vez em um pacote HTML estático, com uma
+variante por UF (a tela do app com só aquela UF selecionada). Publicar o
+pacote é servir um diretório: nenhum trabalho Python por visitante.
+
+Cada página tem o mapa, os cards, os gráficos e a composição por UF, montados
+com as mesmas funções do app (`mda_app.core.indicadores` e
+`mda_app.components.visualizations`). Os mapas folium ficam em
+`mapas/<página>.html` e entram por iframe; o plotly.js, a folha de estilo e o
+logo são gravados uma única vez em `recursos/`. `numeros.json` guarda os
+números e os textos dos cards de cada página, para conferência com o app.
+
+Uso:
+
+    python -m mda_app.core.instantaneo data/raw/precificacao_al_ii.geojson publicacao/
+"""
+
+import argparse
+import html
+import json
+import os
+
+from mda_app.components.visualizations import (
+    criar_gauge_area_georef,
+    criar_grafico_composicao_uf,
+    criar_grafico_trimestral,
+    criar_mapa,
+)
+from mda_app.config.settings import APP_CONFIG, COLORS, PATHS
+from mda_app.core.indicadores import (
+    COLUNAS_COMPOSICAO_UF,
+    calcular_media_notas_por_uf,
+    cartoes_selecao,
+    cartoes_trimestrais,
+    resumir_selecao,
+)
+from mda_app.core.preparacao import carregar_base_preparada
+from mda_app.utils.importacao import modulo_tardio
+from mda_app.utils.recursos import gravar_recursos
+
+pd = modulo_tardio("pandas")
+plotly_io = modulo_tardio("plotly.io")
+plotly_offline = modulo_tardio("plotly.offline")
+
+PASTA_MAPAS = "mapas"
+PAGINA_PADRAO = "index.html"
+ARQUIVO_NUMEROS = "numeros.json"
+# Critério do slider do app e coloração padrão do mapa
+CRITERIO = "nota_media"
+
+ESTILO = """
+body { font-family: "Source Sans Pro", "Segoe UI", Arial, sans-serif; color: #262730; margin: 0; }
+.conteudo { max-width: 1200px; margin: 0 auto; padding: 16px; }
+.cabecalho { display: flex; align-items: center; gap: 16px; border-bottom: 3px solid %(primaria)s; }
+.cabecalho img { width: 200px; }
+h1 { color: %(primaria)s; font-size: 26px; margin: 8px 0; }
+h3 { text-align: center; margin: 24px 0 12px; }
+h4 { text-align: center; margin: 8px 0; }
+nav { margin: 12px 0; font-size: 14px; }
+nav a { margin-right: 8px; color: %(secundaria)s; }
+nav a.atual { font-weight: bold; color: %(primaria)s; }
+iframe { width: 100%%; height: 500px; border: 0; }
+.cards { display: grid; grid-template-columns: repeat(auto-fit, minmax(160px, 1fr)); gap: 12px; }
+.card span { display: block; font-size: 14px; color: #555; }
+.card strong { font-size: 28px; font-weight: normal; }
+.graficos { display: grid; grid-template-columns: 1fr 1fr; gap: 12px; }
+.nota { font-size: 13px; color: #777; }
+hr { border: 0; border-top: 1px solid #ddd; margin: 24px 0; }
+""" % {"primaria": COLORS["primary"], "secundaria": COLORS["secondary"]}
+
+
+def selecao_padrao(gdf, uf=None):
+    """Municípios da visão padrão do app (todas as UFs ou só `uf`).
+
+    Como no app: todos os municípios e a faixa completa de `nota_media`, que
+    deixa de fora os municípios sem nota.
+    """
+    criterio = gdf[CRITERIO]
+    filtros = criterio.between(criterio.min(), criterio.max())
+    if uf is not None:
+        filtros &= gdf["SIGLA_UF"] == uf
+    return gdf[filtros]
+
+
+def numeros_da_vista(selecao):
+    """Números de uma vista do dashboard (a seleção já filtrada).
+
+    Returns:
+        Dicionário serializável em JSON: indicadores de `resumir_selecao`,
+        textos dos cards e médias das notas por UF.
+    """
+    resumo = resumir_selecao(selecao)
+    colunas = [c for c in COLUNAS_COMPOSICAO_UF if c in selecao.columns]
+    composicao = calcular_media_notas_por_uf(selecao, colunas) if len(colunas) >= 3 else None
+    return {
+        "indicadores": resumo,
+        "cartoes": cartoes_selecao(resumo),
+        "cartoes_trimestrais": cartoes_trimestrais(resumo.get("valores_trimestrais", [])),
+        "composicao_uf": None if composicao is None else composicao.to_dict("records"),
+        "colunas_composicao": colunas,
+    }
+
+
+def _grafico(figura):
+    return plotly_io.to_html(figura, full_html=False, include_plotlyjs=False,
+                             config={"responsive": True})
+
+
+def _cards(cartoes):
+    return "".join(
+        f'<div class="card"><span>{html.escape(rotulo)}</span><strong>{html.escape(valor)}</strong></div>'
+        for rotulo, valor in cartoes
+    )
+
+
+def renderizar_pagina(selecao, numeros, arquivo_mapa, navegacao, recursos):
+    """HTML de uma vista: mapa, cards, gráficos e composição por UF.
+
+    Args:
+        selecao: Municípios da vista
+        numeros: Saída de `numeros_da_vista(selecao)`
+        arquivo_mapa: Endereço do mapa da vista, relativo à página
+        navegacao: Lista de pares (rótulo, endereço, atual) com as vistas
+        recursos: Endereços de `gravar_recursos` (`plotly`, `estilo` e `logo`)
+    """
+    resumo = numeros["indicadores"]
+    titulo = "Informações Adicionais"
+    if resumo["municipios"] == 1:
+        linha = selecao.iloc[0]
+        titulo += f" - {linha.get('mun_nome', linha['NM_MUN'])}"
+
+    graficos_trimestre = _grafico(criar_grafico_trimestral(resumo.get("notas_trimestrais", [0, 0, 0, 0])))
+    gauge = _grafico(criar_gauge_area_georef(resumo.get("percent_area_georef", 0.0)))
+    if numeros["composicao_uf"] is None:
+        composicao = '<p class="nota">Graus de dificuldade insuficientes para gerar o gráfico de composição média por UF.</p>'
+    else:
+        df_uf = pd.DataFrame(numeros["composicao_uf"])
+        composicao = (_grafico(criar_grafico_composicao_uf(df_uf, numeros["colunas_composicao"]))
+                      + '<p class="nota">* Estados ordenados por pontuação total.</p>')
+
+    links = "".join(
+        '<a href="{}"{}>{}</a>'.format(html.escape(endereco), ' class="atual"' if atual else "",
+                                       html.escape(rotulo))
+        for rotulo, endereco, atual in navegacao
+    )
+    logo = f'<img src="{recursos["logo"]}" alt="logo">' if recursos["logo"] else ""
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(APP_CONFIG["page_title"])}</title>
+<link rel="stylesheet" href="{recursos["estilo"]}">
+<script src="{recursos["plotly"]}"></script></head>
+<body><div class="conteudo">
+<div class="cabecalho">{logo}<h1>{html.escape(APP_CONFIG["page_title"])}</h1></div>
+<nav>{links}</nav>
+<iframe src="{html.escape(arquivo_mapa)}" title="Mapa" loading="lazy"></iframe>
+<hr><h3>{html.escape(str(titulo))}</h3>
+<div class="cards">{_cards(numeros["cartoes"])}</div>
+<hr><div class="graficos">
+<div><h4>Grau de Dificuldade por Trimestre</h4>{graficos_trimestre}</div>
+<div><h4>Percentual de Área Georreferenciável</h4>{gauge}</div>
+</div>
+<hr><h3>Valores Totais Trimestrais por Nota</h3>
+<div class="cards">{_cards(numeros["cartoes_trimestrais"])}</div>
+<hr><h3>Composição Média dos Graus de Dificuldade por UF</h3>
+{composicao}
+<p class="nota">Instantâneo estático da base versão {html.escape(str(selecao.attrs.get("versao", "")))}.</p>
+</div></body></html>
+"""
+
+
+def gerar_instantaneo(gdf, diretorio, ufs=None, caminho_logo=None):
+    """Gerar o pacote estático da visão padrão e das variantes por UF.
+
+    Args:
+        gdf: Base preparada (ver `mda_app.core.preparacao.carregar_base_preparada`)
+        diretorio: Diretório de saída (`index.html`, `<UF>.html`, `mapas/`,
+            `recursos/` e `numeros.json`)
+        ufs: UFs com variante própria (padrão: todas)
+        caminho_logo: Logo do cabeçalho (padrão: `APP_CONFIG["logo_path"]`)
+
+    Returns:
+        Conteúdo de `numeros.json`: versão da base e, por página, as UFs e
+        os números da vista.
+    """
+    os.makedirs(os.path.join(diretorio, PASTA_MAPAS), exist_ok=True)
+    recursos = gravar_recursos(diretorio, {
+        "plotly": ("plotly.min.js", plotly_offline.get_plotlyjs()),
+        "estilo": ("instantaneo.css", ESTILO),
+    }, caminho_logo)
+
+    ufs = sorted(gdf["SIGLA_UF"].unique()) if ufs is None else list(ufs)
+    vistas = [(PAGINA_PADRAO, "Todas as UFs", selecao_padrao(gdf))]
+    vistas += [(f"{uf}.html", uf, selecao_padrao(gdf, uf)) for uf in ufs]
+
+    paginas = {}
+    for pagina, rotulo, selecao in vistas:
+        if len(selecao) == 0:
+            continue
+        arquivo_mapa = f"{PASTA_MAPAS}/{pagina}"
+        # Mesmo mapa do app: seleções com muitas UFs usam a camada agregada
+        criar_mapa(selecao, CRITERIO, mostrar_controle_camadas=True, base=gdf).save(
+            os.path.join(diretorio, arquivo_mapa))
+
+        navegacao = [(r, p, p == pagina) for p, r, s in vistas if len(s)]
+        numeros = numeros_da_vista(selecao)
+        with open(os.path.join(diretorio, pagina), "w", encoding="utf-8") as arquivo:
+            arquivo.write(renderizar_pagina(selecao, numeros, arquivo_mapa, navegacao, recursos))
+        paginas[pagina] = {"ufs": sorted(selecao["SIGLA_UF"].unique()), **numeros}
+
+    manifesto = {"versao": gdf.attrs.get("versao"), "paginas": paginas}
+    with open(os.path.join(diretorio, ARQUIVO_NUMEROS), "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=1, default=float)
+    return manifesto
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gerar o instantâneo HTML estático da visão padrão.")
+    parser.add_argument("origem", nargs="?", default=PATHS["dataset"], help="Base a ler")
+    parser.add_argument("saida", nargs="?", default="publicacao", help="Diretório de saída")
+    parser.add_argument("--ufs", nargs="+", help="UFs com variante própria (padrão: todas)")
+    args = parser.parse_args()
+    manifesto = gerar_instantaneo(carregar_base_preparada(args.origem), args.saida, ufs=args.ufs)
+    print(f"{len(manifesto['paginas'])} páginas em {args.saida}")
@@ -0,0 +1,425 @@
+"""Notas trimestrais de clima por krigagem ordinária, fora do dashboard.
+
+Recalcula `nota_p_q1..q4` (e, a partir delas, `nota_total_q*`, `nota_media` e
+`valor_mun_area`) a partir das séries diárias de precipitação das estações:
+
+1. As séries (CSV ou Parquet, colunas `COLUNAS_SERIES`) são lidas em lotes e
+   somadas por estação, ano e trimestre; só os totais acumulados ficam em
+   memória. Cada estação recebe a média, entre os anos com cobertura
+   suficiente, do total de cada trimestre.
+2. Para cada trimestre é ajustado um variograma esférico ao semivariograma
+   empírico das estações.
+3. Cada alvo (centróide de município ou centro de célula de uma grade) é
+   estimado por krigagem ordinária com as `vizinhos` estações mais próximas.
+   Os alvos são processados em lotes cujo tamanho respeita o orçamento de
+   memória, e os lotes são distribuídos por um pool de processos.
+4. A precipitação estimada vira nota de 0 a `NOTA_MAXIMA` pelas mínimas e
+   máximas gerais (todos os trimestres), e as notas são gravadas na base.
+
+Distâncias em metros, em EPSG:5880. Uso:
+
+    python -m mda_app.core.krigagem series.parquet \
+        data/raw/precificacao_al_ii.geojson saida.parquet --processos 4
+"""
+
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mda_app.config.settings import PATHS
+from mda_app.core.fontes_dados import gravar_base, obter_fonte
+from mda_app.core.precificacao import substituir_notas
+from mda_app.utils.importacao import modulo_tardio
+
+gpd = modulo_tardio("geopandas")
+pd = modulo_tardio("pandas")
+pq = modulo_tardio("pyarrow.parquet")
+
+# Colunas das séries: estação, data da observação, coordenadas e precipitação (mm)
+COLUNAS_SERIES = ["estacao", "data", "latitude", "longitude", "precipitacao"]
+COLUNAS_NOTAS_P = [f"nota_p_q{q}" for q in range(1, 5)]
+
+EPSG_DISTANCIAS = 5880
+LINHAS_POR_LOTE = 500_000
+# Dias com observação exigidos para o total de um trimestre valer
+DIAS_MINIMOS_TRIMESTRE = 72
+VIZINHOS = 32
+NOTA_MAXIMA = 20.0
+# Alvos mínimos por processo: abaixo disso, iniciar processos custa mais do que krigar
+ALVOS_POR_PROCESSO = 5000
+# Pares de estações usados no semivariograma empírico (amostrados se houver mais)
+ESTACOES_VARIOGRAMA = 2000
+CLASSES_VARIOGRAMA = 15
+
+
+def _lotes_series(caminho, linhas_por_lote):
+    if str(caminho).endswith(".parquet"):
+        arquivo = pq.ParquetFile(caminho)
+        for lote in arquivo.iter_batches(
+            batch_size=linhas_por_lote, columns=COLUNAS_SERIES
+        ):
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(
+            caminho, usecols=COLUNAS_SERIES, chunksize=linhas_por_lote
+        )
+
+
+def agregar_trimestres(
+    caminho, linhas_por_lote=LINHAS_POR_LOTE, dias_minimos=DIAS_MINIMOS_TRIMESTRE
+):
+    """Precipitação média de cada trimestre por estação, lendo as séries em lotes.
+
+    Returns:
+        DataFrame indexado pela estação, com `latitude`, `longitude` e
+        `q1`..`q4` (mm; NaN quando nenhum ano teve cobertura suficiente).
+    """
+    totais = None
+    coordenadas = {}
+    for lote in _lotes_series(caminho, linhas_por_lote):
+        lote = lote.dropna(subset=["estacao", "data"])
+        datas = pd.to_datetime(lote["data"])
+        chaves = [
+            lote["estacao"].to_numpy(),
+            datas.dt.year.to_numpy(),
+            datas.dt.quarter.to_numpy(),
+        ]
+        parcial = lote.groupby(chaves)["precipitacao"].agg(["sum", "count"])
+        totais = (
+            parcial
+            if totais is None
+            else pd.concat([totais, parcial]).groupby(level=[0, 1, 2]).sum()
+        )
+        for estacao, linha in (
+            lote.drop_duplicates("estacao").set_index("estacao").iterrows()
+        ):
+            coordenadas.setdefault(estacao, (linha["latitude"], linha["longitude"]))
+    if totais is None:
+        raise ValueError(f"Nenhuma observação em {caminho}.")
+
+    totais.index.names = ["estacao", "ano", "trimestre"]
+    validos = totais[totais["count"] >= dias_minimos]["sum"]
+    medias = validos.groupby(level=["estacao", "trimestre"]).mean().unstack("trimestre")
+    medias = medias.reindex(columns=[1, 2, 3, 4])
+    medias.columns = ["q1", "q2", "q3", "q4"]
+    posicoes = pd.DataFrame.from_dict(
+        coordenadas, orient="index", columns=["latitude", "longitude"]
+    )
+    return posicoes.join(medias, how="inner").rename_axis("estacao")
+
+
+def projetar(longitudes, latitudes, crs="EPSG:4326"):
+    """Coordenadas (x, y) em metros, em EPSG:5880."""
+    pontos = gpd.GeoSeries(gpd.points_from_xy(longitudes, latitudes), crs=crs).to_crs(
+        epsg=EPSG_DISTANCIAS
+    )
+    return np.column_stack([pontos.x.to_numpy(), pontos.y.to_numpy()])
+
+
+def esferico(distancias, pepita, patamar, alcance):
+    """Variograma esférico (patamar parcial `patamar`, sem contar a pepita)."""
+    razao = np.minimum(np.asarray(distancias, dtype=float) / alcance, 1.0)
+    return np.where(
+        distancias > 0, pepita + patamar * (1.5 * razao - 0.5 * razao**3), 0.0
+    )
+
+
+def ajustar_variograma(coordenadas, valores, classes=CLASSES_VARIOGRAMA, semente=0):
+    """Ajustar um variograma esférico `(pepita, patamar, alcance)` às estações.
+
+    Para cada alcance candidato, pepita e patamar saem de mínimos quadrados
+    (o modelo é linear neles); fica o alcance de menor erro, ponderado pelo
+    número de pares de cada classe de distância.
+    """
+    validos = np.isfinite(valores)
+    coordenadas, valores = coordenadas[validos], valores[validos]
+    if len(valores) > ESTACOES_VARIOGRAMA:
+        amostra = np.random.default_rng(semente).choice(
+            len(valores), ESTACOES_VARIOGRAMA, replace=False
+        )
+        coordenadas, valores = coordenadas[amostra], valores[amostra]
+    i, j = np.triu_indices(len(valores), k=1)
+    distancias = np.hypot(*(coordenadas[i] - coordenadas[j]).T)
+    semivariancias = 0.5 * (valores[i] - valores[j]) ** 2
+
+    limite = distancias.max() / 2
+    bordas = np.linspace(0, limite, classes + 1)
+    classe = np.digitize(distancias, bordas) - 1
+    dentro = classe < classes
+    pares = np.bincount(classe[dentro], minlength=classes)
+    ocupadas = pares > 0
+    h = (
+        np.bincount(classe[dentro], distancias[dentro], classes)[ocupadas]
+        / pares[ocupadas]
+    )
+    gama = (
+        np.bincount(classe[dentro], semivariancias[dentro], classes)[ocupadas]
+        / pares[ocupadas]
+    )
+    pesos = np.sqrt(pares[ocupadas])
+
+    melhor = None
+    for alcance in np.linspace(limite / classes, limite * 2, 40):
+        forma = esferico(h, 0.0, 1.0, alcance)
+        matriz = np.column_stack([np.ones_like(h), forma]) * pesos[:, None]
+        (pepita, patamar), *_ = np.linalg.lstsq(matriz, gama * pesos, rcond=None)
+        pepita, patamar = max(pepita, 0.0), max(patamar, 1e-12)
+        erro = np.sum((pesos * (gama - esferico(h, pepita, patamar, alcance))) ** 2)
+        if melhor is None or erro < melhor[0]:
+            melhor = (erro, (float(pepita), float(patamar), float(alcance)))
+    return melhor[1]
+
+
+def krigar_lote(estacoes, valores, alvos, variograma, vizinhos=VIZINHOS):
+    """Krigagem ordinária de um lote de alvos com as estações mais próximas.
+
+    Args:
+        estacoes: Coordenadas das estações (n x 2, metros)
+        valores: Valores nas estações (n)
+        alvos: Coordenadas dos alvos (m x 2, metros)
+        variograma: `(pepita, patamar, alcance)`
+        vizinhos: Estações usadas por alvo
+
+    Returns:
+        Estimativas nos alvos (m).
+    """
+    # Estações nas mesmas coordenadas tornariam o sistema singular: viram uma
+    # só, com a média dos valores
+    estacoes, unicas = np.unique(estacoes, axis=0, return_inverse=True)
+    unicas = unicas.reshape(-1)
+    valores = np.bincount(unicas, valores) / np.bincount(unicas)
+
+    k = min(vizinhos, len(estacoes))
+    distancias = np.hypot(
+        alvos[:, None, 0] - estacoes[None, :, 0],
+        alvos[:, None, 1] - estacoes[None, :, 1],
+    )
+    proximas = (
+        np.argpartition(distancias, k - 1, axis=1)[:, :k]
+        if k < len(estacoes)
+        else np.broadcast_to(np.arange(k), (len(alvos), k))
+    )
+    pontos = estacoes[proximas]
+
+    # Sistema de cada alvo: semivariâncias entre as k estações + restrição de soma 1
+    sistema = np.ones((len(alvos), k + 1, k + 1))
+    sistema[:, :k, :k] = esferico(
+        np.hypot(
+            *(pontos[:, :, None, :] - pontos[:, None, :, :]).transpose(3, 0, 1, 2)
+        ),
+        *variograma,
+    )
+    sistema[:, k, k] = 0.0
+    lado = np.ones((len(alvos), k + 1))
+    lado[:, :k] = esferico(
+        np.take_along_axis(distancias, proximas, axis=1), *variograma
+    )
+    # Alvo sobre uma estação: diagonal com pepita zero torna o sistema exato
+    pesos = np.linalg.solve(sistema, lado[:, :, None])[:, :k, 0]
+    return np.einsum("ij,ij->i", pesos, valores[proximas])
+
+
+def _krigar_trimestres(estacoes, valores, alvos, variogramas, vizinhos, lote):
+    resultado = np.empty((len(alvos), valores.shape[1]))
+    for inicio in range(0, len(alvos), lote):
+        fatia = slice(inicio, inicio + lote)
+        for trimestre, variograma in enumerate(variogramas):
+            validos = np.isfinite(valores[:, trimestre])
+            resultado[fatia, trimestre] = krigar_lote(
+                estacoes[validos],
+                valores[validos, trimestre],
+                alvos[fatia],
+                variograma,
+                vizinhos,
+            )
+    return resultado
+
+
+def _tamanho_lote(estacoes, vizinhos, orcamento):
+    """Alvos por lote cujo pico de memória (distâncias e sistemas) cabe no orçamento."""
+    k = min(vizinhos, estacoes)
+    por_alvo = 8 * (3 * estacoes + 4 * (k + 1) ** 2 + 4 * k * k)
+    return max(1, int(orcamento // por_alvo))
+
+
+def krigar(
+    estacoes,
+    valores,
+    alvos,
+    variogramas,
+    vizinhos=VIZINHOS,
+    processos=None,
+    memoria_mb=1024,
+):
+    """Estimar cada coluna de `valores` (um trimestre por coluna) nos alvos.
+
+    Os alvos são divididos entre os processos; cada processo krige a sua parte
+    em lotes que cabem em `memoria_mb / processos`.
+    """
+    processos = min(
+        processos or os.cpu_count() or 1, -(-len(alvos) // ALVOS_POR_PROCESSO)
+    )
+    orcamento = memoria_mb * 1024 * 1024 / max(processos, 1)
+    lote = _tamanho_lote(len(estacoes), vizinhos, orcamento)
+    if processos <= 1:
+        return _krigar_trimestres(estacoes, valores, alvos, variogramas, vizinhos, lote)
+    partes = np.array_split(np.arange(len(alvos)), processos)
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as pool:
+        futuros = [
+            pool.submit(
+                _krigar_trimestres,
+                estacoes,
+                valores,
+                alvos[parte],
+                variogramas,
+                vizinhos,
+                lote,
+            )
+            for parte in partes
+        ]
+        return np.concatenate([futuro.result() for futuro in futuros])
+
+
+def alvos_municipios(gdf, grade=None):
+    """Pontos a krigar e a qual município cada um pertence.
+
+    Sem `grade`, um ponto por município (o centróide, calculado em EPSG:5880).
+    Com `grade` (tamanho da célula em metros), os centros das células que caem
+    em cada município; municípios menores que uma célula usam o centróide.
+
+    Returns:
+        Tupla `(coordenadas em metros, posição do município de cada ponto)`.
+    """
+    projetada = gdf.geometry.to_crs(epsg=EPSG_DISTANCIAS)
+    centroides = projetada.centroid
+    coordenadas = np.column_stack([centroides.x.to_numpy(), centroides.y.to_numpy()])
+    municipios = np.arange(len(gdf))
+    if grade is None:
+        return coordenadas, municipios
+
+    xmin, ymin, xmax, ymax = projetada.total_bounds
+    xs = np.arange(xmin + grade / 2, xmax, grade)
+    ys = np.arange(ymin + grade / 2, ymax, grade)
+    celulas = np.column_stack([np.repeat(xs, len(ys)), np.tile(ys, len(xs))])
+    pontos, donos = projetada.sindex.query(
+        gpd.points_from_xy(celulas[:, 0], celulas[:, 1]), predicate="within"
+    )
+    sem_celula = np.setdiff1d(municipios, donos)
+    return (
+        np.concatenate([celulas[pontos], coordenadas[sem_celula]]),
+        np.concatenate([donos, sem_celula]),
+    )
+
+
+def notas_por_precipitacao(precipitacao, maxima=NOTA_MAXIMA):
+    """Notas de 0 a `maxima` pelas mínimas e máximas gerais (todos os trimestres)."""
+    menor, maior = np.nanmin(precipitacao), np.nanmax(precipitacao)
+    if maior == menor:
+        return np.zeros_like(precipitacao)
+    return maxima * (precipitacao - menor) / (maior - menor)
+
+
+def aplicar_notas(gdf, notas_p):
+    """Base com as novas `nota_p_q*` e os totais, a média e o valor recalculados."""
+    return substituir_notas(
+        gdf, {coluna: notas_p[:, q] for q, coluna in enumerate(COLUNAS_NOTAS_P)}
+    )
+
+
+def recalcular_notas_clima(
+    series, gdf, grade=None, vizinhos=VIZINHOS, processos=None, memoria_mb=1024
+):
+    """Krigar as séries das estações sobre os municípios de `gdf`.
+
+    Args:
+        series: CSV ou Parquet com as séries diárias (`COLUNAS_SERIES`)
+        gdf: Base municipal
+        grade: Tamanho da célula da grade em metros (padrão: centróides)
+        vizinhos: Estações por alvo
+        processos: Processos do pool (padrão: número de CPUs)
+        memoria_mb: Orçamento de memória da krigagem
+
+    Returns:
+        Tupla `(base atualizada, precipitação estimada por município (m x 4),
+        variogramas)`.
+    """
+    trimestres = agregar_trimestres(series)
+    estacoes = projetar(
+        trimestres["longitude"].to_numpy(), trimestres["latitude"].to_numpy()
+    )
+    valores = trimestres[["q1", "q2", "q3", "q4"]].to_numpy(dtype=float)
+    variogramas = [ajustar_variograma(estacoes, valores[:, q]) for q in range(4)]
+
+    alvos, donos = alvos_municipios(gdf, grade)
+    estimados = krigar(
+        estacoes, valores, alvos, variogramas, vizinhos, processos, memoria_mb
+    )
+    contagem = np.bincount(donos, minlength=len(gdf))[:, None]
+    precipitacao = (
+        np.stack(
+            [np.bincount(donos, estimados[:, q], len(gdf)) for q in range(4)], axis=1
+        )
+        / contagem
+    )
+    return (
+        aplicar_notas(gdf, notas_por_precipitacao(precipitacao)),
+        precipitacao,
+        variogramas,
+    )
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        description="Recalcular as notas de clima por krigagem ordinária."
+    )
+    parser.add_argument("series", help="Séries diárias das estações (CSV ou Parquet)")
+    parser.add_argument(
+        "origem", nargs="?", default=PATHS["dataset"], help="Base municipal"
+    )
+    parser.add_argument(
+        "saida",
+        nargs="?",
+        default=os.path.join(PATHS["data_processed"], "precificacao_clima.parquet"),
+        help="Base atualizada (.parquet, .gpkg, .geojson)",
+    )
+    parser.add_argument(
+        "--grade",
+        type=float,
+        help="Krigar em células de GRADE metros (padrão: centróides)",
+    )
+    parser.add_argument(
+        "--vizinhos", type=int, default=VIZINHOS, help="Estações por alvo"
+    )
+    parser.add_argument(
+        "--processos", type=int, help="Processos do pool (padrão: número de CPUs)"
+    )
+    parser.add_argument(
+        "--memoria-mb", type=int, default=1024, help="Orçamento de memória da krigagem"
+    )
+    args = parser.parse_args(argumentos)
+
+    gdf = obter_fonte(args.origem).carregar()
+    atualizada, _, variogramas = recalcular_notas_clima(
+        args.series,
+        gdf,
+        grade=args.grade,
+        vizinhos=args.vizinhos,
+        processos=args.processos,
+        memoria_mb=args.memoria_mb,
+    )
+    for trimestre, (pepita, patamar, alcance) in enumerate(variogramas, start=1):
+        print(
+            f"q{trimestre}: pepita {pepita:.1f}, patamar {patamar:.1f}, "
+            f"alcance {alcance / 1000:.0f} km"
+        )
+    gravar_base(atualizada, args.saida)
+    print(f"{len(atualizada)} municípios gravados em {args.saida}")
+    return atualizada
+
+
+if __name__ == "__main__":
+    main()
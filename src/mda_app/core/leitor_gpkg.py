@@ -0,0 +1,200 @@
+"""Leitura de GeoPackage direto no SQLite.
+
+O entregável oficial é um GeoPackage (.gpkg). Este leitor consulta o arquivo
+com `sqlite3`, sem passar pelo GDAL: filtros por UF, faixas de critério e
+cláusulas WHERE viram SQL, e o filtro por bbox usa o índice espacial R-tree do
+próprio GeoPackage (`rtree_<tabela>_<coluna>`). Só as linhas selecionadas saem
+do SQLite, e só as geometrias delas são decodificadas.
+
+As conexões são somente leitura e ficam em um pequeno pool por arquivo,
+reaproveitado entre reruns e sessões.
+"""
+
+import os
+import sqlite3
+import threading
+from functools import partial
+
+from mda_app.utils.importacao import modulo_tardio
+from mda_app.utils.pool_conexoes import PoolConexoes
+
+gpd = modulo_tardio("geopandas")
+pd = modulo_tardio("pandas")
+shapely = modulo_tardio("shapely")
+
+TAMANHO_POOL = 4
+
+# Bytes do envelope no cabeçalho da geometria GPKG, pelo indicador dos flags
+_TAMANHO_ENVELOPE = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+_pools = {}
+_trava_pools = threading.Lock()
+
+
+def _conectar_somente_leitura(caminho):
+    # Uma conexão é usada por uma thread de cada vez (garantido pelo pool)
+    return sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, check_same_thread=False)
+
+
+def obter_pool(caminho, tamanho=TAMANHO_POOL):
+    """Pool compartilhado de conexões para `caminho` (um por arquivo)."""
+    chave = os.path.abspath(caminho)
+    with _trava_pools:
+        pool = _pools.get(chave)
+        if pool is None:
+            pool = _pools[chave] = PoolConexoes(partial(_conectar_somente_leitura, chave), tamanho)
+        return pool
+
+
+def fechar_pools():
+    """Fechar e descartar todos os pools."""
+    with _trava_pools:
+        for pool in _pools.values():
+            pool.fechar()
+        _pools.clear()
+
+
+def wkb_de_gpkg(blob):
+    """Extrair o WKB de uma geometria no formato binário do GeoPackage."""
+    if blob is None:
+        return None
+    blob = bytes(blob)
+    if blob[:2] != b"GP":
+        raise ValueError("Geometria fora do formato GeoPackage (cabeçalho 'GP' ausente).")
+    flags = blob[3]
+    envelope = (flags >> 1) & 0b111
+    if envelope not in _TAMANHO_ENVELOPE:
+        raise ValueError(f"Indicador de envelope inválido no GeoPackage: {envelope}.")
+    return blob[8 + _TAMANHO_ENVELOPE[envelope]:]
+
+
+def _aspas(identificador):
+    return '"' + identificador.replace('"', '""') + '"'
+
+
+def _descrever_camada(conexao, camada):
+    """Tabela, coluna de geometria, chave primária, colunas, CRS e R-tree da camada."""
+    if camada is None:
+        linha = conexao.execute(
+            "SELECT table_name FROM gpkg_contents WHERE data_type = 'features' ORDER BY table_name LIMIT 1"
+        ).fetchone()
+        if linha is None:
+            raise ValueError("O GeoPackage não tem camadas vetoriais.")
+        camada = linha[0]
+
+    linha = conexao.execute(
+        "SELECT column_name, srs_id FROM gpkg_geometry_columns WHERE table_name = ?", (camada,)
+    ).fetchone()
+    if linha is None:
+        raise ValueError(f"Camada {camada!r} não encontrada no GeoPackage.")
+    coluna_geometria, srs_id = linha
+
+    info = conexao.execute(f"PRAGMA table_info({_aspas(camada)})").fetchall()
+    colunas = [coluna[1] for coluna in info]
+    chave = next((coluna[1] for coluna in info if coluna[5] == 1), "rowid")
+
+    srs = conexao.execute(
+        "SELECT organization, organization_coordsys_id, definition "
+        "FROM gpkg_spatial_ref_sys WHERE srs_id = ?", (srs_id,)
+    ).fetchone()
+    crs = None
+    if srs is not None and srs_id > 0:
+        organizacao, codigo, definicao = srs
+        crs = f"{organizacao.upper()}:{codigo}" if organizacao and organizacao.upper() == "EPSG" else definicao
+
+    rtree = f"rtree_{camada}_{coluna_geometria}"
+    tem_rtree = conexao.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (rtree,)
+    ).fetchone() is not None
+    return {
+        "camada": camada,
+        "coluna_geometria": coluna_geometria,
+        "chave": chave,
+        "colunas": colunas,
+        "crs": crs,
+        "rtree": rtree if tem_rtree else None,
+    }
+
+
+def contar_gpkg(caminho, coluna, camada=None):
+    """Número de feições por valor de `coluna`, sem ler as geometrias."""
+    with obter_pool(caminho).conexao() as conexao:
+        camada_info = _descrever_camada(conexao, camada)
+        if coluna not in camada_info["colunas"]:
+            raise KeyError(f"Coluna inexistente na camada {camada_info['camada']!r}: {coluna}")
+        linhas = conexao.execute(
+            f"SELECT {_aspas(coluna)}, COUNT(*) FROM {_aspas(camada_info['camada'])} "
+            f"GROUP BY {_aspas(coluna)} ORDER BY {_aspas(coluna)}"
+        ).fetchall()
+    return {valor: int(total) for valor, total in linhas}
+
+
+def ler_gpkg(caminho, camada=None, bbox=None, ufs=None, faixas=None, onde=None,
+             parametros=(), colunas=None, geometria=True):
+    """Ler uma camada de GeoPackage com os filtros aplicados no SQLite.
+
+    Args:
+        caminho: Arquivo .gpkg
+        camada: Nome da camada (padrão: a primeira camada vetorial)
+        bbox: (minx, miny, maxx, maxy) no CRS da camada; usa o índice R-tree
+        ufs: UFs desejadas (filtro em `SIGLA_UF`)
+        faixas: {coluna: (mínimo, máximo)}, filtro inclusivo por coluna
+        onde: Cláusula SQL adicional (com `?` para os `parametros`)
+        parametros: Valores para os `?` de `onde`
+        colunas: Colunas de atributos desejadas (padrão: todas)
+        geometria: Se False, a coluna de geometria não é lida (a menos que
+            `bbox` exija o refinamento) e o resultado é um DataFrame
+
+    Returns:
+        GeoDataFrame com as feições selecionadas.
+    """
+    with obter_pool(caminho).conexao() as conexao:
+        camada_info = _descrever_camada(conexao, camada)
+        existentes = set(camada_info["colunas"])
+        coluna_geometria = camada_info["coluna_geometria"]
+        chave = camada_info["chave"]
+        ler_geometria = geometria or bbox is not None
+
+        if colunas is None:
+            colunas = [c for c in camada_info["colunas"] if c not in (coluna_geometria, chave)]
+        desconhecidas = [c for c in [*colunas, *(faixas or {})] if c not in existentes]
+        if desconhecidas:
+            raise KeyError(f"Colunas inexistentes na camada {camada_info['camada']!r}: {desconhecidas}")
+
+        lidas = [*colunas, coluna_geometria] if ler_geometria else colunas
+        selecao = ", ".join(f"t.{_aspas(c)}" for c in lidas)
+        sql = [f"SELECT {selecao} FROM {_aspas(camada_info['camada'])} AS t"]
+        condicoes, valores = [], []
+
+        if bbox is not None and camada_info["rtree"] is not None:
+            minx, miny, maxx, maxy = bbox
+            condicoes.append(
+                f"t.{_aspas(chave)} IN (SELECT id FROM {_aspas(camada_info['rtree'])} "
+                "WHERE minx <= ? AND maxx >= ? AND miny <= ? AND maxy >= ?)"
+            )
+            valores.extend([maxx, minx, maxy, miny])
+        if ufs is not None:
+            ufs = list(ufs)
+            condicoes.append(f"t.\"SIGLA_UF\" IN ({', '.join('?' * len(ufs))})" if ufs else "0")
+            valores.extend(ufs)
+        for coluna, (minimo, maximo) in (faixas or {}).items():
+            condicoes.append(f"t.{_aspas(coluna)} BETWEEN ? AND ?")
+            valores.extend([minimo, maximo])
+        if onde:
+            condicoes.append(f"({onde})")
+            valores.extend(parametros)
+        if condicoes:
+            sql.append("WHERE " + " AND ".join(condicoes))
+        sql.append(f"ORDER BY t.{_aspas(chave)}")
+
+        df = pd.read_sql_query(" ".join(sql), conexao, params=valores)
+
+    if not ler_geometria:
+        return df
+    geometrias = shapely.from_wkb([wkb_de_gpkg(blob) for blob in df.pop(coluna_geometria)])
+    gdf = gpd.GeoDataFrame(df, geometry=geometrias, crs=camada_info["crs"])
+    if bbox is not None:
+        # O R-tree compara envelopes (em float32); o refinamento é exato
+        gdf = gdf[shapely.intersects(gdf.geometry.to_numpy(), shapely.box(*bbox))]
+        gdf = gdf.reset_index(drop=True)
+    return gdf if geometria else pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
@@ -0,0 +1,87 @@
+"""Precificação por faixas de pontuação (tabela de Rendimento e Preço INCRA)."""
+
+import numpy as np
+
+# Limite superior (inclusivo) de cada faixa de pontuação
+FAIXAS_PONTUACAO = np.array([15, 25, 35, 45, 55], dtype=float)
+
+# Preço por hectare de cada faixa; o último vale para pontuações acima de 55
+PRECOS_HA = np.array([49.83, 59.80, 104.78, 134.88, 164.95, 202.87])
+
+COLUNAS_TRIMESTRES = ['nota_total_q1', 'nota_total_q2', 'nota_total_q3', 'nota_total_q4']
+
+# Notas de critério somadas em todos os totais trimestrais (além de `nota_p_q<n>`)
+COLUNAS_CRITERIOS = ['nota_veg', 'nota_area', 'nota_relevo', 'nota_acesso', 'nota_insalub_2']
+
+
+def calcular_valor_por_nota(pontuacao, area):
+    """Calcula valor baseado na pontuação e área."""
+    if pontuacao <= 15:
+        return area * 49.83
+    elif pontuacao <= 25:
+        return area * 59.80
+    elif pontuacao <= 35:
+        return area * 104.78
+    elif pontuacao <= 45:
+        return area * 134.88
+    elif pontuacao <= 55:
+        return area * 164.95
+    else:
+        return area * 202.87
+
+
+def faixa_por_nota(pontuacao):
+    """Índice da faixa de preço de cada pontuação (vetorizado)."""
+    return np.searchsorted(FAIXAS_PONTUACAO, np.asarray(pontuacao, dtype=float), side='left')
+
+
+def valor_por_nota(pontuacao, area):
+    """Versão vetorizada de `calcular_valor_por_nota` para arrays/Series."""
+    return np.asarray(area, dtype=float) * PRECOS_HA[faixa_por_nota(pontuacao)]
+
+
+def calcular_totais_trimestrais(gdf):
+    """Calcular o valor total de cada trimestre para os municípios informados.
+
+    Returns:
+        Lista com os totais (R$) dos trimestres 1 a 4.
+    """
+    area = np.asarray(gdf['area_georef'], dtype=float)
+    return [
+        float(valor_por_nota(np.asarray(gdf[coluna], dtype=float), area).sum())
+        for coluna in COLUNAS_TRIMESTRES
+    ]
+
+
+def substituir_notas(gdf, notas):
+    """Trocar notas de critério e recalcular os totais trimestrais, a média e o valor.
+
+    Args:
+        gdf: Base municipal (não é alterada)
+        notas: `{coluna: valores}`; `nota_p_q<n>` entra só no total do
+            trimestre `n`, as de `COLUNAS_CRITERIOS` nos quatro totais e as
+            demais (ex.: `nota_insalub`) em nenhum
+
+    Returns:
+        Cópia de `gdf` com as notas novas e `nota_total_q*`, `nota_media` e
+        `valor_mun_area` recalculados (quando as colunas existem).
+    """
+    gdf = gdf.copy()
+    for coluna, valores in notas.items():
+        valores = np.asarray(valores, dtype=float)
+        if coluna.startswith("nota_p_q"):
+            totais = [f"nota_total_q{coluna[-1]}"]
+        else:
+            totais = COLUNAS_TRIMESTRES if coluna in COLUNAS_CRITERIOS else []
+        if coluna in gdf.columns:
+            # O total é a soma das notas de critério: troca-se só a parcela desta
+            diferenca = valores - gdf[coluna].to_numpy(dtype=float)
+            for total in totais:
+                if total in gdf.columns:
+                    gdf[total] = gdf[total] + diferenca
+        gdf[coluna] = valores
+    if all(coluna in gdf.columns for coluna in COLUNAS_TRIMESTRES):
+        gdf["nota_media"] = gdf[COLUNAS_TRIMESTRES].mean(axis=1)
+        if "area_georef" in gdf.columns:
+            gdf["valor_mun_area"] = valor_por_nota(gdf["nota_media"], gdf["area_georef"])
+    return gdf
@@ -0,0 +1,213 @@
+"""Precificação em lote, sem o dashboard.
+
+Calcula, para cada município, os indicadores derivados registrados em
+`mda_app.core.colunas_derivadas` e o preço de cada trimestre (tabela de
+Rendimento e Preço INCRA), gravando o resultado em Parquet e CSV:
+
+    <saida>/parquet/SIGLA_UF=<UF>/parte-0.parquet
+    <saida>/csv/precificacao_<UF>.csv
+    <saida>/resumo.csv
+
+Cada UF é uma partição processada por um processo de um pool: o processo lê só
+a sua UF, grava as saídas e devolve apenas um resumo com os totais. Partições
+são despachadas enquanto a memória estimada das que estão em processamento
+couber no orçamento (`memoria_mb`), de modo que uma execução nacional não
+precisa manter a base inteira em memória.
+
+Uso (ver `precificar.py` na raiz do projeto):
+
+    python precificar.py data/raw/precificacao_al_ii.geojson saida/ --ufs AL SE --processos 4
+"""
+
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from mda_app.config.settings import PATHS
+from mda_app.core.acervo_safras import ARQUIVO_CATALOGO, AcervoSafras
+from mda_app.core.colunas_derivadas import COLUNAS_DERIVADAS, anexar_colunas, aplicar_correcoes
+from mda_app.core.fontes_dados import obter_fonte
+from mda_app.core.precificacao import COLUNAS_TRIMESTRES, faixa_por_nota, valor_por_nota
+from mda_app.utils.importacao import modulo_tardio
+
+pa = modulo_tardio("pyarrow")
+pq = modulo_tardio("pyarrow.parquet")
+pd = modulo_tardio("pandas")
+
+FORMATOS = ("parquet", "csv")
+
+# Memória estimada por município carregado (só atributos, a geometria não é
+# lida, e cópias intermediárias); usada só para decidir quantas UFs processar
+# ao mesmo tempo
+BYTES_POR_LINHA = 16 * 1024
+
+# Linhas por grupo de linhas do Parquet
+LINHAS_POR_GRUPO = 10_000
+
+
+def _eh_acervo(origem):
+    return os.path.isfile(os.path.join(str(origem), ARQUIVO_CATALOGO))
+
+
+def contar_por_uf(origem, safra=None):
+    """Municípios por UF na origem (base, banco ou acervo de safras)."""
+    if _eh_acervo(origem):
+        return AcervoSafras(origem).contar_por_uf(safra)
+    return obter_fonte(origem).contar_por_uf()
+
+
+def ler_particao(origem, uf, safra=None):
+    """Atributos dos municípios de uma UF (sem geometria).
+
+    O filtro de UF vai para a leitura (OGR, SQLite/GeoPackage, banco ou
+    memory-map da base colunar) e a coluna de geometria não é lida: cada
+    processo só tem em memória os atributos da sua partição.
+    """
+    if _eh_acervo(origem):
+        return AcervoSafras(origem).abrir(safra, ufs=[uf], geometria=False)
+    return pd.DataFrame(obter_fonte(origem).carregar(ufs=(uf,), geometria=False))
+
+
+def _calculavel(nome, colunas):
+    """Se a coluna derivada `nome` pode ser calculada a partir de `colunas`."""
+    return all(
+        entrada in colunas or (entrada in COLUNAS_DERIVADAS and _calculavel(entrada, colunas))
+        for entrada in COLUNAS_DERIVADAS[nome].entradas
+    )
+
+
+def precificar_particao(df):
+    """Indicadores derivados e preços trimestrais de cada município.
+
+    Acrescenta as colunas derivadas cujas entradas existem em `df` e, por
+    trimestre, `faixa_q<n>` (1 a 6, faixa da tabela de preços) e `valor_q<n>`
+    (R$, nota total do trimestre aplicada à área georreferenciável).
+    """
+    df = aplicar_correcoes(df.copy())
+    df = anexar_colunas(df, [nome for nome in COLUNAS_DERIVADAS if _calculavel(nome, df.columns)])
+
+    area = df["area_georef"].to_numpy(dtype=float)
+    precos = {}
+    for trimestre, coluna in enumerate(COLUNAS_TRIMESTRES, start=1):
+        notas = df[coluna].to_numpy(dtype=float)
+        precos[f"faixa_q{trimestre}"] = faixa_por_nota(notas) + 1
+        precos[f"valor_q{trimestre}"] = valor_por_nota(notas, area)
+    return df.assign(**precos)
+
+
+def _gravar_particao(df, uf, saida, formatos):
+    if "parquet" in formatos:
+        arquivo = os.path.join(saida, "parquet", f"SIGLA_UF={uf}", "parte-0.parquet")
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+        tabela = pa.Table.from_pandas(df.drop(columns="SIGLA_UF", errors="ignore"), preserve_index=False)
+        pq.write_table(tabela, arquivo, row_group_size=LINHAS_POR_GRUPO)
+    if "csv" in formatos:
+        arquivo = os.path.join(saida, "csv", f"precificacao_{uf}.csv")
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+        df.to_csv(arquivo, index=False)
+
+
+def processar_uf(origem, uf, saida, formatos=FORMATOS, safra=None):
+    """Ler, precificar e gravar uma UF; devolve só o resumo da partição."""
+    df = precificar_particao(ler_particao(origem, uf, safra))
+    _gravar_particao(df, uf, saida, formatos)
+    resumo = {"SIGLA_UF": uf, "municipios": len(df), "area_georef": float(df["area_georef"].sum())}
+    for trimestre in range(1, len(COLUNAS_TRIMESTRES) + 1):
+        resumo[f"valor_q{trimestre}"] = float(df[f"valor_q{trimestre}"].sum())
+    return resumo
+
+
+def precificar_lote(origem, saida, ufs=None, processos=None, memoria_mb=2048, formatos=FORMATOS,
+                    safra=None):
+    """Precificar as UFs de `origem` em paralelo, gravando as saídas em `saida`.
+
+    Args:
+        origem: Base (arquivo, base colunar, banco SQL) ou acervo de safras
+        saida: Diretório de saída
+        ufs: UFs a processar (padrão: todas)
+        processos: Processos do pool (padrão: número de CPUs); 1 processa
+            tudo no processo atual
+        memoria_mb: Orçamento de memória para as partições em processamento
+        formatos: Formatos gravados ("parquet" e/ou "csv")
+        safra: Safra do acervo (padrão: a mais recente)
+
+    Returns:
+        DataFrame com o resumo por UF (também gravado em `<saida>/resumo.csv`).
+    """
+    desconhecidos = [formato for formato in formatos if formato not in FORMATOS]
+    if desconhecidos:
+        raise ValueError(f"Formatos não suportados: {desconhecidos} (use {', '.join(FORMATOS)}).")
+    contagem = contar_por_uf(origem, safra)
+    if ufs is not None:
+        ausentes = [uf for uf in ufs if uf not in contagem]
+        if ausentes:
+            raise KeyError(f"UFs ausentes na origem: {ausentes}")
+        contagem = {uf: contagem[uf] for uf in ufs}
+    if not contagem:
+        raise ValueError("Nenhuma UF para processar.")
+    os.makedirs(saida, exist_ok=True)
+
+    # Maiores partições primeiro, para que a última a terminar seja pequena
+    pendentes = sorted(contagem, key=contagem.get, reverse=True)
+    processos = processos or os.cpu_count() or 1
+    if processos == 1 or len(pendentes) == 1:
+        resumos = [processar_uf(origem, uf, saida, formatos, safra) for uf in pendentes]
+    else:
+        resumos = _processar_em_pool(origem, saida, pendentes, contagem, processos,
+                                     memoria_mb * 1024 * 1024, formatos, safra)
+
+    resumo = pd.DataFrame(resumos).sort_values("SIGLA_UF").reset_index(drop=True)
+    resumo.to_csv(os.path.join(saida, "resumo.csv"), index=False)
+    return resumo
+
+
+def _processar_em_pool(origem, saida, pendentes, contagem, processos, orcamento, formatos, safra):
+    resumos = []
+    em_andamento = {}
+    # "spawn": os processos não herdam conexões SQLite/pools abertos no processo atual
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(processos, len(pendentes)), mp_context=contexto) as pool:
+        while pendentes or em_andamento:
+            # Despacha enquanto couber no orçamento; uma partição maior que o
+            # orçamento inteiro roda sozinha
+            while pendentes and len(em_andamento) < processos:
+                estimativa = contagem[pendentes[0]] * BYTES_POR_LINHA
+                em_uso = sum(em_andamento.values())
+                if em_andamento and em_uso + estimativa > orcamento:
+                    break
+                uf = pendentes.pop(0)
+                futuro = pool.submit(processar_uf, origem, uf, saida, formatos, safra)
+                em_andamento[futuro] = estimativa
+            concluidos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                del em_andamento[futuro]
+                resumos.append(futuro.result())
+    return resumos
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Precificação em lote por UF, sem o dashboard.")
+    parser.add_argument("origem", nargs="?", default=PATHS["dataset"],
+                        help="Base, banco (postgresql://, sqlite:///) ou acervo de safras")
+    parser.add_argument("saida", nargs="?", default=os.path.join(PATHS["data_processed"], "precificacao"),
+                        help="Diretório de saída")
+    parser.add_argument("--ufs", nargs="+", help="UFs a processar (padrão: todas)")
+    parser.add_argument("--processos", type=int, help="Processos do pool (padrão: número de CPUs)")
+    parser.add_argument("--memoria-mb", type=int, default=2048,
+                        help="Orçamento de memória para as partições em processamento")
+    parser.add_argument("--formatos", nargs="+", default=list(FORMATOS), choices=FORMATOS)
+    parser.add_argument("--safra", help="Safra do acervo (padrão: a mais recente)")
+    args = parser.parse_args(argumentos)
+
+    resumo = precificar_lote(args.origem, args.saida, ufs=args.ufs, processos=args.processos,
+                             memoria_mb=args.memoria_mb, formatos=args.formatos, safra=args.safra)
+    totais = resumo[[f"valor_q{q}" for q in range(1, len(COLUNAS_TRIMESTRES) + 1)]].sum()
+    print(resumo.to_string(index=False))
+    print(f"{int(resumo['municipios'].sum())} municípios em {len(resumo)} UFs; "
+          f"totais por trimestre (R$): {', '.join(f'{v:,.2f}' for v in totais)}")
+    return resumo
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Preparação da base como o dashboard a usa (EPSG:4326 e correções).
+
+Sem dependência do Streamlit: o app (`mda_app.core.data_loader`), a API e os
+instantâneos estáticos preparam a base pelas mesmas funções, e por isso
+mostram os mesmos números.
+"""
+
+from mda_app.config.settings import PATHS
+from mda_app.core.base_colunar import reprojetar
+from mda_app.core.colunas_derivadas import aplicar_correcoes
+from mda_app.core.fontes_dados import obter_fonte
+
+
+def processar_dados_geograficos(gdf):
+    """Processar dados geográficos."""
+    gdf = reprojetar(gdf, 4326)
+    return aplicar_correcoes(gdf)
+
+
+def carregar_base_preparada(caminho=None):
+    """Carregar e preparar a base como o dashboard (EPSG:4326 e correções).
+
+    Fora do Streamlit (sem os caches do app); `attrs["versao"]` recebe a
+    versão da fonte (ver `FonteDados.versao`).
+    """
+    caminho = caminho or PATHS["dataset"]
+    fonte = obter_fonte(caminho)
+    gdf = processar_dados_geograficos(fonte.carregar())
+    gdf.attrs["versao"] = fonte.versao()
+    return gdf
@@ -0,0 +1,344 @@
+"""Relatórios por município para impressão (HTML).
+
+Cada relatório reproduz a visão de município único do dashboard: os quatro
+cards, o gráfico do grau de dificuldade por trimestre e o medidor de área
+georreferenciável, além do valor estimado em cada trimestre. Os gráficos são
+SVG estáticos gerados aqui mesmo, sem navegador nem JavaScript, e o HTML tem
+estilo de impressão em A4 (um relatório por página ao imprimir em PDF).
+
+A renderização roda em um pool de processos, que recebe só os atributos
+necessários de cada município. Recursos comuns a todos os relatórios são
+gravados uma única vez em `<saida>/recursos/` (logo de `APP_CONFIG["logo_path"]`
+e folha de estilo) e referenciados por cada página; as partes fixas dos gráficos
+são montadas uma vez por processo.
+
+Uso:
+
+    python -m mda_app.core.relatorios data/raw/precificacao_al_ii.geojson \
+        relatorios/ --ufs AL
+"""
+
+import argparse
+import html
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from mda_app.components.visualizations import CORES_GAUGE, CORES_TRIMESTRES, TRIMESTRES
+from mda_app.config.settings import APP_CONFIG, COLORS, PATHS
+from mda_app.core.fontes_dados import obter_fonte
+from mda_app.core.indicadores import cartoes_selecao, resumir_selecao
+from mda_app.core.precificacao import COLUNAS_TRIMESTRES, valor_por_nota
+from mda_app.utils.formatters import numero_br, reais
+from mda_app.utils.recursos import gravar_recursos
+
+# Atributos usados pelo relatório (os ausentes na base são ignorados)
+COLUNAS_RELATORIO = [
+    "CD_MUN",
+    "NM_MUN",
+    "mun_nome",
+    "SIGLA_UF",
+    "area_georef",
+    "area_car_total",
+    "area_car_media",
+    "valor_mun_area",
+    "percent_area_georef",
+    "nota_media",
+    *COLUNAS_TRIMESTRES,
+]
+
+ESTILO = """
+body { font-family: "Segoe UI", Arial, sans-serif; color: #222; margin: 0; }
+.pagina { width: 190mm; margin: 0 auto; padding: 10mm 0; page-break-after: always; }
+.cabecalho { display: flex; align-items: center; gap: 16px;
+             border-bottom: 3px solid %(primaria)s; }
+.cabecalho img { width: 160px; }
+h1 { color: %(primaria)s; font-size: 22px; margin: 8px 0; }
+h2 { color: %(secundaria)s; font-size: 16px; margin: 18px 0 6px; }
+.cards { display: grid; grid-template-columns: repeat(4, 1fr); gap: 8px;
+         margin-top: 12px; }
+.card { border: 1px solid #ddd; border-radius: 6px; padding: 8px; }
+.card span { display: block; font-size: 11px; color: #666; }
+.card strong { font-size: 17px; }
+.graficos { display: grid; grid-template-columns: 3fr 2fr; gap: 12px; }
+table { border-collapse: collapse; width: 100%%; font-size: 13px; }
+td, th { border-bottom: 1px solid #ddd; padding: 4px 6px; text-align: right; }
+td:first-child, th:first-child { text-align: left; }
+@page { size: A4; margin: 0; }
+""" % {
+    "primaria": COLORS["primary"],
+    "secundaria": COLORS["secondary"],
+}
+
+# Relatórios mínimos por processo: abaixo disso, iniciar processos custa mais
+# do que renderizar (cada relatório leva algumas centenas de microssegundos)
+RELATORIOS_POR_PROCESSO = 2000
+
+
+def grafico_trimestral_svg(valores, largura=420, altura=240):
+    """Barras do grau de dificuldade por trimestre, em SVG."""
+    valores = [float(v) for v in valores]
+    topo = max(valores) * 1.15 or 1
+    margem, base = 20, altura - 30
+    passo = (largura - 2 * margem) / len(valores)
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{largura}" height="{altura}" '
+        f'viewBox="0 0 {largura} {altura}" font-size="12">'
+    ]
+    for i, (valor, cor, rotulo) in enumerate(
+        zip(valores, CORES_TRIMESTRES, TRIMESTRES)
+    ):
+        altura_barra = (base - 20) * valor / topo
+        x = margem + i * passo + passo * 0.15
+        partes.append(
+            f'<rect x="{x:.1f}" y="{base - altura_barra:.1f}" '
+            f'width="{passo * 0.7:.1f}" height="{altura_barra:.1f}" fill="{cor}"/>'
+        )
+        centro = x + passo * 0.35
+        partes.append(
+            f'<text x="{centro:.1f}" y="{base - altura_barra - 4:.1f}" '
+            f'text-anchor="middle">{numero_br(valor)}</text>'
+        )
+        partes.append(
+            f'<text x="{centro:.1f}" y="{base + 18}" '
+            f'text-anchor="middle">{rotulo}</text>'
+        )
+    partes.append(
+        f'<line x1="{margem}" y1="{base}" x2="{largura - margem}" y2="{base}" '
+        'stroke="#999"/>'
+    )
+    partes.append("</svg>")
+    return "".join(partes)
+
+
+def _ponto_arco(cx, cy, raio, percentual):
+    angulo = math.pi * (1 - percentual / 100)
+    return cx + raio * math.cos(angulo), cy - raio * math.sin(angulo)
+
+
+def _geometria_medidor(largura, altura):
+    return largura / 2, altura - 30, largura / 2 - 20, 28
+
+
+@lru_cache(maxsize=None)
+def _faixas_medidor(largura, altura):
+    """Arcos coloridos do medidor: iguais em todos os relatórios."""
+    cx, cy, raio, espessura = _geometria_medidor(largura, altura)
+    passo = 100 / len(CORES_GAUGE)
+    partes = []
+    for i, cor in enumerate(CORES_GAUGE):
+        x1, y1 = _ponto_arco(cx, cy, raio, i * passo)
+        x2, y2 = _ponto_arco(cx, cy, raio, (i + 1) * passo)
+        partes.append(
+            f'<path d="M {x1:.2f} {y1:.2f} A {raio} {raio} 0 0 1 {x2:.2f} {y2:.2f}" '
+            f'stroke="{cor}" stroke-width="{espessura}" fill="none"/>'
+        )
+    return "".join(partes)
+
+
+def medidor_svg(percentual, largura=260, altura=160):
+    """Medidor semicircular do percentual de área georreferenciável, em SVG."""
+    percentual = min(max(float(percentual), 0.0), 100.0)
+    cx, cy, raio, espessura = _geometria_medidor(largura, altura)
+    partes = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{largura}" height="{altura}" '
+        f'viewBox="0 0 {largura} {altura}">',
+        _faixas_medidor(largura, altura),
+    ]
+    x_int, y_int = _ponto_arco(cx, cy, raio - espessura / 2 - 2, percentual)
+    x_ext, y_ext = _ponto_arco(cx, cy, raio + espessura / 2 + 2, percentual)
+    partes.append(
+        f'<line x1="{x_int:.2f}" y1="{y_int:.2f}" x2="{x_ext:.2f}" y2="{y_ext:.2f}" '
+        f'stroke="darkblue" stroke-width="4"/>'
+    )
+    partes.append(
+        f'<text x="{cx}" y="{cy + 2}" text-anchor="middle" font-size="30">'
+        f"{numero_br(percentual, 1)}%</text>"
+    )
+    partes.append("</svg>")
+    return "".join(partes)
+
+
+def _card(rotulo, valor):
+    return (
+        f'<div class="card"><span>{html.escape(rotulo)}</span>'
+        f"<strong>{html.escape(valor)}</strong></div>"
+    )
+
+
+def renderizar_relatorio(municipio, recursos=None):
+    """HTML do relatório de um município.
+
+    Args:
+        municipio: Dicionário com os atributos de `COLUNAS_RELATORIO`
+        recursos: Endereços da folha de estilo e do logo, relativos à página
+            (ver `mda_app.utils.recursos.gravar_recursos`); sem eles, o estilo
+            vai embutido e a página fica sem logo
+    """
+    nome = municipio.get("mun_nome") or municipio.get("NM_MUN", "")
+    area = float(municipio.get("area_georef") or 0)
+
+    # Os mesmos cards do dashboard com um único município selecionado
+    resumo = resumir_selecao({coluna: [valor] for coluna, valor in municipio.items()})
+    cards = [_card(rotulo, valor) for rotulo, valor in cartoes_selecao(resumo)]
+
+    notas = [float(municipio.get(coluna) or 0) for coluna in COLUNAS_TRIMESTRES]
+    valores = resumo.get("valores_trimestrais") or [
+        float(valor_por_nota(nota, area)) for nota in notas
+    ]
+    linhas_valores = "".join(
+        f"<tr><td>{rotulo}</td><td>{numero_br(nota)}</td><td>{reais(valor)}</td></tr>"
+        for rotulo, nota, valor in zip(TRIMESTRES, notas, valores)
+    )
+    logo = (
+        f'<img src="{recursos["logo"]}" alt="logo">'
+        if recursos and recursos["logo"]
+        else ""
+    )
+    estilo = (
+        f'<link rel="stylesheet" href="{recursos["estilo"]}">'
+        if recursos
+        else f"<style>{ESTILO}</style>"
+    )
+    titulo = (
+        f"{html.escape(str(nome))} - {html.escape(str(municipio.get('SIGLA_UF', '')))}"
+    )
+    subtitulo = (
+        f"{html.escape(APP_CONFIG['page_title'])} · "
+        f"Código IBGE {html.escape(str(municipio.get('CD_MUN', '')))}"
+    )
+    medidor = medidor_svg(municipio.get("percent_area_georef") or 0)
+    cabecalho_tabela = (
+        "<tr><th>Trimestre</th><th>Grau de dificuldade</th><th>Valor</th></tr>"
+    )
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8"><title>{titulo}</title>
+{estilo}</head>
+<body><div class="pagina">
+<div class="cabecalho">{logo}<div><h1>{titulo}</h1>
+<div>{subtitulo}</div></div></div>
+<div class="cards">{"".join(cards)}</div>
+<div class="graficos">
+<div><h2>Grau de Dificuldade por Trimestre</h2>{grafico_trimestral_svg(notas)}</div>
+<div><h2>Percentual de Área Georreferenciável</h2>{medidor}</div>
+</div>
+<h2>Valor estimado por trimestre</h2>
+<table>{cabecalho_tabela}{linhas_valores}</table>
+</div></body></html>
+"""
+
+
+def _arquivo_relatorio(diretorio, municipio, posicao):
+    identificador = municipio.get("CD_MUN") or posicao
+    return os.path.join(
+        diretorio, str(municipio.get("SIGLA_UF", "")), f"{identificador}.html"
+    )
+
+
+def _gravar_relatorio(tarefa):
+    municipio, caminho, recursos = tarefa
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write(renderizar_relatorio(municipio, recursos))
+    return caminho
+
+
+def _indice(caminhos, municipios, diretorio):
+    itens = "".join(
+        f'<li><a href="{html.escape(os.path.relpath(caminho, diretorio))}">'
+        f'{html.escape(str(m.get("mun_nome") or m.get("NM_MUN", "")))} - '
+        f'{html.escape(str(m.get("SIGLA_UF", "")))}</a></li>'
+        for caminho, m in zip(caminhos, municipios)
+    )
+    return (
+        '<!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8">'
+        "<title>Relatórios</title></head>"
+        f"<body><h1>Relatórios por município ({len(caminhos)})</h1>"
+        f"<ul>{itens}</ul></body></html>"
+    )
+
+
+def gerar_relatorios(
+    gdf, diretorio, ufs=None, municipios=None, processos=None, caminho_logo=None
+):
+    """Gerar um relatório HTML por município, em paralelo.
+
+    Args:
+        gdf: Base (ou seleção já filtrada)
+        diretorio: Diretório de saída (`<UF>/<CD_MUN>.html` e `index.html`)
+        ufs: Restringir a estas UFs
+        municipios: Restringir a estes nomes de município
+        processos: Processos do pool (padrão: número de CPUs); 1 gera tudo
+            no processo atual
+        caminho_logo: Logo do cabeçalho (padrão: `APP_CONFIG["logo_path"]`)
+
+    Returns:
+        Lista com os caminhos dos relatórios gerados.
+    """
+    selecao = gdf
+    if ufs is not None:
+        selecao = selecao[selecao["SIGLA_UF"].isin(list(ufs))]
+    if municipios is not None:
+        coluna_nome = "mun_nome" if "mun_nome" in selecao.columns else "NM_MUN"
+        selecao = selecao[selecao[coluna_nome].isin(list(municipios))]
+
+    # Só os atributos do relatório atravessam a fronteira entre processos
+    colunas = [c for c in COLUNAS_RELATORIO if c in selecao.columns]
+    registros = [
+        {
+            chave: valor for chave, valor in registro.items() if valor == valor
+        }  # descarta NaN
+        for registro in selecao[colunas].to_dict("records")
+    ]
+    caminhos = [_arquivo_relatorio(diretorio, m, i) for i, m in enumerate(registros)]
+    for pasta in {os.path.dirname(caminho) for caminho in caminhos} | {str(diretorio)}:
+        os.makedirs(pasta, exist_ok=True)
+
+    # Relatórios ficam em <diretorio>/<UF>/: recursos um nível acima
+    recursos = {
+        chave: None if valor is None else f"../{valor}"
+        for chave, valor in gravar_recursos(
+            diretorio, {"estilo": ("relatorio.css", ESTILO)}, caminho_logo
+        ).items()
+    }
+    tarefas = [
+        (registro, caminho, recursos) for registro, caminho in zip(registros, caminhos)
+    ]
+    processos = min(
+        processos or os.cpu_count() or 1, -(-len(tarefas) // RELATORIOS_POR_PROCESSO)
+    )
+    if processos <= 1:
+        gerados = [_gravar_relatorio(tarefa) for tarefa in tarefas]
+    else:
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as pool:
+            lote = max(1, len(tarefas) // (processos * 4))
+            gerados = list(pool.map(_gravar_relatorio, tarefas, chunksize=lote))
+
+    with open(os.path.join(diretorio, "index.html"), "w", encoding="utf-8") as arquivo:
+        arquivo.write(_indice(gerados, registros, diretorio))
+    return gerados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gerar relatórios HTML por município.")
+    parser.add_argument(
+        "origem", nargs="?", default=PATHS["dataset"], help="Base a ler"
+    )
+    parser.add_argument(
+        "saida", nargs="?", default="relatorios", help="Diretório de saída"
+    )
+    parser.add_argument("--ufs", nargs="+", help="UFs a incluir (padrão: todas)")
+    parser.add_argument(
+        "--municipios", nargs="+", help="Municípios a incluir (padrão: todos)"
+    )
+    parser.add_argument(
+        "--processos", type=int, help="Processos do pool (padrão: número de CPUs)"
+    )
+    args = parser.parse_args()
+    base = obter_fonte(args.origem).carregar(ufs=args.ufs)
+    gerados = gerar_relatorios(
+        base, args.saida, municipios=args.municipios, processos=args.processos
+    )
+    print(f"{len(gerados)} relatórios em {args.saida}")
@@ -0,0 +1,250 @@
+"""Sensibilidade dos preços à incerteza das notas (Monte Carlo).
+
+O preço por hectare muda em degraus nas faixas de pontuação (15, 25, 35, 45 e
+55): um município perto de um limite pode passar de R$ 104,78 para R$ 134,88
+por hectare com uma pequena variação de nota. A simulação soma ruído gaussiano
+às notas e reprecifica todos os municípios em cada sorteio:
+
+- cada nota de critério (`COLUNAS_CRITERIOS`) recebe um ruído independente,
+  comum aos quatro trimestres; como a soma de gaussianas independentes é
+  gaussiana, sorteia-se direto o ruído do total, com desvio
+  `sqrt(soma dos desvios ao quadrado)`;
+- cada nota de clima (`nota_p_q<n>`) recebe o seu ruído, só no trimestre `n`.
+
+Os sorteios são processados em lotes vetorizados (matrizes sorteios x
+municípios) e divididos em blocos de `SORTEIOS_POR_BLOCO`, cada um com a sua
+semente derivada da semente principal: o resultado não depende de quantos
+processos participam. Como o preço por hectare só assume os valores da tabela,
+a distribuição do valor de cada município é guardada como a contagem de
+sorteios por faixa.
+
+Os resultados ficam memorizados pela versão da base, pela seleção de
+municípios e pelos parâmetros.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mda_app.core.precificacao import (
+    COLUNAS_CRITERIOS,
+    COLUNAS_TRIMESTRES,
+    FAIXAS_PONTUACAO,
+    PRECOS_HA,
+    faixa_por_nota,
+    valor_por_nota,
+)
+from mda_app.utils.importacao import modulo_tardio
+
+pd = modulo_tardio("pandas")
+
+COLUNAS_CLIMA = [f"nota_p_q{q}" for q in range(1, 5)]
+# Desvio-padrão do ruído de cada nota (notas de critério de 1 a 10, de clima de 0 a 20)
+DESVIOS_PADRAO = {**{c: 0.5 for c in COLUNAS_CRITERIOS}, **{c: 1.0 for c in COLUNAS_CLIMA}}
+SORTEIOS = 2000
+SEMENTE = 2024
+SORTEIOS_POR_BLOCO = 250
+# Elementos (sorteios x municípios x trimestres) por lote vetorizado
+ELEMENTOS_POR_LOTE = 4_000_000
+# Sorteios x municípios mínimos por processo: abaixo disso, iniciar processos custa mais do que simular
+ELEMENTOS_POR_PROCESSO = 5_000_000
+PERCENTIS = (5, 50, 95)
+COLUNAS_VALORES = ["valor_mun_area", "valor_q1", "valor_q2", "valor_q3", "valor_q4"]
+RESULTADOS_MEMORIZADOS = 8
+
+_memo = OrderedDict()
+_trava = threading.Lock()
+
+
+def desvios_do_total(desvios):
+    """Desvio do ruído comum aos trimestres e desvios do ruído de cada trimestre."""
+    desconhecidas = set(desvios) - set(COLUNAS_CRITERIOS) - set(COLUNAS_CLIMA)
+    if desconhecidas:
+        raise ValueError(f"Notas sem ruído definido: {', '.join(sorted(desconhecidas))}.")
+    comum = float(np.sqrt(sum(desvios.get(c, 0.0) ** 2 for c in COLUNAS_CRITERIOS)))
+    return comum, np.array([desvios.get(c, 0.0) for c in COLUNAS_CLIMA], dtype=float)
+
+
+def simular_bloco(trimestres, media, area, comum, clima, sorteios, semente):
+    """Simular `sorteios` sorteios de um bloco.
+
+    Args:
+        trimestres: Notas totais (municípios x 4)
+        media: Nota média de cada município
+        area: Área georreferenciável de cada município
+        comum: Desvio do ruído comum aos trimestres
+        clima: Desvios do ruído de cada trimestre (4)
+        semente: Semente (ou `SeedSequence`) do bloco
+
+    Returns:
+        Tupla `(contagem de sorteios por município e faixa da nota média,
+        valor total de cada sorteio: média e trimestres (sorteios x 5))`.
+    """
+    rng = np.random.default_rng(semente)
+    n, faixas = len(area), len(PRECOS_HA)
+    contagem = np.zeros(n * faixas, dtype=np.int64)
+    totais = np.empty((sorteios, 5))
+    deslocamento = np.arange(n) * faixas
+    lote = max(1, ELEMENTOS_POR_LOTE // max(n * 4, 1))
+    for inicio in range(0, sorteios, lote):
+        k = min(lote, sorteios - inicio)
+        ruido_comum = rng.standard_normal((k, 1, n)) * comum
+        ruido_clima = rng.standard_normal((k, 4, n)) * clima[None, :, None]
+        notas = trimestres.T[None] + ruido_comum + ruido_clima
+        faixas_media = faixa_por_nota(media[None] + ruido_comum[:, 0] + ruido_clima.mean(axis=1))
+        contagem += np.bincount((faixas_media + deslocamento).ravel(), minlength=n * faixas)
+        totais[inicio:inicio + k, 0] = PRECOS_HA[faixas_media] @ area
+        totais[inicio:inicio + k, 1:] = PRECOS_HA[faixa_por_nota(notas)] @ area
+    return contagem.reshape(n, faixas), totais
+
+
+def _simular_blocos(trimestres, media, area, comum, clima, blocos):
+    resultados = [simular_bloco(trimestres, media, area, comum, clima, sorteios, semente)
+                  for sorteios, semente in blocos]
+    return sum(r[0] for r in resultados), np.concatenate([r[1] for r in resultados])
+
+
+def simular(trimestres, media, area, desvios=None, sorteios=SORTEIOS, semente=SEMENTE, processos=None):
+    """Contagens por faixa e valores totais de `sorteios` sorteios, em blocos.
+
+    Returns:
+        Mesma tupla de `simular_bloco`, somada sobre os blocos.
+    """
+    trimestres = np.asarray(trimestres, dtype=float)
+    media = np.asarray(media, dtype=float)
+    area = np.nan_to_num(np.asarray(area, dtype=float))
+    comum, clima = desvios_do_total(DESVIOS_PADRAO if desvios is None else desvios)
+    sementes = np.random.SeedSequence(semente).spawn(-(-sorteios // SORTEIOS_POR_BLOCO))
+    blocos = [
+        (min(SORTEIOS_POR_BLOCO, sorteios - i * SORTEIOS_POR_BLOCO), s) for i, s in enumerate(sementes)
+    ]
+    processos = min(processos or os.cpu_count() or 1, len(blocos),
+                    -(-len(area) * sorteios // ELEMENTOS_POR_PROCESSO))
+    if processos <= 1:
+        return _simular_blocos(trimestres, media, area, comum, clima, blocos)
+    partes = np.array_split(np.arange(len(blocos)), processos)
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as pool:
+        futuros = [
+            pool.submit(_simular_blocos, trimestres, media, area, comum, clima, [blocos[i] for i in parte])
+            for parte in partes
+        ]
+        resultados = [futuro.result() for futuro in futuros]
+    return sum(r[0] for r in resultados), np.concatenate([r[1] for r in resultados])
+
+
+def _percentil_por_faixa(contagem, percentil):
+    """Faixa do percentil de cada município, a partir das contagens por faixa."""
+    acumulada = np.cumsum(contagem, axis=1) / contagem.sum(axis=1, keepdims=True)
+    return np.minimum((acumulada < percentil / 100).sum(axis=1), contagem.shape[1] - 1)
+
+
+def resumir_municipios(gdf, contagem):
+    """Risco de mudança de faixa e distribuição do valor de cada município.
+
+    Returns:
+        DataFrame com o índice de `gdf`: `faixa` (1 a 6, sem ruído),
+        `distancia_limite` (pontos até o limite de faixa mais próximo),
+        `prob_mudar_faixa`, `prob_subir`, `prob_descer`, `valor_base`,
+        `valor_esperado`, `valor_p<n>` (`PERCENTIS`) e `valor_em_risco`
+        (variação absoluta esperada do valor, R$).
+    """
+    nota = _nota_media(gdf)
+    area = np.nan_to_num(gdf["area_georef"].to_numpy(dtype=float))
+    faixa = faixa_por_nota(nota)
+    proporcao = contagem / contagem.sum(axis=1, keepdims=True)
+    faixas = np.arange(contagem.shape[1])
+    valores = area[:, None] * PRECOS_HA[None, :]
+    valor_base = valor_por_nota(nota, area)
+
+    resumo = pd.DataFrame(index=gdf.index)
+    for coluna in ("CD_MUN", "NM_MUN", "SIGLA_UF"):
+        if coluna in gdf.columns:
+            resumo[coluna] = gdf[coluna].to_numpy()
+    resumo["nota_media"] = nota
+    resumo["faixa"] = faixa + 1
+    resumo["distancia_limite"] = np.abs(nota[:, None] - FAIXAS_PONTUACAO[None, :]).min(axis=1)
+    resumo["prob_subir"] = (proporcao * (faixas[None, :] > faixa[:, None])).sum(axis=1)
+    resumo["prob_descer"] = (proporcao * (faixas[None, :] < faixa[:, None])).sum(axis=1)
+    resumo["prob_mudar_faixa"] = resumo["prob_subir"] + resumo["prob_descer"]
+    resumo["valor_base"] = valor_base
+    resumo["valor_esperado"] = (proporcao * valores).sum(axis=1)
+    for percentil in PERCENTIS:
+        resumo[f"valor_p{percentil:02d}"] = area * PRECOS_HA[_percentil_por_faixa(contagem, percentil)]
+    resumo["valor_em_risco"] = (proporcao * np.abs(valores - valor_base[:, None])).sum(axis=1)
+    return resumo
+
+
+def resumir_totais(tabela):
+    """Média, desvio e percentis do valor total da seleção em cada coluna de `tabela`."""
+    resumo = pd.DataFrame({"media": tabela.mean(), "desvio": tabela.std()})
+    for percentil in PERCENTIS:
+        resumo[f"p{percentil:02d}"] = tabela.quantile(percentil / 100)
+    return resumo
+
+
+def _nota_media(gdf):
+    if "nota_media" in gdf.columns:
+        return gdf["nota_media"].to_numpy(dtype=float)
+    return gdf[COLUNAS_TRIMESTRES].to_numpy(dtype=float).mean(axis=1)
+
+
+def chave_selecao(gdf):
+    """Identificador da seleção: versão da base, número de linhas e resumo do índice."""
+    selecao = hashlib.sha1(pd.util.hash_pandas_object(gdf.index, index=False).to_numpy().tobytes()).hexdigest()
+    return (gdf.attrs.get("versao"), len(gdf), selecao)
+
+
+def _chave(gdf, desvios, sorteios, semente):
+    return (*chave_selecao(gdf), tuple(sorted(desvios.items())), sorteios, semente)
+
+
+def analisar_sensibilidade(gdf, desvios=None, sorteios=SORTEIOS, semente=SEMENTE, processos=None):
+    """Simular os preços de `gdf` com ruído nas notas, memorizado por seleção e parâmetros.
+
+    Args:
+        gdf: Municípios (com `nota_total_q1..q4` e `area_georef`)
+        desvios: `{nota: desvio-padrão}` (padrão: `DESVIOS_PADRAO`)
+        sorteios: Número de sorteios
+        semente: Semente principal
+        processos: Processos do pool (padrão: número de CPUs, se compensar)
+
+    Returns:
+        Tupla `(resumir_municipios(...), valor total de cada sorteio)`; o
+        segundo é um DataFrame com `valor_mun_area` e `valor_q1..q4`.
+    """
+    desvios = dict(DESVIOS_PADRAO if desvios is None else desvios)
+    chave = _chave(gdf, desvios, sorteios, semente)
+    if chave[0] is not None:
+        with _trava:
+            resultado = _memo.get(chave)
+            if resultado is not None:
+                _memo.move_to_end(chave)
+                return resultado
+
+    contagem, totais = simular(gdf[COLUNAS_TRIMESTRES].to_numpy(dtype=float), _nota_media(gdf),
+                               gdf["area_georef"].to_numpy(dtype=float), desvios, sorteios, semente, processos)
+    resultado = (resumir_municipios(gdf, contagem), pd.DataFrame(totais, columns=COLUNAS_VALORES))
+    if chave[0] is not None:
+        with _trava:
+            _memo[chave] = resultado
+            while len(_memo) > RESULTADOS_MEMORIZADOS:
+                _memo.popitem(last=False)
+    return resultado
+
+
+def municipios_em_risco(resumo, quantidade=20, probabilidade_minima=0.05):
+    """Municípios mais sujeitos a mudar de faixa, do mais provável ao menos."""
+    em_risco = resumo[resumo["prob_mudar_faixa"] >= probabilidade_minima]
+    return em_risco.sort_values(["prob_mudar_faixa", "valor_em_risco"], ascending=False).head(quantidade)
+
+
+def limpar_memoria():
+    """Descartar as simulações memorizadas."""
+    with _trava:
+        _memo.clear()
@@ -0,0 +1,458 @@
+"""API HTTP local, somente leitura, com os números do dashboard.
+
+Serviço independente do Streamlit (`http.server.ThreadingHTTPServer`) que
+carrega a base uma vez, prepara-a como o app (EPSG:4326 e correções) e
+responde em JSON:
+
+- `GET /saude`: versão (resumida) e tamanho da base;
+- `GET /municipios?nome=&uf=`: busca por nome (sem acentos e sem diferenciar
+  maiúsculas), até `LIMITE_BUSCA` resultados;
+- `GET /municipios/<CD_MUN>`: atributos, indicadores derivados e preço de
+  cada trimestre (faixa e valor) do município;
+- `GET /agregados?uf=&municipio=&criterio=&min=&max=`: indicadores da seleção
+  (os mesmos cartões do dashboard, ver `mda_app.core.indicadores`) e médias
+  das notas por UF;
+- `GET /precos?uf=`: tabela de faixas e valores trimestrais por UF e total;
+- `GET /geojson/<UF>`: municípios da UF em GeoJSON (notas e valores).
+
+Listas nos parâmetros aceitam vírgulas ou repetição (`uf=AL,SE` ou
+`uf=AL&uf=SE`). As respostas são memorizadas já serializadas (e comprimidas
+em gzip, quando maiores que `TAMANHO_MINIMO_GZIP`). O ETag de cada resposta
+deriva da versão da base e da consulta normalizada: um `If-None-Match` igual
+recebe 304 sem recalcular nada, e trocar a base (outra versão) invalida todos
+os ETags.
+
+Uso:
+
+    python -m mda_app.core.servico_api data/raw/precificacao_al_ii.geojson --porta 8600
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import math
+import threading
+import unicodedata
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from mda_app.config.settings import PATHS
+from mda_app.core.colunas_derivadas import COLUNAS_DERIVADAS, anexar_colunas
+from mda_app.core.indicadores import COLUNAS_COMPOSICAO_UF, resumir_selecao
+from mda_app.core.precificacao import (
+    COLUNAS_TRIMESTRES,
+    FAIXAS_PONTUACAO,
+    PRECOS_HA,
+    faixa_por_nota,
+    valor_por_nota,
+)
+from mda_app.core.preparacao import carregar_base_preparada
+
+logger = logging.getLogger("mda_app.api")
+
+LIMITE_BUSCA = 50
+RESPOSTAS_MEMORIZADAS = 512
+TAMANHO_MINIMO_GZIP = 1024
+NIVEL_GZIP = 6
+# Colunas de cada município no GeoJSON por UF
+COLUNAS_GEOJSON = [
+    "CD_MUN",
+    "NM_MUN",
+    "SIGLA_UF",
+    "nota_media",
+    *COLUNAS_TRIMESTRES,
+    "area_georef",
+    "valor_mun_area",
+]
+
+
+class ErroConsulta(Exception):
+    """Consulta inválida ou recurso inexistente (vira a resposta `status`)."""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _sem_acentos(texto):
+    normalizado = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in normalizado if not unicodedata.combining(c)).casefold()
+
+
+def _json_valor(valor):
+    """Valor serializável (NaN vira null; tipos do NumPy viram nativos)."""
+    if isinstance(valor, (np.integer,)):
+        return int(valor)
+    if isinstance(valor, (float, np.floating)):
+        return None if math.isnan(valor) else float(valor)
+    if isinstance(valor, np.bool_):
+        return bool(valor)
+    return valor
+
+
+def _registros(df):
+    return [
+        {c: _json_valor(v) for c, v in linha.items()}
+        for linha in df.to_dict(orient="records")
+    ]
+
+
+def _lista(consulta, nome):
+    """Valores de um parâmetro repetido ou separado por vírgulas."""
+    return [
+        v.strip()
+        for valor in consulta.get(nome, [])
+        for v in valor.split(",")
+        if v.strip()
+    ]
+
+
+def _numero(consulta, nome):
+    valores = consulta.get(nome)
+    if not valores:
+        return None
+    try:
+        return float(valores[-1])
+    except ValueError:
+        raise ErroConsulta(
+            HTTPStatus.BAD_REQUEST,
+            f"Parâmetro {nome!r} não é um número: {valores[-1]!r}.",
+        )
+
+
+def etag_confere(etag, if_none_match):
+    """`etag` está na lista do cabeçalho `If-None-Match`?
+
+    A lista é separada por vírgulas; `*` confere com qualquer resposta e a
+    comparação é fraca (o prefixo `W/` é ignorado), como pede o RFC 9110.
+    """
+    for candidato in (if_none_match or "").split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ServicoAPI:
+    """Rotas da API sobre uma base preparada, com as respostas memorizadas.
+
+    Args:
+        gdf: Base preparada, com `attrs["versao"]` (ver
+            `mda_app.core.preparacao.carregar_base_preparada`)
+    """
+
+    def __init__(self, gdf):
+        self.gdf = gdf
+        self.versao = hashlib.sha1(
+            str(gdf.attrs.get("versao", "")).encode("utf-8")
+        ).hexdigest()[:16]
+        self.coluna_nome = "mun_nome" if "mun_nome" in gdf.columns else "NM_MUN"
+        self._nomes = gdf[self.coluna_nome].map(_sem_acentos)
+        self._por_codigo = {
+            str(codigo): indice for indice, codigo in zip(gdf.index, gdf["CD_MUN"])
+        }
+        self._derivadas = [
+            nome
+            for nome, coluna in COLUNAS_DERIVADAS.items()
+            if all(e in gdf.columns for e in coluna.entradas)
+        ]
+        self._memo = OrderedDict()
+        self._trava = threading.Lock()
+        self.rotas = {
+            "saude": self.saude,
+            "municipios": self.municipios,
+            "agregados": self.agregados,
+            "precos": self.precos,
+            "geojson": self.geojson,
+        }
+
+    # Respostas memorizadas
+
+    def etag(self, chave):
+        return (
+            '"'
+            + hashlib.sha1(f"{self.versao}|{chave}".encode("utf-8")).hexdigest()[:24]
+            + '"'
+        )
+
+    def pedido(self, caminho, consulta):
+        """Rota e consulta normalizadas de `caminho` com a `consulta` já decodificada.
+
+        Returns:
+            Tupla `(partes do caminho, consulta normalizada, chave)`; a chave
+            identifica a resposta (memória e `etag`) sem calculá-la.
+        """
+        partes = [unquote(p) for p in caminho.strip("/").split("/") if p]
+        if not partes or partes[0] not in self.rotas:
+            raise ErroConsulta(HTTPStatus.NOT_FOUND, f"Rota inexistente: {caminho!r}.")
+        # Consulta normalizada: a ordem dos parâmetros e dos itens das listas
+        # não muda a resposta
+        consulta = {nome: sorted(_lista(consulta, nome)) for nome in sorted(consulta)}
+        return partes, consulta, json.dumps([partes, consulta], ensure_ascii=False)
+
+    def responder(self, caminho, consulta):
+        """Resposta serializada de `caminho` com a `consulta` já decodificada.
+
+        Returns:
+            Tupla `(status, corpo, corpo em gzip ou None, tipo, etag)`.
+        """
+        return self.responder_pedido(*self.pedido(caminho, consulta))
+
+    def responder_pedido(self, partes, consulta, chave):
+        """Resposta de um pedido já normalizado (ver `pedido`), memorizada."""
+        with self._trava:
+            resposta = self._memo.get(chave)
+            if resposta is not None:
+                self._memo.move_to_end(chave)
+                return resposta
+
+        dados, tipo = self.rotas[partes[0]](partes[1:], consulta)
+        corpo = (
+            dados
+            if isinstance(dados, bytes)
+            else json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        )
+        comprimido = (
+            gzip.compress(corpo, NIVEL_GZIP)
+            if len(corpo) >= TAMANHO_MINIMO_GZIP
+            else None
+        )
+        resposta = (HTTPStatus.OK, corpo, comprimido, tipo, self.etag(chave))
+        with self._trava:
+            self._memo[chave] = resposta
+            while len(self._memo) > RESPOSTAS_MEMORIZADAS:
+                self._memo.popitem(last=False)
+        return resposta
+
+    # Rotas: recebem os segmentos após a rota e a consulta; devolvem (dados, tipo)
+
+    def saude(self, partes, consulta):
+        return {"versao": self.versao, "municipios": len(self.gdf)}, "application/json"
+
+    def filtrar(self, consulta):
+        """Seleção pelos filtros da sidebar: UFs, municípios e faixa de um critério."""
+        gdf = self.gdf
+        selecao = np.ones(len(gdf), dtype=bool)
+        ufs = _lista(consulta, "uf")
+        if ufs:
+            selecao &= gdf["SIGLA_UF"].isin(ufs).to_numpy()
+        municipios = _lista(consulta, "municipio")
+        if municipios:
+            selecao &= gdf[self.coluna_nome].isin(municipios).to_numpy()
+        criterio = (consulta.get("criterio") or [None])[-1]
+        minimo, maximo = _numero(consulta, "min"), _numero(consulta, "max")
+        if criterio is not None or minimo is not None or maximo is not None:
+            criterio = criterio or "nota_media"
+            if criterio not in gdf.columns:
+                raise ErroConsulta(
+                    HTTPStatus.BAD_REQUEST, f"Critério desconhecido: {criterio!r}."
+                )
+            valores = gdf[criterio].to_numpy(dtype=float)
+            selecao &= (valores >= (-np.inf if minimo is None else minimo)) & (
+                valores <= (np.inf if maximo is None else maximo)
+            )
+        return gdf[selecao]
+
+    def municipios(self, partes, consulta):
+        if partes:
+            return self.municipio(partes[0]), "application/json"
+        termo = _sem_acentos((consulta.get("nome") or [""])[-1])
+        encontrados = self._nomes.str.contains(termo, regex=False)
+        ufs = _lista(consulta, "uf")
+        if ufs:
+            encontrados &= self.gdf["SIGLA_UF"].isin(ufs)
+        colunas = ["CD_MUN", self.coluna_nome, "SIGLA_UF"]
+        selecao = self.gdf.loc[encontrados.to_numpy(), colunas]
+        return {
+            "total": len(selecao),
+            "municipios": _registros(selecao.head(LIMITE_BUSCA)),
+        }, "application/json"
+
+    def municipio(self, codigo):
+        indice = self._por_codigo.get(codigo)
+        if indice is None:
+            raise ErroConsulta(
+                HTTPStatus.NOT_FOUND, f"Município {codigo!r} não encontrado."
+            )
+        linha = self.gdf.loc[[indice]]
+        linha = anexar_colunas(linha, self._derivadas, base=self.gdf)
+        atributos = _registros(linha.drop(columns=linha.geometry.name))[0]
+        area = float(linha["area_georef"].iloc[0])
+        precos = []
+        for trimestre, coluna in enumerate(COLUNAS_TRIMESTRES, start=1):
+            nota = float(linha[coluna].iloc[0])
+            precos.append(
+                {
+                    "trimestre": trimestre,
+                    "nota": nota,
+                    "faixa": int(faixa_por_nota(nota)) + 1,
+                    "valor": float(valor_por_nota(nota, area)),
+                }
+            )
+        return {"municipio": atributos, "precos": precos}
+
+    def agregados(self, partes, consulta):
+        selecao = self.filtrar(consulta)
+        colunas = [c for c in COLUNAS_COMPOSICAO_UF if c in selecao.columns]
+        por_uf = selecao.groupby("SIGLA_UF")[colunas].mean().reset_index()
+        return {
+            "indicadores": resumir_selecao(selecao),
+            "notas_por_uf": _registros(por_uf),
+        }, "application/json"
+
+    def precos(self, partes, consulta):
+        selecao = self.filtrar(consulta)
+        por_uf = {
+            uf: resumir_selecao(grupo).get("valores_trimestrais")
+            for uf, grupo in selecao.groupby("SIGLA_UF")
+        }
+        return {
+            "faixas": [
+                {
+                    "faixa": i + 1,
+                    "ate": (
+                        float(FAIXAS_PONTUACAO[i])
+                        if i < len(FAIXAS_PONTUACAO)
+                        else None
+                    ),
+                    "preco_ha": float(preco),
+                }
+                for i, preco in enumerate(PRECOS_HA)
+            ],
+            "valores_trimestrais": resumir_selecao(selecao).get("valores_trimestrais"),
+            "por_uf": por_uf,
+        }, "application/json"
+
+    def geojson(self, partes, consulta):
+        if len(partes) != 1:
+            raise ErroConsulta(HTTPStatus.NOT_FOUND, "Use /geojson/<UF>.")
+        uf = partes[0].upper()
+        selecao = self.gdf[self.gdf["SIGLA_UF"] == uf]
+        if selecao.empty:
+            raise ErroConsulta(
+                HTTPStatus.NOT_FOUND, f"UF {uf!r} sem municípios na base."
+            )
+        colunas = [c for c in COLUNAS_GEOJSON if c in selecao.columns]
+        texto = selecao[[*colunas, selecao.geometry.name]].to_json(
+            drop_id=True, na="null"
+        )
+        return texto.encode("utf-8"), "application/geo+json"
+
+
+class ManipuladorAPI(BaseHTTPRequestHandler):
+    """Manipulador HTTP/1.1 (conexões persistentes) das rotas de `servico`."""
+
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo saem em escritas separadas: sem TCP_NODELAY, conexões
+    # persistentes esperam o ACK atrasado do cliente a cada resposta
+    disable_nagle_algorithm = True
+    server_version = "mda-api"
+    servico = None
+
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        try:
+            pedido = self.servico.pedido(
+                partes.path, parse_qs(partes.query, keep_blank_values=False)
+            )
+            # O ETag só depende da versão e da consulta: 304 sem montar a resposta
+            etag = self.servico.etag(pedido[2])
+            if etag_confere(etag, self.headers.get("If-None-Match")):
+                self._enviar(
+                    HTTPStatus.NOT_MODIFIED, b"", None, "application/json", etag
+                )
+                return
+            status, corpo, comprimido, tipo, etag = self.servico.responder_pedido(
+                *pedido
+            )
+        except ErroConsulta as erro:
+            self._enviar(
+                erro.status,
+                json.dumps({"erro": str(erro)}, ensure_ascii=False).encode("utf-8"),
+                None,
+                "application/json",
+                None,
+            )
+            return
+        except Exception:
+            logger.exception("Erro ao responder %s", self.path)
+            self._enviar(
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                b'{"erro": "erro interno"}',
+                None,
+                "application/json",
+                None,
+            )
+            return
+        self._enviar(status, corpo, comprimido, tipo, etag)
+
+    def _enviar(self, status, corpo, comprimido, tipo, etag):
+        aceita_gzip = "gzip" in (self.headers.get("Accept-Encoding") or "")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{tipo}; charset=utf-8")
+        if etag is not None:
+            self.send_header("ETag", etag)
+            # Sempre revalidar: a base pode ser trocada sem mudar a URL
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+        if status != HTTPStatus.NOT_MODIFIED:
+            if comprimido is not None and aceita_gzip:
+                corpo = comprimido
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.wfile.write(corpo)
+
+    def log_message(self, formato, *argumentos):
+        logger.debug("%s - %s", self.address_string(), formato % argumentos)
+
+
+def criar_servidor(servico, host="127.0.0.1", porta=8600):
+    """Servidor HTTP com uma thread por conexão, ainda não iniciado.
+
+    Para atender, chame `serve_forever`.
+    """
+    manipulador = type("Manipulador", (ManipuladorAPI,), {"servico": servico})
+    servidor = ThreadingHTTPServer((host, porta), manipulador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        description="API HTTP local, somente leitura, com os números do dashboard."
+    )
+    parser.add_argument(
+        "origem", nargs="?", default=PATHS["dataset"], help="Base municipal"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8600)
+    args = parser.parse_args(argumentos)
+
+    logging.basicConfig(level=logging.INFO)
+    servico = ServicoAPI(carregar_base_preparada(args.origem))
+    servidor = criar_servidor(servico, args.host, args.porta)
+    logger.info(
+        "%d municípios (versão %s) em http://%s:%d",
+        len(servico.gdf),
+        servico.versao,
+        args.host,
+        servidor.server_address[1],
+    )
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
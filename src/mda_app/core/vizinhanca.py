@@ -0,0 +1,140 @@
+"""Grafo de vizinhança (adjacência) entre municípios.
+
+Dois municípios são vizinhos quando suas geometrias se tocam (contiguidade do
+tipo "rainha": basta um vértice em comum). Os pares são obtidos por uma única
+consulta em lote ao STRtree da base, sem comparar todos os pares, e guardados
+em formato CSR: os vizinhos do município na posição `i` são
+`indices[indptr[i]:indptr[i + 1]]`, posições na mesma base.
+
+O grafo é calculado na preparação dos dados e memorizado pela versão da base
+(`gdf.attrs["versao"]`).
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from mda_app.core.base_colunar import geometrias_de, so_atributos
+
+from mda_app.utils.importacao import modulo_tardio
+
+pd = modulo_tardio("pandas")
+shapely = modulo_tardio("shapely")
+
+# Quantas versões da base mantêm o grafo memorizado
+VERSOES_MEMORIZADAS = 4
+
+# Colunas exibidas na comparação com os vizinhos
+COLUNAS_COMPARACAO = ["nota_media", "valor_mun_area", "area_georef", "percent_area_georef", "nota_insalub_2"]
+
+_memo = OrderedDict()
+_trava = threading.Lock()
+
+
+class Adjacencia:
+    """Grafo de vizinhança em formato CSR.
+
+    Args:
+        indptr: Início dos vizinhos de cada município em `indices` (n + 1)
+        indices: Posições dos vizinhos, ordenadas dentro de cada município
+    """
+
+    def __init__(self, indptr, indices):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def pares(self):
+        """Número de pares (direcionados) de vizinhos."""
+        return len(self.indices)
+
+    def vizinhos(self, posicao):
+        """Posições dos vizinhos do município na posição `posicao`."""
+        return self.indices[self.indptr[posicao]:self.indptr[posicao + 1]]
+
+    def graus(self):
+        """Número de vizinhos de cada município."""
+        return np.diff(self.indptr)
+
+    def linhas(self):
+        """Posição de origem de cada par (a "linha" CSR de cada entrada de `indices`)."""
+        return np.repeat(np.arange(len(self), dtype=np.int32), self.graus())
+
+
+def construir_adjacencia(geometrias, arvore=None):
+    """Calcular o grafo de vizinhança de um array de geometrias.
+
+    Usa uma consulta em lote ao STRtree (`predicate="intersects"`): o custo é
+    O(n log n) mais o teste exato dos pares cujos envelopes se cruzam.
+
+    Args:
+        geometrias: Geometrias dos municípios
+        arvore: Índice espacial já construído sobre `geometrias` (ex.:
+            `gdf.sindex`); se omitido, um STRtree é criado
+    """
+    geometrias = np.asarray(geometrias, dtype=object)
+    arvore = arvore if arvore is not None else shapely.STRtree(geometrias)
+    origem, destino = arvore.query(geometrias, predicate="intersects")
+    distintos = origem != destino
+    origem, destino = origem[distintos], destino[distintos]
+
+    ordem = np.lexsort((destino, origem))
+    origem, destino = origem[ordem], destino[ordem]
+    indptr = np.zeros(len(geometrias) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(origem, minlength=len(geometrias)), out=indptr[1:])
+    return Adjacencia(indptr, destino)
+
+
+def _construir(gdf):
+    if so_atributos(gdf):
+        # Base colunar sem geometrias carregadas: decodificadas só para o grafo
+        return construir_adjacencia(geometrias_de(gdf).to_numpy())
+    return construir_adjacencia(gdf.geometry.to_numpy(), gdf.sindex)
+
+
+def adjacencia(gdf):
+    """Grafo de vizinhança de `gdf`, memorizado pela versão da base."""
+    versao = gdf.attrs.get("versao")
+    if versao is None:
+        return _construir(gdf)
+    chave = (versao, len(gdf))
+    with _trava:
+        grafo = _memo.get(chave)
+        if grafo is not None:
+            _memo.move_to_end(chave)
+            return grafo
+    grafo = _construir(gdf)
+    with _trava:
+        _memo[chave] = grafo
+        while len(_memo) > VERSOES_MEMORIZADAS:
+            _memo.popitem(last=False)
+    return grafo
+
+
+def comparar_com_vizinhos(gdf, indice, colunas=None):
+    """Tabela com o município `indice` (rótulo do índice) e seus vizinhos.
+
+    Para cada coluna, além do valor, traz a diferença em relação ao município
+    de referência (`<coluna>_dif`). A primeira linha é o próprio município.
+    """
+    colunas = [c for c in (colunas or COLUNAS_COMPARACAO) if c in gdf.columns]
+    posicao = gdf.index.get_loc(indice)
+    posicoes = np.concatenate([[posicao], adjacencia(gdf).vizinhos(posicao)])
+    identificacao = [c for c in ("NM_MUN", "SIGLA_UF") if c in gdf.columns]
+
+    tabela = pd.DataFrame(gdf.iloc[posicoes][identificacao + colunas])
+    referencia = tabela.iloc[0]
+    for coluna in colunas:
+        tabela[f"{coluna}_dif"] = tabela[coluna] - referencia[coluna]
+    tabela.insert(0, "referencia", [True] + [False] * (len(tabela) - 1))
+    return tabela
+
+
+def limpar_memoria():
+    """Descartar os grafos memorizados."""
+    with _trava:
+        _memo.clear()
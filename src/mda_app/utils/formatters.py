@@ -1,6 +1,21 @@
 """Funções utilitárias para formatação e processamento de dados."""
 
+
 def reais(x):
     """Formatar valor para real brasileiro."""
     val = f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    return val
\ No newline at end of file
+    return val
+
+
+def numero_br(x, casas=2):
+    """Formatar número no padrão brasileiro (ex.: 1.234,56)."""
+    return f"{x:,.{casas}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def csv_br(df, cabecalho=True):
+    """Serializar um DataFrame como CSV no padrão brasileiro.
+
+    Separador `;` e vírgula como separador decimal, como o Excel em
+    português espera.
+    """
+    return df.to_csv(sep=";", decimal=",", index=False, header=cabecalho)
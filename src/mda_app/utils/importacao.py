@@ -0,0 +1,33 @@
+"""Importação tardia de dependências pesadas."""
+
+import importlib
+
+
+class ModuloTardio:
+    """Proxy que só importa o módulo no primeiro acesso a um atributo.
+
+    Permite declarar dependências pesadas (geopandas, folium, plotly...) no topo
+    do módulo sem pagar o custo de importação na inicialização do app: o custo
+    fica para a primeira aba ou componente que realmente as usar.
+    """
+
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+
+    def _carregar(self):
+        if self._modulo is None:
+            self._modulo = importlib.import_module(self._nome)
+        return self._modulo
+
+    def __getattr__(self, atributo):
+        return getattr(self._carregar(), atributo)
+
+    def __repr__(self):
+        estado = "carregado" if self._modulo is not None else "não carregado"
+        return f"<ModuloTardio {self._nome} ({estado})>"
+
+
+def modulo_tardio(nome):
+    """Declarar um módulo importado apenas quando for usado."""
+    return ModuloTardio(nome)
@@ -0,0 +1,272 @@
+"""Instrumentação leve das etapas de cada rerun (tempo, memória e payload).
+
+Uso:
+
+    @medir_etapa("criar_grafico_trimestral", payload=True)
+    def criar_grafico_trimestral(valores): ...
+
+    with etapa("criar_mapa") as registro:
+        m = criar_mapa(...)
+        registro.payload(m)
+
+Quando a instrumentação está desativada (padrão), `etapa` devolve um contexto
+nulo compartilhado e `medir_etapa` apenas repassa a chamada, de modo que o
+custo fica restrito a uma verificação de flag.
+
+A memória alocada por etapa vem do `tracemalloc`, que mede o processo inteiro:
+com várias sessões do Streamlit rodando ao mesmo tempo, as alocações de uma
+sessão entram nas medições das outras. Para números de memória confiáveis,
+perfile uma sessão por vez (ou desligue `PERF_CONFIG["medir_memoria"]` e use
+só os tempos).
+"""
+
+import collections
+import functools
+import json
+import logging
+import threading
+import time
+import tracemalloc
+
+from mda_app.config.settings import PERF_CONFIG
+
+logger = logging.getLogger(PERF_CONFIG["logger"])
+
+_estado = {"ativo": PERF_CONFIG["ativo"]}
+_local = threading.local()
+
+# Chamadas e execuções efetivas (misses) das funções cacheadas, por processo
+_contadores_cache = collections.defaultdict(lambda: {"chamadas": 0, "execucoes": 0})
+_trava_contadores = threading.Lock()
+
+
+def instrumentacao_ativa():
+    """Indicar se a instrumentação está ligada neste processo."""
+    return _estado["ativo"]
+
+
+def ativar_instrumentacao(ativo=True):
+    """Ligar ou desligar a instrumentação em tempo de execução."""
+    _estado["ativo"] = ativo
+    if ativo and PERF_CONFIG["medir_memoria"] and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not ativo and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    if ativo and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def tamanho_payload(obj):
+    """Estimar, em bytes, o volume enviado ao navegador por um objeto."""
+    if obj is None:
+        return 0
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, str):
+        return len(obj.encode("utf-8"))
+    if hasattr(obj, "to_plotly_json"):
+        # Figura Plotly
+        return len(obj.to_json().encode("utf-8"))
+    if hasattr(obj, "get_root"):
+        # Mapa folium: o HTML que a renderização já gerou
+        return _tamanho_html_renderizado(obj.get_root())
+    if hasattr(obj, "memory_usage"):
+        # DataFrame / GeoDataFrame
+        return int(obj.memory_usage(deep=True).sum())
+    try:
+        return len(json.dumps(obj, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _tamanho_html_renderizado(figura):
+    """Bytes do HTML guardado em header/html/script de uma figura branca.
+
+    Ao renderizar (no `st_folium`, por exemplo), cada elemento grava o seu
+    trecho como filho dessas três partes; somá-los mede o que foi enviado sem
+    renderizar o mapa uma segunda vez. Antes da renderização o valor é só o
+    do esqueleto da página.
+    """
+    return sum(
+        len((filho._template_str or "").encode("utf-8"))
+        for parte in (figura.header, figura.html, figura.script)
+        for filho in parte._children.values()
+    )
+
+
+class _RegistroEtapa:
+    """Medição de uma etapa (usada como context manager)."""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.tempo_ms = 0.0
+        self.alocado_kb = None
+        self.payload_bytes = None
+
+    def payload(self, obj):
+        """Registrar o objeto enviado ao navegador nesta etapa."""
+        self.payload_bytes = (self.payload_bytes or 0) + tamanho_payload(obj)
+        return obj
+
+    def __enter__(self):
+        self._memoria_inicio = (
+            tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        )
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tempo_ms = (time.perf_counter() - self._inicio) * 1000
+        if self._memoria_inicio is not None and tracemalloc.is_tracing():
+            atual = tracemalloc.get_traced_memory()[0]
+            self.alocado_kb = (atual - self._memoria_inicio) / 1024
+        registros = getattr(_local, "registros", None)
+        if registros is not None:
+            registros.append(self.como_dict())
+        return False
+
+    def como_dict(self):
+        """Converter a medição em dicionário serializável."""
+        return {
+            "etapa": self.nome,
+            "tempo_ms": round(self.tempo_ms, 3),
+            "alocado_kb": None if self.alocado_kb is None else round(self.alocado_kb, 1),
+            "payload_bytes": self.payload_bytes,
+        }
+
+
+class _EtapaNula:
+    """Contexto sem efeito usado quando a instrumentação está desligada."""
+
+    def payload(self, obj):
+        return obj
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_ETAPA_NULA = _EtapaNula()
+
+
+def etapa(nome):
+    """Context manager que mede uma etapa do rerun atual."""
+    if not _estado["ativo"]:
+        return _ETAPA_NULA
+    return _RegistroEtapa(nome)
+
+
+def medir_etapa(nome=None, payload=False):
+    """Decorator que mede cada chamada da função como uma etapa.
+
+    Args:
+        nome: Nome da etapa (padrão: nome da função)
+        payload: Se True, registra o tamanho do valor de retorno como payload
+    """
+    def decorator(func):
+        nome_etapa = nome or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _estado["ativo"]:
+                return func(*args, **kwargs)
+            with _RegistroEtapa(nome_etapa) as registro:
+                resultado = func(*args, **kwargs)
+                if payload:
+                    registro.payload(resultado)
+            return resultado
+
+        return wrapper
+
+    return decorator
+
+
+def cache_com_estatisticas(decorador_cache):
+    """Aplicar um decorator de cache contando chamadas e misses.
+
+    Uso: `@cache_com_estatisticas(st.cache_data)`. A função interna só executa
+    quando o cache falha, de modo que `execucoes / chamadas` é a taxa de miss.
+    A contagem é sempre feita (custo de um incremento por chamada).
+    """
+    def decorator(func):
+        nome = func.__qualname__
+
+        def _contar(campo):
+            with _trava_contadores:
+                _contadores_cache[nome][campo] += 1
+
+        @functools.wraps(func)
+        def executar(*args, **kwargs):
+            _contar("execucoes")
+            return func(*args, **kwargs)
+
+        cacheada = decorador_cache(executar)
+
+        @functools.wraps(func)
+        def chamar(*args, **kwargs):
+            _contar("chamadas")
+            return cacheada(*args, **kwargs)
+
+        chamar.clear = cacheada.clear
+        return chamar
+
+    return decorator
+
+
+def estatisticas_cache():
+    """Devolver chamadas, misses e taxa de acerto de cada função cacheada."""
+    with _trava_contadores:
+        contadores = {nome: dict(c) for nome, c in _contadores_cache.items()}
+    for c in contadores.values():
+        c["taxa_acerto"] = (
+            1 - c["execucoes"] / c["chamadas"] if c["chamadas"] else None
+        )
+    return contadores
+
+
+def zerar_estatisticas_cache():
+    """Zerar os contadores de cache (útil entre execuções de testes de carga)."""
+    with _trava_contadores:
+        _contadores_cache.clear()
+
+
+def iniciar_rerun():
+    """Iniciar a coleta de medições do rerun na thread atual."""
+    _local.registros = [] if _estado["ativo"] else None
+    _local.inicio = time.perf_counter()
+
+
+def finalizar_rerun(**contexto):
+    """Encerrar a coleta, emitir o log JSON e devolver as medições.
+
+    Args:
+        **contexto: Campos extras incluídos no log (ex.: número de municípios)
+
+    Returns:
+        Lista de dicionários, um por etapa (vazia se desativada).
+    """
+    registros = getattr(_local, "registros", None)
+    _local.registros = None
+    if not _estado["ativo"] or registros is None:
+        return []
+
+    evento = {
+        "evento": "rerun",
+        "timestamp": time.time(),
+        "tempo_total_ms": round((time.perf_counter() - _local.inicio) * 1000, 3),
+        "payload_total_bytes": sum(r["payload_bytes"] or 0 for r in registros),
+        "etapas": registros,
+        **contexto,
+    }
+    logger.info(json.dumps(evento, ensure_ascii=False, default=str))
+    return registros
+
+
+if _estado["ativo"]:
+    ativar_instrumentacao()
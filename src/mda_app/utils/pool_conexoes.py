@@ -0,0 +1,63 @@
+"""Pool simples de conexões de banco de dados (DB-API)."""
+
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class PoolConexoes:
+    """Pool de conexões reaproveitadas entre reruns e sessões.
+
+    As conexões são abertas sob demanda, até `tamanho`; depois disso, quem pede
+    uma conexão espera alguma ser devolvida. Cada conexão é usada por uma única
+    thread de cada vez.
+
+    Args:
+        fabrica: Função sem argumentos que abre uma nova conexão
+        tamanho: Número máximo de conexões abertas
+    """
+
+    def __init__(self, fabrica, tamanho=4):
+        self.fabrica = fabrica
+        self.tamanho = tamanho
+        self._livres = queue.LifoQueue()
+        self._abertas = 0
+        self._trava = threading.Lock()
+
+    @property
+    def abertas(self):
+        return self._abertas
+
+    @contextmanager
+    def conexao(self):
+        """Emprestar uma conexão do pool (bloqueia se todas estiverem em uso)."""
+        try:
+            conexao = self._livres.get_nowait()
+        except queue.Empty:
+            with self._trava:
+                abrir = self._abertas < self.tamanho
+                if abrir:
+                    self._abertas += 1
+            if abrir:
+                try:
+                    conexao = self.fabrica()
+                except Exception:
+                    with self._trava:
+                        self._abertas -= 1
+                    raise
+            else:
+                conexao = self._livres.get()
+        try:
+            yield conexao
+        finally:
+            self._livres.put(conexao)
+
+    def fechar(self):
+        """Fechar as conexões livres."""
+        while True:
+            try:
+                self._livres.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._trava:
+                self._abertas -= 1
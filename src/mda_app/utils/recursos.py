@@ -0,0 +1,41 @@
+"""Recursos estáticos comuns às páginas HTML geradas (relatórios e instantâneos).
+
+Folhas de estilo, scripts e o logo são gravados uma única vez em
+`<diretorio>/recursos/` e referenciados por todas as páginas.
+"""
+
+import os
+import shutil
+
+from mda_app.config.settings import APP_CONFIG
+
+PASTA_RECURSOS = "recursos"
+
+
+def gravar_recursos(diretorio, arquivos, caminho_logo=None):
+    """Gravar `arquivos` e uma cópia do logo em `<diretorio>/recursos/`.
+
+    Args:
+        diretorio: Diretório das páginas
+        arquivos: `{chave: (nome do arquivo, conteúdo em texto)}`
+        caminho_logo: Imagem do logo (padrão: `APP_CONFIG["logo_path"]`)
+
+    Returns:
+        Caminhos relativos a `diretorio` de cada chave de `arquivos` e do
+        `logo` (None se o arquivo do logo não existir).
+    """
+    pasta = os.path.join(diretorio, PASTA_RECURSOS)
+    os.makedirs(pasta, exist_ok=True)
+    recursos = {}
+    for chave, (nome, conteudo) in arquivos.items():
+        with open(os.path.join(pasta, nome), "w", encoding="utf-8") as arquivo:
+            arquivo.write(conteudo)
+        recursos[chave] = f"{PASTA_RECURSOS}/{nome}"
+
+    recursos["logo"] = None
+    caminho_logo = caminho_logo or APP_CONFIG["logo_path"]
+    if os.path.exists(caminho_logo):
+        nome = "logo" + os.path.splitext(caminho_logo)[1]
+        shutil.copyfile(caminho_logo, os.path.join(pasta, nome))
+        recursos["logo"] = f"{PASTA_RECURSOS}/{nome}"
+    return recursos
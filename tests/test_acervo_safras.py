@@ -0,0 +1,65 @@
+"""Testes para o acervo de safras."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+import shapely
+
+from mda_app.core.acervo_safras import AcervoSafras
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+
+
+def _duas_safras():
+    primeira = gerar_base_sintetica(40)
+    segunda = primeira.copy()
+    segunda["nota_media"] = segunda["nota_media"] + 1
+    segunda.loc[0, "geometry"] = shapely.affinity.translate(segunda.loc[0, "geometry"], 0.01)
+    return primeira, segunda
+
+
+def test_ingestao_deduplica_geometrias(tmp_path):
+    primeira, segunda = _duas_safras()
+    acervo = AcervoSafras(tmp_path)
+
+    assert acervo.ingerir(primeira, "2024-01")["geometrias_novas"] == 40
+    resumo = acervo.ingerir(segunda, "2025-01")
+    assert resumo["geometrias_novas"] == 1
+    assert resumo["geometrias_reaproveitadas"] == 39
+    assert acervo.safras == ["2024-01", "2025-01"]
+
+    with pytest.raises(ValueError):
+        acervo.ingerir(segunda, "2025-01")
+
+
+def test_abrir_safra_e_comparar_coluna(tmp_path):
+    primeira, segunda = _duas_safras()
+    acervo = AcervoSafras(tmp_path)
+    acervo.ingerir(primeira, "2024-01")
+    acervo.ingerir(segunda, "2025-01")
+
+    antiga = acervo.abrir("2024-01").set_index("CD_MUN").loc[primeira["CD_MUN"]]
+    assert shapely.equals_exact(antiga.geometry.to_numpy(), primeira.geometry.to_numpy(), tolerance=0).all()
+    assert (antiga["nota_media"].to_numpy() == primeira["nota_media"].to_numpy()).all()
+
+    uf = primeira["SIGLA_UF"].iloc[0]
+    recorte = acervo.abrir(ufs=[uf], colunas=["CD_MUN", "nota_media"])
+    assert set(recorte["SIGLA_UF"]) == {uf}
+    assert list(recorte.columns) == ["CD_MUN", "nota_media", "SIGLA_UF", "geometry"]
+    assert recorte.geometry.iloc[0] is not None
+
+    historico = acervo.comparar_coluna("nota_media")
+    assert list(historico.columns) == ["2024-01", "2025-01"]
+    assert ((historico["2025-01"] - historico["2024-01"]).round(9) == 1).all()
+
+
+def test_abrir_ufs_fora_da_safra(tmp_path):
+    primeira, _ = _duas_safras()
+    acervo = AcervoSafras(tmp_path)
+    acervo.ingerir(primeira, "2024-01")
+
+    vazio = acervo.abrir(ufs=["ZZ"])
+    assert len(vazio) == 0 and vazio.crs == primeira.crs
+    assert vazio.geometry.name == primeira.geometry.name
+    assert len(acervo.abrir(ufs=["ZZ"], colunas=["CD_MUN"])) == 0
@@ -0,0 +1,49 @@
+"""Testes para a auditoria de áreas e perímetros em EPSG:5880."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pytest
+
+from mda_app.core.auditoria_geometrica import auditar, escore_robusto, medidas_geometricas, resumir_auditoria
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+
+
+@pytest.fixture(scope="module")
+def base():
+    return gerar_base_sintetica(150).to_crs(epsg=4326)
+
+
+def test_medidas_independem_do_crs_de_entrada(base):
+    medidas = medidas_geometricas(base)
+    np.testing.assert_allclose(medidas["area_calculada_ha"], base["area_cidade"], rtol=1e-6)
+    assert (medidas["perimetro_calculado_km"] > 0).all()
+    np.testing.assert_allclose(medidas_geometricas(base.to_crs(epsg=3857)), medidas, rtol=1e-6)
+
+
+def test_base_consistente_sem_inconsistencias_de_area(base):
+    resumo = resumir_auditoria(auditar(base))
+    assert resumo["area_divergente"] == resumo["area_georef_excede"] == resumo["percentual_divergente"] == 0
+
+
+def test_sinaliza_colunas_corrompidas(base):
+    corrompida = base.copy()
+    rotulos = corrompida.index[[3, 40, 77]]
+    corrompida.loc[rotulos[0], "area_cidade"] *= 1.5
+    corrompida.loc[rotulos[1], "area_georef"] = corrompida.loc[rotulos[1], "area_cidade"] * 2
+    corrompida.loc[rotulos[2], "perimetro_total_car"] *= 10_000
+
+    relatorio = auditar(corrompida)
+    assert relatorio.loc[rotulos[0], "area_divergente"]
+    assert relatorio.loc[rotulos[1], ["area_georef_excede", "percentual_divergente"]].all()
+    assert relatorio.loc[rotulos[2], "perimetro_atipico"]
+    assert relatorio.loc[rotulos[1], "problemas"] == 2
+
+
+def test_colunas_ausentes_nao_geram_verificacao(base):
+    relatorio = auditar(base[["CD_MUN", "geometry"]])
+    assert resumir_auditoria(relatorio) == {}
+    assert (relatorio["problemas"] == 0).all()
+    assert escore_robusto([1.0, 1.0, 1.0]).tolist() == [0.0, 0.0, 0.0]
@@ -0,0 +1,73 @@
+"""Testes para o I de Moran e as classes LISA."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pytest
+
+from mda_app.components.visualizations import criar_mapa
+from mda_app.core import autocorrelacao
+from mda_app.core.autocorrelacao import (
+    CLASSES_LISA,
+    anexar_classes_lisa,
+    defasagem_espacial,
+    lisa,
+    moran_global,
+)
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.vizinhanca import construir_adjacencia
+
+
+@pytest.fixture(scope="module")
+def base():
+    gdf = gerar_base_sintetica(200)
+    # Nota com tendência espacial (cresce de oeste para leste)
+    gdf["nota_media"] = gdf.geometry.centroid.x.rank().to_numpy()
+    gdf.attrs["versao"] = "teste-autocorrelacao"
+    return gdf
+
+
+@pytest.fixture(scope="module")
+def grafo(base):
+    return construir_adjacencia(base.geometry.to_numpy())
+
+
+def test_defasagem_igual_a_matriz_densa(base, grafo):
+    pesos = np.zeros((len(base), len(base)))
+    for posicao in range(len(base)):
+        pesos[posicao, grafo.vizinhos(posicao)] = 1 / grafo.graus()[posicao]
+    valores = base[["nota_media", "nota_insalub_2"]].to_numpy()
+    np.testing.assert_allclose(defasagem_espacial(grafo, valores), pesos @ valores)
+
+
+def test_moran_detecta_tendencia_espacial(base, grafo):
+    tendencia = moran_global(grafo, base["nota_media"], permutacoes=199)
+    assert tendencia["I"] > 0.5 and tendencia["p_valor"] == pytest.approx(1 / 200)
+    aleatoria = moran_global(grafo, np.random.default_rng(0).permutation(len(base)), permutacoes=199)
+    assert abs(aleatoria["I"]) < 0.2 and aleatoria["p_valor"] > 0.01
+
+
+def test_lisa_classifica_extremos(base, grafo):
+    locais, p_valores, classes = lisa(grafo, base["nota_media"], permutacoes=199)
+    oeste = np.argmin(base["nota_media"].to_numpy())
+    leste = np.argmax(base["nota_media"].to_numpy())
+    assert classes[leste] == 1 and classes[oeste] == 3
+    assert locais[leste] > 0 and p_valores[leste] <= 0.05
+    assert set(np.unique(classes)) <= set(CLASSES_LISA)
+
+
+def test_pool_igual_ao_processo_atual(base, grafo, monkeypatch):
+    valores = base[["nota_media", "nota_insalub_2"]].to_numpy()
+    _, esperado, _ = lisa(grafo, valores, permutacoes=99, processos=1)
+    monkeypatch.setattr(autocorrelacao, "MUNICIPIOS_POR_PROCESSO", 50)
+    _, obtido, _ = lisa(grafo, valores, permutacoes=99, processos=2)
+    np.testing.assert_array_equal(obtido, esperado)
+
+
+def test_mapa_com_classes_lisa(base):
+    selecao = anexar_classes_lisa(base.iloc[:30], "nota_media", base=base)
+    assert selecao["lisa_nota_media"].isin(list(CLASSES_LISA)).all()
+    html = criar_mapa(selecao, "lisa_nota_media", classes=CLASSES_LISA).get_root().render()
+    assert "Alto-Alto" in html and "Não significativo" in html
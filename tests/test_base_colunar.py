@@ -0,0 +1,100 @@
+"""Testes para a base colunar (atributos em Arrow, geometrias em WKB)."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import geopandas as gpd
+import pandas as pd
+
+from mda_app.core.base_colunar import BaseColunar, eh_base_colunar, salvar_base_colunar
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+
+
+def test_ida_e_volta_preserva_atributos_e_geometrias(tmp_path):
+    """Gravar e reabrir mantém atributos, geometrias e CRS."""
+    gdf = gerar_base_sintetica(40, vertices_por_aresta=2)
+    versao = salvar_base_colunar(gdf, tmp_path)
+
+    base = BaseColunar(tmp_path)
+    assert eh_base_colunar(tmp_path)
+    assert len(base) == 40 and base.versao == versao
+
+    lido = base.para_geodataframe()
+    assert lido.crs == gdf.crs
+    pd.testing.assert_frame_equal(
+        pd.DataFrame(lido.drop(columns="geometry")), pd.DataFrame(gdf.drop(columns="geometry"))
+    )
+    assert lido.geometry.geom_equals_exact(gdf.geometry, tolerance=0).all()
+
+
+def test_leitura_de_atributos_nao_materializa_geometrias(tmp_path):
+    """Atributos e subconjuntos de linhas são lidos sem montar geometrias."""
+    gdf = gerar_base_sintetica(30)
+    salvar_base_colunar(gdf, tmp_path)
+    base = BaseColunar(tmp_path)
+
+    atributos = base.atributos(["CD_MUN", "nota_media"], indices=[3, 7])
+    assert not isinstance(atributos, gpd.GeoDataFrame)
+    assert list(atributos.columns) == ["CD_MUN", "nota_media"]
+    assert list(atributos["CD_MUN"]) == list(gdf["CD_MUN"].iloc[[3, 7]])
+
+    geometrias = base.geometrias([7])
+    assert geometrias[0].equals(gdf.geometry.iloc[7])
+
+
+def test_quadro_de_atributos_monta_geometrias_sob_demanda(tmp_path):
+    """Só atributos na carga; geometrias das linhas pedidas, já reprojetadas."""
+    from mda_app.core.base_colunar import com_geometrias, localizar_ponto, reprojetar, so_atributos
+    from mda_app.core.fontes_dados import FonteArquivo
+    from mda_app.core.vizinhanca import adjacencia, construir_adjacencia
+
+    gdf = gerar_base_sintetica(40, semente=3)
+    salvar_base_colunar(gdf, tmp_path)
+    uf = gdf["SIGLA_UF"].iloc[0]
+
+    quadro = FonteArquivo(tmp_path).carregar(ufs=(uf,), geometria=False)
+    assert so_atributos(quadro) and "geometry" not in quadro.columns
+    esperado = gdf[gdf["SIGLA_UF"] == uf]
+    assert list(quadro.index) == list(esperado.index)
+
+    quadro = reprojetar(quadro, 4326)
+    selecao = quadro.iloc[::2]
+    montado = com_geometrias(selecao)
+    assert isinstance(montado, gpd.GeoDataFrame) and montado.crs.to_epsg() == 4326
+    referencia = esperado.iloc[::2].to_crs(epsg=4326)
+    assert montado.geometry.geom_equals_exact(referencia.geometry, tolerance=1e-9).all()
+
+    ponto = referencia.geometry.iloc[0].representative_point()
+    assert list(localizar_ponto(quadro, ponto.x, ponto.y)) == [referencia.index[0]]
+
+    grafo = adjacencia(quadro)
+    assert (grafo.indices == construir_adjacencia(esperado.geometry.to_numpy()).indices).all()
+
+
+def test_envelopes_gravados_e_clique_decodifica_so_candidatos(tmp_path, monkeypatch):
+    """O clique no mapa consulta os envelopes gravados e decodifica só os candidatos."""
+    import numpy as np
+    import shapely
+
+    from mda_app.core.base_colunar import ARQUIVO_ENVELOPES, localizar_ponto
+
+    gdf = gerar_base_sintetica(60, semente=4)
+    salvar_base_colunar(gdf, tmp_path)
+    envelopes = np.load(tmp_path / ARQUIVO_ENVELOPES)
+    assert envelopes.dtype == np.float64 and envelopes.shape == (60, 4)
+    np.testing.assert_array_equal(envelopes, shapely.bounds(gdf.geometry.to_numpy()))
+
+    base = BaseColunar(tmp_path)
+    quadro = base.quadro_atributos()
+    decodificadas = []
+    geometrias = BaseColunar.geometrias
+
+    def registrar(self, indices=None):
+        decodificadas.append(len(self) if indices is None else len(indices))
+        return geometrias(self, indices)
+
+    monkeypatch.setattr(BaseColunar, "geometrias", registrar)
+    ponto = gdf.geometry.iloc[10].representative_point()
+    assert list(localizar_ponto(quadro, ponto.x, ponto.y)) == [10]
+    assert decodificadas and max(decodificadas) < len(gdf)
@@ -0,0 +1,59 @@
+"""Testes para as camadas agregadas por UF e por região."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pytest
+
+from mda_app.components.visualizations import criar_mapa
+from mda_app.core.camadas_regionais import (
+    agregar_atributos,
+    camada_agregada,
+    construir_camadas,
+    nivel_agregacao,
+)
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+
+
+@pytest.fixture(scope="module")
+def base():
+    gdf = gerar_base_sintetica(300, vertices_por_aresta=4).to_crs(epsg=4326)
+    gdf.attrs["versao"] = "teste-camadas"
+    return gdf
+
+
+def test_notas_ponderadas_pela_area(base):
+    agregados = agregar_atributos(base, "uf")
+    uf = base[base["SIGLA_UF"] == agregados.index[0]]
+    esperado = np.average(uf["nota_media"], weights=uf["area_georef"])
+    assert agregados.iloc[0]["nota_media"] == pytest.approx(esperado)
+    assert agregados.iloc[0]["valor_mun_area"] == pytest.approx(uf["valor_mun_area"].sum())
+    assert agregados["municipios"].sum() == len(base)
+
+
+def test_camadas_cobrem_a_base(base):
+    camadas = construir_camadas(base)
+    assert sorted(camadas["uf"].index) == sorted(base["SIGLA_UF"].unique())
+    assert camadas["regiao"]["municipios"].sum() == len(base)
+    for camada in camadas.values():
+        # Divisas simplificadas em conjunto: sem sobreposição nem perda de área relevante
+        assert camada.geometry.area.sum() == pytest.approx(base.geometry.area.sum(), rel=0.02)
+        assert camada.geometry.union_all().area == pytest.approx(camada.geometry.area.sum(), rel=1e-6)
+
+
+def test_selecao_usa_geometrias_da_base(base):
+    ufs = sorted(base["SIGLA_UF"].unique())[:8]
+    selecao = base[base["SIGLA_UF"].isin(ufs) & (base["nota_media"] > base["nota_media"].median())]
+    camada = camada_agregada(selecao, base)
+    assert list(camada.index) == ufs
+    assert camada["municipios"].sum() == len(selecao)
+    assert camada.geometry.geom_equals(construir_camadas(base)["uf"].geometry.loc[ufs]).all()
+
+
+def test_mapa_agregado_com_muitas_ufs(base):
+    assert nivel_agregacao(base[base["SIGLA_UF"] == base["SIGLA_UF"].iloc[0]]) is None
+    assert nivel_agregacao(base) == "uf"
+    html = criar_mapa(base, "nota_media", base=base).get_root().render()
+    assert "municípios" in html and "Município " not in html
@@ -0,0 +1,70 @@
+"""Testes para o registro de colunas derivadas."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pandas as pd
+
+from mda_app.core import colunas_derivadas
+from mda_app.core.colunas_derivadas import (
+    aplicar_correcoes,
+    anexar_colunas,
+    coluna_derivada,
+    divisao_segura,
+)
+
+
+def _base():
+    df = pd.DataFrame({
+        "valor_mun_perim": [100.0, 200.0, 300.0],
+        "valor_mun_area": [50.0, 0.0, 90.0],
+        "area_car_total": [10.0, 0.0, 5.0],
+        "area_georef": [20.0, 0.0, 0.0],
+        "num_imoveis": [2, 0, 3],
+        "nota_insalub_2": [0.5, 3.0, np.nan],
+    })
+    df.attrs["versao"] = "teste"
+    return df
+
+
+def test_divisao_segura_usa_padrao_em_denominador_invalido():
+    resultado = divisao_segura([1.0, 2.0, 3.0], [2.0, 0.0, np.nan])
+    np.testing.assert_array_equal(resultado, [0.5, 0.0, 0.0])
+
+
+def test_colunas_calculadas_sem_divisao_por_zero():
+    colunas_derivadas.limpar_memoria()
+    df = anexar_colunas(_base(), ["valor_medio", "valor_medio_car", "val_med_car_perim"])
+    np.testing.assert_allclose(df["valor_medio"], [75.0, 100.0, 195.0])
+    np.testing.assert_allclose(df["valor_medio_car"], [12.5, 0.0, 0.0])
+    np.testing.assert_allclose(df["val_med_car_perim"], [50.0, 0.0, 100.0])
+
+
+def test_correcao_aplica_piso_na_insalubridade():
+    df = aplicar_correcoes(_base())
+    assert df["nota_insalub_2"].iloc[0] == 1
+    assert df["nota_insalub_2"].iloc[1] == 3
+    assert np.isnan(df["nota_insalub_2"].iloc[2])
+
+
+def test_coluna_calculada_uma_vez_por_versao_e_alinhada_ao_recorte():
+    colunas_derivadas.limpar_memoria()
+    chamadas = []
+
+    @coluna_derivada("teste_dobro_medio", ["valor_medio"])
+    def _dobro(df):
+        chamadas.append(len(df))
+        return df["valor_medio"] * 2
+
+    try:
+        base = _base()
+        recorte = base.iloc[[2, 0]]
+        for _ in range(3):
+            resultado = anexar_colunas(recorte, ["teste_dobro_medio"], base=base)
+        assert chamadas == [3]
+        assert list(resultado["teste_dobro_medio"]) == [390.0, 150.0]
+        assert "valor_medio" not in resultado.columns
+    finally:
+        colunas_derivadas.COLUNAS_DERIVADAS.pop("teste_dobro_medio")
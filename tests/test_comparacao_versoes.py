@@ -0,0 +1,65 @@
+"""Testes para a comparação entre versões da base."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+import shapely
+
+from mda_app.core.comparacao_versoes import comparar_versoes, impacto_por_uf, resumir_comparacao
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.precificacao import valor_por_nota
+
+
+def _versoes():
+    antiga = gerar_base_sintetica(30)
+    nova = antiga.copy()
+    nova.loc[0, "valor_mun_area"] += 1000.0
+    nova.loc[0, "nota_media"] = 60.0
+    nova.loc[1, "geometry"] = shapely.affinity.translate(nova.loc[1, "geometry"], 0.01)
+    nova = nova.drop(index=2)
+    incluido = antiga.iloc[[3]].assign(CD_MUN="9999999")
+    return antiga, pd.concat([nova, incluido], ignore_index=True)
+
+
+def test_situacoes_e_geometria_por_hash():
+    antiga, nova = _versoes()
+    comparacao = comparar_versoes(antiga, nova).set_index("CD_MUN")
+
+    cd = antiga["CD_MUN"]
+    assert comparacao.loc[cd[0], "situacao"] == "alterado"
+    assert comparacao.loc[cd[0], "valor_mun_area_delta"] == 1000.0
+    assert not comparacao.loc[cd[0], "geometria_alterada"]
+    assert comparacao.loc[cd[1], "situacao"] == "alterado"
+    assert comparacao.loc[cd[1], "geometria_alterada"]
+    assert comparacao.loc[cd[2], "situacao"] == "removido"
+    assert comparacao.loc["9999999", "situacao"] == "incluído"
+    assert comparacao.loc[cd[4], "situacao"] == "inalterado"
+
+
+def test_resumo_e_impacto_na_precificacao():
+    antiga, nova = _versoes()
+    comparacao = comparar_versoes(antiga, nova)
+    resumo = resumir_comparacao(comparacao)
+
+    # As duas versões são reprecificadas: o valor gravado alterado não conta, a nota nova sim
+    valor_alterado = valor_por_nota(60.0, antiga.loc[0, "area_georef"]) - antiga.loc[0, "valor_mun_area"]
+    valor_removido = antiga.loc[2, "valor_mun_area"]
+    valor_incluido = antiga.loc[3, "valor_mun_area"]
+    assert resumo["alterado"] == 2 and resumo["removido"] == 1 and resumo["incluído"] == 1
+    assert abs(resumo["impacto_valor"] - (valor_alterado - valor_removido + valor_incluido)) < 1e-6
+    assert resumo["mudancas_faixa"] == 1
+    assert abs(impacto_por_uf(comparacao)["impacto_valor"].sum() - resumo["impacto_valor"]) < 1e-6
+
+
+def test_versoes_em_crs_diferentes():
+    """Reprojetar uma versão não é mudança de geometria; um deslocamento real é."""
+    antiga, _ = _versoes()
+    nova = antiga.copy()
+    nova.loc[1, "geometry"] = shapely.affinity.translate(nova.loc[1, "geometry"], 0.01)
+    comparacao = comparar_versoes(antiga, nova.to_crs(epsg=5880)).set_index("CD_MUN")
+
+    cd = antiga["CD_MUN"]
+    assert comparacao.loc[cd[1], "geometria_alterada"]
+    assert comparacao["geometria_alterada"].sum() == 1
@@ -20,4 +20,30 @@ def test_processar_dados_geograficos():
     resultado = processar_dados_geograficos(mock_gdf)
     
     # Verificar se to_crs foi chamado
-    mock_gdf.to_crs.assert_called_once_with(epsg=4326)
\ No newline at end of file
+    mock_gdf.to_crs.assert_called_once_with(epsg=4326)
+
+def test_recorte_filtrado_reaproveita_a_versao_da_base(tmp_path, monkeypatch):
+    """Recortes filtrados não consultam a versão na fonte.
+
+    A versão faz parte da chave do cache: uma versão nova invalida o recorte.
+    """
+    from mda_app.core.dados_sinteticos import gerar_base_sintetica
+    from mda_app.core.data_loader import carregar_dados_filtrados
+    from mda_app.core.fontes_dados import FonteSQL, gravar_tabela_sqlite
+
+    base = gerar_base_sintetica(40, semente=3)
+    gravar_tabela_sqlite(base, tmp_path / "municipios.db")
+    endereco = f"sqlite:///{tmp_path / 'municipios.db'}"
+    lida = MagicMock(side_effect=AssertionError("versão lida da fonte"))
+    monkeypatch.setattr(FonteSQL, "versao", lida)
+    uf = base["SIGLA_UF"].iloc[0]
+    faixas = (("nota_media", (0.0, 100.0)),)
+
+    def recortar(versao):
+        return carregar_dados_filtrados(endereco, (uf,), None, "NM_MUN", faixas, versao)
+
+    recorte = recortar("v1")
+    assert recorte.attrs["versao"].startswith("v1|")
+    assert (recorte["SIGLA_UF"] == uf).all()
+    assert recortar("v2").attrs["versao"].startswith("v2|")
+    lida.assert_not_called()
@@ -0,0 +1,80 @@
+"""Testes para as notas de relevo e vegetação por estatística zonal."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pytest
+
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.estatisticas_zonais import (
+    INTERVALOS_VEGETACAO,
+    classificar_declividade,
+    classificar_vegetacao,
+    dividir_janela,
+    janela_alinhada,
+    notas_por_classes,
+    resumir_classes,
+)
+from mda_app.core.precificacao import substituir_notas
+
+
+def test_classes_de_lepsch_e_do_mapbiomas():
+    declividade = np.array([0, 3, 3.1, 8, 19, 45, 60, 80, np.nan, -9999])
+    assert classificar_declividade(declividade).tolist() == [1, 1, 2, 2, 3, 4, 5, 6, 0, 0]
+    # Formação florestal, savânica, mosaico de usos, pastagem, água, sem dado
+    assert classificar_vegetacao(np.array([3, 4, 21, 15, 33, 0])).tolist() == [3, 2, 2, 1, 0, 0]
+
+
+def test_janela_alinhada_aos_blocos_e_dividida_em_faixas():
+    assert janela_alinhada(300, 130, 100, 20, (256, 256), (1000, 1000)) == (256, 0, 256, 256)
+    assert janela_alinhada(900, 900, 300, 300, (256, 256), (1000, 1000)) == (768, 768, 232, 232)
+    assert janela_alinhada(-10, -10, 5, 5, (256, 256), (1000, 1000))[2:] == (0, 0)
+
+    faixas = list(dividir_janela((0, 0, 1024, 1000), (16, 1024), pixels_por_leitura=40 * 1024))
+    assert all(linha % 16 == 0 and altura <= 40 for _, linha, _, altura in faixas)
+    assert sum(altura for *_, altura in faixas) == 1000
+
+
+def test_notas_pela_classe_predominante_e_media():
+    contagens = np.array([[10, 0, 0], [0, 0, 10], [0, 10, 0], [1, 5, 4], [0, 0, 0]])
+    predominante, media = resumir_classes(contagens)
+    assert predominante.tolist() == [1, 3, 2, 2, 0]
+    notas = notas_por_classes(predominante, media, INTERVALOS_VEGETACAO)
+    assert notas[:4].tolist() == [1, 10, 6, 6]
+    assert np.isnan(notas[4])
+
+
+def test_substituir_notas_recalcula_totais_e_valor():
+    gdf = gerar_base_sintetica(30, semente=2)
+    novas = np.full(len(gdf), 9.0)
+    atualizada = substituir_notas(gdf, {"nota_veg": novas})
+    diferenca = novas - gdf["nota_veg"].to_numpy()
+    for q in range(1, 5):
+        np.testing.assert_allclose(atualizada[f"nota_total_q{q}"], gdf[f"nota_total_q{q}"] + diferenca)
+    np.testing.assert_allclose(atualizada["nota_media"], gdf["nota_media"] + diferenca)
+    assert (atualizada["valor_mun_area"] != gdf["valor_mun_area"]).any()
+    assert (gdf["nota_veg"] != 9).any()
+
+
+def test_contagem_em_raster_local(tmp_path):
+    rasterio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_origin
+    from mda_app.core.estatisticas_zonais import recalcular_notas_rasters
+
+    gdf = gerar_base_sintetica(12, semente=3)
+    minx, miny, maxx, maxy = gdf.total_bounds
+    resolucao = 0.01
+    largura, altura = int(np.ceil((maxx - minx) / resolucao)), int(np.ceil((maxy - miny) / resolucao))
+    caminho = tmp_path / "mapbiomas.tif"
+    with rasterio.open(
+        caminho, "w", driver="GTiff", width=largura, height=altura, count=1, dtype="uint8",
+        crs=gdf.crs, transform=from_origin(minx, maxy, resolucao, resolucao),
+        tiled=True, blockxsize=64, blockysize=64, nodata=0,
+    ) as raster:
+        raster.write(np.full((altura, largura), 3, dtype="uint8"), 1)
+
+    atualizada, contagens = recalcular_notas_rasters(gdf, {"vegetacao": caminho}, pixels_por_leitura=64 * 64)
+    assert (contagens["vegetacao"][:, 2] > 0).all()
+    assert (atualizada["nota_veg"] == 10).all()
@@ -0,0 +1,62 @@
+"""Testes para a exportação da seleção filtrada."""
+
+import io
+import sqlite3
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+import shapely
+
+from mda_app.core import exportacao
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.exportacao import exportar, gerar_csv, gerar_geoparquet
+from mda_app.core.leitor_gpkg import ler_gpkg
+
+
+@pytest.fixture(scope="module")
+def selecao():
+    gdf = gerar_base_sintetica(90, vertices_por_aresta=2)
+    gdf.attrs["versao"] = "teste"
+    return gdf[gdf["SIGLA_UF"].isin(gdf["SIGLA_UF"].unique()[:6])]
+
+
+def test_geradores_em_lotes(selecao):
+    pedacos = list(gerar_csv(selecao, linhas_por_lote=10))
+    assert len(pedacos) == -(-len(selecao) // 10)
+    csv = pd.read_csv(io.BytesIO(b"".join(pedacos)), sep=";", decimal=",", encoding="utf-8-sig")
+    assert len(csv) == len(selecao)
+    assert csv["nota_media"].tolist() == pytest.approx(selecao["nota_media"].tolist())
+    assert len([p for p in gerar_geoparquet(selecao, linhas_por_lote=10) if p]) > 2
+
+
+def test_geoparquet_e_gpkg_preservam_geometrias(selecao, tmp_path):
+    parquet = gpd.read_parquet(exportar(selecao, "parquet", tmp_path, linhas_por_lote=7))
+    assert parquet.crs == selecao.crs
+    assert shapely.equals_exact(parquet.geometry.to_numpy(), selecao.geometry.to_numpy(), 0).all()
+
+    gpkg = exportar(selecao, "gpkg", tmp_path, linhas_por_lote=7)
+    with sqlite3.connect(gpkg) as conexao:
+        assert conexao.execute("SELECT COUNT(*) FROM rtree_municipios_geom").fetchone()[0] == len(selecao)
+    assert sorted(ler_gpkg(gpkg)["CD_MUN"]) == sorted(selecao["CD_MUN"])
+
+
+def test_geoparquet_com_tipos_variando_entre_lotes(selecao, tmp_path):
+    """O schema vem da seleção inteira: lotes com a coluna nula ou só com inteiros não quebram."""
+    selecao = selecao.copy()
+    selecao["observacao"] = pd.Series([None] * 10 + ["revisar"] * (len(selecao) - 10),
+                                      index=selecao.index, dtype=object)
+    selecao["ajuste"] = pd.Series([1] * 10 + [0.5] * (len(selecao) - 10), index=selecao.index, dtype=object)
+    lido = gpd.read_parquet(exportar(selecao, "parquet", tmp_path, linhas_por_lote=10))
+    assert lido["observacao"].fillna("").tolist() == selecao["observacao"].fillna("").tolist()
+    assert lido["ajuste"].tolist() == pytest.approx(selecao["ajuste"].tolist())
+
+
+def test_mesmo_recorte_reaproveita_arquivo(selecao, tmp_path, monkeypatch):
+    caminho = exportar(selecao, "csv", tmp_path)
+    monkeypatch.setitem(exportacao.GERADORES, "csv", lambda *args: pytest.fail("arquivo regravado"))
+    assert exportar(selecao, "csv", tmp_path) == caminho
+    assert exportar(selecao.iloc[:-1], "parquet", tmp_path) != caminho
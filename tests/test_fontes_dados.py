@@ -0,0 +1,110 @@
+"""Testes para as fontes de dados plugáveis."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+import shapely
+
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.fontes_dados import FonteArquivo, FonteSQL, criar_fonte, gravar_tabela_sqlite
+
+
+@pytest.fixture(scope="module")
+def base():
+    return gerar_base_sintetica(80, vertices_por_aresta=2)
+
+
+@pytest.fixture(scope="module", params=["geojson", "gpkg", "sqlite", "postgis"])
+def fonte(request, base, tmp_path_factory):
+    """Mesma base servida por cada tipo de fonte."""
+    diretorio = tmp_path_factory.mktemp("fontes")
+    if request.param == "geojson":
+        caminho = diretorio / "municipios.geojson"
+        base.to_file(caminho, driver="GeoJSON")
+        return criar_fonte(str(caminho))
+    if request.param == "gpkg":
+        caminho = diretorio / "municipios.gpkg"
+        base.to_file(caminho, driver="GPKG", layer="municipios")
+        return criar_fonte(str(caminho))
+    if request.param == "sqlite":
+        caminho = diretorio / "municipios.db"
+        gravar_tabela_sqlite(base, caminho)
+        return criar_fonte(f"sqlite:///{caminho}")
+    # PostGIS: só roda com um banco de teste carregado com a base sintética
+    endereco = os.environ.get("MDA_TESTE_POSTGIS")
+    if not endereco:
+        pytest.skip("MDA_TESTE_POSTGIS não definido")
+    return criar_fonte(endereco)
+
+
+def _ordenar(gdf):
+    return gdf.sort_values("CD_MUN").reset_index(drop=True)
+
+
+def test_tipo_da_fonte(tmp_path):
+    assert isinstance(criar_fonte(tmp_path / "base.geojson"), FonteArquivo)
+    assert isinstance(criar_fonte(f"sqlite:///{tmp_path / 'base.db'}"), FonteSQL)
+    assert criar_fonte("postgresql://usuario@localhost/mda").dialeto == "postgis"
+
+
+def test_carga_completa_igual_a_base(fonte, base):
+    lido = _ordenar(fonte.carregar())
+    esperado = _ordenar(base)
+    assert list(lido["CD_MUN"]) == list(esperado["CD_MUN"])
+    assert lido["nota_media"].tolist() == pytest.approx(esperado["nota_media"].tolist())
+    assert shapely.equals_exact(lido.geometry.to_numpy(), esperado.geometry.to_numpy(), 1e-9).all()
+    assert lido.crs == base.crs
+
+
+def test_filtros_iguais_ao_pandas(fonte, base):
+    ufs = tuple(sorted(base["SIGLA_UF"].unique())[:2])
+    municipios = tuple(base.loc[base["SIGLA_UF"].isin(ufs), "NM_MUN"].iloc[:10])
+    faixas = (("nota_media", (10.0, 40.0)),)
+    lido = fonte.carregar(ufs=ufs, municipios=municipios, faixas=faixas)
+    esperado = base[
+        base["SIGLA_UF"].isin(ufs) & base["NM_MUN"].isin(municipios) & base["nota_media"].between(10.0, 40.0)
+    ]
+    assert sorted(lido["CD_MUN"]) == sorted(esperado["CD_MUN"])
+    assert len(fonte.carregar(ufs=())) == 0
+
+
+def test_fonte_sql_mantem_indice_estavel(fonte, base):
+    if not fonte.filtra_na_origem:
+        pytest.skip("índice estável só é garantido pelas fontes SQL")
+    completo = fonte.carregar()
+    uf = base["SIGLA_UF"].iloc[0]
+    recorte = fonte.carregar(ufs=(uf,))
+    assert recorte.index.isin(completo.index).all()
+    assert (completo.loc[recorte.index, "CD_MUN"] == recorte["CD_MUN"]).all()
+
+
+def test_contagem_por_uf(fonte, base):
+    assert fonte.contar_por_uf() == base["SIGLA_UF"].value_counts().sort_index().to_dict()
+
+
+def test_versao_sql_muda_com_update(base, tmp_path):
+    """Um UPDATE que mantém contagem e chaves muda a versão."""
+    import sqlite3
+
+    caminho = tmp_path / "municipios.db"
+    gravar_tabela_sqlite(base, caminho)
+    fonte = FonteSQL(lambda: sqlite3.connect(caminho, check_same_thread=False), dialeto="sqlite")
+    antes = fonte.versao()
+    assert fonte.versao() == antes
+
+    with sqlite3.connect(caminho) as conexao:
+        conexao.execute('UPDATE municipios SET nota_media = nota_media + 1 WHERE id = 0')
+    # Dentro da validade, a versão memorizada é reaproveitada sem consultar o banco
+    assert fonte.versao() == antes
+    fonte.validade_versao = 0
+    assert fonte.versao() != antes
+
+
+def test_so_atributos_com_filtro_na_leitura(fonte, base):
+    """Sem geometria: DataFrame só com as linhas da UF, sem a coluna de geometria."""
+    uf = sorted(base["SIGLA_UF"].unique())[0]
+    atributos = fonte.carregar(ufs=(uf,), geometria=False)
+    assert not hasattr(atributos, "geometry") and "geometry" not in atributos.columns
+    assert sorted(atributos["CD_MUN"]) == sorted(base.loc[base["SIGLA_UF"] == uf, "CD_MUN"])
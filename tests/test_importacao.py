@@ -0,0 +1,30 @@
+"""Testes para a importação tardia de dependências."""
+
+import subprocess
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mda_app.utils.importacao import modulo_tardio
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+
+def test_modulo_tardio_importa_no_primeiro_acesso():
+    """O módulo só é importado quando um atributo é acessado."""
+    json_tardio = modulo_tardio("json")
+    assert "não carregado" in repr(json_tardio)
+    assert json_tardio.dumps([1]) == "[1]"
+    assert "(carregado)" in repr(json_tardio)
+
+
+def test_app_nao_importa_dependencias_pesadas():
+    """Importar o app não carrega geopandas, folium nem shapely."""
+    codigo = (
+        "import sys; sys.path.insert(0, %r); import mda_app.app; "
+        "print(','.join(m for m in ('geopandas', 'folium', 'shapely', 'pandas') if m in sys.modules))"
+    ) % SRC
+    saida = subprocess.run(
+        [sys.executable, "-c", codigo], capture_output=True, text=True, check=True
+    ).stdout.strip()
+    assert saida == ""
@@ -0,0 +1,86 @@
+"""Testes para a ingestão do DataSUS e as notas de insalubridade."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.insalubridade import (
+    AcumuladoInsalubridade,
+    codigos_municipio,
+    contar_casos,
+    meses,
+    recalcular_notas_insalubridade,
+)
+
+
+def _notificacoes(caminho, municipios, datas, sep=";"):
+    pd.DataFrame({"ID_AGRAVO": "A90", "ID_MN_RESI": municipios, "DT_NOTIFIC": datas}).to_csv(
+        caminho, sep=sep, index=False
+    )
+
+
+def test_codigos_e_meses_normalizados():
+    assert codigos_municipio(["270030", "2700300", "", "abc"]).tolist() == [270030, 270030, -1, -1]
+    assert meses(pd.Series(["2024-01-15", "20240220", "15/03/2024", None, "2024-13-01"])).tolist() == [
+        202401, 202402, 202403, -1, -1
+    ]
+
+
+def test_contagem_em_lotes_igual_a_contagem_direta(tmp_path):
+    rng = np.random.default_rng(0)
+    municipios = rng.choice(["270030", "2704302", "280030", "xx"], 5000)
+    datas = rng.choice(["2024-01-10", "20240205", "03/03/2024"], 5000)
+    _notificacoes(tmp_path / "dengue.csv", municipios, datas)
+
+    casos, linhas, descartadas = contar_casos(tmp_path / "dengue.csv", linhas_por_lote=333)
+    assert linhas == 5000
+    assert descartadas == int((municipios == "xx").sum())
+    esperado = pd.Series(codigos_municipio(municipios)).value_counts().drop(-1)
+    assert casos.groupby("municipio")["casos"].sum().sort_index().tolist() == esperado.sort_index().tolist()
+
+
+def test_ingestao_incremental_le_so_arquivos_novos_ou_alterados(tmp_path):
+    _notificacoes(tmp_path / "jan.csv", ["270030"] * 3 + ["270040"], ["2024-01-05"] * 4)
+    _notificacoes(tmp_path / "fev.csv", ["270030"] * 2, ["2024-02-05"] * 2, sep=",")
+    acumulado = AcumuladoInsalubridade(tmp_path / "totais")
+
+    assert acumulado.ingerir(tmp_path / "jan.csv", "dengue")["situacao"] == "novo"
+    assert acumulado.ingerir(tmp_path / "jan.csv", "dengue")["situacao"] == "inalterado"
+    assert acumulado.ingerir(tmp_path / "fev.csv", "dengue")["situacao"] == "novo"
+    assert acumulado.totais("dengue").to_dict() == {270030: 5, 270040: 1}
+    assert acumulado.totais("dengue", inicio=202402).to_dict() == {270030: 2}
+
+    # Arquivo republicado com correções: a parte antiga é substituída
+    _notificacoes(tmp_path / "jan.csv", ["270040"] * 2, ["2024-01-05"] * 2)
+    assert acumulado.ingerir(tmp_path / "jan.csv", "dengue")["situacao"] == "atualizado"
+    assert acumulado.totais("dengue").to_dict() == {270030: 2, 270040: 2}
+    assert len(acumulado.catalogo()["arquivos"]) == 2
+    assert acumulado.totais("peconhentos").empty
+
+    with pytest.raises(ValueError, match="Agravo"):
+        acumulado.ingerir(tmp_path / "jan.csv", "malaria")
+
+
+def test_notas_normalizadas_pelas_minimas_e_maximas(tmp_path):
+    gdf = gerar_base_sintetica(20, semente=4)
+    codigos = gdf["CD_MUN"].str[:6].to_numpy()
+    _notificacoes(tmp_path / "dengue.csv", np.repeat(codigos, np.arange(20)), "2024-03-01")
+    _notificacoes(tmp_path / "animais.csv", codigos[:5], "2024-03-01")
+    acumulado = AcumuladoInsalubridade(tmp_path / "totais")
+    acumulado.ingerir(tmp_path / "dengue.csv", "dengue")
+    acumulado.ingerir(tmp_path / "animais.csv", "peconhentos")
+
+    atualizada, tabela = recalcular_notas_insalubridade(acumulado, gdf)
+    incidencia = np.arange(20) * 100_000 / gdf["populacao"].to_numpy()
+    assert atualizada["nota_insalub"].min() == 0 and atualizada["nota_insalub"].max() == pytest.approx(10)
+    assert atualizada["nota_insalub"].to_numpy().argmax() == incidencia.argmax()
+    np.testing.assert_allclose(tabela["dengue"], incidencia)
+
+    # Só nota_insalub_2 entra nos totais trimestrais
+    diferenca = atualizada["nota_insalub_2"] - gdf["nota_insalub_2"]
+    np.testing.assert_allclose(atualizada["nota_total_q1"], gdf["nota_total_q1"] + diferenca)
@@ -0,0 +1,82 @@
+"""Testes para o instantâneo estático da visão padrão."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import json
+
+import pytest
+
+from mda_app.config.settings import PATHS
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.indicadores import cartoes_selecao, resumir_selecao
+from mda_app.core.instantaneo import gerar_instantaneo, selecao_padrao
+from mda_app.core.preparacao import carregar_base_preparada
+
+RAIZ = os.path.join(os.path.dirname(__file__), '..')
+
+
+@pytest.fixture(scope="module")
+def pacote(tmp_path_factory):
+    diretorio = tmp_path_factory.mktemp("instantaneo")
+    caminho = str(diretorio / "base.geojson")
+    gdf = gerar_base_sintetica(60, semente=4)
+    gdf.loc[gdf.index[0], "nota_media"] = float("nan")
+    gdf.to_file(caminho, driver="GeoJSON")
+    base = carregar_base_preparada(caminho)
+    manifesto = gerar_instantaneo(base, str(diretorio / "saida"))
+    return caminho, base, diretorio / "saida", manifesto
+
+
+def test_pacote_com_variantes_por_uf(pacote):
+    _, base, saida, manifesto = pacote
+    ufs = sorted(base["SIGLA_UF"].unique())
+    assert list(manifesto["paginas"]) == ["index.html", *[f"{uf}.html" for uf in ufs]]
+    assert json.loads((saida / "numeros.json").read_text(encoding="utf-8")) == json.loads(json.dumps(manifesto))
+    assert (saida / "recursos" / "plotly.min.js").stat().st_size > 1_000_000
+
+    padrao = manifesto["paginas"]["index.html"]
+    # Faixa completa do slider: municípios sem nota ficam de fora, como no app
+    assert padrao["indicadores"]["municipios"] == len(base) - 1
+    assert padrao["cartoes"] == cartoes_selecao(resumir_selecao(selecao_padrao(base)))
+    assert {linha["SIGLA_UF"] for linha in padrao["composicao_uf"]} == set(ufs)
+
+    for pagina, numeros in manifesto["paginas"].items():
+        conteudo = (saida / pagina).read_text(encoding="utf-8")
+        assert (saida / "mapas" / pagina).exists() and f'src="mapas/{pagina}"' in conteudo
+        assert '<script src="recursos/plotly.min.js"></script>' in conteudo
+        for rotulo, valor in numeros["cartoes"] + numeros["cartoes_trimestrais"]:
+            assert f"<span>{rotulo}</span><strong>{valor}</strong>" in conteudo
+        assert "cdn.plot.ly" not in conteudo
+
+
+def _metricas(app):
+    return {(metrica.label, metrica.value) for metrica in app.metric}
+
+
+def test_numeros_iguais_aos_do_app(pacote, tmp_path, monkeypatch):
+    """Os cards do instantâneo são os que o app mostra na mesma seleção."""
+    import streamlit as st
+    from PIL import Image
+    from streamlit.testing.v1 import AppTest
+
+    caminho, base, _, manifesto = pacote
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("assets/images")
+    Image.new("RGB", (8, 8), "white").save("assets/images/img_1.png")
+    monkeypatch.setitem(PATHS, "dataset", caminho)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    app = AppTest.from_file(os.path.join(RAIZ, "main.py"), default_timeout=120)
+    app.run()
+    assert not app.exception
+    padrao = manifesto["paginas"]["index.html"]
+    assert {tuple(c) for c in padrao["cartoes"] + padrao["cartoes_trimestrais"]} <= _metricas(app)
+
+    uf = base["SIGLA_UF"].value_counts().index[0]
+    app.multiselect(key="ufs_selecionadas").set_value([uf]).run()
+    assert not app.exception
+    variante = manifesto["paginas"][f"{uf}.html"]
+    assert {tuple(c) for c in variante["cartoes"] + variante["cartoes_trimestrais"]} <= _metricas(app)
@@ -0,0 +1,110 @@
+"""Testes para a instrumentação de etapas."""
+
+import json
+import logging
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from mda_app.utils import instrumentacao
+from mda_app.utils.instrumentacao import (
+    ativar_instrumentacao,
+    etapa,
+    finalizar_rerun,
+    iniciar_rerun,
+    medir_etapa,
+)
+
+
+@pytest.fixture
+def instrumentacao_ligada():
+    ativar_instrumentacao(True)
+    yield
+    ativar_instrumentacao(False)
+
+
+def test_desativada_nao_registra():
+    """Sem instrumentação, etapas não geram registros."""
+    ativar_instrumentacao(False)
+    iniciar_rerun()
+    with etapa("qualquer") as registro:
+        assert registro.payload("abc") == "abc"
+    assert finalizar_rerun() == []
+
+
+def test_registra_etapas_e_emite_json(instrumentacao_ligada):
+    """Cada etapa registra tempo, alocação e payload, e o rerun vira log JSON."""
+    mensagens = []
+
+    class _Coletor(logging.Handler):
+        def emit(self, record):
+            mensagens.append(record.getMessage())
+
+    coletor = _Coletor()
+    instrumentacao.logger.addHandler(coletor)
+
+    @medir_etapa("dobrar", payload=True)
+    def dobrar(x):
+        return x * 2
+
+    try:
+        iniciar_rerun()
+        with etapa("lista") as registro:
+            dados = list(range(10000))
+            registro.payload(b"x" * 128)
+        assert dobrar("ab") == "abab"
+        registros = finalizar_rerun(municipios=3)
+    finally:
+        instrumentacao.logger.removeHandler(coletor)
+
+    assert [r["etapa"] for r in registros] == ["lista", "dobrar"]
+    assert registros[0]["payload_bytes"] == 128
+    assert registros[0]["alocado_kb"] > 0
+    assert registros[1]["payload_bytes"] == 4
+
+    evento = json.loads(mensagens[-1])
+    assert evento["evento"] == "rerun"
+    assert evento["municipios"] == 3
+    assert evento["payload_total_bytes"] == 132
+    assert len(dados) == 10000
+
+
+def test_cache_com_estatisticas_conta_acertos():
+    """Chamadas repetidas com o mesmo argumento contam como acerto."""
+    from functools import lru_cache
+    from mda_app.utils.instrumentacao import cache_com_estatisticas, estatisticas_cache
+
+    def _lru(func):
+        cacheada = lru_cache(maxsize=None)(func)
+        cacheada.clear = cacheada.cache_clear
+        return cacheada
+
+    @cache_com_estatisticas(_lru)
+    def quadrado_cacheado(x):
+        return x * x
+
+    assert [quadrado_cacheado(v) for v in (2, 2, 3, 2)] == [4, 4, 9, 4]
+
+    stats = estatisticas_cache()[quadrado_cacheado.__qualname__]
+    assert stats["chamadas"] == 4
+    assert stats["execucoes"] == 2
+    assert stats["taxa_acerto"] == 0.5
+
+
+def test_payload_do_mapa_sem_renderizar_de_novo():
+    """O payload do mapa vem do HTML já gerado, sem nova renderização."""
+    import folium
+    from mda_app.utils.instrumentacao import tamanho_payload
+
+    m = folium.Map(location=[-9.6, -36.6], zoom_start=7)
+    anel = [[-36.6 + i / 1000, -9.6 + (i % 7) / 1000] for i in range(2000)]
+    folium.GeoJson({"type": "Polygon", "coordinates": [anel + anel[:1]]}).add_to(m)
+    antes = tamanho_payload(m)
+    assert len(m.get_root().script._children) == 0
+
+    html = m.get_root().render()
+    depois = tamanho_payload(m)
+    assert depois > antes
+    assert depois == pytest.approx(len(html.encode("utf-8")), rel=0.1)
@@ -0,0 +1,110 @@
+"""Testes para a krigagem das notas trimestrais de clima."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mda_app.core import krigagem
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.krigagem import (
+    agregar_trimestres,
+    ajustar_variograma,
+    krigar,
+    krigar_lote,
+    projetar,
+    recalcular_notas_clima,
+)
+
+
+def _chuva(latitude, longitude):
+    """Precipitação diária (mm) com tendência espacial suave."""
+    return (latitude + 40) * 0.2 + np.sin(longitude / 5)
+
+
+@pytest.fixture(scope="module")
+def series(tmp_path_factory):
+    rng = np.random.default_rng(1)
+    latitude, longitude = rng.uniform(-33, 5, 80), rng.uniform(-74, -35, 80)
+    datas = pd.date_range("2020-01-01", "2021-12-31", freq="D")
+    estacao = np.repeat(np.arange(80), len(datas))
+    df = pd.DataFrame({
+        "estacao": estacao,
+        "data": np.tile(datas.to_numpy(), 80),
+        "latitude": latitude[estacao],
+        "longitude": longitude[estacao],
+        "precipitacao": _chuva(latitude[estacao], longitude[estacao]),
+    })
+    # Estação 0 sem o primeiro trimestre de 2021 quase inteiro: só 2020 conta
+    df = df[~((df["estacao"] == 0) & (df["data"] >= "2021-01-01") & (df["data"] < "2021-03-20"))]
+    pasta = tmp_path_factory.mktemp("series")
+    df.to_parquet(pasta / "series.parquet")
+    df.to_csv(pasta / "series.csv", index=False)
+    return pasta
+
+
+def test_agregacao_por_trimestre_em_lotes(series):
+    parquet = agregar_trimestres(series / "series.parquet", linhas_por_lote=5000)
+    csv = agregar_trimestres(series / "series.csv", linhas_por_lote=7777)
+    pd.testing.assert_frame_equal(parquet, csv, check_exact=False, check_index_type=False)
+
+    dias_q1_2020 = 91
+    linha = parquet.loc[1]
+    assert linha["q1"] == pytest.approx(_chuva(linha["latitude"], linha["longitude"]) * (dias_q1_2020 + 90) / 2)
+    assert parquet.loc[0, "q1"] == pytest.approx(_chuva(parquet.loc[0, "latitude"], parquet.loc[0, "longitude"]) * 91)
+
+
+def test_krigagem_exata_nas_estacoes_e_suave_entre_elas(series):
+    trimestres = agregar_trimestres(series / "series.parquet")
+    estacoes = projetar(trimestres["longitude"], trimestres["latitude"])
+    valores = trimestres["q2"].to_numpy()
+    variograma = ajustar_variograma(estacoes, valores)
+    assert variograma[1] > 0 and variograma[2] > 0
+
+    exato = krigar_lote(estacoes, valores, estacoes[:10], (0.0,) + variograma[1:], vizinhos=16)
+    np.testing.assert_allclose(exato, valores[:10], rtol=1e-8)
+
+
+def test_estacoes_coincidentes_usam_a_media(series):
+    trimestres = agregar_trimestres(series / "series.parquet")
+    estacoes = projetar(trimestres["longitude"], trimestres["latitude"])
+    valores = trimestres["q2"].to_numpy()
+    variograma = (0.0,) + ajustar_variograma(estacoes, valores)[1:]
+
+    duplicadas = np.vstack([estacoes, estacoes[:5]])
+    obtido = krigar_lote(duplicadas, np.concatenate([valores, valores[:5] + 10]), estacoes[:10], variograma, 16)
+    np.testing.assert_allclose(obtido[:5], valores[:5] + 5, rtol=1e-8)
+    np.testing.assert_allclose(obtido[5:], valores[5:10], rtol=1e-8)
+
+
+def test_pool_e_lotes_pequenos_iguais_ao_processo_atual(series, monkeypatch):
+    trimestres = agregar_trimestres(series / "series.parquet")
+    estacoes = projetar(trimestres["longitude"], trimestres["latitude"])
+    valores = trimestres[["q1", "q2", "q3", "q4"]].to_numpy()
+    variogramas = [ajustar_variograma(estacoes, valores[:, q]) for q in range(4)]
+    alvos = estacoes[:30] + 20_000
+
+    esperado = krigar(estacoes, valores, alvos, variogramas, vizinhos=12, processos=1)
+    monkeypatch.setattr(krigagem, "ALVOS_POR_PROCESSO", 10)
+    obtido = krigar(estacoes, valores, alvos, variogramas, vizinhos=12, processos=2, memoria_mb=1)
+    np.testing.assert_allclose(obtido, esperado)
+
+
+def test_notas_gravadas_na_base(series):
+    gdf = gerar_base_sintetica(120)
+    atualizada, precipitacao, _ = recalcular_notas_clima(series / "series.parquet", gdf, processos=1)
+
+    centroides = gdf.to_crs(epsg=5880).centroid.to_crs(epsg=4326)
+    verdade = _chuva(centroides.y.to_numpy(), centroides.x.to_numpy())
+    assert np.corrcoef(precipitacao[:, 0], verdade)[0, 1] > 0.99
+    notas = atualizada[[f"nota_p_q{q}" for q in range(1, 5)]].to_numpy()
+    assert notas.min() >= 0 and notas.max() == pytest.approx(20)
+    fixos = gdf["nota_total_q1"] - gdf["nota_p_q1"]
+    np.testing.assert_allclose(atualizada["nota_total_q1"], fixos + atualizada["nota_p_q1"])
+    np.testing.assert_allclose(atualizada["nota_media"], atualizada[[f"nota_total_q{q}" for q in range(1, 5)]].mean(axis=1))
+
+    em_grade, _, _ = recalcular_notas_clima(series / "series.parquet", gdf, grade=100_000, processos=1)
+    assert em_grade["nota_p_q1"].notna().all()
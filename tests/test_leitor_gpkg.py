@@ -0,0 +1,53 @@
+"""Testes para o leitor de GeoPackage."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import geopandas as gpd
+import pytest
+import shapely
+
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.leitor_gpkg import ler_gpkg, obter_pool
+
+
+@pytest.fixture(scope="module")
+def gpkg(tmp_path_factory):
+    """GeoPackage gerado localmente, com índice espacial R-tree."""
+    gdf = gerar_base_sintetica(60, vertices_por_aresta=2)
+    caminho = tmp_path_factory.mktemp("gpkg") / "municipios.gpkg"
+    gdf.to_file(caminho, driver="GPKG", layer="municipios")
+    return str(caminho), gdf
+
+
+def test_leitura_completa_igual_ao_gdal(gpkg):
+    caminho, _ = gpkg
+    lido = ler_gpkg(caminho)
+    referencia = gpd.read_file(caminho)
+    assert list(lido.columns) == list(referencia.columns)
+    assert lido.crs == referencia.crs
+    assert shapely.equals_exact(lido.geometry.to_numpy(), referencia.geometry.to_numpy(), 0).all()
+
+
+def test_filtros_por_uf_faixa_e_bbox(gpkg):
+    caminho, gdf = gpkg
+    uf = gdf["SIGLA_UF"].iloc[0]
+    por_uf = ler_gpkg(caminho, ufs=[uf], faixas={"nota_media": (0, 30)})
+    esperado = gdf[(gdf["SIGLA_UF"] == uf) & gdf["nota_media"].between(0, 30)]
+    assert sorted(por_uf["CD_MUN"]) == sorted(esperado["CD_MUN"])
+
+    bbox = (-60.0, -20.0, -45.0, -5.0)
+    por_bbox = ler_gpkg(caminho, bbox=bbox, colunas=["CD_MUN"])
+    esperado = gdf[gdf.intersects(shapely.box(*bbox))]
+    assert list(por_bbox.columns) == ["CD_MUN", "geometry"]
+    assert sorted(por_bbox["CD_MUN"]) == sorted(esperado["CD_MUN"])
+
+
+def test_conexoes_reaproveitadas(gpkg):
+    caminho, _ = gpkg
+    pool = obter_pool(caminho)
+    for _ in range(5):
+        ler_gpkg(caminho, ufs=["SP"])
+    assert pool is obter_pool(caminho)
+    assert pool.abertas == 1
@@ -0,0 +1,42 @@
+"""Testes para a precificação por faixas de pontuação."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pandas as pd
+
+from mda_app.core.precificacao import (
+    calcular_totais_trimestrais,
+    calcular_valor_por_nota,
+    valor_por_nota,
+)
+
+
+def test_valor_vetorizado_igual_ao_escalar():
+    """A versão vetorizada deve reproduzir a função escalar, inclusive nos limites."""
+    notas = np.array([0, 15, 15.01, 25, 25.5, 35, 40, 45, 45.1, 55, 55.01, 80])
+    areas = np.linspace(10, 1000, len(notas))
+
+    esperado = [calcular_valor_por_nota(n, a) for n, a in zip(notas, areas)]
+
+    np.testing.assert_allclose(valor_por_nota(notas, areas), esperado)
+
+
+def test_totais_trimestrais():
+    """Os totais somam o valor de cada município por trimestre."""
+    df = pd.DataFrame({
+        "area_georef": [100.0, 200.0],
+        "nota_total_q1": [10, 30],
+        "nota_total_q2": [20, 40],
+        "nota_total_q3": [50, 60],
+        "nota_total_q4": [15, 56],
+    })
+
+    totais = calcular_totais_trimestrais(df)
+
+    assert totais[0] == 100 * 49.83 + 200 * 104.78
+    assert totais[1] == 100 * 59.80 + 200 * 134.88
+    assert totais[2] == 100 * 164.95 + 200 * 202.87
+    assert totais[3] == 100 * 49.83 + 200 * 202.87
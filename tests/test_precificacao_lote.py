@@ -0,0 +1,62 @@
+"""Testes para a precificação em lote."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+import pytest
+
+from mda_app.core.acervo_safras import AcervoSafras
+from mda_app.core.colunas_derivadas import aplicar_correcoes
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.fontes_dados import gravar_tabela_sqlite
+from mda_app.core.precificacao import calcular_totais_trimestrais
+from mda_app.core.base_colunar import salvar_base_colunar
+from mda_app.core.precificacao_lote import ler_particao, precificar_lote
+
+
+@pytest.fixture(scope="module")
+def base():
+    return gerar_base_sintetica(120)
+
+
+def test_totais_iguais_ao_dashboard(base, tmp_path):
+    banco = tmp_path / "base.db"
+    gravar_tabela_sqlite(base, banco)
+    resumo = precificar_lote(f"sqlite:///{banco}", tmp_path / "saida", processos=2)
+
+    esperado = calcular_totais_trimestrais(aplicar_correcoes(base.copy()))
+    obtido = resumo[["valor_q1", "valor_q2", "valor_q3", "valor_q4"]].sum().tolist()
+    assert obtido == pytest.approx(esperado)
+    assert resumo["municipios"].sum() == len(base)
+    assert sorted(resumo["SIGLA_UF"]) == sorted(base["SIGLA_UF"].unique())
+
+
+def test_saidas_parquet_e_csv_por_uf(base, tmp_path):
+    acervo = AcervoSafras(tmp_path / "acervo")
+    acervo.ingerir(base, "2025-01")
+    ufs = sorted(base["SIGLA_UF"].unique())[:2]
+    precificar_lote(str(tmp_path / "acervo"), tmp_path / "saida", ufs=ufs, processos=1)
+
+    parquet = pd.read_parquet(tmp_path / "saida" / "parquet")
+    assert sorted(parquet["SIGLA_UF"].astype(str).unique()) == ufs
+    assert {"valor_medio", "faixa_q1", "valor_q4"} <= set(parquet.columns)
+    for uf in ufs:
+        csv = pd.read_csv(tmp_path / "saida" / "csv" / f"precificacao_{uf}.csv")
+        assert len(csv) == (base["SIGLA_UF"] == uf).sum()
+
+
+@pytest.mark.parametrize("formato", ["geojson", "gpkg", "colunar"])
+def test_particao_le_so_a_uf_sem_geometria(base, tmp_path, formato):
+    if formato == "colunar":
+        origem = tmp_path / "colunar"
+        salvar_base_colunar(base, origem)
+    else:
+        origem = tmp_path / f"base.{formato}"
+        base.to_file(origem, driver="GeoJSON" if formato == "geojson" else "GPKG")
+    uf = sorted(base["SIGLA_UF"].unique())[0]
+
+    particao = ler_particao(str(origem), uf)
+    assert type(particao) is pd.DataFrame and "geometry" not in particao.columns
+    assert sorted(particao["CD_MUN"]) == sorted(base.loc[base["SIGLA_UF"] == uf, "CD_MUN"])
@@ -0,0 +1,52 @@
+"""Testes para os relatórios por município."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from mda_app.core import relatorios
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.indicadores import cartoes_selecao, resumir_selecao
+from mda_app.core.relatorios import gerar_relatorios, medidor_svg, renderizar_relatorio
+
+
+@pytest.fixture(scope="module")
+def base():
+    return gerar_base_sintetica(40)
+
+
+def test_relatorio_de_um_municipio(base):
+    municipio = base.iloc[0].drop("geometry").to_dict()
+    municipio["NM_MUN"] = "São João <d'El Rei>"
+    pagina = renderizar_relatorio(municipio)
+    assert "São João &lt;d&#x27;El Rei&gt;" in pagina
+    assert pagina.count("<svg") == 2
+    assert "Valor Médio/ha" in pagina and "R$ " in pagina
+    assert 'stroke="darkblue"' in medidor_svg(55.5)
+
+
+def test_cards_iguais_aos_do_dashboard(base):
+    """Os cards do relatório são os do app com o município selecionado sozinho."""
+    municipio = base.iloc[[3]].drop(columns="geometry")
+    pagina = renderizar_relatorio(municipio.iloc[0].to_dict())
+    cartoes = cartoes_selecao(resumir_selecao(municipio))
+    assert len(cartoes) == 4
+    for rotulo, valor in cartoes:
+        assert f"<span>{rotulo}</span><strong>{valor}</strong>" in pagina
+
+
+@pytest.mark.parametrize("processos", [1, 2])
+def test_um_relatorio_por_municipio(base, tmp_path, monkeypatch, processos):
+    monkeypatch.setattr(relatorios, "RELATORIOS_POR_PROCESSO", 5)
+    ufs = sorted(base["SIGLA_UF"].unique())[:3]
+    gerados = gerar_relatorios(base, tmp_path, ufs=ufs, processos=processos)
+
+    esperados = base[base["SIGLA_UF"].isin(ufs)]
+    assert sorted(os.path.basename(c)[:-5] for c in gerados) == sorted(esperados["CD_MUN"])
+    assert os.path.exists(tmp_path / "recursos" / "relatorio.css")
+    with open(gerados[0], encoding="utf-8") as arquivo:
+        assert "../recursos/relatorio.css" in arquivo.read()
+    with open(tmp_path / "index.html", encoding="utf-8") as arquivo:
+        assert arquivo.read().count("<li>") == len(esperados)
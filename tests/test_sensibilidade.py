@@ -0,0 +1,97 @@
+"""Testes para a análise de sensibilidade dos preços."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pytest
+
+from mda_app.core import sensibilidade
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.precificacao import COLUNAS_TRIMESTRES, calcular_totais_trimestrais, valor_por_nota
+from mda_app.core.sensibilidade import (
+    analisar_sensibilidade,
+    desvios_do_total,
+    municipios_em_risco,
+    simular,
+)
+
+
+@pytest.fixture
+def base():
+    gdf = gerar_base_sintetica(60, semente=5)
+    gdf.attrs["versao"] = "teste"
+    return gdf
+
+
+def test_sem_ruido_reproduz_os_precos(base):
+    desvios = {"nota_veg": 0.0}
+    resumo, totais = analisar_sensibilidade(base, desvios, sorteios=300)
+    assert (resumo["prob_mudar_faixa"] == 0).all()
+    np.testing.assert_allclose(resumo["valor_esperado"], resumo["valor_base"])
+    np.testing.assert_allclose(totais["valor_mun_area"], valor_por_nota(base["nota_media"], base["area_georef"]).sum())
+    np.testing.assert_allclose(totais.iloc[0, 1:], calcular_totais_trimestrais(base))
+
+
+def test_municipio_no_limite_muda_de_faixa_metade_das_vezes():
+    trimestres = np.array([[35.0] * 4, [30.0] * 4])
+    contagem, _ = simular(trimestres, trimestres.mean(axis=1), [1.0, 1.0], {"nota_area": 0.5}, sorteios=4000)
+    proporcao = contagem / contagem.sum(axis=1, keepdims=True)
+    # 35 é inclusivo na faixa 3 (índice 2): metade dos sorteios sobe para a faixa 4
+    assert proporcao[0, 2] == pytest.approx(0.5, abs=0.03) and proporcao[0, 3] == pytest.approx(0.5, abs=0.03)
+    # 30 está a 10 desvios dos limites
+    assert proporcao[1, 2] == 1
+
+
+def test_desvios_combinados_e_notas_desconhecidas():
+    comum, clima = desvios_do_total({"nota_veg": 0.3, "nota_area": 0.4, "nota_p_q2": 2.0})
+    assert comum == pytest.approx(0.5)
+    assert clima.tolist() == [0, 2.0, 0, 0]
+    with pytest.raises(ValueError, match="nota_media"):
+        desvios_do_total({"nota_media": 1.0})
+
+
+def test_resultado_independe_dos_processos_e_fica_memorizado(base, monkeypatch):
+    trimestres, media, area = base[COLUNAS_TRIMESTRES], base["nota_media"], base["area_georef"]
+    um = simular(trimestres, media, area, sorteios=600, processos=1)
+    monkeypatch.setattr(sensibilidade, "ELEMENTOS_POR_PROCESSO", 1)
+    dois = simular(trimestres, media, area, sorteios=600, processos=2)
+    np.testing.assert_array_equal(um[0], dois[0])
+    np.testing.assert_allclose(um[1], dois[1])
+
+    resultado = analisar_sensibilidade(base, sorteios=500)
+    assert analisar_sensibilidade(base, sorteios=500) is resultado
+    assert analisar_sensibilidade(base.iloc[:30], sorteios=500) is not resultado
+    em_risco = municipios_em_risco(resultado[0], quantidade=5)
+    assert len(em_risco) <= 5 and em_risco["prob_mudar_faixa"].is_monotonic_decreasing
+
+
+def test_parametros_descartados_quando_a_selecao_muda(tmp_path, monkeypatch):
+    """Mudar os filtros não refaz a simulação: ela precisa ser pedida de novo."""
+    import streamlit as st
+    from PIL import Image
+    from streamlit.testing.v1 import AppTest
+
+    from mda_app.config.settings import PATHS
+
+    caminho = str(tmp_path / "base.geojson")
+    gerar_base_sintetica(60, semente=6).to_file(caminho, driver="GeoJSON")
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("assets/images")
+    Image.new("RGB", (8, 8), "white").save("assets/images/img_1.png")
+    monkeypatch.setitem(PATHS, "dataset", caminho)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    app = AppTest.from_file(os.path.join(os.path.dirname(__file__), '..', 'main.py'), default_timeout=120)
+    app.run()
+    formulario = next(b for b in app.get("form_submit_button") if b.label == "Simular")
+    formulario.click().run()
+    assert not app.exception
+    assert "parametros_sensibilidade" in app.session_state
+
+    uf = app.multiselect(key="ufs_selecionadas").value[0]
+    app.multiselect(key="ufs_selecionadas").set_value([uf]).run()
+    assert not app.exception
+    assert "parametros_sensibilidade" not in app.session_state
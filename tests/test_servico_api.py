@@ -0,0 +1,156 @@
+"""Testes para a API HTTP local."""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import gzip
+import http.client
+import json
+import threading
+
+import pytest
+
+from mda_app.core.colunas_derivadas import aplicar_correcoes
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.indicadores import resumir_selecao
+from mda_app.core.precificacao import calcular_totais_trimestrais
+from mda_app.core.servico_api import (
+    ErroConsulta,
+    ServicoAPI,
+    criar_servidor,
+    etag_confere,
+)
+
+
+@pytest.fixture(scope="module")
+def servico():
+    gdf = aplicar_correcoes(gerar_base_sintetica(200, semente=6).to_crs(epsg=4326))
+    gdf.attrs["versao"] = "teste"
+    return ServicoAPI(gdf)
+
+
+def _json(servico, caminho, **consulta):
+    _, corpo, _, _, _ = servico.responder(
+        caminho, {k: [v] for k, v in consulta.items()}
+    )
+    return json.loads(corpo)
+
+
+def test_agregados_iguais_aos_do_dashboard(servico):
+    gdf = servico.gdf
+    ufs = sorted(gdf["SIGLA_UF"].unique())[:2]
+    resposta = _json(
+        servico, "/agregados", uf=",".join(ufs), criterio="nota_media", min="30"
+    )
+    selecao = gdf[gdf["SIGLA_UF"].isin(ufs) & (gdf["nota_media"] >= 30)]
+    assert resposta["indicadores"] == pytest.approx(resumir_selecao(selecao))
+    assert [linha["SIGLA_UF"] for linha in resposta["notas_por_uf"]] == ufs
+    assert _json(servico, "/precos")["valores_trimestrais"] == pytest.approx(
+        calcular_totais_trimestrais(gdf)
+    )
+
+
+def test_municipio_busca_e_geojson(servico):
+    gdf = servico.gdf
+    codigo = gdf["CD_MUN"].iloc[3]
+    detalhe = _json(servico, f"/municipios/{codigo}")
+    assert detalhe["municipio"]["CD_MUN"] == codigo
+    assert "valor_medio" in detalhe["municipio"]
+    assert [p["trimestre"] for p in detalhe["precos"]] == [1, 2, 3, 4]
+
+    busca = _json(servico, "/municipios", nome=f"MUNICÍPIO {codigo}")
+    assert [m["CD_MUN"] for m in busca["municipios"]] == [codigo]
+
+    uf = gdf["SIGLA_UF"].iloc[0]
+    colecao = _json(servico, f"/geojson/{uf.lower()}")
+    assert len(colecao["features"]) == int((gdf["SIGLA_UF"] == uf).sum())
+
+    for caminho, consulta in (
+        ("/municipios/0000000", {}),
+        ("/geojson/XX", {}),
+        ("/inexistente", {}),
+        ("/agregados", {"min": ["abc"]}),
+    ):
+        with pytest.raises(ErroConsulta):
+            servico.responder(caminho, consulta)
+
+
+def test_etag_gzip_e_304_pelo_servidor(servico):
+    servidor = criar_servidor(servico, porta=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        conexao = http.client.HTTPConnection(
+            "127.0.0.1", servidor.server_address[1], timeout=10
+        )
+        conexao.request(
+            "GET", "/agregados?uf=AL,SE", headers={"Accept-Encoding": "gzip"}
+        )
+        resposta = conexao.getresponse()
+        corpo = resposta.read()
+        assert (
+            resposta.status == 200 and resposta.getheader("Content-Encoding") == "gzip"
+        )
+        assert "indicadores" in json.loads(gzip.decompress(corpo))
+        etag = resposta.getheader("ETag")
+
+        # Mesma consulta em outra ordem, na mesma conexão persistente
+        conexao.request(
+            "GET", "/agregados?uf=SE&uf=AL", headers={"If-None-Match": etag}
+        )
+        resposta = conexao.getresponse()
+        assert resposta.status == 304 and resposta.read() == b""
+
+        conexao.request("GET", "/saude")
+        resposta = conexao.getresponse()
+        assert resposta.status == 200 and resposta.getheader("Content-Encoding") is None
+        assert json.loads(resposta.read())["municipios"] == len(servico.gdf)
+        conexao.close()
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    outra = servico.gdf.copy()
+    outra.attrs["versao"] = "outra"
+    assert ServicoAPI(outra).etag("x") != servico.etag("x")
+
+
+def test_if_none_match_exato():
+    etag = '"abc123"'
+    assert etag_confere(etag, '"abc123"')
+    assert etag_confere(etag, 'W/"abc123"')
+    assert etag_confere(etag, '"outro", W/"abc123"')
+    assert etag_confere(etag, "*")
+    assert not etag_confere(etag, '"abc12"')
+    assert not etag_confere(etag, '"xabc123", "abc1234"')
+    assert not etag_confere(etag, "abc123")
+    assert not etag_confere(etag, None)
+
+
+def test_304_sem_montar_a_resposta(servico, monkeypatch):
+    servidor = criar_servidor(servico, porta=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        conexao = http.client.HTTPConnection(
+            "127.0.0.1", servidor.server_address[1], timeout=10
+        )
+        conexao.request("GET", "/precos?uf=AL")
+        resposta = conexao.getresponse()
+        resposta.read()
+        etag = resposta.getheader("ETag")
+
+        def falhar(*argumentos):
+            raise AssertionError("resposta montada para um ETag válido")
+
+        monkeypatch.setattr(servico, "responder_pedido", falhar)
+        conexao.request(
+            "GET", "/precos?uf=AL", headers={"If-None-Match": f'"outro", W/{etag}'}
+        )
+        resposta = conexao.getresponse()
+        assert resposta.status == 304 and resposta.read() == b""
+        assert resposta.getheader("ETag") == etag
+        conexao.close()
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,102 @@
+"""Testes para os gráficos estatísticos."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Point
+
+from mda_app.components.visualizations import (
+    amostrar_preservando_densidade,
+    calcular_bins_histograma,
+    criar_gauge_area_georef,
+    criar_grafico_composicao_uf,
+    criar_grafico_trimestral,
+    criar_histograma,
+    criar_scatter_plot,
+)
+
+
+def _gdf_exemplo(n=200):
+    rng = np.random.default_rng(0)
+    return gpd.GeoDataFrame(
+        {
+            "NM_MUN": [f"Município {i}" for i in range(n)],
+            "nota_media": rng.uniform(10, 60, n),
+            "valor_mun_area": rng.uniform(1e5, 1e7, n),
+        },
+        geometry=[Point(i, i) for i in range(n)],
+        crs="EPSG:4326",
+    )
+
+
+def test_histograma_envia_apenas_contagens():
+    """O histograma deve conter só os bins, sem as linhas brutas."""
+    gdf = _gdf_exemplo()
+    fig = criar_histograma(gdf, "nota_media", "Notas", nbins=10)
+
+    contagens, _ = calcular_bins_histograma(gdf["nota_media"], 10)
+    assert len(fig.data) == 1
+    assert len(fig.data[0].y) == 10
+    assert int(np.sum(fig.data[0].y)) == len(gdf)
+    np.testing.assert_array_equal(fig.data[0].y, contagens)
+    assert "geometry" not in fig.to_json()
+
+
+def test_scatter_usa_webgl_e_reduz_pontos():
+    """O scatter deve usar Scattergl e respeitar o limite de pontos."""
+    gdf = _gdf_exemplo(1000)
+    fig = criar_scatter_plot(gdf, "nota_media", "valor_mun_area", "Dispersão", max_pontos=100)
+
+    assert fig.data[0].type == "scattergl"
+    assert len(fig.data[0].x) <= 200
+    assert "geometry" not in fig.to_json()
+
+    fig_completa = criar_scatter_plot(gdf, "nota_media", "valor_mun_area", "Dispersão", max_pontos=0)
+    assert len(fig_completa.data[0].x) == 1000
+
+
+def test_amostragem_preserva_celulas_esparsas():
+    """Pontos isolados devem sobreviver à amostragem."""
+    rng = np.random.default_rng(1)
+    x = np.r_[rng.normal(0, 1, 10000), 100.0]
+    y = np.r_[rng.normal(0, 1, 10000), 100.0]
+
+    indices = amostrar_preservando_densidade(x, y, 500)
+
+    assert 10000 in indices
+    assert len(indices) < 1000
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_templates_nao_sao_alterados_entre_chamadas():
+    """Cada chamada recebe uma cópia do template com os próprios dados."""
+    fig_a = criar_gauge_area_georef(30)
+    fig_b = criar_gauge_area_georef(80)
+
+    assert fig_a.data[0].value == 30
+    assert fig_b.data[0].value == 80
+    assert fig_b.data[0].gauge.threshold.value == 80
+    assert len(fig_a.data[0].gauge.steps) == 40
+
+    barras = criar_grafico_trimestral([10, 20, 30, 40])
+    assert list(barras.data[0].y) == [10, 20, 30, 40]
+    assert barras.layout.yaxis.range[1] == 40 * 1.15
+
+
+def test_grafico_composicao_uf_respeita_ordem_da_legenda():
+    """Os traços seguem a ordem da legenda e ignoram colunas ausentes."""
+    df_uf = pd.DataFrame({
+        "SIGLA_UF": ["AL", "SE"],
+        "nota_veg": [1.0, 2.0],
+        "nota_relevo": [3.0, 4.0],
+        "nota_total_q1": [5.0, 6.0],
+    })
+
+    fig = criar_grafico_composicao_uf(df_uf, ["nota_veg", "nota_relevo", "nota_total_q1"])
+
+    assert [t.name for t in fig.data] == ["Clima T1", "Relevo", "Vegetação"]
+    assert fig.layout.barmode == "stack"
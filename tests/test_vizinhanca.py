@@ -0,0 +1,54 @@
+"""Testes para o grafo de vizinhança entre municípios."""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+import pytest
+import shapely
+
+from mda_app.core import vizinhanca
+from mda_app.core.dados_sinteticos import gerar_base_sintetica
+from mda_app.core.vizinhanca import adjacencia, comparar_com_vizinhos, construir_adjacencia
+
+
+@pytest.fixture(scope="module")
+def base():
+    gdf = gerar_base_sintetica(120)
+    gdf.attrs["versao"] = "teste-vizinhanca"
+    return gdf
+
+
+def test_grafo_igual_a_forca_bruta(base):
+    geometrias = base.geometry.to_numpy()
+    grafo = construir_adjacencia(geometrias)
+
+    assert len(grafo) == len(base)
+    for posicao, geometria in enumerate(geometrias):
+        esperado = np.flatnonzero(shapely.intersects(geometria, geometrias))
+        assert list(grafo.vizinhos(posicao)) == [p for p in esperado if p != posicao]
+    # Simétrico: cada par aparece nos dois sentidos
+    pares = set(zip(grafo.linhas().tolist(), grafo.indices.tolist()))
+    assert pares == {(j, i) for i, j in pares}
+    # Malha hexagonal: municípios internos têm 6 vizinhos
+    assert grafo.graus().max() == 6
+
+
+def test_grafo_memorizado_pela_versao(base):
+    vizinhanca.limpar_memoria()
+    assert adjacencia(base) is adjacencia(base.copy())
+    outra = base.copy()
+    outra.attrs["versao"] = "outra"
+    assert adjacencia(outra) is not adjacencia(base)
+
+
+def test_comparacao_com_vizinhos(base):
+    posicao = int(np.argmax(adjacencia(base).graus()))
+    tabela = comparar_com_vizinhos(base, base.index[posicao])
+
+    assert len(tabela) == 7
+    assert tabela["referencia"].tolist() == [True] + [False] * 6
+    assert tabela.iloc[0]["nota_media_dif"] == 0
+    vizinho = tabela.iloc[1]
+    assert vizinho["nota_media_dif"] == pytest.approx(vizinho["nota_media"] - tabela.iloc[0]["nota_media"])